@@ -51,6 +51,8 @@ ENVFILE
 
 # Start backend with PM2
 pm2 start "uvicorn server:app --host 0.0.0.0 --port 8001" --name backend
+# Marketing broadcasts are sent by their own worker process, never by the API
+pm2 start "python broadcast_worker.py" --name broadcasts
 pm2 save
 pm2 startup
 
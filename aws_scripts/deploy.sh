@@ -88,6 +88,30 @@ sudo systemctl enable namecraft-backend
 sudo systemctl start namecraft-backend
 echo -e "${GREEN}Backend service started!${NC}"
 
+# Marketing broadcasts are sent by their own worker process, never by the API
+sudo cat > /etc/systemd/system/namecraft-broadcasts.service << EOF
+[Unit]
+Description=Name Craft Broadcast Worker
+After=network.target mongod.service
+
+[Service]
+User=ubuntu
+Group=ubuntu
+WorkingDirectory=$APP_DIR/backend
+Environment="PATH=$APP_DIR/backend/venv/bin"
+ExecStart=$APP_DIR/backend/venv/bin/python broadcast_worker.py
+Restart=always
+RestartSec=5
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
+sudo systemctl daemon-reload
+sudo systemctl enable namecraft-broadcasts
+sudo systemctl start namecraft-broadcasts
+echo -e "${GREEN}Broadcast worker started!${NC}"
+
 # Configure Nginx
 echo -e "${YELLOW}Configuring Nginx...${NC}"
 sudo cat > /etc/nginx/sites-available/namecraft << EOF
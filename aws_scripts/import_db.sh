@@ -1,7 +1,7 @@
 #!/bin/bash
 
 # Database Import Script - Uses files from db_export folder in repo
-# Usage: ./import_db.sh
+# Usage: ./import_db.sh [dump_dir]
 
 set -e
 
@@ -13,33 +13,27 @@ echo "=========================================="
 echo "  Importing Name Craft Database"
 echo "=========================================="
 
-# Check if mongodb-database-tools is installed
-if ! command -v mongoimport &> /dev/null; then
-    echo "Installing MongoDB Database Tools..."
-    sudo apt install -y mongodb-database-tools
+BACKEND_DIR="$SCRIPT_DIR/../backend"
+PYTHON="$BACKEND_DIR/venv/bin/python"
+if [ ! -x "$PYTHON" ]; then
+    PYTHON=python3
 fi
 
-# Check if export directory exists
-if [ ! -d "$EXPORT_DIR" ]; then
-    echo "Error: db_export directory not found at $EXPORT_DIR"
+# Accept either a db_tool.py dump directory or the legacy JSON export
+IMPORT_DIR="${1:-$EXPORT_DIR}"
+
+# Check if import directory exists
+if [ ! -d "$IMPORT_DIR" ]; then
+    echo "Error: import directory not found at $IMPORT_DIR"
     exit 1
 fi
 
-cd "$EXPORT_DIR"
-
-echo "Importing from: $EXPORT_DIR"
+echo "Importing from: $IMPORT_DIR"
 echo ""
 
-# Import each collection
-for file in *.json; do
-    if [ -f "$file" ] && [ -s "$file" ]; then
-        collection="${file%.json}"
-        echo "  Importing $collection..."
-        mongoimport --db=$DB_NAME --collection=$collection --file=$file --drop 2>/dev/null || echo "    Warning: $collection import had issues"
-    else
-        echo "  Skipping $file (empty or not found)"
-    fi
-done
+# Streams every collection in parallel and rebuilds indexes after loading;
+# re-running after an interruption resumes where it stopped
+"$PYTHON" "$BACKEND_DIR/db_tool.py" --db-name "$DB_NAME" restore "$IMPORT_DIR" --drop
 
 echo ""
 echo "Database import complete!"
@@ -57,6 +57,27 @@ sudo systemctl daemon-reload
 sudo systemctl enable namecraft-backend
 sudo systemctl start namecraft-backend
 
+# Marketing broadcasts are sent by their own worker process, never by the API
+sudo tee /etc/systemd/system/namecraft-broadcasts.service > /dev/null << 'EOF'
+[Unit]
+Description=Name Craft Broadcast Worker
+After=network.target mongod.service
+
+[Service]
+User=ubuntu
+WorkingDirectory=/var/www/namecraft/backend
+Environment="PATH=/var/www/namecraft/backend/venv/bin"
+ExecStart=/var/www/namecraft/backend/venv/bin/python broadcast_worker.py
+Restart=always
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
+sudo systemctl daemon-reload
+sudo systemctl enable namecraft-broadcasts
+sudo systemctl start namecraft-broadcasts
+
 # Nginx
 echo "Configuring Nginx..."
 sudo tee /etc/nginx/sites-available/namecraft > /dev/null << 'NGINX'
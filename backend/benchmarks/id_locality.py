@@ -0,0 +1,76 @@
+"""
+Document id benchmark: uuid4 vs time-ordered UUIDv7
+Inserts the same documents twice, once keyed by random uuid4 ids and once by ids.new_id(),
+into collections with a unique `id` index, and compares insert throughput (overall and
+for the last tenth, when the index no longer fits the cache as comfortably), index size
+and id generation cost.
+
+Run: python3 benchmarks/id_locality.py --documents 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from ids import new_id  # noqa: E402
+
+GENERATORS = {"uuid4": lambda: str(uuid.uuid4()), "uuid7": new_id}
+
+
+def insert_documents(collection, make_id, documents, batch_size):
+    """Insert in batches; returns (total seconds, seconds for the last tenth)"""
+    collection.drop()
+    collection.create_index("id", unique=True)
+    tail_from = documents - documents // 10
+    started = time.perf_counter()
+    tail_started = None
+    for first in range(0, documents, batch_size):
+        if tail_started is None and first >= tail_from:
+            tail_started = time.perf_counter()
+        now = datetime.utcnow()
+        collection.insert_many([
+            {"id": make_id(), "order_status": "pending", "total": 1499.0, "created_at": now}
+            for _ in range(min(batch_size, documents - first))
+        ], ordered=False)
+    finished = time.perf_counter()
+    return finished - started, finished - (tail_started or started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare uuid4 and time-ordered ids")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="namecraft_bench_ids")
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print("Id generation (1M calls):")
+    for name, make_id in GENERATORS.items():
+        seconds = timeit.timeit(make_id, number=1_000_000)
+        print(f"  {name:<6}{seconds * 1000:>8.0f} ms")
+
+    client = MongoClient(args.mongo_url)
+    db = client[args.db_name]
+    print(f"\n{'ids':<8}{'docs/s':>12}{'tail docs/s':>14}{'id index MB':>14}{'all indexes MB':>16}")
+    for name, make_id in GENERATORS.items():
+        collection = db[f"orders_{name}"]
+        total, tail = insert_documents(collection, make_id, args.documents, args.batch_size)
+        stats = db.command("collStats", collection.name)
+        print(f"{name:<8}{args.documents / total:>12,.0f}{(args.documents // 10) / tail:>14,.0f}"
+              f"{stats['indexSizes']['id_1'] / 2 ** 20:>14.1f}{stats['totalIndexSize'] / 2 ** 20:>16.1f}")
+
+    client.drop_database(args.db_name)
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
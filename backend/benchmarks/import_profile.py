@@ -0,0 +1,57 @@
+"""
+Startup import profile for server.py
+Imports the app in a fresh interpreter under `python -X importtime` and reports total
+import time plus the modules server.py pulls in directly, slowest first. Use it to
+check that a new top-level import does not slow cold starts; the budget itself is
+enforced by tests/test_startup.py. No database needed (the Mongo client connects lazily).
+
+Run: python3 benchmarks/import_profile.py --top 20
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# "import time:  self [us] | cumulative | imported package", nesting shown by indentation
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def profile(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if result.returncode:
+        raise SystemExit(result.stderr[-2000:])
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, len(indent) // 2, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile server.py import time")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    entries = profile(args.module)
+    app = next(entry for entry in reversed(entries) if entry[0] == args.module and entry[1] == 0)
+    # Modules imported directly by the app sit one level below it (level 1)
+    direct = sorted((entry for entry in entries if entry[1] == 1), key=lambda entry: -entry[3])
+
+    print(f"import {args.module}: {app[3] / 1000:.0f} ms total, {app[2] / 1000:.0f} ms in the module body\n")
+    print(f"{'module':<32}{'cumulative':>12}")
+    for name, _, _, cumulative_us in direct[:args.top]:
+        print(f"{name:<32}{cumulative_us / 1000:>9.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+End-to-end load test for Name Craft
+Starts the API against a local mongod, seeds a synthetic dataset and drives a weighted
+mix of storefront, checkout and admin traffic. Reports p50/p95/p99 latency and
+throughput per route and writes the results as JSON so runs can be compared.
+
+Run: python3 benchmarks/load_test.py --products 2000 --orders 20000 --duration 60
+     python3 benchmarks/load_test.py --mix checkout=1 --concurrency 50
+     python3 benchmarks/load_test.py --compare bench_results/baseline.json
+     python3 benchmarks/load_test.py --base-url http://127.0.0.1:8001 --no-seed
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from generate_data import ADMIN_EMAIL, DEFAULT_PASSWORD, generate  # noqa: E402
+
+COUPON_CODE = "WELCOME10"
+SEARCH_TERMS = ["heart", "name", "gold", "silver", "couple", "ring", "bracelet", "photo", "infinity", "rose"]
+
+# Relative weights; a storefront sees far more browsing than buying
+DEFAULT_MIX = {"browse": 50, "detail": 30, "checkout": 15, "admin": 5}
+
+
+# ==================== DATASET ====================
+
+def seed_dataset(mongo_url, db_name, products, users, orders, reviews_per_product, seed):
+    """Recreate the benchmark database with generate_data.py; returns what the scenarios need"""
+    mongo = MongoClient(mongo_url)
+    mongo.drop_database(db_name)
+    _, data = generate(mongo_url, db_name, products=products, users=users, orders=orders,
+                       reviews_per_product=reviews_per_product, media=0, seed=seed, log=lambda *_: None)
+    # Checkout traffic must never run the catalogue out of stock mid-run
+    mongo[db_name].products.update_many({}, {"$set": {"stock_quantity": 10 ** 7}})
+    mongo.close()
+    return {
+        "products": [{"id": p["id"], "slug": p["slug"], "price": p["price"]} for p in data["products"]],
+        "categories": sorted({p["category"] for p in data["products"]})
+    }
+
+
+def load_catalog(mongo_url, db_name):
+    """Scenario inputs from an existing database (used with --no-seed)"""
+    mongo = MongoClient(mongo_url)
+    db = mongo[db_name]
+    products = list(db.products.find({"is_active": True}, {"_id": 0, "id": 1, "slug": 1, "price": 1}).limit(5000))
+    categories = db.products.distinct("category")
+    mongo.close()
+    return {"products": products, "categories": categories}
+
+
+# ==================== SERVER ====================
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mongod(workdir):
+    """Throwaway mongod on a temp dbpath, for machines without one running"""
+    port = free_port()
+    dbpath = Path(workdir) / "db"
+    dbpath.mkdir()
+    proc = subprocess.Popen(
+        ["mongod", "--dbpath", str(dbpath), "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT
+    )
+    mongo_url = f"mongodb://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            MongoClient(mongo_url, serverSelectionTimeoutMS=500).admin.command("ping")
+            return proc, mongo_url
+        except Exception:
+            time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("mongod did not start within 30s")
+
+
+def start_api(mongo_url, db_name, workers):
+    port = free_port()
+    env = dict(os.environ, MONGO_URL=mongo_url, DB_NAME=db_name, SLOW_REQUEST_MS="100000")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("API server did not become healthy within 60s")
+
+
+# ==================== SCENARIOS ====================
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    async def call(self, client, name, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.samples.setdefault(name, []).append(time.perf_counter() - started)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return response if ok else None
+
+
+async def browse(client, rec, ctx, rng):
+    await rec.call(client, "GET /api/products", "GET", "/api/products", params={"limit": 24})
+    await rec.call(client, "GET /api/products?category", "GET", "/api/products",
+                   params={"category": rng.choice(ctx["categories"]), "limit": 24})
+    await rec.call(client, "GET /api/products?search", "GET", "/api/products",
+                   params={"search": rng.choice(SEARCH_TERMS), "limit": 24})
+
+
+async def detail(client, rec, ctx, rng):
+    product = rng.choice(ctx["products"])
+    await rec.call(client, "GET /api/products/{slug}", "GET", f"/api/products/{product['slug']}")
+    await rec.call(client, "GET /api/products/{id}/reviews", "GET", f"/api/products/{product['id']}/reviews")
+
+
+async def checkout(client, rec, ctx, rng):
+    picked = rng.sample(ctx["products"], k=min(len(ctx["products"]), rng.randint(1, 3)))
+    items = [{"product_id": p["id"], "quantity": rng.randint(1, 2)} for p in picked]
+    subtotal = sum(p["price"] * item["quantity"] for p, item in zip(picked, items))
+    await rec.call(client, "GET /api/settings", "GET", "/api/settings")
+    await rec.call(client, "POST /api/coupons/validate", "POST", "/api/coupons/validate",
+                   params={"code": COUPON_CODE, "subtotal": subtotal})
+    n = rng.randint(0, 10 ** 6)
+    await rec.call(client, "POST /api/orders", "POST", "/api/orders", headers={"Idempotency-Key": str(uuid.uuid4())}, json={
+        "items": items,
+        "shipping_address": {"first_name": "Bench", "last_name": f"Buyer{n}", "email": f"bench-buyer-{n}@example.com",
+                             "phone": "9876543210", "address": "1 Bench Street", "city": "Mumbai",
+                             "state": "Maharashtra", "pincode": "400001"},
+        "payment_method": "cod",
+        "coupon_code": COUPON_CODE
+    })
+
+
+async def admin(client, rec, ctx, rng):
+    headers = {"Authorization": f"Bearer {ctx['admin_token']}"}
+    await rec.call(client, "GET /api/admin/dashboard", "GET", "/api/admin/dashboard", headers=headers)
+    await rec.call(client, "GET /api/admin/analytics", "GET", "/api/admin/analytics",
+                   params={"period": "30d"}, headers=headers)
+    await rec.call(client, "GET /api/admin/orders", "GET", "/api/admin/orders", headers=headers)
+
+
+SCENARIOS = {"browse": browse, "detail": detail, "checkout": checkout, "admin": admin}
+
+
+async def drive(base_url, ctx, mix, concurrency, duration, warmup, seed):
+    scenarios = [SCENARIOS[name] for name in mix]
+    weights = list(mix.values())
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        if "admin" in mix:
+            response = await client.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": DEFAULT_PASSWORD})
+            response.raise_for_status()
+            ctx["admin_token"] = response.json()["token"]
+
+        async def virtual_user(worker, rec, deadline):
+            rng = random.Random(seed + worker)
+            while time.perf_counter() < deadline:
+                await rng.choices(scenarios, weights)[0](client, rec, ctx, rng)
+
+        if warmup:
+            warm = Recorder()
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(*[virtual_user(i, warm, deadline) for i in range(concurrency)])
+
+        rec = Recorder()
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[virtual_user(i, rec, deadline) for i in range(concurrency)])
+        return rec, time.perf_counter() - started
+
+
+# ==================== REPORTING ====================
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(rec, elapsed):
+    routes = {}
+    for name, samples in sorted(rec.samples.items()):
+        ordered = sorted(samples)
+        routes[name] = {
+            "requests": len(ordered),
+            "errors": rec.errors.get(name, 0),
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2)
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {
+        "routes": routes,
+        "total": {"requests": total, "errors": sum(rec.errors.values()),
+                  "throughput_rps": round(total / elapsed, 2), "elapsed_seconds": round(elapsed, 2)}
+    }
+
+
+def print_report(summary, baseline=None):
+    header = f"{'route':<34}{'reqs':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        header += f"{'p95 Δ':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, r in summary["routes"].items():
+        line = (f"{name:<34}{r['requests']:>8}{r['errors']:>6}{r['throughput_rps']:>9.1f}"
+                f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+        before = (baseline or {}).get("routes", {}).get(name)
+        if before and before["p95_ms"]:
+            line += f"{(r['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100:>+9.0f}%"
+        print(line)
+    total = summary["total"]
+    print(f"\n{total['requests']} requests, {total['errors']} errors, "
+          f"{total['throughput_rps']} req/s over {total['elapsed_seconds']}s")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}', choose from {', '.join(SCENARIOS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Name Craft end-to-end load test")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--start-mongod", action="store_true", help="Run a throwaway mongod instead of --mongo-url")
+    parser.add_argument("--db-name", default="namecraft_bench")
+    parser.add_argument("--base-url", help="Benchmark an already running API instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started API")
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the data already in --db-name")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--reviews-per-product", type=int, default=8)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Scenario weights, e.g. browse=5,detail=3,checkout=1,admin=1")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before the run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Results JSON path (default bench_results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to diff p95 against")
+    args = parser.parse_args()
+
+    processes = []
+    workdir = tempfile.mkdtemp(prefix="namecraft-bench-")
+    try:
+        mongo_url = args.mongo_url
+        if args.start_mongod:
+            mongod, mongo_url = start_mongod(workdir)
+            processes.append(mongod)
+
+        if args.no_seed:
+            ctx = load_catalog(mongo_url, args.db_name)
+        else:
+            started = time.perf_counter()
+            ctx = seed_dataset(mongo_url, args.db_name, args.products, args.users, args.orders,
+                               args.reviews_per_product, args.seed)
+            print(f"Seeded {args.products} products, {args.users} users, {args.orders} orders "
+                  f"in {time.perf_counter() - started:.1f}s")
+        if not ctx["products"]:
+            parser.error("No products to benchmark; drop --no-seed")
+
+        base_url = args.base_url
+        if not base_url:
+            api, base_url = start_api(mongo_url, args.db_name, args.workers)
+            processes.append(api)
+
+        print(f"Driving {base_url} with {args.concurrency} virtual users for {args.duration}s, mix {args.mix}")
+        rec, elapsed = asyncio.run(drive(base_url, ctx, args.mix, args.concurrency, args.duration,
+                                         args.warmup, args.seed))
+    finally:
+        for proc in reversed(processes):
+            proc.terminate()
+            proc.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarize(rec, elapsed)
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(summary, baseline)
+
+    result = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "config": {
+            "products": args.products, "users": args.users, "orders": args.orders,
+            "reviews_per_product": args.reviews_per_product, "seeded": not args.no_seed,
+            "mix": args.mix, "concurrency": args.concurrency, "duration": args.duration,
+            "workers": args.workers, "seed": args.seed
+        },
+        **summary
+    }
+    output = Path(args.output or BACKEND_DIR / "bench_results" / f"{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Order number allocator contention benchmark
+Starts several worker processes, each running many concurrent "checkouts" that take
+order numbers from one shared daily counter, and compares block sizes. A block size of
+1 is the naive single-counter design: every order is a write to the same document.
+Every run also checks that no number was handed out twice.
+
+Run: python3 benchmarks/order_numbers.py --processes 8 --concurrency 50 --per-task 40
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from sequences import SequenceAllocator  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_worker(job):
+    """One process: `concurrency` tasks each allocating `per_task` numbers"""
+    mongo_url, db_name, block_size, concurrency, per_task = job
+
+    async def main():
+        client = AsyncIOMotorClient(mongo_url)
+        allocator = SequenceAllocator(client[db_name].counters, "order_number", block_size)
+        latencies = []
+
+        async def checkout_stream():
+            numbers = []
+            for _ in range(per_task):
+                started = time.perf_counter()
+                numbers.append(await allocator.next("bench"))
+                latencies.append((time.perf_counter() - started) * 1000)
+            return numbers
+
+        results = await asyncio.gather(*(checkout_stream() for _ in range(concurrency)))
+        client.close()
+        return [n for numbers in results for n in numbers], latencies
+
+    return asyncio.run(main())
+
+
+def bench(args, block_size):
+    MongoClient(args.mongo_url)[args.db_name].counters.delete_many({})
+    jobs = [(args.mongo_url, args.db_name, block_size, args.concurrency, args.per_task)] * args.processes
+    started = time.perf_counter()
+    with Pool(args.processes) as pool:
+        results = pool.map(run_worker, jobs)
+    elapsed = time.perf_counter() - started
+
+    numbers = [n for numbers, _ in results for n in numbers]
+    latencies = [ms for _, per_worker in results for ms in per_worker]
+    if len(numbers) != len(set(numbers)):
+        raise SystemExit(f"block size {block_size}: {len(numbers) - len(set(numbers))} duplicate numbers")
+    return {
+        "numbers_per_s": len(numbers) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "counter_writes": -(-len(numbers) // block_size)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark order number allocation under contention")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="namecraft_bench_sequences")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent checkouts per process")
+    parser.add_argument("--per-task", type=int, default=40, help="orders per checkout task")
+    parser.add_argument("--block-sizes", default="1,10,50,200")
+    args = parser.parse_args()
+
+    total = args.processes * args.concurrency * args.per_task
+    print(f"{args.processes} processes x {args.concurrency} tasks x {args.per_task} orders = {total} numbers\n")
+    print(f"{'block':>6}{'numbers/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'counter writes':>16}")
+    for block_size in (int(b) for b in args.block_sizes.split(",")):
+        result = bench(args, block_size)
+        print(f"{block_size:>6}{result['numbers_per_s']:>12,.0f}{result['p50_ms']:>10.2f}"
+              f"{result['p99_ms']:>10.2f}{result['counter_writes']:>16,}")
+    print("\nNo duplicates in any run")
+
+    MongoClient(args.mongo_url).drop_database(args.db_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Co-purchase recommendation build benchmark
+Builds top-K related products for synthetic order baskets two ways: a pure-Python
+Counter over every pair of every basket, and the vectorized NumPy build in
+recommendations.py. Checks the two agree. No database needed.
+
+Run: python3 benchmarks/recommendations.py --orders 500000 --products 2000
+"""
+import argparse
+import itertools
+import math
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from recommendations import MAX_BASKET_SIZE, co_purchase_recommendations  # noqa: E402
+
+
+def synthetic_baskets(orders, products, seed):
+    rng = random.Random(seed)
+    # A few best sellers and a long tail, like a real catalogue
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(products)]
+    ids = [f"product-{n}" for n in range(products)]
+    return [
+        rng.choices(ids, weights, k=rng.choices([1, 2, 3, 4, 6], [45, 30, 15, 7, 3])[0])
+        for _ in range(orders)
+    ]
+
+
+def python_recommendations(baskets, k):
+    frequency, pairs = Counter(), Counter()
+    for basket in baskets:
+        distinct = set(basket)
+        if 2 <= len(distinct) <= MAX_BASKET_SIZE:
+            frequency.update(distinct)
+            pairs.update(itertools.permutations(distinct, 2))
+    scored = {}
+    for (a, b), count in pairs.items():
+        scored.setdefault(a, []).append((count / math.sqrt(frequency[a] * frequency[b]), count, b))
+    return {a: sorted(candidates, key=lambda c: (-c[0], -c[1]))[:k] for a, candidates in scored.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark co-purchase recommendation builds")
+    parser.add_argument("--orders", type=int, default=500_000)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    baskets = synthetic_baskets(args.orders, args.products, args.seed)
+    print(f"{args.orders:,} orders, {args.products:,} products, top {args.top_k}\n")
+
+    started = time.perf_counter()
+    expected = python_recommendations(baskets, args.top_k)
+    python_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    related = co_purchase_recommendations(baskets, args.top_k)
+    numpy_seconds = time.perf_counter() - started
+
+    print(f"{'python Counter':<16}{python_seconds:>8.2f} s")
+    print(f"{'numpy':<16}{numpy_seconds:>8.2f} s  ({python_seconds / numpy_seconds:.1f}x)")
+
+    for product, candidates in expected.items():
+        scores = [round(score, 4) for score, _, _ in candidates]
+        if [r["score"] for r in related[product]] != scores:
+            raise SystemExit(f"Mismatch for {product}")
+    print(f"\nBoth agree for all {len(expected):,} products")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Message template render benchmark
+Renders every default order template for a batch of synthetic orders two ways:
+compiling the template for each message (what an uncached engine does) and
+render_many over the whole batch from the cached, compiled template.
+Context building is timed separately since bulk sends pay for it once per recipient.
+No database needed.
+
+Run: python3 benchmarks/template_render.py --messages 20000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from message_templates import DEFAULT_TEMPLATES, CompiledTemplate, order_context  # noqa: E402
+
+ORDER_TEMPLATES = ["order_confirmation", "order_shipped", "whatsapp_order_confirmation", "whatsapp_order_shipped"]
+SETTINGS = {"site_name": "Name Craft", "contact_email": "support@example.com"}
+
+
+def synthetic_orders(count, seed):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    orders = []
+    for n in range(count):
+        items = [{
+            "name": rng.choice(["Name Necklace", "Couple Ring", "Initial Bracelet", "Photo Keychain"]),
+            "image": f"/api/uploads/{n}-{i}.jpg", "price": rng.choice([799, 1299, 1999]),
+            "quantity": rng.randint(1, 3), "customization": {"name": rng.choice(["Asha", "Rahul", "Meera & Dev"])}
+        } for i in range(rng.choices([1, 2, 3, 5], [60, 25, 10, 5])[0])]
+        subtotal = sum(item["price"] * item["quantity"] for item in items)
+        orders.append({
+            "order_number": f"NC{now:%Y%m%d}{n:07d}", "created_at": now - timedelta(minutes=n),
+            "payment_method": rng.choice(["upi", "razorpay", "cod"]), "items": items,
+            "subtotal": subtotal, "shipping_cost": 0 if subtotal > 999 else 99, "discount_amount": 0,
+            "total": subtotal, "tracking_number": f"NCT{n:010d}" if rng.random() < 0.5 else None,
+            "shipping_address": {"first_name": "Asha", "last_name": "Kumar", "address": f"{n} MG Road",
+                                 "city": "Pune", "state": "Maharashtra", "pincode": "411001", "phone": "9876543210"}
+        })
+    return orders
+
+
+def rate(count, seconds):
+    return f"{count / seconds:>12,.0f}/s {seconds / count * 1e6:>8.1f} µs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compiled message template rendering")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    orders = synthetic_orders(args.messages, args.seed)
+    started = time.perf_counter()
+    contexts = [order_context(order, SETTINGS) for order in orders]
+    print(f"context build      {rate(len(contexts), time.perf_counter() - started)}\n")
+
+    # Compiling per message is slow, so time it on a slice
+    sample = contexts[:max(1, len(contexts) // 20)]
+    for template_id in ORDER_TEMPLATES:
+        source = DEFAULT_TEMPLATES[template_id]
+        started = time.perf_counter()
+        for context in sample:
+            CompiledTemplate(source, None).render(context)
+        uncached = time.perf_counter() - started
+
+        template = CompiledTemplate(source, None)
+        started = time.perf_counter()
+        rendered = template.render_many(contexts)
+        batch = time.perf_counter() - started
+        size = sum(len(part) for message in rendered for part in message.values()) / len(rendered)
+
+        print(f"{template_id} (~{size / 1024:.1f} KB per message)")
+        print(f"  compile each     {rate(len(sample), uncached)}")
+        print(f"  render_many      {rate(len(contexts), batch)}")
+
+
+if __name__ == "__main__":
+    main()
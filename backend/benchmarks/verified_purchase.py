@@ -0,0 +1,104 @@
+"""
+Verified-purchase lookup benchmark
+Seeds customers with large delivered-order histories and compares the old check in
+submit_review (load up to 100 delivered orders, scan their items in Python) with the
+indexed existence query it was replaced by.
+
+Run: python3 benchmarks/verified_purchase.py --orders-per-customer 5000 --lookups 500
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import uuid
+
+from pymongo import MongoClient
+
+INDEX = [("user_email", 1), ("order_status", 1), ("items.product_id", 1)]
+
+
+def seed(db, customers, orders_per_customer, products, seed_value):
+    rng = random.Random(seed_value)
+    db.orders.drop()
+    product_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(products)]
+    emails = [f"heavy.buyer{i}@example.com" for i in range(customers)]
+    for email in emails:
+        batch = []
+        for _ in range(orders_per_customer):
+            items = [{"product_id": pid, "name": "Bench Item", "price": 999, "quantity": 1, "customization": {}}
+                     for pid in rng.sample(product_ids, rng.randint(1, 3))]
+            batch.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)), "user_email": email,
+                "order_status": rng.choices(["delivered", "shipped", "cancelled"], [85, 10, 5])[0], "items": items
+            })
+        db.orders.insert_many(batch, ordered=False)
+    db.orders.create_index(INDEX)
+    return emails, product_ids
+
+
+def old_check(db, email, product_id):
+    orders = list(db.orders.find({"user_email": email, "order_status": "delivered"}).limit(100))
+    return any(item.get("product_id") == product_id or item.get("id") == product_id
+               for order in orders for item in order.get("items", []))
+
+
+def new_check(db, email, product_id):
+    return db.orders.find_one(
+        {"user_email": email, "order_status": "delivered", "items.product_id": product_id}, {"_id": 1}
+    ) is not None
+
+
+def measure(fn, db, lookups):
+    timings, answers = [], []
+    for email, product_id in lookups:
+        started = time.perf_counter()
+        answers.append(fn(db, email, product_id))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return answers, {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+        "mean_ms": round(statistics.fmean(timings), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the verified-purchase check")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="namecraft_bench_reviews")
+    parser.add_argument("--customers", type=int, default=5)
+    parser.add_argument("--orders-per-customer", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_url)
+    db = client[args.db_name]
+    started = time.perf_counter()
+    emails, product_ids = seed(db, args.customers, args.orders_per_customer, args.products, args.seed)
+    print(f"Seeded {args.customers} customers x {args.orders_per_customer} orders in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(args.seed)
+    lookups = [(rng.choice(emails), rng.choice(product_ids)) for _ in range(args.lookups)]
+    old_answers, old_stats = measure(old_check, db, lookups)
+    new_answers, new_stats = measure(new_check, db, lookups)
+
+    plan = db.orders.find(
+        {"user_email": lookups[0][0], "order_status": "delivered", "items.product_id": lookups[0][1]}
+    ).limit(1).explain()["executionStats"]
+    missed = sum(1 for old, new in zip(old_answers, new_answers) if new and not old)
+
+    print(f"\n{'check':<10}{'p50':>10}{'p95':>10}{'mean':>10}")
+    print(f"{'old':<10}{old_stats['p50_ms']:>10}{old_stats['p95_ms']:>10}{old_stats['mean_ms']:>10}")
+    print(f"{'indexed':<10}{new_stats['p50_ms']:>10}{new_stats['p95_ms']:>10}{new_stats['mean_ms']:>10}")
+    print(f"\nIndexed query examined {plan['totalKeysExamined']} keys / {plan['totalDocsExamined']} docs")
+    print(f"Old check missed {missed} of {sum(new_answers)} verified purchases (orders beyond the first 100)")
+
+    client.drop_database(args.db_name)
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
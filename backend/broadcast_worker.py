@@ -0,0 +1,37 @@
+"""
+Marketing broadcast worker for Name Craft
+Sends queued broadcasts in its own process, so SMTP and WhatsApp traffic never shares an
+event loop, thread pool or CPU with the API workers. Admins queue, pause, resume and cancel
+broadcasts through the API; this process picks them up by polling the broadcasts collection.
+Several copies can run at once: each broadcast is claimed by one of them at a time.
+
+Run next to the API (systemd / pm2), with the same .env:
+
+    python3 broadcast_worker.py
+
+SIGTERM or Ctrl+C hands the running broadcast back to the queue; the next worker resumes it
+from its checkpoint without resending recipients already recorded as delivered.
+"""
+import asyncio
+import signal
+
+import server
+
+
+async def main():
+    await server.client.admin.command('ping')
+    server.logger.info(f"Broadcast worker {server.BROADCAST_WORKER_ID} connected to {server.db_name}")
+    worker = asyncio.create_task(server.broadcast_worker())
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, worker.cancel)
+    try:
+        await worker
+    except asyncio.CancelledError:
+        server.logger.info("Broadcast worker stopped")
+    finally:
+        server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
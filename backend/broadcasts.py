@@ -0,0 +1,334 @@
+"""
+Marketing broadcasts for Name Craft
+Broadcasts run in their own process (broadcast_worker.py), never inside the API workers.
+A broadcast streams its audience from `users` through one cursor in id order, renders each
+batch with the cached compiled templates and sends it over pooled SMTP connections and a
+shared WhatsApp HTTP client, all under one token-bucket rate. Every successful send is
+recorded in `broadcast_deliveries` before the runner moves on, and after every batch the last
+user id is checkpointed on the broadcast document. When a worker dies the next one to claim
+the broadcast resumes from the checkpoint and skips recipients already recorded, so only a
+send cut off between the SMTP/WhatsApp call and its record can go out twice. The claim's
+lease is renewed before each batch and while one is in flight, so slow sends don't let a
+second worker take over. The mail and HTTP libraries are imported by the senders themselves.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from message_templates import sale_context, sale_settings_context
+from metrics import track
+
+if TYPE_CHECKING:
+    import smtplib
+
+logger = logging.getLogger(__name__)
+
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', '4'))
+SMTP_TIMEOUT_SECONDS = float(os.environ.get('SMTP_TIMEOUT_SECONDS', '30'))
+WHATSAPP_API_URL = "https://graph.facebook.com/v18.0"
+WHATSAPP_MAX_CONNECTIONS = int(os.environ.get('WHATSAPP_MAX_CONNECTIONS', '10'))
+WHATSAPP_TIMEOUT_SECONDS = float(os.environ.get('WHATSAPP_TIMEOUT_SECONDS', '15'))
+# A batch is capped to about this many seconds of sends so the checkpoint stays fresh
+# even at low rates
+MAX_BATCH_SECONDS = 60
+# A claim whose locked_at is older than this is taken over by another worker
+LEASE_SECONDS = 300
+RECIPIENT_PROJECTION = {"_id": 0, "id": 1, "name": 1, "email": 1, "phone": 1}
+
+
+def clean_whatsapp_number(phone: str) -> str:
+    """Digits only, with the Indian country code the Business API expects"""
+    clean_phone = phone.replace(" ", "").replace("-", "").replace("+", "")
+    if not clean_phone.startswith("91"):
+        clean_phone = "91" + clean_phone
+    return clean_phone
+
+
+class RateLimiter:
+    """Token bucket: `rate` acquisitions per second on average, up to `burst` at once"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        # Waiters queue on the lock, so tokens go out in arrival order
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class SMTPPool:
+    """Sends email over logged-in SMTP connections kept open on a small thread pool"""
+
+    def __init__(self, host: str, port: int, user: str, password: str, from_header: str,
+                 size: int = SMTP_POOL_SIZE, timeout: float = SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.from_header = from_header
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> "smtplib.SMTP":
+        import smtplib
+
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        connection.starttls()
+        connection.login(self.user, self.password)
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _send(self, to_email: str, message: str):
+        import smtplib
+
+        connection = getattr(self._local, "connection", None)
+        for attempt in range(2):
+            if connection is None:
+                connection = self._local.connection = self._connect()
+            try:
+                connection.sendmail(self.from_header, [to_email], message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                # Servers drop connections that sat idle; reconnect once
+                connection = self._local.connection = None
+                if attempt:
+                    raise
+
+    def build_message(self, to_email: str, rendered: Dict[str, str]) -> str:
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = rendered["subject"]
+        msg['From'] = self.from_header
+        msg['To'] = to_email
+        if rendered.get("text"):
+            msg.attach(MIMEText(rendered["text"], 'plain'))
+        msg.attach(MIMEText(rendered["html"], 'html'))
+        return msg.as_string()
+
+    async def send(self, to_email: str, rendered: Dict[str, str]):
+        message = self.build_message(to_email, rendered)
+        loop = asyncio.get_running_loop()
+        with track("smtp"):
+            await loop.run_in_executor(self._executor, self._send, to_email, message)
+
+    def close(self):
+        """Blocks until in-flight sends finish; run it off the event loop"""
+        import smtplib
+
+        self._executor.shutdown(wait=True)
+        for connection in self._connections:
+            try:
+                connection.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._connections.clear()
+
+
+class WhatsAppSender:
+    """WhatsApp Business API text messages over one pooled HTTP client"""
+
+    def __init__(self, api_token: str, phone_id: str, max_connections: int = WHATSAPP_MAX_CONNECTIONS,
+                 timeout: float = WHATSAPP_TIMEOUT_SECONDS):
+        import httpx
+
+        self.url = f"{WHATSAPP_API_URL}/{phone_id}/messages"
+        # No pool timeout: the rate limiter, not the pool, decides when a send may start
+        self._client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_token}", "Content-Type": "application/json"},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout, pool=None)
+        )
+
+    async def send(self, to_phone: str, rendered: Dict[str, str]):
+        with track("whatsapp"):
+            response = await self._client.post(self.url, json={
+                "messaging_product": "whatsapp",
+                "to": clean_whatsapp_number(to_phone),
+                "type": "text",
+                "text": {"body": rendered["text"]}
+            })
+        if response.status_code != 200:
+            raise RuntimeError(f"WhatsApp error {response.status_code}: {response.text}")
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class BroadcastRunner:
+    """Runs one claimed broadcast from its checkpoint until it completes or is paused / cancelled"""
+
+    def __init__(self, broadcasts, users, deliveries, templates, settings: dict, worker_id: str,
+                 email: Optional[SMTPPool] = None, whatsapp: Optional[WhatsAppSender] = None,
+                 lease_seconds: float = LEASE_SECONDS):
+        self.broadcasts = broadcasts
+        self.users = users
+        self.deliveries = deliveries
+        self.templates = templates
+        self.settings = settings
+        self.worker_id = worker_id
+        self.senders = {"email": email, "whatsapp": whatsapp}
+        self.lease_seconds = lease_seconds
+
+    async def run(self, job: dict, audience: dict) -> bool:
+        """True when the audience was exhausted, False when the broadcast was stopped"""
+        channels = {
+            channel: await self.templates.get(job["template_ids"][channel])
+            for channel in job["channels"] if self.senders.get(channel)
+        }
+        limiter = RateLimiter(job["rate_per_second"])
+        shared = sale_settings_context(self.settings)
+        batch_size = max(1, min(job["batch_size"], int(job["rate_per_second"] * MAX_BATCH_SECONDS)))
+
+        query = audience
+        if job.get("checkpoint"):
+            query = {"$and": [query, {"id": {"$gt": job["checkpoint"]}}]}
+        cursor = self.users.find(query, RECIPIENT_PROJECTION).sort("id", 1).batch_size(batch_size)
+
+        batch = []
+        async for user in cursor:
+            batch.append(user)
+            if len(batch) >= batch_size:
+                if not await self.send_batch(job, batch, channels, shared, limiter):
+                    await cursor.close()
+                    return False
+                batch = []
+        if batch and not await self.send_batch(job, batch, channels, shared, limiter):
+            return False
+
+        await self.broadcasts.update_one(
+            {"id": job["id"], "lock_owner": self.worker_id, "status": "running"},
+            {"$set": {"status": "completed", "lock_owner": None, "completed_at": datetime.utcnow()}}
+        )
+        return True
+
+    async def renew_lease(self, job: dict, only_running: bool = True) -> bool:
+        """Push locked_at forward; False once another worker holds the claim (or, with
+        `only_running`, once the broadcast was paused or cancelled)"""
+        now = datetime.utcnow()
+        query = {"id": job["id"], "lock_owner": self.worker_id}
+        if only_running:
+            query["status"] = "running"
+        return await self.broadcasts.find_one_and_update(
+            query,
+            {"$set": {"locked_at": now, "updated_at": now}},
+            projection={"_id": 0, "status": 1},
+            return_document=ReturnDocument.AFTER
+        ) is not None
+
+    async def keep_lease(self, job: dict, lost: asyncio.Event):
+        """Renew the lease while a batch is in flight; sets `lost` if another worker took it.
+        A pause doesn't count: the batch in flight still finishes and is checkpointed."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await self.renew_lease(job, only_running=False):
+                lost.set()
+                return
+
+    async def delivered(self, job: dict, deliveries: list) -> set:
+        """Keys of the deliveries an earlier attempt already sent"""
+        keys = [delivery_key(job, channel, user) for channel, user, _ in deliveries]
+        found = await self.deliveries.find({"_id": {"$in": keys}}, {"_id": 1}).to_list(None)
+        return {document["_id"] for document in found}
+
+    async def release(self, job: dict):
+        # Let the next claimant (or the resume) start cleanly
+        await self.broadcasts.update_one(
+            {"id": job["id"], "lock_owner": self.worker_id},
+            {"$set": {"lock_owner": None}}
+        )
+
+    async def send_batch(self, job: dict, batch: list, channels: dict, shared: dict, limiter: RateLimiter) -> bool:
+        """Render, send and checkpoint one batch; False if the broadcast should stop"""
+        if not await self.renew_lease(job):
+            await self.release(job)
+            return False
+
+        loop = asyncio.get_running_loop()
+        contexts = [sale_context(user, shared) for user in batch]
+        deliveries = []
+        for channel, template in channels.items():
+            field = "email" if channel == "email" else "phone"
+            # Rendering a few hundred messages is CPU work; keep it off the event loop
+            rendered = await loop.run_in_executor(None, template.render_many, contexts)
+            deliveries += [
+                (channel, user, message)
+                for user, message in zip(batch, rendered) if user.get(field)
+            ]
+        already_sent = await self.delivered(job, deliveries)
+        lost = asyncio.Event()
+
+        async def deliver(channel, user, message):
+            key = delivery_key(job, channel, user)
+            if key in already_sent:
+                return f"{channel}_sent"
+            await limiter.acquire()
+            if lost.is_set():
+                return None
+            recipient = user["email" if channel == "email" else "phone"]
+            try:
+                await self.senders[channel].send(recipient, message)
+            except Exception as e:
+                logger.warning(f"Broadcast {job['id']}: {channel} to {recipient} failed: {e}")
+                return f"{channel}_failed"
+            try:
+                await self.deliveries.insert_one({"_id": key, "broadcast_id": job["id"], "sent_at": datetime.utcnow()})
+            except DuplicateKeyError:
+                pass
+            return f"{channel}_sent"
+
+        heartbeat = asyncio.create_task(self.keep_lease(job, lost))
+        try:
+            outcomes = Counter(await asyncio.gather(*(deliver(*delivery) for delivery in deliveries)))
+        finally:
+            heartbeat.cancel()
+        outcomes.pop(None, None)
+        now = datetime.utcnow()
+        # Pause / cancel only change status, so the checkpoint is recorded either way
+        job_state = await self.broadcasts.find_one_and_update(
+            {"id": job["id"], "lock_owner": self.worker_id},
+            {
+                "$set": {"checkpoint": batch[-1]["id"], "locked_at": now, "updated_at": now},
+                "$inc": {"counts.processed": len(batch), **{f"counts.{key}": n for key, n in outcomes.items()}}
+            },
+            projection={"_id": 0, "status": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if job_state and job_state["status"] == "running" and not lost.is_set():
+            return True
+        # Stopped by an admin (or the claim was taken over)
+        await self.release(job)
+        return False
+
+
+def delivery_key(job: dict, channel: str, user: dict) -> str:
+    return f"{job['id']}:{channel}:{user['id']}"
@@ -0,0 +1,206 @@
+"""
+Cross-worker cache invalidation for Name Craft
+Every worker keeps small in-process caches (settings, templates, related products, dashboard
+counts...). An admin write lands on one worker, so the others would serve the old value until
+their TTL ran out. InvalidationBus watches one MongoDB change stream over the collections those
+caches read and hands each change, as an InvalidationEvent, to the cache regions registered for
+that collection, so every worker drops stale entries within moments of the write.
+
+The stream resumes from the last token (kept in memory, and saved to `cache_bus` so a restarted
+worker picks up where the fleet left off). When the token is unusable, or the stream was opened
+fresh, regions get a "resync" event and clear everything, since changes may have been missed.
+Update events carry the names of the fields they changed (never their values), so a region can
+ignore writes to fields it doesn't cache, like the stock counter every checkout decrements.
+Change streams need a replica set; on a standalone server the bus stays in TTL-only mode, where
+the caches' own TTLs bound staleness as before, and it checks again every few minutes.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, FrozenSet, Iterable, List, NamedTuple, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+CACHE_BUS_ENABLED = os.environ.get('CACHE_BUS_ENABLED', 'true').lower() != 'false'
+WATCHED_COLLECTIONS = ("settings", "products", "categories", "navigation", "users", "coupons")
+# Saving the token is only for restarts; a few seconds of replayed events cost nothing
+TOKEN_SAVE_SECONDS = 10
+RETRY_SECONDS = 5
+UNSUPPORTED_RETRY_SECONDS = 600
+# Standalone server ($changeStream needs a replica set) / server too old to know the stage
+UNSUPPORTED_CODES = {40573, 40324}
+# The token fell off the oplog or can no longer be resumed from
+TOKEN_LOST_CODES = {260, 280, 286}
+# Operations after which a region cannot know what changed
+RESYNC_OPERATIONS = {"drop", "rename", "dropDatabase", "invalidate"}
+
+CACHE_BUS_EVENTS = registry.counter(
+    "cache_bus_events_total", "Change stream events received by the cache invalidation bus", ("collection", "operation"))
+CACHE_INVALIDATIONS = registry.counter(
+    "cache_invalidations_total", "Cache region invalidations by region and cause", ("region", "cause"))
+
+
+class InvalidationEvent(NamedTuple):
+    # None for a resync
+    collection: Optional[str]
+    # insert / update / replace / delete, or "resync" when everything may be stale
+    operation: str
+    # The changed document's _id (not our `id` field)
+    document_key: Any = None
+    # Field paths set or removed by an update; None when unknown (inserts, replaces, deletes)
+    updated_fields: Optional[FrozenSet[str]] = None
+
+    @property
+    def resync(self) -> bool:
+        return self.operation == "resync"
+
+    def only_touches(self, fields: Iterable[str]) -> bool:
+        """True for an update that changed nothing but these top-level fields"""
+        if self.updated_fields is None:
+            return False
+        fields = set(fields)
+        return all(path.split(".", 1)[0] in fields for path in self.updated_fields)
+
+
+RESYNC = InvalidationEvent(None, "resync")
+
+
+class CacheRegion(NamedTuple):
+    name: str
+    collections: frozenset
+    handler: Callable[[InvalidationEvent], None]
+
+
+class InvalidationBus:
+    def __init__(self, db, state_collection, collections: Iterable[str] = WATCHED_COLLECTIONS,
+                 enabled: bool = CACHE_BUS_ENABLED):
+        self.db = db
+        self.state = state_collection
+        self.collections = set(collections)
+        self.enabled = enabled
+        self.regions: List[CacheRegion] = []
+        self.resume_token: Optional[dict] = None
+        # "starting", "live" or "ttl" (change streams unavailable, caches rely on their TTLs)
+        self.mode = "starting"
+        self._token_saved_at = 0.0
+
+    @property
+    def live(self) -> bool:
+        return self.mode == "live"
+
+    def register(self, name: str, collections: Iterable[str], handler: Callable[[InvalidationEvent], None]):
+        """Call `handler` for every change to `collections` and for every resync. Register before
+        run(): the stream only covers the collections known when it opens."""
+        collections = frozenset(collections)
+        self.collections |= collections
+        self.regions.append(CacheRegion(name, collections, handler))
+
+    def publish(self, event: InvalidationEvent):
+        """Deliver one event to the regions that care, in this worker"""
+        for region in self.regions:
+            if event.resync or event.collection in region.collections:
+                try:
+                    region.handler(event)
+                except Exception as e:
+                    logger.error(f"Cache region {region.name} failed to invalidate: {e}")
+                registry.inc(CACHE_INVALIDATIONS, (region.name, "resync" if event.resync else event.collection))
+
+    def handle_change(self, change: dict):
+        operation = change["operationType"]
+        collection = change.get("ns", {}).get("coll")
+        registry.inc(CACHE_BUS_EVENTS, (collection or "", operation))
+        if operation in RESYNC_OPERATIONS:
+            self.publish(RESYNC)
+        else:
+            updated = change.get("updatedFields")
+            self.publish(InvalidationEvent(
+                collection, operation, change.get("documentKey", {}).get("_id"),
+                frozenset(updated) if operation == "update" and updated is not None else None
+            ))
+
+    def pipeline(self) -> List[dict]:
+        return [
+            {"$match": {"ns.coll": {"$in": sorted(self.collections)}}},
+            # Only what routing needs; never ship full documents (or updated values) to every worker
+            {"$project": {"operationType": 1, "ns": 1, "documentKey": 1, "updatedFields": {"$concatArrays": [
+                {"$map": {"input": {"$objectToArray": {"$ifNull": ["$updateDescription.updatedFields", {}]}},
+                          "in": "$$this.k"}},
+                {"$ifNull": ["$updateDescription.removedFields", []]},
+                {"$map": {"input": {"$ifNull": ["$updateDescription.truncatedArrays", []]}, "in": "$$this.field"}}
+            ]}}}
+        ]
+
+    async def load_token(self):
+        try:
+            state = await self.state.find_one({"_id": "resume_token"})
+        except PyMongoError as e:
+            logger.warning(f"Could not load cache bus resume token: {e}")
+            return
+        if state:
+            self.resume_token = state["token"]
+
+    async def save_token(self, force: bool = False):
+        now = time.monotonic()
+        if self.resume_token is None or (not force and now - self._token_saved_at < TOKEN_SAVE_SECONDS):
+            return
+        self._token_saved_at = now
+        try:
+            await self.state.update_one(
+                {"_id": "resume_token"}, {"$set": {"token": self.resume_token}}, upsert=True
+            )
+        except PyMongoError as e:
+            logger.warning(f"Could not save cache bus resume token: {e}")
+
+    async def watch_once(self):
+        """Follow the stream until it errors; raises OperationFailure / PyMongoError"""
+        resuming = self.resume_token is not None
+        async with self.db.watch(self.pipeline(), start_after=self.resume_token) as stream:
+            self.mode = "live"
+            if not resuming:
+                # Anything cached before the stream opened may have missed a change
+                self.publish(RESYNC)
+            logger.info(f"Cache invalidation bus live on {sorted(self.collections)}")
+            async for change in stream:
+                self.handle_change(change)
+                self.resume_token = stream.resume_token
+                await self.save_token()
+                if change["operationType"] == "invalidate":
+                    # The stream is closed; reopen after the invalidate event
+                    return
+
+    async def run(self):
+        if not self.enabled:
+            self.mode = "ttl"
+            return
+        await self.load_token()
+        while True:
+            try:
+                await self.watch_once()
+                continue
+            except asyncio.CancelledError:
+                await self.save_token(force=True)
+                raise
+            except OperationFailure as e:
+                if e.code in UNSUPPORTED_CODES:
+                    if self.mode != "ttl":
+                        logger.info(f"Change streams unavailable ({e}); caches fall back to their TTLs")
+                    self.mode = "ttl"
+                    await asyncio.sleep(UNSUPPORTED_RETRY_SECONDS)
+                    continue
+                if e.code in TOKEN_LOST_CODES:
+                    logger.warning(f"Cache bus resume token unusable, resyncing: {e}")
+                    self.resume_token = None
+                else:
+                    logger.warning(f"Cache invalidation stream failed: {e}")
+            except (PyMongoError, NotImplementedError) as e:
+                # Connection trouble, or a client without change stream support
+                logger.warning(f"Cache invalidation stream failed: {e}")
+            if self.mode == "live":
+                logger.info("Cache invalidation bus down; caches fall back to their TTLs until it reconnects")
+            self.mode = "ttl"
+            await asyncio.sleep(RETRY_SECONDS)
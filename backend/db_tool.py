@@ -0,0 +1,356 @@
+"""
+Database dump and restore for Name Craft
+Streams each collection through a cursor into compressed NDJSON (Extended JSON) or BSON,
+several collections at a time, and restores with unordered insert_many chunks, building
+indexes only after the data is in. Both directions can be interrupted and re-run: a
+manifest records a SHA-256 per collection file and restore keeps a checkpoint per
+collection.
+
+Restore also reads the legacy db_export/ (NDJSON) and db_backup/ (JSON array) snapshots.
+
+Run: python3 db_tool.py dump dumps/2026-10-19 --compression zstd
+     python3 db_tool.py restore dumps/2026-10-19 --drop
+     python3 db_tool.py restore ../db_export --db-name namecraft_production --drop
+
+zstd needs the optional `zstandard` package; gzip works out of the box.
+"""
+import argparse
+import codecs
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import bson
+from bson import json_util
+from pymongo import IndexModel, MongoClient
+from pymongo.errors import BulkWriteError
+
+MANIFEST = "manifest.json"
+RESTORE_STATE = "restore_state.json"
+FORMATS = {"ndjson": ".ndjson", "bson": ".bson"}
+COMPRESSIONS = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+DUPLICATE_KEY = 11000
+
+
+class DumpError(Exception):
+    """Raised for unreadable, corrupt or mismatched dump files"""
+
+
+# ==================== FILE FORMAT ====================
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise DumpError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+
+def open_write(path: Path, compression: str):
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor(level=6, threads=-1).stream_writer(open(path, "wb"), closefd=True)
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    return open(path, "wb")
+
+
+def open_read(path: Path):
+    if path.suffix == ".zst":
+        return _zstandard().ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def encode_document(doc: dict, fmt: str) -> bytes:
+    if fmt == "bson":
+        return bson.encode(doc)
+    return json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS).encode() + b"\n"
+
+
+def _chunks(fh) -> Iterator[bytes]:
+    return iter(lambda: fh.read(1 << 16), b"")
+
+
+def iter_documents(path: Path) -> Iterator[dict]:
+    """Documents from a dump file, or a legacy NDJSON / JSON array export"""
+    with open_read(path) as fh:
+        if ".bson" in path.name:
+            yield from bson.decode_file_iter(fh)
+            return
+        chunks = _chunks(fh)
+        first = next(chunks, b"")
+        chunks = itertools.chain([first], chunks)
+        if first.lstrip()[:1] == b"[":
+            yield from _iter_json_array(chunks)
+            return
+        for line in _iter_lines(chunks):
+            if line.strip():
+                yield json_util.loads(line)
+
+
+def _iter_lines(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _iter_json_array(chunks: Iterator[bytes]) -> Iterator[dict]:
+    """Incrementally parse a top-level JSON array without loading it whole"""
+    decoder = json.JSONDecoder(object_hook=json_util.object_hook)
+    # Chunks can end mid-character
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer, opened = "", False
+    for chunk in chunks:
+        buffer += text.decode(chunk)
+        while True:
+            buffer = buffer.lstrip()
+            if not opened:
+                if not buffer:
+                    break
+                buffer, opened = buffer[1:], True
+            elif buffer[:1] == ",":
+                buffer = buffer[1:]
+            elif not buffer or buffer[:1] == "]":
+                break
+            else:
+                try:
+                    doc, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    break  # Document continues in the next chunk
+                yield doc
+                buffer = buffer[end:]
+    if buffer.strip() not in ("", "]"):
+        raise DumpError("Truncated or malformed JSON array")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class JsonState:
+    """Small JSON file updated from several worker threads"""
+
+    def __init__(self, path: Path, initial: dict):
+        self.path = path
+        self.data = json.loads(path.read_text()) if path.exists() else initial
+        self._lock = threading.Lock()
+
+    def update(self, key: str, value: dict):
+        with self._lock:
+            self.data.setdefault("collections", {})[key] = value
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.data, indent=2, default=str))
+            os.replace(tmp, self.path)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.data.get("collections", {}).get(key)
+
+
+# ==================== DUMP ====================
+
+def dump_collection(db, name: str, out_dir: Path, fmt: str, compression: str, batch_size: int) -> dict:
+    path = out_dir / f"{name}{FORMATS[fmt]}{COMPRESSIONS[compression]}"
+    partial = path.with_name(path.name + ".partial")
+    started = time.perf_counter()
+    count = 0
+    with open_write(partial, compression) as fh:
+        for doc in db[name].find({}, batch_size=batch_size):
+            fh.write(encode_document(doc, fmt))
+            count += 1
+    os.replace(partial, path)
+    indexes = [
+        {"key": list(spec["key"]), **{k: v for k, v in spec.items() if k not in ("key", "v", "ns")}, "name": index_name}
+        for index_name, spec in db[name].index_information().items() if index_name != "_id_"
+    ]
+    return {
+        "file": path.name, "count": count, "bytes": path.stat().st_size, "sha256": file_sha256(path),
+        "indexes": indexes, "seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+def dump(mongo_url: str, db_name: str, out_dir: Path, fmt: str = "ndjson", compression: str = "gzip",
+         collections: Optional[List[str]] = None, workers: int = 4, batch_size: int = 1000) -> dict:
+    if compression == "zstd":
+        _zstandard()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    client = MongoClient(mongo_url)
+    db = client[db_name]
+    manifest = JsonState(out_dir / MANIFEST, {
+        "db_name": db_name, "format": fmt, "compression": compression, "created_at": datetime.utcnow().isoformat()
+    })
+    if (manifest.data["format"], manifest.data["compression"]) != (fmt, compression):
+        raise DumpError(f"{out_dir} already holds a {manifest.data['format']}/{manifest.data['compression']} dump")
+
+    names = collections or sorted(n for n in db.list_collection_names() if not n.startswith("system."))
+    pending = []
+    for name in names:
+        done = manifest.get(name)
+        # Resume: a finished collection is skipped as long as its file is intact
+        if done and (out_dir / done["file"]).exists() and file_sha256(out_dir / done["file"]) == done["sha256"]:
+            print(f"  {name}: already dumped ({done['count']} docs)")
+            continue
+        pending.append(name)
+
+    with ThreadPoolExecutor(workers) as pool:
+        futures = {pool.submit(dump_collection, db, name, out_dir, fmt, compression, batch_size): name
+                   for name in pending}
+        for future in as_completed(futures):
+            name = futures[future]
+            result = future.result()
+            manifest.update(name, result)
+            print(f"  {name}: {result['count']} docs, {result['bytes'] / 1e6:.1f} MB in {result['seconds']}s")
+    client.close()
+    return manifest.data
+
+
+# ==================== RESTORE ====================
+
+def find_sources(src_dir: Path) -> Dict[str, dict]:
+    """Collection name -> manifest entry (or a bare file entry for legacy exports)"""
+    manifest_path = src_dir / MANIFEST
+    if manifest_path.exists():
+        return json.loads(manifest_path.read_text())["collections"]
+    return {path.name.split(".")[0]: {"file": path.name} for path in sorted(src_dir.glob("*.json"))
+            if path.stat().st_size > 0}
+
+
+def _insert_chunk(collection, docs: List[dict]) -> int:
+    try:
+        return len(collection.insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        # Re-running a partly restored chunk: documents already there are fine
+        if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+        return e.details["nInserted"]
+
+
+def restore_collection(db, name: str, entry: dict, src_dir: Path, state: JsonState, drop: bool,
+                       chunk_size: int, key: str) -> dict:
+    path = src_dir / entry["file"]
+    started = time.perf_counter()
+    checksum = file_sha256(path)
+    if entry.get("sha256") and checksum != entry["sha256"]:
+        raise DumpError(f"{path.name} does not match its manifest checksum")
+
+    progress = state.get(key) or {}
+    if progress.get("sha256") != checksum:
+        progress = {}
+    if progress.get("status") == "complete":
+        return {**progress, "skipped": True}
+
+    resume_from = progress.get("processed", 0)
+    if drop and not resume_from:
+        db.drop_collection(name)
+
+    collection = db[name]
+    processed, inserted, chunk = 0, progress.get("inserted", 0), []
+    for doc in iter_documents(path):
+        processed += 1
+        if processed <= resume_from:
+            continue
+        chunk.append(doc)
+        if len(chunk) >= chunk_size:
+            inserted += _insert_chunk(collection, chunk)
+            chunk = []
+            state.update(key, {"sha256": checksum, "status": "loading", "processed": processed, "inserted": inserted})
+    if chunk:
+        inserted += _insert_chunk(collection, chunk)
+
+    # Building indexes once over the loaded data beats maintaining them per insert
+    indexes = [IndexModel([tuple(k) for k in spec["key"]], **{k: v for k, v in spec.items() if k != "key"})
+               for spec in entry.get("indexes", [])]
+    if indexes:
+        collection.create_indexes(indexes)
+
+    result = {"sha256": checksum, "status": "complete", "processed": processed, "inserted": inserted,
+              "indexes": len(indexes), "seconds": round(time.perf_counter() - started, 2)}
+    state.update(key, result)
+    return result
+
+
+def restore(mongo_url: str, db_name: str, src_dir: Path, drop: bool = False,
+            collections: Optional[List[str]] = None, workers: int = 4, chunk_size: int = 1000) -> dict:
+    sources = find_sources(src_dir)
+    if collections:
+        sources = {name: entry for name, entry in sources.items() if name in collections}
+    if any(entry["file"].endswith(".zst") for entry in sources.values()):
+        _zstandard()
+
+    client = MongoClient(mongo_url)
+    db = client[db_name]
+    state = JsonState(src_dir / RESTORE_STATE, {})
+    results = {}
+    with ThreadPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(restore_collection, db, name, entry, src_dir, state, drop, chunk_size, f"{db_name}.{name}"): name
+            for name, entry in sources.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            results[name] = result = future.result()
+            if result.get("skipped"):
+                print(f"  {name}: already restored ({result['inserted']} docs)")
+            else:
+                print(f"  {name}: {result['inserted']} docs, {result['indexes']} indexes in {result['seconds']}s")
+    client.close()
+    # Checkpoints only matter for an interrupted run; the next full restore starts fresh
+    state.path.unlink(missing_ok=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dump and restore the Name Craft database")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "test_database"))
+    parser.add_argument("--workers", type=int, default=4, help="Collections processed in parallel")
+    parser.add_argument("--collections", nargs="+", help="Only these collections")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    dump_parser = commands.add_parser("dump", help="Write every collection to a dump directory")
+    dump_parser.add_argument("out_dir", type=Path)
+    dump_parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    dump_parser.add_argument("--compression", choices=COMPRESSIONS, default="gzip")
+    dump_parser.add_argument("--batch-size", type=int, default=1000, help="Cursor batch size")
+
+    restore_parser = commands.add_parser("restore", help="Load a dump directory or legacy JSON export")
+    restore_parser.add_argument("src_dir", type=Path)
+    restore_parser.add_argument("--drop", action="store_true", help="Drop each collection before loading it")
+    restore_parser.add_argument("--chunk-size", type=int, default=1000, help="Documents per insert_many")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print(f"Name Craft - Database {args.command.title()}")
+    print("=" * 50)
+    print(f"Database: {args.db_name}")
+    print(f"MongoDB: {args.mongo_url}")
+    print("=" * 50)
+
+    started = time.perf_counter()
+    if args.command == "dump":
+        dump(args.mongo_url, args.db_name, args.out_dir, args.format, args.compression, args.collections,
+             args.workers, args.batch_size)
+    else:
+        restore(args.mongo_url, args.db_name, args.src_dir, args.drop, args.collections, args.workers,
+                args.chunk_size)
+    print(f"\nDone in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
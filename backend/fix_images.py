@@ -1,9 +1,38 @@
 """
-Script to fix broken product images by replacing external URLs with working stock photos
+Catalog image auditor: checks every product image URL and replaces broken ones with
+working stock photos
+
+URLs are probed concurrently (HEAD, falling back to GET) through one pooled client with a
+per-host concurrency cap, results are cached by URL for --cache-ttl seconds, and all
+repairs go to MongoDB in a single bulk_write.
+
+Only URLs that are definitely gone (404/410, blocked, missing upload, not an image) are
+replaced. Timeouts, connection errors, 429 and 5xx responses are reported as unreachable,
+never cached and never repaired: the next run checks them again.
+
+Run: python3 fix_images.py --dry-run --report image_report.json
+     python3 fix_images.py --per-host 4 --timeout 5 --cache-file .image_cache.json
 """
+import argparse
 import asyncio
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
 from motor.motor_asyncio import AsyncIOMotorClient
-import random
+from pymongo import UpdateOne
+
+UPLOAD_DIR = Path(__file__).parent / "uploads"
+IMAGE_FIELDS = ('image', 'hover_image')
+# Servers that refuse HEAD but serve GET fine
+HEAD_UNSUPPORTED = {403, 405, 501}
+# Failures that say the image is gone for good; anything else may pass on the next run
+DEFINITIVE_FAILURES = {'blocked', 'invalid_url', 'missing_upload', 'not_an_image', 'http_404', 'http_410'}
 
 # Stock photos organized by category
 STOCK_IMAGES = {
@@ -87,59 +116,236 @@ def is_broken_url(url: str) -> bool:
         return True
     return any(domain in url.lower() for domain in blocked_domains)
 
-async def fix_images():
-    client = AsyncIOMotorClient('mongodb://localhost:27017')
-    db = client['test_database']
-    
-    # Get all products
-    products = await db.products.find({}, {'_id': 0}).to_list(200)
-    
-    fixed_count = 0
-    image_index = {}  # Track which images we've used to avoid duplicates
-    
+class ImageCheck:
+    def __init__(self, ok: bool, reason: str, status: Optional[int] = None, checked_at: Optional[float] = None):
+        self.ok = ok
+        self.reason = reason
+        self.status = status
+        self.checked_at = checked_at or time.time()
+
+    @property
+    def broken(self) -> bool:
+        """The URL is definitely gone and safe to replace"""
+        return not self.ok and self.reason in DEFINITIVE_FAILURES
+
+    @property
+    def transient(self) -> bool:
+        """The URL could not be checked this time (timeout, network error, 429, 5xx)"""
+        return not self.ok and self.reason not in DEFINITIVE_FAILURES
+
+    def to_dict(self):
+        return {"ok": self.ok, "reason": self.reason, "status": self.status, "checked_at": self.checked_at}
+
+
+class ImageChecker:
+    """Concurrent URL prober with per-host limits and a TTL cache keyed by URL"""
+
+    def __init__(self, concurrency: int = 50, per_host: int = 8, timeout: float = 10,
+                 cache_ttl: float = 24 * 3600, cache: Optional[Dict[str, dict]] = None):
+        self.per_host = per_host
+        self.cache_ttl = cache_ttl
+        # Older cache files may still hold transient failures; those get probed again
+        self.cache: Dict[str, ImageCheck] = {
+            url: ImageCheck(**entry) for url, entry in (cache or {}).items()
+            if entry.get('ok') or entry.get('reason') in DEFINITIVE_FAILURES
+        }
+        self.requests_made = 0
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        )
+        self._host_limits: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def check(self, url: str) -> ImageCheck:
+        cached = self.cache.get(url)
+        if cached and time.time() - cached.checked_at < self.cache_ttl:
+            return cached
+        # Products share images; probe each URL once even when asked concurrently
+        if url not in self._inflight:
+            self._inflight[url] = asyncio.ensure_future(self._probe(url))
+        try:
+            result = await self._inflight[url]
+        finally:
+            self._inflight.pop(url, None)
+        if not result.transient:
+            self.cache[url] = result
+        return result
+
+    async def check_all(self, urls) -> Dict[str, ImageCheck]:
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*[self.check(url) for url in urls])
+        return dict(zip(urls, results))
+
+    async def _probe(self, url: str) -> ImageCheck:
+        if is_broken_url(url):
+            return ImageCheck(False, "blocked")
+        if url.startswith("/api/uploads/"):
+            exists = (UPLOAD_DIR / url.rsplit("/", 1)[-1]).is_file()
+            return ImageCheck(exists, "ok" if exists else "missing_upload")
+        host = urlsplit(url).netloc
+        if not host:
+            return ImageCheck(False, "invalid_url")
+
+        async with self._host_limits[host]:
+            try:
+                self.requests_made += 1
+                response = await self._client.head(url)
+                if response.status_code in HEAD_UNSUPPORTED:
+                    self.requests_made += 1
+                    async with self._client.stream("GET", url) as response:
+                        pass
+            except httpx.TimeoutException:
+                return ImageCheck(False, "timeout")
+            except httpx.HTTPError as e:
+                return ImageCheck(False, type(e).__name__)
+
+        if response.status_code >= 400:
+            return ImageCheck(False, f"http_{response.status_code}", response.status_code)
+        content_type = response.headers.get("content-type", "")
+        if content_type and not content_type.startswith("image/"):
+            return ImageCheck(False, "not_an_image", response.status_code)
+        return ImageCheck(True, "ok", response.status_code)
+
+    def export_cache(self) -> Dict[str, dict]:
+        return {url: check.to_dict() for url, check in self.cache.items()}
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def plan_repairs(products: List[dict], health: Dict[str, ImageCheck]) -> Tuple[List[UpdateOne], List[dict]]:
+    """Updates replacing broken images with healthy stock photos, and what they change
+
+    Images that were merely unreachable this run are left as they are.
+    """
+    healthy_stock = {
+        category: [url for url in urls if health.get(url) and health[url].ok]
+        for category, urls in STOCK_IMAGES.items()
+    }
+    image_index: Dict[str, int] = {}  # Rotate through stock images to avoid duplicates
+    updates, fixes = [], []
+
     for product in products:
-        image = product.get('image', '')
-        hover_image = product.get('hover_image', '')
-        name = product.get('name', '')
-        category = product.get('category', '')
-        product_id = product.get('id', '')
-        
-        # Check if images are broken
-        if is_broken_url(image) or is_broken_url(hover_image):
-            # Determine the best image category
-            img_category = get_image_category(name, category)
-            available_images = STOCK_IMAGES.get(img_category, STOCK_IMAGES['default'])
-            
-            # Get an index to rotate through images
-            if img_category not in image_index:
-                image_index[img_category] = 0
-            
-            idx = image_index[img_category] % len(available_images)
-            new_image = available_images[idx]
-            
-            # Use next image for hover
-            hover_idx = (idx + 1) % len(available_images)
-            new_hover = available_images[hover_idx]
-            
-            image_index[img_category] += 1
-            
-            # Update the product
-            update_data = {
-                'image': new_image,
-                'hover_image': new_hover
+        broken = [field for field in IMAGE_FIELDS if not product.get(field) or health[product[field]].broken]
+        gallery = product.get('gallery') or []
+        kept_gallery = [url for url in gallery if not health[url].broken]
+        if not broken and len(kept_gallery) == len(gallery):
+            continue
+
+        update_data = {}
+        img_category = get_image_category(product.get('name', ''), product.get('category', ''))
+        available_images = healthy_stock.get(img_category) or healthy_stock['default']
+        if broken and available_images:
+            idx = image_index.get(img_category, 0)
+            image_index[img_category] = idx + 1
+            replacements = {
+                'image': available_images[idx % len(available_images)],
+                # Use next image for hover
+                'hover_image': available_images[(idx + 1) % len(available_images)]
             }
-            
-            await db.products.update_one(
-                {'id': product_id},
-                {'$set': update_data}
-            )
-            
-            print(f"Fixed: {name}")
-            print(f"  Old: {image[:50]}...")
-            print(f"  New: {new_image}")
-            fixed_count += 1
-    
-    print(f"\n✅ Fixed {fixed_count} products with broken images")
+            update_data.update({field: replacements[field] for field in broken})
+        if len(kept_gallery) != len(gallery):
+            update_data['gallery'] = kept_gallery
+        if not update_data:
+            continue
+
+        updates.append(UpdateOne({'id': product['id']}, {'$set': update_data}))
+        fixes.append({
+            'id': product['id'],
+            'name': product.get('name', ''),
+            'changes': {
+                field: {'old': product.get(field), 'new': value,
+                        'reason': health[product[field]].reason if product.get(field) else 'empty'}
+                for field, value in update_data.items() if field != 'gallery'
+            },
+            'gallery_removed': [url for url in gallery if health[url].broken]
+        })
+    return updates, fixes
+
+
+async def fix_images(mongo_url: str, db_name: str, checker: ImageChecker, dry_run: bool = False) -> dict:
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+    started = time.perf_counter()
+
+    products = await db.products.find(
+        {}, {'_id': 0, 'id': 1, 'name': 1, 'category': 1, 'image': 1, 'hover_image': 1, 'gallery': 1}
+    ).to_list(None)
+    urls = [product[field] for product in products for field in IMAGE_FIELDS if product.get(field)]
+    urls += [url for product in products for url in product.get('gallery') or []]
+    urls += [url for images in STOCK_IMAGES.values() for url in images]
+    health = await checker.check_all(urls)
+
+    updates, fixes = plan_repairs(products, health)
+    modified = 0
+    if updates and not dry_run:
+        modified = (await db.products.bulk_write(updates, ordered=False)).modified_count
+    client.close()
+
+    broken = {url: check for url, check in health.items() if check.broken}
+    unreachable = {url: check for url, check in health.items() if check.transient}
+    return {
+        'products_scanned': len(products),
+        'urls_checked': len(health),
+        'requests_made': checker.requests_made,
+        'broken_urls': len(broken),
+        'broken_by_reason': dict(Counter(check.reason for check in broken.values())),
+        'broken_by_host': dict(Counter(urlsplit(url).netloc or 'local' for url in broken)),
+        'unreachable_urls': len(unreachable),
+        'unreachable_by_reason': dict(Counter(check.reason for check in unreachable.values())),
+        'unreachable_by_host': dict(Counter(urlsplit(url).netloc for url in unreachable)),
+        'products_fixed': len(fixes),
+        'products_modified': modified,
+        'dry_run': dry_run,
+        'elapsed_seconds': round(time.perf_counter() - started, 2),
+        'fixes': fixes,
+        'broken': {url: check.to_dict() for url, check in broken.items()},
+        'unreachable': {url: check.to_dict() for url, check in unreachable.items()}
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Audit product images and repair broken ones")
+    parser.add_argument('--mongo-url', default=os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    parser.add_argument('--db-name', default=os.environ.get('DB_NAME', 'test_database'))
+    parser.add_argument('--concurrency', type=int, default=50, help='Open connections overall')
+    parser.add_argument('--per-host', type=int, default=8, help='Concurrent requests per host')
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--cache-ttl', type=float, default=24 * 3600, help='Seconds a URL result stays valid')
+    parser.add_argument('--cache-file', help='Persist URL results between runs')
+    parser.add_argument('--report', help='Write the full report as JSON')
+    parser.add_argument('--dry-run', action='store_true', help='Report without writing repairs')
+    args = parser.parse_args()
+
+    cache_path = Path(args.cache_file) if args.cache_file else None
+    cache = json.loads(cache_path.read_text()) if cache_path and cache_path.exists() else None
+    checker = ImageChecker(args.concurrency, args.per_host, args.timeout, args.cache_ttl, cache)
+    try:
+        report = await fix_images(args.mongo_url, args.db_name, checker, args.dry_run)
+    finally:
+        await checker.close()
+    if cache_path:
+        cache_path.write_text(json.dumps(checker.export_cache()))
+
+    for fix in report['fixes']:
+        print(f"Fixed: {fix['name']}")
+        for field, change in fix['changes'].items():
+            print(f"  {field} ({change['reason']}): {(change['old'] or '')[:50]}... -> {change['new']}")
+        if fix['gallery_removed']:
+            print(f"  gallery: removed {len(fix['gallery_removed'])} broken images")
+
+    print(f"\nChecked {report['urls_checked']} URLs with {report['requests_made']} requests "
+          f"in {report['elapsed_seconds']}s")
+    print(f"Broken: {report['broken_urls']} {report['broken_by_reason']}")
+    if report['unreachable_urls']:
+        print(f"Unreachable, left untouched: {report['unreachable_urls']} {report['unreachable_by_reason']}")
+    verb = "Would fix" if args.dry_run else "✅ Fixed"
+    print(f"{verb} {report['products_fixed']} products with broken images")
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2))
+        print(f"Report saved to {args.report}")
 
 if __name__ == '__main__':
-    asyncio.run(fix_images())
+    asyncio.run(main())
@@ -0,0 +1,472 @@
+"""
+Synthetic dataset generator for Name Craft
+Expands the product shapes in seed_data.py into catalogues, customers and order histories
+large enough to expose scaling problems. Output is deterministic for a given --seed,
+whatever the number of workers.
+
+Generated users (and the admin) share the password in DEFAULT_PASSWORD.
+
+Run: python3 generate_data.py --products 5000 --users 200000 --orders 1000000 --drop
+     python3 generate_data.py --db-name namecraft_bench --orders 50000 --workers 4
+"""
+import argparse
+import math
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import bcrypt
+from pymongo import MongoClient, UpdateOne
+
+from ids import datetime_ms, uuid7_from
+from search_keys import order_search_keys, user_search_keys
+from seed_data import MONGO_URL, DB_NAME, PRODUCTS, product_document
+
+ADMIN_EMAIL = "admin@example.com"
+DEFAULT_PASSWORD = "Password123!"
+COLLECTIONS = ["categories", "products", "users", "coupons", "orders", "refunds", "reviews", "media"]
+
+FIRST_NAMES = ["Aarav", "Aditi", "Ananya", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Neha", "Priya",
+               "Rahul", "Riya", "Rohan", "Saanvi", "Sneha", "Tanvi", "Varun", "Vihaan", "Zara", "Kabir"]
+LAST_NAMES = ["Sharma", "Verma", "Patel", "Iyer", "Reddy", "Nair", "Gupta", "Singh", "Mehta", "Khan",
+              "Das", "Joshi", "Kapoor", "Rao", "Bose"]
+CITIES = [("Mumbai", "Maharashtra", "400001"), ("Delhi", "Delhi", "110001"), ("Bengaluru", "Karnataka", "560001"),
+          ("Hyderabad", "Telangana", "500001"), ("Chennai", "Tamil Nadu", "600001"), ("Kolkata", "West Bengal", "700001"),
+          ("Pune", "Maharashtra", "411001"), ("Jaipur", "Rajasthan", "302001"), ("Lucknow", "Uttar Pradesh", "226001"),
+          ("Ahmedabad", "Gujarat", "380001")]
+VARIANTS = ["Classic", "Deluxe", "Mini", "Premium", "Vintage", "Signature", "Everyday", "Festive"]
+METALS = ["gold", "rose-gold", "silver"]
+MEDIA_FOLDERS = ["products", "products", "products", "banners", "categories", "general"]
+# Share of orders per hour of day (IST evenings are busiest)
+HOUR_WEIGHTS = [2, 1, 1, 1, 1, 1, 2, 3, 4, 5, 6, 6, 7, 7, 6, 6, 6, 7, 8, 10, 11, 11, 8, 4]
+
+COUPONS = [
+    {"code": "WELCOME10", "discount_type": "percentage", "discount_value": 10, "min_order_amount": 0, "max_discount": 200},
+    {"code": "LOVE15", "discount_type": "percentage", "discount_value": 15, "min_order_amount": 999, "max_discount": 400},
+    {"code": "FESTIVE20", "discount_type": "percentage", "discount_value": 20, "min_order_amount": 1499, "max_discount": 600},
+    {"code": "FLAT100", "discount_type": "fixed", "discount_value": 100, "min_order_amount": 799, "max_discount": None},
+    {"code": "FLAT250", "discount_type": "fixed", "discount_value": 250, "min_order_amount": 1999, "max_discount": None},
+]
+EXPIRED_COUPON = {"code": "OLDSALE30", "discount_type": "percentage", "discount_value": 30, "min_order_amount": 0,
+                  "max_discount": 500}
+
+
+def random_id(rng):
+    """uuid4-shaped id drawn from the seeded generator"""
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def time_ordered_id(rng, moment):
+    """UUIDv7 for a document created at `moment`, the way ids.new_id() would have stamped it"""
+    return uuid7_from(datetime_ms(moment), rng.getrandbits(12), rng.getrandbits(62))
+
+
+def spread_timestamp(rng, start, span_seconds):
+    """Timestamp in [start, start + span) skewed towards the present, with a daily cycle"""
+    # sqrt gives linearly growing volume over the period
+    moment = start + timedelta(seconds=span_seconds * math.sqrt(rng.random()))
+    hour = rng.choices(range(24), HOUR_WEIGHTS)[0]
+    return moment.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+
+
+def phone_number(rng):
+    digits = f"{rng.choice('6789')}{rng.randrange(10 ** 9):09d}"
+    # Customers type phone numbers every way imaginable
+    return rng.choice([digits, f"+91{digits}", f"+91 {digits[:5]} {digits[5:]}", f"{digits[:5]}-{digits[5:]}"])
+
+
+# ==================== CATALOGUE AND CUSTOMERS ====================
+
+def build_categories(now):
+    slugs = sorted({p["category"] for p in PRODUCTS})
+    return [{"id": str(uuid.uuid5(uuid.NAMESPACE_URL, slug)), "name": slug.replace("-", " ").title(), "slug": slug,
+             "is_active": True, "order": i, "created_at": now} for i, slug in enumerate(slugs)]
+
+
+def build_products(count, rng, start, now):
+    products = []
+    for i in range(count):
+        shape = PRODUCTS[i % len(PRODUCTS)]
+        round_ = i // len(PRODUCTS)
+        name = shape["name"] if round_ == 0 else f"{VARIANTS[round_ % len(VARIANTS)]} {shape['name']} {round_}"
+        product = product_document(shape, name)
+        price = max(199, int(shape["price"] * rng.uniform(0.85, 1.15)) // 100 * 100 + 99)
+        created = start + timedelta(seconds=rng.uniform(0, (now - start).total_seconds()))
+        product.update({
+            "id": time_ordered_id(rng, created),
+            "price": price,
+            "original_price": max(price, int(price * rng.uniform(1.6, 2.1))),
+            "is_featured": rng.random() < 0.05,
+            "is_active": rng.random() < 0.97,
+            # A handful run low so inventory alerts have something to show
+            "stock_quantity": rng.randint(0, 9) if rng.random() < 0.04 else rng.randint(20, 500),
+            "metal_types": METALS if product["show_metal_options"] else [],
+            "tags": [shape["category"]],
+            "created_at": created,
+            "updated_at": created
+        })
+        product["discount"] = round((1 - price / product["original_price"]) * 100)
+        products.append(product)
+    return products
+
+
+def build_users(count, rng, start, now, password_hash):
+    users = [{
+        "id": time_ordered_id(rng, start), "email": ADMIN_EMAIL, "name": "Admin", "role": "admin", "is_active": True,
+        "password_hash": password_hash, "orders_count": 0, "total_spent": 0, "created_at": start
+    }]
+    span = (now - start).total_seconds()
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        city = rng.choice(CITIES)
+        created = spread_timestamp(rng, start, span)
+        users.append({
+            "id": time_ordered_id(rng, created),
+            "email": f"{first}.{last}{i}@example.com".lower(),
+            "name": f"{first} {last}",
+            "phone": phone_number(rng) if rng.random() < 0.8 else None,
+            "role": "user",
+            "is_active": rng.random() < 0.99,
+            "address": {"city": city[0], "state": city[1], "pincode": city[2]} if rng.random() < 0.6 else None,
+            "password_hash": password_hash,
+            "orders_count": 0,
+            "total_spent": 0,
+            "created_at": created,
+            "last_login": None
+        })
+    for user in users:
+        user["search_keys"] = user_search_keys(user)
+    return users
+
+
+def build_coupons(rng, start, now):
+    coupons = []
+    for spec in COUPONS + [EXPIRED_COUPON]:
+        expired = spec is EXPIRED_COUPON
+        coupons.append({
+            "id": random_id(rng), **spec, "usage_limit": None, "used_count": 0, "is_active": not expired,
+            "valid_from": start, "valid_until": start + timedelta(days=30) if expired else None, "created_at": start
+        })
+    return coupons
+
+
+def build_media(count, rng, products, start, now):
+    span = (now - start).total_seconds()
+    media = []
+    for i in range(count):
+        folder = rng.choice(MEDIA_FOLDERS)
+        url = rng.choice(products)["image"] if products else f"/api/uploads/{i}.jpg"
+        created = spread_timestamp(rng, start, span)
+        media.append({
+            "id": time_ordered_id(rng, created), "name": f"{folder}-{i}.jpg", "url": url, "type": "image",
+            "size": rng.randint(40_000, 2_500_000), "folder": folder, "alt_text": None,
+            "created_at": created
+        })
+    return media
+
+
+# ==================== ORDERS, REFUNDS, REVIEWS ====================
+
+def order_status(rng, age_days, payment_method):
+    """(order_status, payment_status) consistent with how old the order is"""
+    if age_days < 1:
+        status = rng.choices(["pending", "confirmed", "cancelled"], [60, 37, 3])[0]
+    elif age_days < 7:
+        status = rng.choices(["pending", "confirmed", "shipped", "delivered", "cancelled"], [8, 25, 40, 22, 5])[0]
+    else:
+        status = rng.choices(["pending", "confirmed", "shipped", "delivered", "cancelled"], [1, 1, 3, 88, 7])[0]
+
+    if status == "cancelled":
+        payment = "pending" if payment_method == "cod" else rng.choice(["expired", "rejected", "pending"])
+    elif payment_method == "cod":
+        payment = "paid" if status == "delivered" else "pending"
+    elif status == "pending":
+        payment = rng.choices(["pending", "pending_verification"], [70, 30])[0] if payment_method == "upi" else "pending"
+    else:
+        payment = "paid"
+    return status, payment
+
+
+def coupon_discount(coupon, subtotal):
+    if subtotal < coupon["min_order_amount"]:
+        return 0
+    if coupon["discount_type"] == "percentage":
+        discount = subtotal * (coupon["discount_value"] / 100)
+        return min(discount, coupon["max_discount"]) if coupon.get("max_discount") else discount
+    return coupon["discount_value"]
+
+
+def build_order_chunk(ctx, chunk_index):
+    """Orders [chunk_index * chunk_size, ...) plus the refunds raised against them"""
+    rng = random.Random(f"{ctx['seed']}:orders:{chunk_index}")
+    first = chunk_index * ctx["chunk_size"]
+    last = min(first + ctx["chunk_size"], ctx["orders"])
+    products, users = ctx["products"], ctx["users"]
+    now, start = ctx["now"], ctx["start"]
+    span = (now - start).total_seconds()
+
+    orders, refunds = [], []
+    for n in range(first, last):
+        created = spread_timestamp(rng, start, span)
+        age_days = (now - created).total_seconds() / 86400
+
+        items = {}
+        for product in rng.choices(products, cum_weights=ctx["product_weights"], k=rng.choices([1, 2, 3, 4], [60, 25, 10, 5])[0]):
+            if product["id"] in items:
+                continue
+            customization = {}
+            if product["show_metal_options"]:
+                customization["metal"] = rng.choice(METALS)
+            if rng.random() < 0.6:
+                customization["name"] = rng.choice(FIRST_NAMES)
+            if product["allow_custom_image"]:
+                customization["image"] = f"/api/uploads/{random_id(rng)}.jpg"
+            items[product["id"]] = {
+                "product_id": product["id"], "name": product["name"], "price": product["price"],
+                "quantity": rng.choices([1, 2, 3], [85, 12, 3])[0], "image": product["image"],
+                "customization": customization
+            }
+        items = list(items.values())
+        subtotal = sum(item["price"] * item["quantity"] for item in items)
+        shipping_cost = 0 if subtotal >= 499 else 29
+
+        coupon_code, discount = None, 0
+        if rng.random() < 0.18:
+            coupon = rng.choice(ctx["coupons"])
+            discount = coupon_discount(coupon, subtotal)
+            coupon_code = coupon["code"] if discount else None
+
+        # A quarter of orders come from guests who never registered
+        if rng.random() < 0.25:
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            user_id, email, phone = None, f"guest.{first_name}{n}@example.com".lower(), phone_number(rng)
+        else:
+            user = rng.choice(users)
+            first_name, _, last_name = user["name"].partition(" ")
+            user_id, email, phone = user["id"], user["email"], user["phone"] or phone_number(rng)
+
+        payment_method = rng.choices(["upi", "razorpay", "cod"], [45, 35, 20])[0]
+        status, payment_status = order_status(rng, age_days, payment_method)
+        city = rng.choice(CITIES)
+        order = {
+            "id": time_ordered_id(rng, created),
+            # Index-based suffix keeps numbers unique without a lookup
+            "order_number": f"NC{created:%Y%m%d}{n:06X}",
+            "user_id": user_id,
+            "user_email": email,
+            "items": items,
+            "shipping_address": {
+                "first_name": first_name, "last_name": last_name, "email": email, "phone": phone,
+                "address": f"{rng.randint(1, 999)} {rng.choice(LAST_NAMES)} Road", "apartment": None,
+                "city": city[0], "state": city[1], "pincode": city[2]
+            },
+            "payment_method": payment_method,
+            "payment_status": payment_status,
+            "order_status": status,
+            "subtotal": subtotal,
+            "shipping_cost": shipping_cost,
+            "discount_amount": discount,
+            "total": subtotal + shipping_cost - discount,
+            "coupon_code": coupon_code,
+            "utr_number": f"{rng.randrange(10 ** 12):012d}" if payment_method == "upi" and payment_status != "pending" else None,
+            "payment_id": f"pay_{rng.getrandbits(56):014x}" if payment_method == "razorpay" and payment_status == "paid" else None,
+            "tracking_number": f"NCT{rng.randrange(10 ** 10):010d}" if status in ("shipped", "delivered") else None,
+            "notes": None,
+            "admin_notes": None,
+            "created_at": created,
+            "updated_at": min(now, created + timedelta(days=rng.uniform(0, min(age_days, 6))))
+        }
+        order["search_keys"] = order_search_keys(order)
+
+        if status == "delivered" and payment_status == "paid" and rng.random() < 0.03:
+            refund_status = rng.choices(["pending", "approved", "rejected", "processed"], [20, 10, 10, 60])[0]
+            requested = order["updated_at"] + timedelta(days=rng.uniform(0, 5))
+            refunds.append({
+                "id": time_ordered_id(rng, min(now, requested)), "order_id": order["id"], "order_number": order["order_number"],
+                "user_email": email, "amount": order["total"] if rng.random() < 0.7 else round(order["total"] / 2, 2),
+                "reason": rng.choice(["Damaged item", "Wrong name engraved", "Not as described", "Late delivery"]),
+                "status": refund_status, "admin_notes": None,
+                "processed_by": ADMIN_EMAIL if refund_status != "pending" else None,
+                "created_at": min(now, requested),
+                "processed_at": min(now, requested + timedelta(days=2)) if refund_status != "pending" else None
+            })
+            if refund_status == "processed":
+                order["payment_status"] = order["order_status"] = "refunded"
+        orders.append(order)
+    return orders, refunds
+
+
+def build_review_chunk(ctx, chunk_index):
+    """Reviews for products [chunk_index * chunk_size, ...); popular products get more"""
+    rng = random.Random(f"{ctx['seed']}:reviews:{chunk_index}")
+    products = ctx["products"][chunk_index * ctx["chunk_size"]:(chunk_index + 1) * ctx["chunk_size"]]
+    users, now, start = ctx["users"], ctx["now"], ctx["start"]
+    span = (now - start).total_seconds()
+    reviews = []
+    for product in products:
+        count = int(rng.paretovariate(1.3) * ctx["reviews_per_product"] / 4)
+        for _ in range(min(count, 500)):
+            user = rng.choice(users)
+            created = spread_timestamp(rng, start, span)
+            reviews.append({
+                "id": time_ordered_id(rng, created), "product_id": product["id"],
+                "rating": rng.choices([5, 4, 3, 2, 1], [55, 25, 10, 5, 5])[0],
+                "title": rng.choice([None, "Loved it", "Perfect gift", "Good quality", "Not as expected"]),
+                "comment": rng.choice(["Beautiful finish and quick delivery.", "The engraving was perfect.",
+                                       "My partner loved it!", "Smaller than I expected.", "Great value for money."]),
+                "reviewer_name": user["name"], "reviewer_email": user["email"],
+                "verified_purchase": rng.random() < 0.4, "approved": rng.random() < 0.85,
+                "created_at": created
+            })
+    return reviews
+
+
+# ==================== WRITING ====================
+
+_worker_db = None
+_worker_ctx = None
+
+
+def _init_worker(mongo_url, db_name, ctx):
+    global _worker_db, _worker_ctx
+    _worker_db = MongoClient(mongo_url)[db_name]
+    _worker_ctx = ctx
+
+
+def insert_chunk(collection, docs):
+    if docs:
+        _worker_db[collection].insert_many(docs, ordered=False)
+    return {collection: len(docs)}
+
+
+def generate_chunk(kind, chunk_index):
+    if kind == "orders":
+        orders, refunds = build_order_chunk(_worker_ctx, chunk_index)
+        return {**insert_chunk("orders", orders), **insert_chunk("refunds", refunds)}
+    return insert_chunk("reviews", build_review_chunk(_worker_ctx, chunk_index))
+
+
+def update_user_totals(db, chunk_size):
+    """orders_count / total_spent the way place_order accumulates them"""
+    pipeline = [
+        {"$match": {"user_id": {"$ne": None}}},
+        {"$group": {"_id": "$user_id", "orders_count": {"$sum": 1}, "total_spent": {"$sum": "$total"}}}
+    ]
+    batch, updated = [], 0
+    for row in db.orders.aggregate(pipeline, allowDiskUse=True):
+        batch.append(UpdateOne({"id": row["_id"]}, {"$set": {"orders_count": row["orders_count"],
+                                                            "total_spent": row["total_spent"]}}))
+        if len(batch) >= chunk_size:
+            updated += db.users.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += db.users.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+def generate(mongo_url=MONGO_URL, db_name=DB_NAME, products=1000, users=10000, orders=100000,
+             reviews_per_product=8, media=500, days=365, seed=42, workers=None, chunk_size=5000, drop=False,
+             log=print):
+    """Write a synthetic dataset; returns per-collection counts and the catalogue it generated"""
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    # Anchor on midnight so the same seed gives the same timestamps all day
+    now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = now - timedelta(days=days)
+    # One hash for everyone; bcrypt per user would dominate the run
+    password_hash = bcrypt.hashpw(DEFAULT_PASSWORD.encode(), bcrypt.gensalt(rounds=10)).decode()
+
+    client = MongoClient(mongo_url)
+    db = client[db_name]
+    if drop:
+        for name in COLLECTIONS:
+            db.drop_collection(name)
+
+    product_docs = build_products(products, rng, start, now)
+    user_docs = build_users(users, rng, start, now, password_hash)
+    coupon_docs = build_coupons(rng, start, now)
+    media_docs = build_media(media, rng, product_docs, start, now)
+    category_docs = build_categories(now)
+    db.categories.insert_many(category_docs)
+    db.coupons.insert_many(coupon_docs)
+
+    active = [p for p in product_docs if p["is_active"]] or product_docs
+    ctx = {
+        "seed": seed, "now": now, "start": start, "orders": orders, "chunk_size": chunk_size,
+        "reviews_per_product": reviews_per_product, "coupons": [c for c in coupon_docs if c["is_active"]],
+        "products": [{k: p[k] for k in ("id", "name", "slug", "category", "price", "image", "show_metal_options",
+                                        "allow_custom_image")} for p in active],
+        # Zipf-like popularity: a few bestsellers, a long tail
+        "product_weights": list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(active)))),
+        "users": [{k: u[k] for k in ("id", "email", "name", "phone")} for u in user_docs[1:]] or user_docs
+    }
+
+    counts = {"categories": len(category_docs), "coupons": len(coupon_docs)}
+    jobs = [("insert", name, docs[i:i + chunk_size])
+            for name, docs in (("products", product_docs), ("users", user_docs), ("media", media_docs))
+            for i in range(0, len(docs), chunk_size)]
+    jobs += [("generate", "orders", i) for i in range(math.ceil(orders / chunk_size))]
+    jobs += [("generate", "reviews", i) for i in range(math.ceil(len(ctx["products"]) / chunk_size))]
+
+    workers = workers or os.cpu_count() or 4
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(mongo_url, db_name, ctx)) as pool:
+        futures = [pool.submit(insert_chunk, name, arg) if kind == "insert" else pool.submit(generate_chunk, name, arg)
+                   for kind, name, arg in jobs]
+        done = 0
+        for future in as_completed(futures):
+            for name, n in future.result().items():
+                counts[name] = counts.get(name, 0) + n
+            done += 1
+            if done % 20 == 0 or done == len(futures):
+                log(f"  {done}/{len(futures)} chunks, {counts.get('orders', 0)} orders "
+                    f"({time.perf_counter() - started:.0f}s)")
+
+    # Index first: the totals update matches users by id
+    db.users.create_index("id", unique=True)
+    update_user_totals(db, chunk_size)
+    client.close()
+
+    counts["elapsed_seconds"] = round(time.perf_counter() - started, 1)
+    return counts, ctx
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic Name Craft dataset")
+    parser.add_argument("--mongo-url", default=MONGO_URL)
+    parser.add_argument("--db-name", default=DB_NAME)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--reviews-per-product", type=int, default=8, help="Average; popularity is long-tailed")
+    parser.add_argument("--media", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365, help="History the orders are spread over")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, help="Writer processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--drop", action="store_true", help="Drop the generated collections first")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Name Craft - Synthetic Data")
+    print("=" * 50)
+    print(f"Database: {args.db_name}")
+    print(f"MongoDB: {args.mongo_url}")
+    print("=" * 50)
+
+    counts, _ = generate(
+        args.mongo_url, args.db_name, args.products, args.users, args.orders, args.reviews_per_product,
+        args.media, args.days, args.seed, args.workers, args.chunk_size, args.drop
+    )
+    elapsed = counts.pop("elapsed_seconds")
+    for name, n in counts.items():
+        print(f"   {name}: {n}")
+    print(f"\nDone in {elapsed}s ({counts.get('orders', 0) / max(elapsed, 0.001):.0f} orders/s)")
+    print(f"Admin login: {ADMIN_EMAIL} / {DEFAULT_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+"""
+Email and WhatsApp message templates for Name Craft
+Templates live in the `email_templates` collection (falling back to the defaults below)
+and use mustache-style placeholders:
+
+    {{order_number}}             value, HTML-escaped in html templates
+    {{{reset_link}}}             value, never escaped
+    {{shipping.city}}            dotted lookup
+    {{#items}}...{{/items}}      repeat for each item / render if truthy
+    {{^discount}}...{{/discount}} render if missing or empty
+
+Each template is compiled once into render functions and cached by template id and
+version. Saving a template bumps its version and drops it from this process's cache;
+other processes pick the new version up within TEMPLATE_CACHE_TTL_SECONDS.
+"""
+import html
+import re
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+TEMPLATE_FIELDS = ("name", "channel", "subject", "body", "html")
+# How long a process trusts its compiled copy before re-checking the stored version
+TEMPLATE_CACHE_TTL_SECONDS = 30
+TAG = re.compile(r"\{\{(\{?)\s*([#^/&]?)\s*([\w.]+)\s*\}?\}\}")
+
+
+class TemplateError(ValueError):
+    """A template that cannot be compiled"""
+
+
+# ==================== COMPILER ====================
+
+def lookup(stack: list, path: List[str]) -> Any:
+    if path == ["."]:
+        return stack[-1]
+    for scope in reversed(stack):
+        if isinstance(scope, dict) and path[0] in scope:
+            value = scope[path[0]]
+            break
+    else:
+        return None
+    for key in path[1:]:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def parse(source: str) -> list:
+    """Nested nodes: literal strings, ("=" | "&", name) variables, ("#" | "^", name, children) sections"""
+    root: list = []
+    open_sections = [(None, root)]
+    pos = 0
+    for match in TAG.finditer(source):
+        nodes = open_sections[-1][1]
+        if match.start() > pos:
+            nodes.append(source[pos:match.start()])
+        pos = match.end()
+        triple, sigil, name = match.groups()
+        if sigil in ("#", "^"):
+            section = (sigil, name, [])
+            nodes.append(section)
+            open_sections.append((name, section[2]))
+        elif sigil == "/":
+            if open_sections[-1][0] != name:
+                raise TemplateError(f"Unexpected {{{{/{name}}}}}")
+            open_sections.pop()
+        else:
+            nodes.append(("&" if triple or sigil == "&" else "=", name))
+    if len(open_sections) > 1:
+        raise TemplateError(f"Unclosed section {{{{#{open_sections[-1][0]}}}}}")
+    if pos < len(source):
+        open_sections[-1][1].append(source[pos:])
+    return root
+
+
+def build(nodes: list, autoescape: bool) -> Callable[[list], str]:
+    parts: list = []
+    for node in nodes:
+        if isinstance(node, str):
+            # Literals are kept as plain strings; only tags cost a call at render time
+            if parts and isinstance(parts[-1], str):
+                parts[-1] += node
+            else:
+                parts.append(node)
+            continue
+        kind, name = node[0], node[1]
+        path = name.split(".") if name != "." else ["."]
+        if kind in ("=", "&"):
+            parts.append(variable(path, html.escape if autoescape and kind == "=" else None))
+        elif kind == "#":
+            parts.append(section(path, build(node[2], autoescape)))
+        else:
+            parts.append(inverted(path, build(node[2], autoescape)))
+
+    def render(stack: list) -> str:
+        return "".join([part if part.__class__ is str else part(stack) for part in parts])
+    return render
+
+
+def variable(path, escape):
+    def render(stack):
+        value = lookup(stack, path)
+        if value is None or value is False:
+            return ""
+        return escape(str(value)) if escape else str(value)
+    return render
+
+
+def section(path, inner):
+    def render(stack):
+        value = lookup(stack, path)
+        if not value:
+            return ""
+        if isinstance(value, (list, tuple)):
+            return "".join([inner(stack + [item]) for item in value])
+        return inner(stack + [value])
+    return render
+
+
+def inverted(path, inner):
+    def render(stack):
+        return "" if lookup(stack, path) else inner(stack)
+    return render
+
+
+def compile_template(source: str, autoescape: bool = False) -> Callable[[dict], str]:
+    """Compile once; the returned function renders a context dict to a string"""
+    render = build(parse(source or ""), autoescape)
+    return lambda context: render([context])
+
+
+def text_to_html(text: str) -> str:
+    return f"<div style=\"font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #333;\">" \
+           f"{html.escape(text).replace(chr(10), '<br>')}</div>"
+
+
+class CompiledTemplate:
+    """Render functions for one version of one template"""
+
+    def __init__(self, template: dict, version: Optional[int]):
+        self.id = template["id"]
+        self.version = version
+        self.channel = template.get("channel", "email")
+        self.subject = compile_template(template.get("subject", ""))
+        self.text = compile_template(template.get("body", ""))
+        self.html = compile_template(template["html"], autoescape=True) if template.get("html") else None
+
+    def render(self, context: dict) -> Dict[str, str]:
+        """{"text"} for WhatsApp, {"subject", "html"} for email; only what the channel sends is rendered"""
+        if self.channel == "whatsapp":
+            return {"text": self.text(context)}
+        if self.html:
+            return {"subject": self.subject(context), "html": self.html(context)}
+        text = self.text(context)
+        return {"subject": self.subject(context), "text": text, "html": text_to_html(text)}
+
+    def render_many(self, contexts: Iterable[dict]) -> List[Dict[str, str]]:
+        """Render a batch with one template lookup; bulk sends call this per batch of recipients"""
+        render = self.render
+        return [render(context) for context in contexts]
+
+
+# ==================== CONTEXTS ====================
+
+def rupees(amount) -> str:
+    return f"{amount or 0:,.0f}"
+
+
+def site_context(settings: dict) -> dict:
+    return {
+        "site_name": settings.get("site_name", "Name Craft"),
+        "contact_email": settings.get("contact_email", ""),
+        "year": datetime.now().year
+    }
+
+
+def order_context(order: dict, settings: dict) -> dict:
+    """Placeholders available to order templates"""
+    shipping = order.get("shipping_address") or {}
+    items = order.get("items") or []
+    created = order.get("created_at") or datetime.utcnow()
+    shipping_cost = order.get("shipping_cost", 0)
+    discount = order.get("discount_amount", 0)
+    return {
+        **site_context(settings),
+        "order_number": order.get("order_number", ""),
+        "order_date": created.strftime("%B %d, %Y") if isinstance(created, datetime) else str(created)[:10],
+        "payment_method": (order.get("payment_method") or "N/A").upper(),
+        "customer_name": f"{shipping.get('first_name', '')} {shipping.get('last_name', '')}".strip() or "Customer",
+        "first_name": shipping.get("first_name") or "there",
+        "shipping": shipping,
+        "items": [{
+            "name": item.get("name", ""),
+            "image": item.get("image", ""),
+            "quantity": item.get("quantity", 1),
+            "customization_name": (item.get("customization") or {}).get("name", "N/A"),
+            "line_total": rupees(item.get("price", 0) * item.get("quantity", 1))
+        } for item in items],
+        "items_preview": items[:3],
+        "more_items": len(items) - 3 if len(items) > 3 else None,
+        "subtotal": rupees(order.get("subtotal", 0)),
+        "shipping_cost": "FREE" if not shipping_cost else f"₹{rupees(shipping_cost)}",
+        "discount_amount": rupees(discount) if discount > 0 else None,
+        "total": rupees(order.get("total", 0)),
+        "tracking_number": order.get("tracking_number"),
+        "tracking_id": order.get("tracking_number")
+    }
+
+
+def password_reset_context(user: dict, reset_link: str, settings: dict) -> dict:
+    return {**site_context(settings), "customer_name": user.get("name", "there"), "reset_link": reset_link}
+
+
+def sale_settings_context(settings: dict) -> dict:
+    """The part of a sale broadcast context shared by every recipient; build it once per run"""
+    end = settings.get("sale_end_date")
+    return {
+        **site_context(settings),
+        "site_url": settings.get("site_url", "https://namecraft.shop"),
+        "sale_title": settings.get("sale_title", ""),
+        "sale_discount": settings.get("sale_discount", ""),
+        "sale_subtitle": settings.get("sale_subtitle", ""),
+        "sale_end_date": end.strftime("%B %d") if isinstance(end, datetime) else None
+    }
+
+
+def sale_context(user: dict, shared: dict) -> dict:
+    name = (user.get("name") or "").strip()
+    return {**shared, "customer_name": name or "there", "first_name": name.split(" ", 1)[0] if name else "there"}
+
+
+# ==================== DEFAULT TEMPLATES ====================
+
+EMAIL_STYLE = "font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;"
+
+ORDER_CONFIRMATION_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Order Confirmation</title></head>
+<body style="%(style)s">
+    <div style="text-align: center; padding: 20px 0; border-bottom: 2px solid #8B0000;">
+        <h1 style="font-family: Georgia, serif; font-style: italic; margin: 0; color: #333;">{{site_name}}</h1>
+    </div>
+    <div style="padding: 30px 0;">
+        <h2 style="color: #8B0000; margin-bottom: 5px;">Thank You for Your Order! 🎉</h2>
+        <p style="color: #666; margin-top: 0;">Your order has been received and is being processed.</p>
+        <div style="background: #f9f9f9; padding: 20px; border-radius: 10px; margin: 20px 0;">
+            <p style="margin: 5px 0;"><strong>Order Number:</strong> {{order_number}}</p>
+            <p style="margin: 5px 0;"><strong>Order Date:</strong> {{order_date}}</p>
+            <p style="margin: 5px 0;"><strong>Payment Method:</strong> {{payment_method}}</p>
+        </div>
+        <h3 style="border-bottom: 1px solid #eee; padding-bottom: 10px;">Order Details</h3>
+        <table style="width: 100%%; border-collapse: collapse;">
+            <thead>
+                <tr style="background: #f5f5f5;">
+                    <th style="padding: 12px; text-align: left;">Image</th>
+                    <th style="padding: 12px; text-align: left;">Product</th>
+                    <th style="padding: 12px; text-align: center;">Qty</th>
+                    <th style="padding: 12px; text-align: right;">Price</th>
+                </tr>
+            </thead>
+            <tbody>
+                {{#items}}
+                <tr>
+                    <td style="padding: 12px; border-bottom: 1px solid #eee;">
+                        <img src="{{image}}" alt="{{name}}" style="width: 60px; height: 60px; object-fit: cover; border-radius: 8px;">
+                    </td>
+                    <td style="padding: 12px; border-bottom: 1px solid #eee;">
+                        <strong>{{name}}</strong><br>
+                        <small style="color: #666;">Name: {{customization_name}}</small>
+                    </td>
+                    <td style="padding: 12px; border-bottom: 1px solid #eee; text-align: center;">{{quantity}}</td>
+                    <td style="padding: 12px; border-bottom: 1px solid #eee; text-align: right;">₹{{line_total}}</td>
+                </tr>
+                {{/items}}
+            </tbody>
+        </table>
+        <div style="text-align: right; margin-top: 20px; padding: 20px; background: #f9f9f9; border-radius: 10px;">
+            <p style="margin: 5px 0;">Subtotal: <strong>₹{{subtotal}}</strong></p>
+            <p style="margin: 5px 0;">Shipping: <strong>{{shipping_cost}}</strong></p>
+            {{#discount_amount}}<p style="margin: 5px 0; color: #22c55e;">Discount: <strong>-₹{{discount_amount}}</strong></p>{{/discount_amount}}
+            <p style="margin: 10px 0 0 0; font-size: 1.2em; border-top: 2px solid #8B0000; padding-top: 10px;">
+                Total: <strong style="color: #8B0000;">₹{{total}}</strong>
+            </p>
+        </div>
+        <h3 style="border-bottom: 1px solid #eee; padding-bottom: 10px; margin-top: 30px;">Shipping Address</h3>
+        <div style="background: #f9f9f9; padding: 20px; border-radius: 10px;">
+            <p style="margin: 5px 0;"><strong>{{shipping.first_name}} {{shipping.last_name}}</strong></p>
+            <p style="margin: 5px 0;">{{shipping.address}}</p>
+            {{#shipping.apartment}}<p style="margin: 5px 0;">{{shipping.apartment}}</p>{{/shipping.apartment}}
+            <p style="margin: 5px 0;">{{shipping.city}}, {{shipping.state}} - {{shipping.pincode}}</p>
+            <p style="margin: 5px 0;">Phone: {{shipping.phone}}</p>
+        </div>
+        <div style="margin-top: 30px; padding: 20px; background: #fff8f0; border-radius: 10px; border-left: 4px solid #8B0000;">
+            <p style="margin: 0; font-size: 0.9em;">
+                <strong>📦 What's Next?</strong><br>
+                Your personalized jewelry will be handcrafted with care. You'll receive a shipping notification with tracking details once your order is on its way!
+            </p>
+        </div>
+    </div>
+    <div style="text-align: center; padding: 20px; border-top: 1px solid #eee; color: #666; font-size: 0.85em;">
+        <p>Need help? Contact us at <a href="mailto:{{contact_email}}" style="color: #8B0000;">{{contact_email}}</a></p>
+        <p style="margin-top: 10px;">
+            <a href="#" style="color: #666; text-decoration: none; margin: 0 10px;">Instagram</a>
+            <a href="#" style="color: #666; text-decoration: none; margin: 0 10px;">Facebook</a>
+        </p>
+        <p style="margin-top: 15px;">© {{year}} {{site_name}}. All rights reserved.</p>
+    </div>
+</body>
+</html>""" % {"style": EMAIL_STYLE}
+
+ORDER_SHIPPED_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Your Order Has Shipped!</title></head>
+<body style="%(style)s">
+    <div style="text-align: center; padding: 20px 0; border-bottom: 2px solid #8B0000;">
+        <h1 style="font-family: Georgia, serif; font-style: italic; margin: 0;">{{site_name}}</h1>
+    </div>
+    <div style="padding: 30px 0; text-align: center;">
+        <h2 style="color: #8B0000;">🚚 Your Order Has Shipped!</h2>
+        <p>Great news! Your order <strong>#{{order_number}}</strong> is on its way.</p>
+        {{#tracking_number}}<div style="background: #f9f9f9; padding: 20px; border-radius: 10px; margin: 20px 0;"><p style="margin: 0;"><strong>Tracking Number:</strong> {{tracking_number}}</p></div>{{/tracking_number}}
+        <p style="color: #666;">You can track your package using the tracking number above.</p>
+    </div>
+    <div style="text-align: center; padding: 20px; border-top: 1px solid #eee; color: #666; font-size: 0.85em;">
+        <p>© {{year}} {{site_name}}</p>
+    </div>
+</body>
+</html>""" % {"style": EMAIL_STYLE}
+
+PASSWORD_RESET_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Reset Your Password</title></head>
+<body style="%(style)s">
+    <div style="text-align: center; padding: 20px 0; border-bottom: 2px solid #0ea5e9;">
+        <h1 style="font-family: Georgia, serif; margin: 0; color: #0ea5e9;">{{site_name}}</h1>
+    </div>
+    <div style="padding: 30px 0;">
+        <h2 style="color: #333;">Reset Your Password</h2>
+        <p>Hi {{customer_name}},</p>
+        <p>We received a request to reset your password. Click the button below to create a new password:</p>
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="{{reset_link}}" style="background: #0ea5e9; color: white; padding: 12px 30px; text-decoration: none; border-radius: 8px; display: inline-block;">Reset Password</a>
+        </div>
+        <p style="color: #666; font-size: 0.9em;">This link will expire in 1 hour. If you didn't request this, you can safely ignore this email.</p>
+    </div>
+    <div style="text-align: center; padding: 20px; border-top: 1px solid #eee; color: #666; font-size: 0.85em;">
+        <p>© {{year}} {{site_name}}. All rights reserved.</p>
+    </div>
+</body>
+</html>""" % {"style": EMAIL_STYLE}
+
+SALE_ANNOUNCEMENT_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{{sale_title}}</title></head>
+<body style="%(style)s">
+    <div style="text-align: center; padding: 20px 0; border-bottom: 2px solid #8B0000;">
+        <h1 style="font-family: Georgia, serif; font-style: italic; margin: 0;">{{site_name}}</h1>
+    </div>
+    <div style="padding: 30px 0; text-align: center;">
+        <p>Hi {{first_name}},</p>
+        <h2 style="color: #8B0000; font-size: 2em; margin: 10px 0;">{{sale_title}}</h2>
+        <p style="font-size: 1.4em; margin: 0;"><strong>{{sale_discount}}</strong> {{sale_subtitle}}</p>
+        {{#sale_end_date}}<p style="color: #666;">Ends {{sale_end_date}}</p>{{/sale_end_date}}
+        <div style="margin: 30px 0;">
+            <a href="{{site_url}}" style="background: #8B0000; color: white; padding: 12px 30px; text-decoration: none; border-radius: 8px; display: inline-block;">Shop the Sale</a>
+        </div>
+    </div>
+    <div style="text-align: center; padding: 20px; border-top: 1px solid #eee; color: #666; font-size: 0.85em;">
+        <p>© {{year}} {{site_name}}. All rights reserved.</p>
+    </div>
+</body>
+</html>""" % {"style": EMAIL_STYLE}
+
+DEFAULT_TEMPLATES = {
+    "order_confirmation": {
+        "id": "order_confirmation", "name": "Order Confirmation", "channel": "email",
+        "subject": "Order Confirmed! #{{order_number}}",
+        "body": "Dear {{customer_name}},\n\nThank you for your order!\n\nOrder Number: {{order_number}}\nTotal: ₹{{total}}\n\nWe'll notify you when your order ships.\n\nBest regards,\n{{site_name}} Team",
+        "html": ORDER_CONFIRMATION_HTML
+    },
+    "order_shipped": {
+        "id": "order_shipped", "name": "Order Shipped", "channel": "email",
+        "subject": "Your Order #{{order_number}} Has Shipped!",
+        "body": "Dear {{customer_name}},\n\nGreat news! Your order has been shipped.\n\nOrder Number: {{order_number}}\nTracking ID: {{tracking_id}}\n\nBest regards,\n{{site_name}} Team",
+        "html": ORDER_SHIPPED_HTML
+    },
+    "order_delivered": {
+        "id": "order_delivered", "name": "Order Delivered", "channel": "email",
+        "subject": "Your order {{order_number}} has been delivered!",
+        "body": "Dear {{customer_name}},\n\nYour order has been delivered!\n\nWe hope you love your purchase. Please leave a review!\n\nBest regards,\n{{site_name}} Team"
+    },
+    "password_reset": {
+        "id": "password_reset", "name": "Password Reset", "channel": "email",
+        "subject": "Reset Your Password - {{site_name}}",
+        "body": "Hi {{customer_name}},\n\nReset your password here: {{{reset_link}}}\n\nThis link will expire in 1 hour.",
+        "html": PASSWORD_RESET_HTML
+    },
+    "sale_announcement": {
+        "id": "sale_announcement", "name": "Sale Announcement", "channel": "email",
+        "subject": "{{sale_title}}: {{sale_discount}} {{sale_subtitle}}",
+        "body": "Hi {{first_name}},\n\n{{sale_title}} is on: {{sale_discount}} {{sale_subtitle}}.\n\nShop now: {{{site_url}}}\n\n{{site_name}} Team",
+        "html": SALE_ANNOUNCEMENT_HTML
+    },
+    "whatsapp_sale_announcement": {
+        "id": "whatsapp_sale_announcement", "name": "WhatsApp Sale Announcement", "channel": "whatsapp",
+        "body": "🎉 *{{sale_title}}*\n\nHi {{first_name}}! {{sale_discount}} {{sale_subtitle}}"
+                "{{#sale_end_date}} until {{sale_end_date}}{{/sale_end_date}}.\n\nShop now: {{{site_url}}}\n\n- {{site_name}} Team"
+    },
+    "whatsapp_order_confirmation": {
+        "id": "whatsapp_order_confirmation", "name": "WhatsApp Order Confirmation", "channel": "whatsapp",
+        "body": "🎉 *Order Confirmed!*\n\nHi {{first_name}}!\n\nYour order *#{{order_number}}* has been placed successfully.\n\n"
+                "*Items:*\n{{#items_preview}}• {{name}} x{{quantity}}\n{{/items_preview}}"
+                "{{#more_items}}  ...and {{more_items}} more items\n{{/more_items}}\n"
+                "*Total:* ₹{{total}}\n\nWe'll notify you when your order ships!\n\nThank you for shopping with {{site_name}} 💝"
+    },
+    "whatsapp_order_shipped": {
+        "id": "whatsapp_order_shipped", "name": "WhatsApp Order Shipped", "channel": "whatsapp",
+        "body": "🚚 *Your Order Has Shipped!*\n\nHi {{first_name}}!\n\nGreat news! Your order *#{{order_number}}* is on its way."
+                "{{#tracking_number}}\n*Tracking Number:* {{tracking_number}}{{/tracking_number}}\n\n"
+                "Estimated delivery: 3-5 business days\n\nTrack your package and stay updated!\n\n- {{site_name}} Team"
+    }
+}
+
+
+# ==================== STORE ====================
+
+def effective_template(template_id: str, stored: Optional[dict]) -> Optional[dict]:
+    """Stored fields override the default; a stored text body without html replaces the default html too"""
+    default = DEFAULT_TEMPLATES.get(template_id)
+    if not stored:
+        return default
+    template = {**(default or {}), **stored, "id": template_id}
+    if "body" in stored and "html" not in stored:
+        template.pop("html", None)
+    return template
+
+
+class TemplateStore:
+    """Compiled templates cached per (id, version), backed by the email_templates collection"""
+
+    def __init__(self, collection, ttl_seconds: float = TEMPLATE_CACHE_TTL_SECONDS):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self._compiled: Dict[str, CompiledTemplate] = {}
+        self._checked_at: Dict[str, float] = {}
+
+    async def get(self, template_id: str) -> CompiledTemplate:
+        cached = self._compiled.get(template_id)
+        if cached and time.monotonic() - self._checked_at[template_id] < self.ttl_seconds:
+            return cached
+        stored = await self.collection.find_one({"id": template_id}, {"_id": 0})
+        version = stored.get("version", 0) if stored else None
+        if not cached or cached.version != version:
+            template = effective_template(template_id, stored)
+            if template is None:
+                raise KeyError(template_id)
+            cached = self._compiled[template_id] = CompiledTemplate(template, version)
+        self._checked_at[template_id] = time.monotonic()
+        return cached
+
+    def invalidate(self, template_id: Optional[str] = None):
+        if template_id is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(template_id, None)
+
+    async def list(self) -> List[dict]:
+        stored = {t["id"]: t for t in await self.collection.find({}, {"_id": 0}).to_list(100)}
+        return [effective_template(template_id, stored.get(template_id))
+                for template_id in list(DEFAULT_TEMPLATES) + [t for t in stored if t not in DEFAULT_TEMPLATES]]
+
+    async def save(self, template_id: str, data: dict) -> dict:
+        """Validate, store and bump the version; raises TemplateError for a template that does not compile"""
+        update = {k: v for k, v in data.items() if k in TEMPLATE_FIELDS}
+        stored = await self.collection.find_one({"id": template_id}, {"_id": 0}) or {}
+        CompiledTemplate(effective_template(template_id, {**stored, **update}), None)
+        update["updated_at"] = datetime.utcnow()
+        await self.collection.update_one(
+            {"id": template_id}, {"$set": update, "$inc": {"version": 1}}, upsert=True
+        )
+        self.invalidate(template_id)
+        return await self.collection.find_one({"id": template_id}, {"_id": 0})
@@ -0,0 +1,265 @@
+"""
+Request timing and MongoDB command instrumentation for Name Craft
+Records per-route latency histograms, counts every Mongo command a request issues,
+logs slow requests with a breakdown and renders everything in Prometheus text format.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '500'))
+
+# Seconds; covers a cached settings read through a slow analytics aggregation
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            base = _format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{{{_format_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class MetricsRegistry:
+    """Process-wide metrics; Mongo events arrive on Motor's executor threads, hence the lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def observe(self, histogram: Histogram, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            histogram.observe(labels, value)
+
+    def inc(self, counter: Counter, labels: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            counter.inc(labels, amount)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [line for metric in self._metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+REQUESTS_TOTAL = registry.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+REQUEST_MONGO_COMMANDS = registry.histogram(
+    "http_request_mongo_commands", "MongoDB commands issued per request", ("method", "route"), buckets=COUNT_BUCKETS)
+REQUEST_MONGO_SECONDS = registry.histogram(
+    "http_request_mongo_seconds", "Time per request spent waiting on MongoDB", ("method", "route"))
+MONGO_COMMAND_DURATION = registry.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command"))
+MONGO_COMMAND_FAILURES = registry.counter(
+    "mongo_command_failures_total", "Failed MongoDB commands", ("collection", "command"))
+SECTION_DURATION = registry.histogram(
+    "app_section_duration_seconds", "Time spent in instrumented sections (bcrypt, smtp, ...)", ("section",))
+
+
+class RequestStats:
+    """Everything one request spent its time on"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # Set once the response body is sent; background tasks run after this
+        self.finished: Optional[float] = None
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+        # (collection, command) -> [count, seconds]
+        self.mongo_ops: Dict[Tuple[str, str], List[float]] = {}
+        self.sections: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_mongo(self, collection: str, command: str, seconds: float):
+        with self._lock:
+            self.mongo_commands += 1
+            self.mongo_seconds += seconds
+            op = self.mongo_ops.setdefault((collection, command), [0, 0.0])
+            op[0] += 1
+            op[1] += seconds
+
+    def add_section(self, name: str, seconds: float):
+        with self._lock:
+            self.sections[name] = self.sections.get(name, 0.0) + seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        parts = [f"mongo;desc=\"{self.mongo_commands} cmds\";dur={self.mongo_seconds * 1000:.1f}"]
+        parts += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.sections.items()]
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+    def breakdown(self) -> str:
+        ops = sorted(self.mongo_ops.items(), key=lambda kv: kv[1][1], reverse=True)
+        op_text = ", ".join(f"{coll}.{cmd} x{int(n)} {s * 1000:.0f}ms" for (coll, cmd), (n, s) in ops[:8])
+        sections = "".join(f", {name} {s * 1000:.0f}ms" for name, s in self.sections.items())
+        return f"mongo {self.mongo_commands} cmds {self.mongo_seconds * 1000:.0f}ms [{op_text}]{sections}"
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None)
+
+
+@contextmanager
+def track(section: str):
+    """Time a block (bcrypt, SMTP, ...) into the current request and the section histogram"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe(SECTION_DURATION, (section,), elapsed)
+        stats = current_request.get()
+        if stats:
+            stats.add_section(section, elapsed)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Feeds every Motor/PyMongo command into the metrics and the active request
+
+    Motor copies the caller's context onto its executor threads, so ``current_request``
+    resolves to the request that issued the command.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple, Tuple[str, str]] = {}
+
+    def started(self, event):
+        command = event.command
+        target = command.get(event.command_name)
+        collection = target if isinstance(target, str) else command.get("collection", event.database_name)
+        self._inflight[(event.connection_id, event.request_id)] = (str(collection), event.command_name)
+
+    def _finish(self, event, failed: bool):
+        labels = self._inflight.pop((event.connection_id, event.request_id), ("unknown", event.command_name))
+        seconds = event.duration_micros / 1e6
+        registry.observe(MONGO_COMMAND_DURATION, labels, seconds)
+        if failed:
+            registry.inc(MONGO_COMMAND_FAILURES, labels)
+        stats = current_request.get()
+        if stats:
+            stats.add_mongo(labels[0], labels[1], seconds)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording latency and Mongo usage per route"""
+
+    def __init__(self, app, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                elapsed = time.perf_counter() - stats.started
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", stats.server_timing(elapsed).encode())
+                ]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                stats.finished = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            self._record(scope, stats, status[0])
+
+    def _record(self, scope, stats: RequestStats, status: int):
+        elapsed = (stats.finished or time.perf_counter()) - stats.started
+        route = scope.get("route")
+        # Unmatched paths collapse into one label so 404 scans cannot explode cardinality
+        labels = (scope["method"], route.path if route is not None else "unmatched")
+        registry.observe(REQUEST_DURATION, labels, elapsed)
+        registry.inc(REQUESTS_TOTAL, labels + (str(status),))
+        registry.observe(REQUEST_MONGO_COMMANDS, labels, stats.mongo_commands)
+        registry.observe(REQUEST_MONGO_SECONDS, labels, stats.mongo_seconds)
+
+        if elapsed * 1000 >= self.slow_request_ms:
+            logger.warning(
+                f"Slow request {labels[0]} {labels[1]} {status} {elapsed * 1000:.0f}ms: {stats.breakdown()}"
+            )
@@ -0,0 +1,51 @@
+"""
+Navigation menu tree for Name Craft
+Items point at their parent through `parent_id`. The storefront wants the nested menu, so the
+server builds it once per change and every client gets the same ready-made tree.
+"""
+from typing import Dict, List, Optional
+
+# The header has room for a top bar, a dropdown and one flyout
+MAX_DEPTH = 3
+
+
+def _sort_key(item: dict):
+    return (item.get("order", 0), item.get("name", ""))
+
+
+def build_navigation_tree(items: List[dict], max_depth: int = MAX_DEPTH) -> List[dict]:
+    """Nest active items under their parents, each level sorted by order then name.
+
+    An item whose parent no longer exists moves to the top level; one under an inactive
+    parent is hidden with it. Items caught in a parent cycle, or deeper than `max_depth`,
+    are left out.
+    """
+    by_id = {item["id"]: item for item in items}
+    children: Dict[Optional[str], List[dict]] = {}
+    for item in items:
+        if item.get("is_active", True):
+            parent_id = item.get("parent_id")
+            children.setdefault(parent_id if parent_id in by_id else None, []).append(item)
+
+    def subtree(parent_id: Optional[str], depth: int) -> List[dict]:
+        if depth > max_depth:
+            return []
+        return [
+            {**item, "children": subtree(item["id"], depth + 1)}
+            for item in sorted(children.get(parent_id, []), key=_sort_key)
+        ]
+
+    # Walking down from the roots never reaches a cycle, since no member of one is a root
+    return subtree(None, 1)
+
+
+def creates_cycle(items: List[dict], item_id: str, parent_id: Optional[str]) -> bool:
+    """True if making `parent_id` the parent of `item_id` would loop back to `item_id`"""
+    parents = {item["id"]: item.get("parent_id") for item in items}
+    seen = set()
+    while parent_id and parent_id not in seen:
+        if parent_id == item_id:
+            return True
+        seen.add(parent_id)
+        parent_id = parents.get(parent_id)
+    return False
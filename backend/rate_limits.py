@@ -0,0 +1,223 @@
+"""
+Request rate limiting for Name Craft
+Token buckets per client IP and per account (the email in the request body) for the
+unauthenticated routes that cost real resources: login (bcrypt), forgot-password (SMTP),
+review submission (order lookups) and image upload (disk). Buckets live in process memory
+by default; with several workers, MongoBucketStore keeps them in one collection so the
+limits hold across processes. Rejected requests get 429 with Retry-After, and every
+decision is counted on /metrics.
+"""
+import json
+import logging
+import math
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+# Proxies in front of the app that append to X-Forwarded-For (the ingress); 0 trusts only the socket peer
+RATE_LIMIT_PROXY_HOPS = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', '1'))
+# Idle buckets are full again and can be dropped; this caps memory under an IP-rotating bot
+MAX_MEMORY_BUCKETS = 100_000
+# Account keys come from small JSON bodies; anything bigger is not one of these forms
+MAX_BODY_BYTES = 64 * 1024
+
+RATE_LIMIT_DECISIONS = registry.counter(
+    "rate_limit_decisions_total", "Rate limiter decisions by rule, bucket scope and outcome", ("rule", "scope", "outcome"))
+RATE_LIMIT_STORE_ERRORS = registry.counter(
+    "rate_limit_store_errors_total", "Shared rate limit store failures (requests are let through)", ("rule",))
+
+
+class Limit(NamedTuple):
+    """`requests` per `seconds`, refilled continuously; a full bucket allows a burst of `requests`"""
+    requests: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.seconds
+
+
+class RateRule(NamedTuple):
+    name: str
+    method: str
+    path: "re.Pattern"
+    per_ip: Limit
+    per_account: Optional[Limit] = None
+    # JSON body field identifying the account
+    account_field: Optional[str] = None
+
+
+RULES = [
+    RateRule("login", "POST", re.compile(r"^/api/auth/login$"), Limit(60, 60), Limit(20, 60), "email"),
+    RateRule("forgot_password", "POST", re.compile(r"^/api/auth/forgot-password$"), Limit(5, 600), Limit(3, 3600), "email"),
+    RateRule("submit_review", "POST", re.compile(r"^/api/products/[^/]+/reviews$"), Limit(10, 600), Limit(5, 3600), "reviewer_email"),
+    RateRule("upload_image", "POST", re.compile(r"^/api/upload/image$"), Limit(30, 600)),
+]
+
+
+class MemoryBucketStore:
+    """Buckets in this process only"""
+
+    def __init__(self, max_buckets: int = MAX_MEMORY_BUCKETS):
+        self.max_buckets = max_buckets
+        # key -> (tokens, updated, seconds until full)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    def _evict_idle(self, now: float):
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < bucket[2]}
+        if len(self._buckets) >= self.max_buckets:
+            self._buckets.clear()
+
+    async def take(self, key: str, limit: Limit) -> float:
+        """0 if a token was taken, else seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated, _ = self._buckets.get(key, (limit.requests, now, 0))
+        tokens = min(limit.requests, tokens + (now - updated) * limit.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        if key not in self._buckets and len(self._buckets) >= self.max_buckets:
+            self._evict_idle(now)
+        self._buckets[key] = (tokens, now, limit.seconds)
+        return 0.0 if allowed else (1 - tokens) / limit.rate
+
+
+class MongoBucketStore:
+    """Buckets shared by every worker, one document each, refilled and taken in a single update.
+    Needs a TTL index on expires_at so idle buckets disappear."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def take(self, key: str, limit: Limit) -> float:
+        now = time.time()
+        refilled = {"$min": [limit.requests, {"$add": [
+            {"$ifNull": ["$tokens", limit.requests]},
+            {"$multiply": [{"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated", now]}]}]}, limit.rate]}
+        ]}]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated": now,
+                          "expires_at": datetime.utcnow() + timedelta(seconds=limit.seconds)}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}}
+            ],
+            projection={"_id": 0, "tokens": 1, "allowed": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return 0.0 if bucket["allowed"] else (1 - bucket["tokens"]) / limit.rate
+
+
+def client_ip(scope, proxy_hops: int = RATE_LIMIT_PROXY_HOPS) -> str:
+    """The address our outermost trusted proxy saw; clients can prepend to the header but not append"""
+    if proxy_hops:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                if hops:
+                    return hops[-min(proxy_hops, len(hops))]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying RULES; requests on other routes pass straight through"""
+
+    def __init__(self, app, store=None, rules: List[RateRule] = RULES, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.store = store or MemoryBucketStore()
+        self.rules = rules
+        self.enabled = enabled
+
+    def match(self, scope) -> Optional[RateRule]:
+        for rule in self.rules:
+            if scope["method"] == rule.method and rule.path.match(scope["path"]):
+                return rule
+        return None
+
+    async def __call__(self, scope, receive, send):
+        rule = self.match(scope) if self.enabled and scope["type"] == "http" else None
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        buckets = [("ip", f"{rule.name}:ip:{client_ip(scope)}", rule.per_ip)]
+        if rule.per_account:
+            body, receive = await buffer_body(receive)
+            account = account_key(body, rule.account_field)
+            if account:
+                buckets.append(("account", f"{rule.name}:account:{account}", rule.per_account))
+
+        retry_after = 0.0
+        for bucket_scope, key, limit in buckets:
+            try:
+                wait = await self.store.take(key, limit)
+            except Exception as e:
+                # A broken shared store must not lock everyone out of login
+                logger.warning(f"Rate limit store failed for {rule.name}: {e}")
+                registry.inc(RATE_LIMIT_STORE_ERRORS, (rule.name,))
+                continue
+            registry.inc(RATE_LIMIT_DECISIONS, (rule.name, bucket_scope, "limited" if wait else "allowed"))
+            if wait:
+                # Don't spend the account's tokens on a request the IP limit already refused
+                retry_after = wait
+                break
+
+        if retry_after:
+            return await too_many_requests(send, retry_after)
+        await self.app(scope, receive, send)
+
+
+async def buffer_body(receive):
+    """Read the whole request body and return it with a receive that replays it"""
+    chunks, size, more = [], 0, True
+    while more:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        more = message.get("more_body", False)
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return (body if size <= MAX_BODY_BYTES else b""), replay
+
+
+def account_key(body: bytes, field: str) -> Optional[str]:
+    try:
+        value = json.loads(body).get(field)
+    except (ValueError, AttributeError):
+        return None
+    return value.strip().lower() if isinstance(value, str) and value.strip() else None
+
+
+async def too_many_requests(send, retry_after: float):
+    body = json.dumps({"detail": "Too many requests, please try again later"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,125 @@
+"""
+Razorpay gateway adapter for Name Craft
+Caches one SDK client per key pair, shares a pooled HTTP session between them and
+runs the blocking SDK calls in a thread pool so they never stall the event loop.
+
+The SDK and requests are imported on first use, so importing this module (and
+server.py) stays cheap for processes that never take a payment.
+
+Point RAZORPAY_BASE_URL at a local stand-in (see tests/fake_razorpay.py) to test
+payments without reaching api.razorpay.com.
+"""
+import asyncio
+import functools
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+if TYPE_CHECKING:
+    import razorpay
+
+RAZORPAY_BASE_URL = os.environ.get('RAZORPAY_BASE_URL', 'https://api.razorpay.com')
+RAZORPAY_TIMEOUT_SECONDS = float(os.environ.get('RAZORPAY_TIMEOUT_SECONDS', '10'))
+RAZORPAY_MAX_WORKERS = int(os.environ.get('RAZORPAY_MAX_WORKERS', '8'))
+# Key pairs only change when an admin rotates them; a handful covers old + new
+MAX_CACHED_CLIENTS = 4
+
+
+class RazorpayGatewayError(Exception):
+    """Raised when Razorpay rejects a call, errors or does not answer in time"""
+
+
+class RazorpayGateway:
+    def __init__(self, base_url: str = RAZORPAY_BASE_URL, timeout: float = RAZORPAY_TIMEOUT_SECONDS,
+                 max_workers: int = RAZORPAY_MAX_WORKERS):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._session = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="razorpay")
+        self._clients: Dict[Tuple[str, str], "razorpay.Client"] = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def client(self, key_id: str, key_secret: str) -> "razorpay.Client":
+        """SDK client for a key pair, created once and reused"""
+        auth = (key_id, key_secret)
+        client = self._clients.get(auth)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(auth)
+                if client is None:
+                    import razorpay
+
+                    if self._session is None:
+                        self._session = self._new_session()
+                    if len(self._clients) >= MAX_CACHED_CLIENTS:
+                        self._clients.clear()
+                    client = razorpay.Client(session=self._session, auth=auth, base_url=self.base_url)
+                    self._clients[auth] = client
+        return client
+
+    async def _call(self, fn, *args, **kwargs) -> Any:
+        """Run a blocking SDK call on the gateway thread pool"""
+        import razorpay
+        import requests
+
+        # requests enforces the socket timeout; wait_for guards against a wedged worker
+        kwargs.setdefault("timeout", self.timeout)
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs)),
+                self.timeout + 1
+            )
+        except asyncio.TimeoutError:
+            raise RazorpayGatewayError("Razorpay did not respond in time")
+        except (razorpay.errors.BadRequestError, razorpay.errors.GatewayError,
+                razorpay.errors.ServerError, requests.RequestException) as e:
+            raise RazorpayGatewayError(str(e)) from e
+
+    async def create_order(self, key_id: str, key_secret: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._call(self.client(key_id, key_secret).order.create, data=payload)
+
+    async def fetch_order(self, key_id: str, key_secret: str, razorpay_order_id: str) -> Dict[str, Any]:
+        return await self._call(self.client(key_id, key_secret).order.fetch, razorpay_order_id)
+
+    async def fetch_payment(self, key_id: str, key_secret: str, razorpay_payment_id: str) -> Dict[str, Any]:
+        return await self._call(self.client(key_id, key_secret).payment.fetch, razorpay_payment_id)
+
+    async def fetch_order_payments(self, key_id: str, key_secret: str, razorpay_order_id: str) -> Dict[str, Any]:
+        return await self._call(self.client(key_id, key_secret).order.payments, razorpay_order_id)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        if self._session is not None:
+            self._session.close()
+
+
+def sign(secret: str, message: str) -> str:
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def verify_payment_signature(key_secret: str, razorpay_order_id: str, razorpay_payment_id: str,
+                             signature: str) -> bool:
+    """Check the signature Razorpay Checkout hands the browser after payment"""
+    expected = sign(key_secret, f"{razorpay_order_id}|{razorpay_payment_id}")
+    return hmac.compare_digest(expected, signature or "")
+
+
+def verify_webhook_signature(webhook_secret: str, body: bytes, signature: str) -> bool:
+    """Check the X-Razorpay-Signature header against the raw request body"""
+    expected = hmac.new(webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
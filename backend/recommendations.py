@@ -0,0 +1,78 @@
+"""
+Co-purchase recommendations for Name Craft
+Builds the sparse product x product co-occurrence counts of a set of baskets (the
+distinct products of each order) with vectorized NumPy, scores each pair by cosine
+similarity and keeps the top K partners per product. Pure computation, no database:
+the server streams baskets in, runs this off the event loop and stores the result.
+"""
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+# Pairs per basket grow quadratically; a wholesale order with hundreds of
+# distinct products says little about what goes together
+MAX_BASKET_SIZE = 50
+
+
+def encode_baskets(baskets: Iterable[Sequence[str]]):
+    """(product ids, basket offsets, product index per entry) with each basket deduplicated"""
+    index: Dict[str, int] = {}
+    entries: List[int] = []
+    offsets = [0]
+    for basket in baskets:
+        distinct = {index.setdefault(product_id, len(index)) for product_id in basket}
+        if 2 <= len(distinct) <= MAX_BASKET_SIZE:
+            entries.extend(distinct)
+            offsets.append(len(entries))
+    return list(index), np.asarray(offsets, dtype=np.int64), np.asarray(entries, dtype=np.int64)
+
+
+def co_occurrence(offsets: np.ndarray, entries: np.ndarray, n_products: int):
+    """Sparse symmetric co-occurrence as (row, col, count) plus per-product basket counts"""
+    sizes = np.diff(offsets)
+    # Pair every entry with every entry of its own basket: entry e of a basket of size m
+    # is repeated m times against positions start..start+m-1
+    size_of_entry = np.repeat(sizes, sizes)
+    start_of_entry = np.repeat(offsets[:-1], sizes)
+    left = np.repeat(np.arange(len(entries)), size_of_entry)
+    first_pair = np.cumsum(size_of_entry) - size_of_entry
+    right = np.repeat(start_of_entry, size_of_entry) + np.arange(len(left)) - np.repeat(first_pair, size_of_entry)
+    distinct = left != right
+    rows, cols = entries[left[distinct]], entries[right[distinct]]
+
+    # One int64 code per pair turns the sparse matrix build into a single unique()
+    codes, counts = np.unique(rows * n_products + cols, return_counts=True)
+    frequency = np.bincount(entries, minlength=n_products)
+    return codes // n_products, codes % n_products, counts, frequency
+
+
+def top_k_related(rows, cols, counts, frequency, k: int, min_count: int = 1):
+    """(row, col, count, score) of the k best-scoring partners of each row, best first"""
+    keep = counts >= min_count
+    rows, cols, counts = rows[keep], cols[keep], counts[keep]
+    # Cosine similarity of the two products' basket vectors
+    scores = counts / np.sqrt(frequency[rows] * frequency[cols])
+    # Ties on score go to the pair bought together more often, then to the lower index
+    order = np.lexsort((cols, -counts, -scores, rows))
+    rows, cols, counts, scores = rows[order], cols[order], counts[order], scores[order]
+    group_start = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    rank = np.arange(len(rows)) - np.repeat(group_start, np.diff(np.r_[group_start, len(rows)]))
+    best = rank < k
+    return rows[best], cols[best], counts[best], scores[best]
+
+
+def co_purchase_recommendations(baskets: Iterable[Sequence[str]], k: int = 8,
+                                min_count: int = 1) -> Dict[str, List[dict]]:
+    """product_id -> [{"product_id", "score", "count"}, ...] for every product bought with another"""
+    product_ids, offsets, entries = encode_baskets(baskets)
+    if not len(entries):
+        return {}
+    rows, cols, counts, frequency = co_occurrence(offsets, entries, len(product_ids))
+    rows, cols, counts, scores = top_k_related(rows, cols, counts, frequency, k, min_count)
+
+    related: Dict[str, List[dict]] = {}
+    for row, col, count, score in zip(rows.tolist(), cols.tolist(), counts.tolist(), scores.tolist()):
+        related.setdefault(product_ids[row], []).append(
+            {"product_id": product_ids[col], "score": round(score, 4), "count": count}
+        )
+    return related
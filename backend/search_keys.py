@@ -0,0 +1,93 @@
+"""
+Normalized search keys for Name Craft admin search
+Orders and users carry a `search_keys` sub-document computed at write time: lowercased
+email, digits-only phone (with and without the country code), uppercase order number and
+lowercased name words. Admin search matches anchored prefixes of these keys, which Mongo
+answers from an index instead of running a case-insensitive regex over every document.
+"""
+import re
+from typing import List, Optional
+
+NON_DIGITS = re.compile(r"\D+")
+# Only queries made of phone characters are looked up as phone numbers
+PHONE_QUERY = re.compile(r"^\+?[\d\s().-]+$")
+NATIONAL_NUMBER_LENGTH = 10
+
+
+def normalize_email(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+
+def normalize_phone(value: Optional[str]) -> str:
+    return NON_DIGITS.sub("", value or "")
+
+
+def normalize_order_number(value: Optional[str]) -> str:
+    return (value or "").strip().upper()
+
+
+def phone_keys(phone: Optional[str]) -> List[str]:
+    """All digits, plus the national number so "84336..." finds "+91 84336..." and "084336..." """
+    digits = normalize_phone(phone)
+    if len(digits) > NATIONAL_NUMBER_LENGTH:
+        return [digits, digits[-NATIONAL_NUMBER_LENGTH:]]
+    return [digits] if digits else []
+
+
+def name_keys(name: Optional[str]) -> List[str]:
+    """The whole name and each word of it, so a surname prefix matches too"""
+    words = (name or "").lower().split()
+    if not words:
+        return []
+    return list(dict.fromkeys([" ".join(words)] + words))
+
+
+def order_search_keys(order: dict) -> dict:
+    shipping = order.get("shipping_address") or {}
+    return {
+        "order_number": normalize_order_number(order.get("order_number")),
+        "email": normalize_email(shipping.get("email") or order.get("user_email")),
+        "phone": phone_keys(shipping.get("phone"))
+    }
+
+
+def user_search_keys(user: dict) -> dict:
+    return {
+        "email": normalize_email(user.get("email")),
+        "phone": phone_keys(user.get("phone")),
+        "name": name_keys(user.get("name"))
+    }
+
+
+def prefix(value: str) -> dict:
+    # Anchored and case-sensitive, so the index bounds the scan to the prefix range
+    return {"$regex": "^" + re.escape(value)}
+
+
+def phone_clause(search: str) -> List[dict]:
+    digits = normalize_phone(search)
+    if digits and PHONE_QUERY.match(search):
+        return [{"search_keys.phone": prefix(digits)}]
+    return []
+
+
+def order_search_clauses(search: str) -> List[dict]:
+    """$or branches for the admin order search box; empty when there is nothing to search"""
+    search = search.strip()
+    if not search:
+        return []
+    return [
+        {"search_keys.order_number": prefix(normalize_order_number(search))},
+        {"search_keys.email": prefix(normalize_email(search))}
+    ] + phone_clause(search)
+
+
+def user_search_clauses(search: str) -> List[dict]:
+    """$or branches for the admin user search box; empty when there is nothing to search"""
+    search = search.strip()
+    if not search:
+        return []
+    return [
+        {"search_keys.name": prefix(" ".join(search.lower().split()))},
+        {"search_keys.email": prefix(normalize_email(search))}
+    ] + phone_clause(search)
@@ -6,10 +6,11 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import bcrypt
 from datetime import datetime
-import uuid
 import re
 import os
 from dotenv import load_dotenv
+from ids import new_id
+from search_keys import user_search_keys
 
 load_dotenv()
 
@@ -625,7 +626,7 @@ async def seed_admin():
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
     
     admin_user = {
-        "id": str(uuid.uuid4()),
+        "id": new_id(),
         "email": "admin@test.com",
         "password_hash": hashed,
         "name": "Admin",
@@ -633,12 +634,45 @@ async def seed_admin():
         "is_active": True,
         "created_at": datetime.utcnow()
     }
+    admin_user["search_keys"] = user_search_keys(admin_user)
     
     await db.users.insert_one(admin_user)
     print("Admin user created!")
     print("   Email: admin@test.com")
     print("   Password: admin123")
 
+# Categories that should show metal options (jewelry)
+JEWELRY_CATEGORIES = ['for-her', 'for-him', 'couples', 'earrings', 'rings']
+# Products that should NOT show metal options (gifts, accessories)
+NON_JEWELRY_KEYWORDS = ['wallet', 'keychain', 'rose', 'bouquet', 'gift box', 'brooch']
+
+def product_document(p, name=None):
+    """Product document for one of the PRODUCTS shapes"""
+    name = name or p['name']
+    # Auto-determine if metal options should show
+    is_jewelry = p['category'] in JEWELRY_CATEGORIES
+    is_non_jewelry = any(keyword in name.lower() for keyword in NON_JEWELRY_KEYWORDS)
+    show_metal = p.get('show_metal_options', is_jewelry and not is_non_jewelry)
+    
+    return {
+        "id": new_id(),
+        "name": name,
+        "slug": slugify(name),
+        "price": p['price'],
+        "original_price": p['original_price'],
+        "category": p['category'],
+        "description": p['description'],
+        "discount": p['discount'],
+        "image": p['image'],
+        "hover_image": p['hover_image'],
+        "is_featured": True,
+        "is_active": True,
+        "allow_custom_image": p.get('allow_custom_image', False),
+        "show_metal_options": show_metal,
+        "stock_quantity": 100,
+        "created_at": datetime.utcnow()
+    }
+
 async def seed_products():
     """Seed all products with properly matched images"""
     client = AsyncIOMotorClient(MONGO_URL)
@@ -647,37 +681,8 @@ async def seed_products():
     # Clear existing products
     await db.products.delete_many({})
     
-    # Categories that should show metal options (jewelry)
-    jewelry_categories = ['for-her', 'for-him', 'couples', 'earrings', 'rings']
-    # Products that should NOT show metal options (gifts, accessories)
-    non_jewelry_keywords = ['wallet', 'keychain', 'rose', 'bouquet', 'gift box', 'brooch']
-    
     for p in PRODUCTS:
-        # Auto-determine if metal options should show
-        is_jewelry = p['category'] in jewelry_categories
-        is_non_jewelry = any(keyword in p['name'].lower() for keyword in non_jewelry_keywords)
-        show_metal = p.get('show_metal_options', is_jewelry and not is_non_jewelry)
-        
-        product = {
-            "id": str(uuid.uuid4()),
-            "name": p['name'],
-            "slug": slugify(p['name']),
-            "price": p['price'],
-            "original_price": p['original_price'],
-            "category": p['category'],
-            "description": p['description'],
-            "discount": p['discount'],
-            "image": p['image'],
-            "hover_image": p['hover_image'],
-            "is_featured": True,
-            "is_active": True,
-            "allow_custom_image": p.get('allow_custom_image', False),
-            "show_metal_options": show_metal,
-            "stock_quantity": 100,
-            "created_at": datetime.utcnow()
-        }
-        
-        await db.products.insert_one(product)
+        await db.products.insert_one(product_document(p))
         print(f"Added: {p['name']}")
     
     count = await db.products.count_documents({})
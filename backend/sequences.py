@@ -0,0 +1,57 @@
+"""
+Block-reserving sequence allocator for Name Craft
+Each process reserves a block of numbers from the `counters` collection with a single
+find_one_and_update ($inc by the block size) and hands them out from memory, so a busy
+sale touches the shared counter document once per block instead of once per order.
+Blocks never overlap, which keeps numbers unique across processes; numbers left in a
+block when a process exits or the scope changes are skipped, so sequences can have gaps.
+"""
+import asyncio
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+class SequenceAllocator:
+    """Increasing integers for one named sequence, optionally restarted per scope (e.g. per day)"""
+
+    def __init__(self, counters, name: str, block_size: int = 50):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.counters = counters
+        self.name = name
+        self.block_size = block_size
+        self._scope: Optional[str] = None
+        self._next = 1
+        self._last = 0
+        self._lock = asyncio.Lock()
+
+    def counter_id(self, scope: str) -> str:
+        return f"{self.name}:{scope}" if scope else self.name
+
+    async def next(self, scope: str = "") -> int:
+        async with self._lock:
+            if scope != self._scope or self._next > self._last:
+                # Concurrent callers wait here for this reservation rather than making their own
+                self._next, self._last = await self.reserve(scope)
+                self._scope = scope
+            value = self._next
+            self._next += 1
+            return value
+
+    async def reserve(self, scope: str):
+        """Claim the next block; returns (first, last) inclusive"""
+        for attempt in range(2):
+            try:
+                counter = await self.counters.find_one_and_update(
+                    {"_id": self.counter_id(scope)},
+                    {"$inc": {"value": self.block_size}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                return counter["value"] - self.block_size + 1, counter["value"]
+            except DuplicateKeyError:
+                # Two processes upserted a new counter at once; the loser retries as an update
+                if attempt:
+                    raise
@@ -1,9 +1,16 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, UploadFile, File, BackgroundTasks, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, UploadFile, File, BackgroundTasks, Request, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, UpdateMany, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
+import asyncio
+import time
+import json
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
@@ -11,15 +18,19 @@ from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timedelta
 import jwt
-from passlib.context import CryptContext
-import secrets
 import base64
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import razorpay
-import hmac
+import functools
 import hashlib
+from cache_bus import InvalidationBus
+from broadcasts import BroadcastRunner, SMTPPool, WhatsAppSender, clean_whatsapp_number
+from ids import new_id
+from sequences import SequenceAllocator
+from message_templates import TemplateError, TemplateStore, order_context, password_reset_context
+from navigation import build_navigation_tree, creates_cycle
+from search_keys import order_search_clauses, order_search_keys, user_search_clauses, user_search_keys
+from metrics import MongoCommandListener, RequestMetricsMiddleware, registry as metrics_registry, track
+from rate_limits import MemoryBucketStore, MongoBucketStore, RateLimitMiddleware
+from razorpay_gateway import RazorpayGateway, RazorpayGatewayError, verify_payment_signature, verify_webhook_signature
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -35,18 +46,25 @@ client = AsyncIOMotorClient(
     connectTimeoutMS=10000,
     socketTimeoutMS=10000,
     maxPoolSize=10,
-    minPoolSize=1
+    minPoolSize=1,
+    event_listeners=[MongoCommandListener()]
 )
 db = client[db_name]
 
+# Tells every worker's in-process caches about writes made by the others (see cache_bus.py)
+invalidation_bus = InvalidationBus(db, db.cache_bus)
+
 # JWT Config - Use fixed secret from env or a stable default for consistent token validation
 JWT_SECRET = os.environ.get('JWT_SECRET', 'namecraft-secure-jwt-secret-key-2024')
 SECRET_KEY = JWT_SECRET
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 7
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; passlib and bcrypt are loaded by the first login or registration
+@functools.lru_cache(maxsize=None)
+def password_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Security
 security = HTTPBearer(auto_error=False)
@@ -62,9 +80,29 @@ async def startup_event():
         # Ping MongoDB to verify connection
         await client.admin.command('ping')
         logger.info(f"Successfully connected to MongoDB: {db_name}")
+        await ensure_indexes()
+        # Products that predate rating summaries get them from their approved reviews
+        if await db.products.find_one({"rating_count": {"$exists": False}}, {"_id": 1}):
+            app.state.rating_rebuild = asyncio.create_task(rating_summary_backfill())
+        # Order history only reads user_id, so guest orders need linking to their accounts
+        app.state.guest_order_backfill = asyncio.create_task(guest_order_backfill())
+        # Documents written before search keys existed are invisible to admin search until backfilled
+        if (await db.orders.find_one({"search_keys": {"$exists": False}}, {"_id": 1})
+                or await db.users.find_one({"search_keys": {"$exists": False}}, {"_id": 1})):
+            app.state.search_key_backfill = asyncio.create_task(backfill_search_keys())
     except Exception as e:
         logger.warning(f"MongoDB connection warning: {e}")
         logger.info("Application will continue - MongoDB may connect later")
+    
+    # Return stock held by unpaid online orders once their hold expires
+    app.state.stock_sweeper = asyncio.create_task(stock_reservation_sweeper())
+    # Apply queued Razorpay webhooks and catch payments whose callbacks never arrived
+    app.state.payment_event_worker = asyncio.create_task(payment_event_worker())
+    app.state.razorpay_reconciler = asyncio.create_task(razorpay_reconciliation_sweeper())
+    # "Customers also bought" is rebuilt periodically by whichever worker claims the run
+    app.state.recommendations_refresher = asyncio.create_task(recommendations_refresher())
+    # Follows writes from other workers and drops the cache entries they make stale
+    app.state.cache_bus = asyncio.create_task(invalidation_bus.run())
 
 # Health check endpoint for Kubernetes - MUST be at root level
 @app.get("/health")
@@ -72,6 +110,11 @@ async def health_check():
     """Health check endpoint for Kubernetes liveness/readiness probes"""
     return {"status": "healthy", "service": "name-craft-api"}
 
+# Prometheus scrape endpoint - per-route latency, Mongo command counts and timings
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -92,7 +135,7 @@ class UserLogin(BaseModel):
     password: str
 
 class User(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     email: EmailStr
     name: str
     phone: Optional[str] = None
@@ -111,7 +154,7 @@ class AdminCreate(BaseModel):
     role: str = "admin"
 
 class Product(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     name: str
     slug: str
     description: Optional[str] = None
@@ -133,6 +176,10 @@ class Product(BaseModel):
     tags: List[str] = []
     seo_title: Optional[str] = None
     seo_description: Optional[str] = None
+    # Approved reviews, maintained by review moderation
+    rating_count: int = 0
+    rating_sum: int = 0
+    rating_histogram: Dict[str, int] = Field(default_factory=lambda: {str(star): 0 for star in range(1, 6)})
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -169,6 +216,13 @@ class ProductUpdate(BaseModel):
     stock_quantity: Optional[int] = None
     tags: Optional[List[str]] = None
 
+class StockAdjustment(BaseModel):
+    # Either a relative change (restock +10, write-off -2)
+    delta: Optional[int] = None
+    # or a compare-and-set: the new quantity and the quantity the admin was looking at
+    quantity: Optional[int] = None
+    expected: Optional[int] = None
+
 class Category(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -203,10 +257,16 @@ class OrderCreate(BaseModel):
     shipping_address: ShippingAddress
     payment_method: str
     coupon_code: Optional[str] = None
+    # From /cart/quote; lets checkout skip repricing while it is valid
+    quote_token: Optional[str] = None
+
+class CartQuoteRequest(BaseModel):
+    items: List[CartItem]
+    coupon_code: Optional[str] = None
 
 class Order(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    order_number: str = Field(default_factory=lambda: f"NC{datetime.now().strftime('%Y%m%d')}{secrets.token_hex(3).upper()}")
+    id: str = Field(default_factory=new_id)
+    order_number: str
     user_id: Optional[str] = None
     user_email: Optional[str] = None
     items: List[Dict[str, Any]]
@@ -260,7 +320,7 @@ class ReviewCreate(BaseModel):
     reviewer_email: EmailStr
 
 class Review(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     product_id: str
     rating: int
     title: Optional[str] = None
@@ -303,6 +363,7 @@ class SiteSettings(BaseModel):
     razorpay_enabled: bool = True
     razorpay_key_id: Optional[str] = None
     razorpay_key_secret: Optional[str] = None
+    razorpay_webhook_secret: Optional[str] = None
     stripe_enabled: bool = True
     stripe_public_key: Optional[str] = None
     stripe_secret_key: Optional[str] = None
@@ -348,7 +409,7 @@ class SiteSettings(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class MediaItem(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     name: str
     url: str
     type: str = "image"
@@ -358,7 +419,7 @@ class MediaItem(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Refund(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=new_id)
     order_id: str
     order_number: str
     user_email: str
@@ -386,6 +447,57 @@ class NavigationItem(BaseModel):
     parent_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+# ==================== DATABASE INDEXES ====================
+
+async def ensure_indexes():
+    """Create the indexes the hot paths rely on (idempotent, runs on startup)"""
+    await db.products.create_index("id")
+    await db.products.create_index("slug")
+    await db.recommendations.create_index("product_id", unique=True)
+    await db.recommendations.create_index("slug")
+    await db.stock_reservations.create_index("order_id", unique=True)
+    await db.stock_reservations.create_index([("status", 1), ("expires_at", 1)])
+    # Settled reservations are only kept around for auditing
+    await db.stock_reservations.create_index("settled_at", expireAfterSeconds=30 * 24 * 3600)
+    await db.idempotency_keys.create_index("key", unique=True)
+    await db.idempotency_keys.create_index("created_at", expireAfterSeconds=IDEMPOTENCY_KEY_TTL_HOURS * 3600)
+    await db.payment_events.create_index("event_id", unique=True)
+    await db.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+    await db.payment_events.create_index([("status", 1), ("available_at", 1)])
+    await db.orders.create_index("razorpay_order_id", sparse=True)
+    # Admin dashboard: recent orders, today's count and the pending count
+    await db.orders.create_index("created_at")
+    await db.orders.create_index([("payment_status", 1), ("reconcile_checked_at", 1)])
+    await db.orders.create_index("order_status")
+    try:
+        await db.orders.create_index("order_number", unique=True)
+    except OperationFailure as e:
+        # Numbers from the old random generator can collide; keep lookups fast until they are fixed
+        logger.error(f"Duplicate order numbers exist, order_number index is not unique: {e}")
+        await db.orders.create_index("order_number")
+    # Customer order history: one equality + range scan, id breaks created_at ties for the cursor
+    await db.orders.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
+    # Verified-purchase lookup in submit_review
+    await db.orders.create_index([("user_email", 1), ("order_status", 1), ("items.product_id", 1)])
+    # Anchored prefix search in admin_get_orders / admin_get_users
+    for field in ("order_number", "email", "phone"):
+        await db.orders.create_index(f"search_keys.{field}")
+    for field in ("email", "phone", "name"):
+        await db.users.create_index(f"search_keys.{field}")
+    # Broadcasts stream the audience in id order and resume from the last id sent
+    await db.users.create_index("id")
+    await db.broadcasts.create_index("id", unique=True)
+    await db.broadcasts.create_index([("status", 1), ("created_at", 1)])
+    await db.broadcast_deliveries.create_index("sent_at", expireAfterSeconds=30 * 24 * 3600)
+    await db.reviews.create_index("id")
+    await db.reviews.create_index([("product_id", 1), ("approved", 1), ("created_at", -1)])
+    
+    # Older product documents predate stock tracking; give them the model default
+    await db.products.update_many(
+        {"stock_quantity": {"$exists": False}},
+        {"$set": {"stock_quantity": Product.model_fields["stock_quantity"].default}}
+    )
+
 # ==================== EMAIL HELPERS ====================
 
 async def send_email(to_email: str, subject: str, html_content: str):
@@ -398,6 +510,10 @@ async def send_email(to_email: str, subject: str, html_content: str):
         logger.warning("SMTP not configured, skipping email")
         return False
     
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    
     try:
         msg = MIMEMultipart('alternative')
         msg['Subject'] = subject
@@ -407,7 +523,7 @@ async def send_email(to_email: str, subject: str, html_content: str):
         html_part = MIMEText(html_content, 'html')
         msg.attach(html_part)
         
-        with smtplib.SMTP(settings.get('smtp_host', 'smtp.gmail.com'), settings.get('smtp_port', 587)) as server:
+        with track("smtp"), smtplib.SMTP(settings.get('smtp_host', 'smtp.gmail.com'), settings.get('smtp_port', 587)) as server:
             server.starttls()
             server.login(settings['smtp_user'], settings['smtp_password'])
             server.sendmail(msg['From'], to_email, msg.as_string())
@@ -418,130 +534,17 @@ async def send_email(to_email: str, subject: str, html_content: str):
         logger.error(f"Failed to send email: {e}")
         return False
 
-def generate_order_email(order: dict, settings: dict) -> str:
-    """Generate order confirmation email HTML"""
-    items_html = ""
-    for item in order.get('items', []):
-        items_html += f"""
-        <tr>
-            <td style="padding: 12px; border-bottom: 1px solid #eee;">
-                <img src="{item.get('image', '')}" alt="{item.get('name', '')}" style="width: 60px; height: 60px; object-fit: cover; border-radius: 8px;">
-            </td>
-            <td style="padding: 12px; border-bottom: 1px solid #eee;">
-                <strong>{item.get('name', '')}</strong><br>
-                <small style="color: #666;">Name: {item.get('customization', {}).get('name', 'N/A')}</small>
-            </td>
-            <td style="padding: 12px; border-bottom: 1px solid #eee; text-align: center;">{item.get('quantity', 1)}</td>
-            <td style="padding: 12px; border-bottom: 1px solid #eee; text-align: right;">₹{item.get('price', 0) * item.get('quantity', 1):,.0f}</td>
-        </tr>
-        """
-    
-    shipping = order.get('shipping_address', {})
-    
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <title>Order Confirmation</title>
-    </head>
-    <body style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="text-align: center; padding: 20px 0; border-bottom: 2px solid #8B0000;">
-            <h1 style="font-family: Georgia, serif; font-style: italic; margin: 0; color: #333;">
-                {settings.get('site_name', 'Name Craft')}
-            </h1>
-        </div>
-        
-        <div style="padding: 30px 0;">
-            <h2 style="color: #8B0000; margin-bottom: 5px;">Thank You for Your Order! 🎉</h2>
-            <p style="color: #666; margin-top: 0;">Your order has been received and is being processed.</p>
-            
-            <div style="background: #f9f9f9; padding: 20px; border-radius: 10px; margin: 20px 0;">
-                <p style="margin: 5px 0;"><strong>Order Number:</strong> {order.get('order_number', 'N/A')}</p>
-                <p style="margin: 5px 0;"><strong>Order Date:</strong> {order.get('created_at', datetime.utcnow()).strftime('%B %d, %Y')}</p>
-                <p style="margin: 5px 0;"><strong>Payment Method:</strong> {order.get('payment_method', 'N/A').upper()}</p>
-            </div>
-            
-            <h3 style="border-bottom: 1px solid #eee; padding-bottom: 10px;">Order Details</h3>
-            <table style="width: 100%; border-collapse: collapse;">
-                <thead>
-                    <tr style="background: #f5f5f5;">
-                        <th style="padding: 12px; text-align: left;">Image</th>
-                        <th style="padding: 12px; text-align: left;">Product</th>
-                        <th style="padding: 12px; text-align: center;">Qty</th>
-                        <th style="padding: 12px; text-align: right;">Price</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {items_html}
-                </tbody>
-            </table>
-            
-            <div style="text-align: right; margin-top: 20px; padding: 20px; background: #f9f9f9; border-radius: 10px;">
-                <p style="margin: 5px 0;">Subtotal: <strong>₹{order.get('subtotal', 0):,.0f}</strong></p>
-                <p style="margin: 5px 0;">Shipping: <strong>{'FREE' if order.get('shipping_cost', 0) == 0 else f"₹{order.get('shipping_cost', 0):,.0f}"}</strong></p>
-                {f'<p style="margin: 5px 0; color: #22c55e;">Discount: <strong>-₹{order.get("discount_amount", 0):,.0f}</strong></p>' if order.get('discount_amount', 0) > 0 else ''}
-                <p style="margin: 10px 0 0 0; font-size: 1.2em; border-top: 2px solid #8B0000; padding-top: 10px;">
-                    Total: <strong style="color: #8B0000;">₹{order.get('total', 0):,.0f}</strong>
-                </p>
-            </div>
-            
-            <h3 style="border-bottom: 1px solid #eee; padding-bottom: 10px; margin-top: 30px;">Shipping Address</h3>
-            <div style="background: #f9f9f9; padding: 20px; border-radius: 10px;">
-                <p style="margin: 5px 0;"><strong>{shipping.get('first_name', '')} {shipping.get('last_name', '')}</strong></p>
-                <p style="margin: 5px 0;">{shipping.get('address', '')}</p>
-                {f"<p style='margin: 5px 0;'>{shipping.get('apartment', '')}</p>" if shipping.get('apartment') else ''}
-                <p style="margin: 5px 0;">{shipping.get('city', '')}, {shipping.get('state', '')} - {shipping.get('pincode', '')}</p>
-                <p style="margin: 5px 0;">Phone: {shipping.get('phone', '')}</p>
-            </div>
-            
-            <div style="margin-top: 30px; padding: 20px; background: #fff8f0; border-radius: 10px; border-left: 4px solid #8B0000;">
-                <p style="margin: 0; font-size: 0.9em;">
-                    <strong>📦 What's Next?</strong><br>
-                    Your personalized jewelry will be handcrafted with care. You'll receive a shipping notification with tracking details once your order is on its way!
-                </p>
-            </div>
-        </div>
-        
-        <div style="text-align: center; padding: 20px; border-top: 1px solid #eee; color: #666; font-size: 0.85em;">
-            <p>Need help? Contact us at <a href="mailto:{settings.get('contact_email', '')}" style="color: #8B0000;">{settings.get('contact_email', '')}</a></p>
-            <p style="margin-top: 10px;">
-                <a href="#" style="color: #666; text-decoration: none; margin: 0 10px;">Instagram</a>
-                <a href="#" style="color: #666; text-decoration: none; margin: 0 10px;">Facebook</a>
-            </p>
-            <p style="margin-top: 15px;">© {datetime.now().year} {settings.get('site_name', 'Name Craft')}. All rights reserved.</p>
-        </div>
-    </body>
-    </html>
-    """
+# Compiled email / WhatsApp templates (see message_templates.py), edited via /admin/email-templates
+message_templates = TemplateStore(db.email_templates)
+invalidation_bus.register("email_templates", ["email_templates"], lambda event: message_templates.invalidate())
 
-def generate_shipping_email(order: dict, settings: dict) -> str:
-    """Generate shipping notification email"""
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head><meta charset="utf-8"><title>Your Order Has Shipped!</title></head>
-    <body style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="text-align: center; padding: 20px 0; border-bottom: 2px solid #8B0000;">
-            <h1 style="font-family: Georgia, serif; font-style: italic; margin: 0;">{settings.get('site_name', 'Name Craft')}</h1>
-        </div>
-        <div style="padding: 30px 0; text-align: center;">
-            <h2 style="color: #8B0000;">🚚 Your Order Has Shipped!</h2>
-            <p>Great news! Your order <strong>#{order.get('order_number', '')}</strong> is on its way.</p>
-            {f'<div style="background: #f9f9f9; padding: 20px; border-radius: 10px; margin: 20px 0;"><p style="margin: 0;"><strong>Tracking Number:</strong> {order.get("tracking_number", "N/A")}</p></div>' if order.get('tracking_number') else ''}
-            <p style="color: #666;">You can track your package using the tracking number above.</p>
-        </div>
-        <div style="text-align: center; padding: 20px; border-top: 1px solid #eee; color: #666; font-size: 0.85em;">
-            <p>© {datetime.now().year} {settings.get('site_name', 'Name Craft')}</p>
-        </div>
-    </body>
-    </html>
-    """
+async def render_order_message(template_id: str, order: dict, settings: dict) -> dict:
+    """Subject, text and html for an order template"""
+    template = await message_templates.get(template_id)
+    return template.render(order_context(order, settings))
 
 # ==================== WHATSAPP HELPERS ====================
 
-import httpx
-
 async def send_whatsapp_message(to_phone: str, message: str):
     """Send WhatsApp message using Meta Business API"""
     settings = await db.settings.find_one({"id": "site_settings"}, {"_id": 0})
@@ -559,26 +562,25 @@ async def send_whatsapp_message(to_phone: str, message: str):
         logger.warning("WhatsApp not configured")
         return False
     
-    # Clean phone number (remove spaces, dashes, ensure country code)
-    clean_phone = to_phone.replace(" ", "").replace("-", "").replace("+", "")
-    if not clean_phone.startswith("91"):
-        clean_phone = "91" + clean_phone
+    clean_phone = clean_whatsapp_number(to_phone)
+    import httpx
     
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://graph.facebook.com/v18.0/{phone_id}/messages",
-                headers={
-                    "Authorization": f"Bearer {api_token}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "messaging_product": "whatsapp",
-                    "to": clean_phone,
-                    "type": "text",
-                    "text": {"body": message}
-                }
-            )
+            with track("whatsapp"):
+                response = await client.post(
+                    f"https://graph.facebook.com/v18.0/{phone_id}/messages",
+                    headers={
+                        "Authorization": f"Bearer {api_token}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "messaging_product": "whatsapp",
+                        "to": clean_phone,
+                        "type": "text",
+                        "text": {"body": message}
+                    }
+                )
             if response.status_code == 200:
                 logger.info(f"WhatsApp sent to {clean_phone}")
                 return True
@@ -589,53 +591,15 @@ async def send_whatsapp_message(to_phone: str, message: str):
         logger.error(f"WhatsApp exception: {e}")
         return False
 
-def generate_order_whatsapp_message(order: dict, settings: dict) -> str:
-    """Generate order confirmation message for WhatsApp"""
-    items_text = ""
-    for item in order.get('items', [])[:3]:  # Limit to 3 items
-        items_text += f"• {item.get('name', '')} x{item.get('quantity', 1)}\n"
-    if len(order.get('items', [])) > 3:
-        items_text += f"  ...and {len(order.get('items', [])) - 3} more items\n"
-    
-    return f"""🎉 *Order Confirmed!*
-
-Hi {order.get('shipping_address', {}).get('first_name', 'there')}!
-
-Your order *#{order.get('order_number', '')}* has been placed successfully.
-
-*Items:*
-{items_text}
-*Total:* ₹{order.get('total', 0):,.0f}
-
-We'll notify you when your order ships!
-
-Thank you for shopping with {settings.get('site_name', 'Name Craft')} 💝"""
-
-def generate_shipping_whatsapp_message(order: dict, settings: dict) -> str:
-    """Generate shipping notification message for WhatsApp"""
-    tracking_info = ""
-    if order.get('tracking_number'):
-        tracking_info = f"\n*Tracking Number:* {order.get('tracking_number')}"
-    
-    return f"""🚚 *Your Order Has Shipped!*
-
-Hi {order.get('shipping_address', {}).get('first_name', 'there')}!
-
-Great news! Your order *#{order.get('order_number', '')}* is on its way.{tracking_info}
-
-Estimated delivery: 3-5 business days
-
-Track your package and stay updated!
-
-- {settings.get('site_name', 'Name Craft')} Team"""
-
 # ==================== AUTH HELPERS ====================
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with track("bcrypt"):
+        return password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with track("bcrypt"):
+        return password_context().hash(password)
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -662,6 +626,118 @@ async def get_admin_user(credentials: HTTPAuthorizationCredentials = Depends(sec
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
 
+# ==================== ORDER HISTORY ====================
+
+# What order lists need; the full order comes from GET /orders/{order_id}
+ORDER_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "order_number": 1, "created_at": 1, "order_status": 1, "payment_status": 1,
+    "payment_method": 1, "total": 1, "tracking_number": 1,
+    "items.name": 1, "items.image": 1, "items.price": 1, "items.quantity": 1, "items.customization.name": 1
+}
+
+def encode_order_cursor(order: dict) -> str:
+    raw = f"{order['created_at'].isoformat()}|{order['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_order_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, order_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), order_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def order_history_page(user_id: str, cursor: Optional[str] = None, limit: int = 20) -> dict:
+    """Newest-first page of a customer's order summaries, served from the (user_id, created_at, id) index"""
+    query = {"user_id": user_id}
+    if cursor:
+        created_at, order_id = decode_order_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": order_id}}
+        ]
+    orders = await db.orders.find(query, ORDER_SUMMARY_PROJECTION).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_order_cursor(orders[limit - 1]) if len(orders) > limit else None
+    return {"orders": orders[:limit], "next_cursor": next_cursor}
+
+# The startup scan runs in one worker per interval; registration links its own email directly
+GUEST_ORDER_BACKFILL_INTERVAL_SECONDS = 3600
+
+async def link_guest_orders(emails: Optional[List[str]] = None) -> int:
+    """Give orders placed without an account the user_id registered for their email; returns orders linked.
+    
+    Each order is claimed by the UpdateMany that sets its user_id, and tagged with this call's
+    link id; orders_count / total_spent are summed from those tagged orders only, so concurrent
+    calls (registration, the admin route, the startup scan) never count an order twice.
+    """
+    match = {"user_id": None, "user_email": {"$ne": None}}
+    if emails:
+        match["user_email"] = {"$in": emails}
+    
+    pending = [row["_id"] async for row in db.orders.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$user_email"}}
+    ])]
+    
+    linked = 0
+    link_id = str(uuid.uuid4())
+    for start in range(0, len(pending), 1000):
+        users = await db.users.find(
+            {"email": {"$in": pending[start:start + 1000]}}, {"_id": 0, "id": 1, "email": 1}
+        ).to_list(None)
+        if not users:
+            continue
+        result = await db.orders.bulk_write([
+            UpdateMany({"user_id": None, "user_email": u["email"]}, {"$set": {"user_id": u["id"], "guest_link_id": link_id}})
+            for u in users
+        ], ordered=False)
+        if not result.modified_count:
+            continue
+        linked += result.modified_count
+        # Keep orders_count / total_spent the way place_order accumulates them
+        claimed = db.orders.aggregate([
+            {"$match": {"user_id": {"$in": [u["id"] for u in users]}, "guest_link_id": link_id}},
+            {"$group": {"_id": "$user_id", "orders_count": {"$sum": 1}, "total_spent": {"$sum": "$total"}}}
+        ])
+        await db.users.bulk_write([
+            UpdateOne({"id": row["_id"]}, {"$inc": {"orders_count": row["orders_count"], "total_spent": row["total_spent"]}})
+            async for row in claimed
+        ], ordered=False)
+    if linked:
+        logger.info(f"Linked {linked} guest orders to customer accounts")
+    return linked
+
+async def guest_order_backfill():
+    try:
+        if await claim_scheduled_run("guest_order_backfill", GUEST_ORDER_BACKFILL_INTERVAL_SECONDS):
+            await link_guest_orders()
+    except Exception as e:
+        logger.warning(f"Guest order backfill failed: {e}")
+
+# ==================== SEARCH KEYS ====================
+
+async def backfill_search_keys() -> int:
+    """Compute search_keys for orders and users written before they existed; returns documents updated"""
+    sources = [
+        (db.orders, order_search_keys, {"order_number": 1, "user_email": 1, "shipping_address.email": 1,
+                                        "shipping_address.phone": 1}),
+        (db.users, user_search_keys, {"email": 1, "phone": 1, "name": 1})
+    ]
+    updated = 0
+    for collection, keys, fields in sources:
+        batch = []
+        async for doc in collection.find({"search_keys": {"$exists": False}}, fields):
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search_keys": keys(doc)}}))
+            if len(batch) >= 1000:
+                updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+    logger.info(f"Backfilled search keys on {updated} orders and users")
+    return updated
+
 # ==================== AUTH ROUTES ====================
 
 @api_router.post("/auth/register")
@@ -677,8 +753,11 @@ async def register(user_data: UserCreate):
     )
     user_dict = user.dict()
     user_dict["password_hash"] = get_password_hash(user_data.password)
+    user_dict["search_keys"] = user_search_keys(user_dict)
     
     await db.users.insert_one(user_dict)
+    # Orders placed as a guest before signing up belong to the new account
+    await link_guest_orders([user.email])
     token = create_access_token({"sub": user.id, "role": user.role})
     
     return {"token": token, "user": {"id": user.id, "email": user.email, "name": user.name, "role": user.role}}
@@ -740,31 +819,9 @@ async def forgot_password(data: dict, background_tasks: BackgroundTasks):
     
     # Send email
     reset_link = f"{settings.get('site_url', 'https://namecraft.shop')}/reset-password?token={reset_token}"
-    email_html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head><meta charset="utf-8"><title>Reset Your Password</title></head>
-    <body style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="text-align: center; padding: 20px 0; border-bottom: 2px solid #0ea5e9;">
-            <h1 style="font-family: Georgia, serif; margin: 0; color: #0ea5e9;">Name Craft</h1>
-        </div>
-        <div style="padding: 30px 0;">
-            <h2 style="color: #333;">Reset Your Password</h2>
-            <p>Hi {user.get('name', 'there')},</p>
-            <p>We received a request to reset your password. Click the button below to create a new password:</p>
-            <div style="text-align: center; margin: 30px 0;">
-                <a href="{reset_link}" style="background: #0ea5e9; color: white; padding: 12px 30px; text-decoration: none; border-radius: 8px; display: inline-block;">Reset Password</a>
-            </div>
-            <p style="color: #666; font-size: 0.9em;">This link will expire in 1 hour. If you didn't request this, you can safely ignore this email.</p>
-        </div>
-        <div style="text-align: center; padding: 20px; border-top: 1px solid #eee; color: #666; font-size: 0.85em;">
-            <p>© {datetime.now().year} Name Craft. All rights reserved.</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    background_tasks.add_task(send_email, email, "Reset Your Password - Name Craft", email_html)
+    template = await message_templates.get("password_reset")
+    message = template.render(password_reset_context(user, reset_link, settings))
+    background_tasks.add_task(send_email, email, message["subject"], message["html"])
     
     return {"success": True, "message": "If an account exists, you will receive a reset email"}
 
@@ -808,28 +865,39 @@ async def update_profile(profile_data: dict, user = Depends(get_current_user)):
     allowed_fields = ["name", "phone", "address", "city", "state", "pincode"]
     update_data = {k: v for k, v in profile_data.items() if k in allowed_fields}
     update_data["updated_at"] = datetime.utcnow()
+    update_data["search_keys"] = user_search_keys({**user, **update_data})
     
     await db.users.update_one({"id": user["id"]}, {"$set": update_data})
     
-    updated_user = await db.users.find_one({"id": user["id"]}, {"_id": 0, "password_hash": 0})
+    updated_user = await db.users.find_one({"id": user["id"]}, {"_id": 0, "password_hash": 0, "search_keys": 0})
     return updated_user
 
 @api_router.get("/orders/my-orders")
-async def get_my_orders(user = Depends(get_current_user)):
-    """Get orders for logged in user"""
+async def get_my_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user = Depends(get_current_user)
+):
+    """Order summaries for the logged in user; guest orders are linked by email at signup"""
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Find orders by user_id OR by email
-    orders = await db.orders.find(
-        {"$or": [{"user_id": user["id"]}, {"user_email": user["email"]}]}, 
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    
-    return orders
+    return await order_history_page(user["id"], cursor, limit)
 
 # ==================== PRODUCT ROUTES ====================
 
+# stock_holds is a retired per-product reservation log still present on older documents
+PRODUCT_PROJECTION = {"_id": 0, "stock_holds": 0}
+# Written by every checkout and review; caches that don't show them skip these updates
+VOLATILE_PRODUCT_FIELDS = frozenset({
+    "stock_quantity", "stock_holds", "rating_count", "rating_sum", "rating_histogram", "updated_at"
+})
+# Kept up to date by checkout and review moderation; the product editor never writes them
+PRODUCT_MANAGED_FIELDS = {
+    "_id", "id", "stock_quantity", "stock_holds", "rating_count", "rating_sum", "rating_histogram",
+    "rating_average", "created_at"
+}
+
 @api_router.get("/products")
 async def get_products(
     category: Optional[str] = None,
@@ -851,16 +919,19 @@ async def get_products(
             {"category": {"$regex": search, "$options": "i"}}
         ]
     
-    products = await db.products.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
+    products = await db.products.find(query, PRODUCT_PROJECTION).skip(skip).limit(limit).to_list(limit)
     total = await db.products.count_documents(query)
+    for product in products:
+        product["rating_average"] = rating_average(product)
     
     return {"products": products, "total": total}
 
 @api_router.get("/products/{slug}")
 async def get_product(slug: str):
-    product = await db.products.find_one({"slug": slug, "is_active": True}, {"_id": 0})
+    product = await db.products.find_one({"slug": slug, "is_active": True}, PRODUCT_PROJECTION)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    product["rating_average"] = rating_average(product)
     return product
 
 # ==================== FILE UPLOAD ====================
@@ -903,62 +974,375 @@ async def get_categories():
     categories = await db.categories.find({"is_active": True}, {"_id": 0}).sort("order", 1).to_list(100)
     return categories
 
-# ==================== ORDER ROUTES ====================
+# ==================== ORDER NUMBERS ====================
 
-@api_router.post("/orders")
-async def create_order(order_data: OrderCreate, background_tasks: BackgroundTasks, user = Depends(get_current_user)):
-    # Calculate totals
-    subtotal = 0
-    order_items = []
-    
-    for item in order_data.items:
-        product = await db.products.find_one({"id": item.product_id}, {"_id": 0})
-        if not product:
-            # If product not found by ID, create a placeholder
-            order_items.append({
-                "product_id": item.product_id,
-                "name": item.name if hasattr(item, 'name') else "Product",
-                "price": item.price if hasattr(item, 'price') else 0,
-                "quantity": item.quantity,
-                "image": item.image if hasattr(item, 'image') else "",
-                "customization": item.customization
-            })
-            subtotal += (item.price if hasattr(item, 'price') else 0) * item.quantity
-            continue
+# Numbers each worker reserves per round trip to the counters collection
+ORDER_NUMBER_BLOCK_SIZE = int(os.environ.get('ORDER_NUMBER_BLOCK_SIZE', '50'))
+order_number_sequence = SequenceAllocator(db.counters, "order_number", ORDER_NUMBER_BLOCK_SIZE)
+
+async def next_order_number() -> str:
+    """NC + date + daily sequence; 7+ digits, so never equal to a legacy 6-hex-digit number"""
+    today = datetime.now().strftime('%Y%m%d')
+    return f"NC{today}{await order_number_sequence.next(today):07d}"
+
+# ==================== INVENTORY HELPERS ====================
+
+# Unpaid UPI/Razorpay orders hold their stock for this long before it is returned
+STOCK_HOLD_MINUTES = int(os.environ.get('STOCK_HOLD_MINUTES', '30'))
+STOCK_HOLD_PAYMENT_METHODS = ["upi", "razorpay"]
+STOCK_SWEEP_INTERVAL_SECONDS = 60
+
+async def reserve_stock(order_id: str, quantities: Dict[str, int], hold: bool) -> Optional[dict]:
+    """Atomically take stock for an order.
+    
+    Every line is decremented by its own update guarded by ``stock_quantity >= qty``
+    (sent concurrently), so concurrent checkouts of the same product can never oversell.
+    If any line is short, exactly the lines whose update matched are put back and a 409
+    is raised.
+    
+    With ``hold`` the reservation expires after STOCK_HOLD_MINUTES unless it is committed.
+    """
+    if not quantities:
+        return None
+    
+    reservation_id = str(uuid.uuid4())
+    lines = list(quantities.items())
+    results = await asyncio.gather(*(
+        db.products.update_one({"id": product_id, "stock_quantity": {"$gte": qty}}, {"$inc": {"stock_quantity": -qty}})
+        for product_id, qty in lines
+    ))
+    taken = [(product_id, qty) for (product_id, qty), result in zip(lines, results) if result.matched_count]
+    
+    if len(taken) < len(lines):
+        # Undo only the lines this reservation actually decremented
+        if taken:
+            await db.products.bulk_write([
+                UpdateOne({"id": product_id}, {"$inc": {"stock_quantity": qty}})
+                for product_id, qty in taken
+            ], ordered=False)
         
-        item_total = product["price"] * item.quantity
-        subtotal += item_total
-        order_items.append({
-            "product_id": product["id"],
-            "name": product["name"],
-            "price": product["price"],
-            "quantity": item.quantity,
-            "image": product["image"],
-            "customization": item.customization
+        products = await db.products.find(
+            {"id": {"$in": list(quantities)}},
+            {"_id": 0, "id": 1, "name": 1, "stock_quantity": 1}
+        ).to_list(len(quantities))
+        short = [
+            f"{p.get('name', p['id'])} (only {max(p.get('stock_quantity', 0), 0)} left)"
+            for p in products if p.get("stock_quantity", 0) < quantities[p["id"]]
+        ]
+        raise HTTPException(
+            status_code=409,
+            detail=f"Insufficient stock: {', '.join(short)}" if short else "Insufficient stock"
+        )
+    
+    now = datetime.utcnow()
+    reservation = {
+        "id": reservation_id,
+        "order_id": order_id,
+        "items": [{"product_id": pid, "quantity": qty} for pid, qty in quantities.items()],
+        "status": "held" if hold else "committed",
+        "expires_at": now + timedelta(minutes=STOCK_HOLD_MINUTES) if hold else None,
+        "created_at": now,
+        "updated_at": now
+    }
+    await db.stock_reservations.insert_one(reservation)
+    reservation.pop("_id", None)
+    return reservation
+
+async def _restock(reservation: dict):
+    """Return a reservation's quantities to the catalog"""
+    await db.products.bulk_write([
+        UpdateOne({"id": item["product_id"]}, {"$inc": {"stock_quantity": item["quantity"]}})
+        for item in reservation.get("items", [])
+    ], ordered=False)
+
+async def commit_stock_reservation(order_id: str):
+    """Make a held reservation permanent once the order is paid"""
+    reservation = await db.stock_reservations.find_one_and_update(
+        {"order_id": order_id, "status": "held"},
+        {"$set": {"status": "committed", "expires_at": None, "updated_at": datetime.utcnow()}}
+    )
+    if reservation:
+        return
+    
+    # Paid after the hold lapsed: take the stock again, but never fail a captured payment over it
+    expired = await db.stock_reservations.find_one_and_delete({"order_id": order_id, "status": "expired"})
+    if expired:
+        try:
+            await reserve_stock(order_id, {i["product_id"]: i["quantity"] for i in expired["items"]}, hold=False)
+        except HTTPException:
+            logger.warning(f"Order {order_id} was paid after its stock hold expired and is now oversold")
+
+async def hold_stock_for_verification(order_id: str):
+    """Stop the hold from expiring while an admin verifies a submitted UTR"""
+    await db.stock_reservations.update_one(
+        {"order_id": order_id, "status": "held"},
+        {"$set": {"expires_at": None, "updated_at": datetime.utcnow()}}
+    )
+
+async def release_stock_reservation(order_id: str, reason: str, restock: bool = True) -> bool:
+    """Give an order's stock back (payment rejected, refunded). Safe to call repeatedly.
+    
+    With ``restock=False`` the reservation is only closed: the goods have left the
+    warehouse (shipped, partially refunded) and must not be counted as sellable again.
+    """
+    now = datetime.utcnow()
+    reservation = await db.stock_reservations.find_one_and_update(
+        {"order_id": order_id, "status": {"$in": ["held", "committed"]}},
+        {"$set": {
+            "status": "released" if restock else "settled",
+            "release_reason": reason, "expires_at": None, "settled_at": now, "updated_at": now
+        }}
+    )
+    if not reservation:
+        return False
+    if restock:
+        await _restock(reservation)
+    return True
+
+async def expire_stock_reservations() -> int:
+    """Return stock from holds whose payment never arrived"""
+    expired = 0
+    while True:
+        now = datetime.utcnow()
+        # Claiming one at a time keeps this safe when several workers sweep concurrently
+        reservation = await db.stock_reservations.find_one_and_update(
+            {"status": "held", "expires_at": {"$ne": None, "$lte": now}},
+            {"$set": {"status": "expired", "settled_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not reservation:
+            return expired
+        await _restock(reservation)
+        await db.orders.update_one(
+            {"id": reservation["order_id"], "payment_status": "pending"},
+            {"$set": {"payment_status": "expired", "order_status": "cancelled", "updated_at": now}}
+        )
+        expired += 1
+
+async def stock_reservation_sweeper():
+    while True:
+        try:
+            expired = await expire_stock_reservations()
+            if expired:
+                logger.info(f"Released stock for {expired} expired reservations")
+        except Exception as e:
+            logger.warning(f"Stock reservation sweep failed: {e}")
+        await asyncio.sleep(STOCK_SWEEP_INTERVAL_SECONDS)
+
+# ==================== IDEMPOTENCY HELPERS ====================
+
+# How long a stored response answers retries of the same Idempotency-Key
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+# A claim older than this is treated as abandoned by a crashed worker
+IDEMPOTENCY_LOCK_SECONDS = 60
+
+async def run_idempotent(scope: str, idempotency_key: Optional[str], payload: Any, handler):
+    """Run ``handler`` at most once per Idempotency-Key.
+    
+    The first request claims the key and stores its response; retries with the same key
+    get that response back without touching orders, coupons, stock or notifications.
+    Failed requests release the key so the client can try again.
+    """
+    if not idempotency_key:
+        return await handler()
+    
+    key = f"{scope}:{idempotency_key}"
+    fingerprint = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    now = datetime.utcnow()
+    
+    try:
+        await db.idempotency_keys.insert_one({
+            "key": key,
+            "fingerprint": fingerprint,
+            "status": "in_progress",
+            "created_at": now,
+            "locked_at": now
         })
+    except DuplicateKeyError:
+        existing = await db.idempotency_keys.find_one({"key": key}, {"_id": 0})
+        if not existing:
+            # Released between our insert and read; the retry can safely claim it
+            return await run_idempotent(scope, idempotency_key, payload, handler)
+        if existing["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if existing["status"] == "completed":
+            return existing["response"]
+        
+        stale = await db.idempotency_keys.find_one_and_update(
+            {"key": key, "status": "in_progress", "locked_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}},
+            {"$set": {"locked_at": now}}
+        )
+        if not stale:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
     
-    # Get settings for shipping
-    settings = await db.settings.find_one({"id": "site_settings"}, {"_id": 0})
-    if not settings:
-        settings = SiteSettings().dict()
+    try:
+        # Stored exactly as serialized so replays are byte-for-byte identical
+        response = jsonable_encoder(await handler())
+    except Exception:
+        await db.idempotency_keys.delete_one({"key": key, "status": "in_progress"})
+        raise
     
+    await db.idempotency_keys.update_one(
+        {"key": key},
+        {"$set": {"status": "completed", "response": response, "completed_at": datetime.utcnow()}}
+    )
+    return response
+
+# ==================== CART QUOTES ====================
+
+# Prices in a quote are honoured at checkout for this long
+CART_QUOTE_TTL_SECONDS = int(os.environ.get('CART_QUOTE_TTL_SECONDS', '900'))
+CART_PRODUCT_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "price": 1, "image": 1, "is_active": 1, "in_stock": 1, "stock_quantity": 1
+}
+
+def cart_quantities(items: List[CartItem]) -> Dict[str, int]:
+    quantities: Dict[str, int] = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+async def price_cart(items: List[CartItem], coupon_code: Optional[str]) -> dict:
+    """Price a cart from the catalogue: one batched product fetch, coupon, shipping and stock"""
+    quantities = cart_quantities(items)
+    products = {
+        product["id"]: product
+        for product in await db.products.find(
+            {"id": {"$in": list(quantities)}}, CART_PRODUCT_PROJECTION
+        ).to_list(len(quantities))
+    }
+    
+    issues = []
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if not product or not product.get("is_active", True):
+            issues.append({"product_id": product_id, "issue": "unavailable"})
+        elif not product.get("in_stock", True) or product.get("stock_quantity", 0) < quantity:
+            issues.append({"product_id": product_id, "issue": "insufficient_stock",
+                           "available": max(product.get("stock_quantity", 0), 0)})
+    
+    unavailable = {issue["product_id"] for issue in issues if issue["issue"] == "unavailable"}
+    items_out = [
+        {
+            "product_id": item.product_id,
+            "name": products[item.product_id]["name"],
+            "price": products[item.product_id]["price"],
+            "quantity": item.quantity,
+            "image": products[item.product_id]["image"],
+            "customization": item.customization
+        }
+        for item in items if item.product_id not in unavailable
+    ]
+    subtotal = sum(item["price"] * item["quantity"] for item in items_out)
+    
+    settings = await cached_site_settings()
     shipping_cost = 0 if subtotal >= settings.get("free_shipping_threshold", 499) else settings.get("shipping_cost", 29)
     
-    # Apply coupon if provided
-    discount_amount = 0
-    if order_data.coupon_code:
-        coupon = await db.coupons.find_one({"code": order_data.coupon_code.upper(), "is_active": True}, {"_id": 0})
-        if coupon and subtotal >= coupon.get("min_order_amount", 0):
-            if coupon["discount_type"] == "percentage":
-                discount_amount = subtotal * (coupon["discount_value"] / 100)
-                if coupon.get("max_discount"):
-                    discount_amount = min(discount_amount, coupon["max_discount"])
-            else:
-                discount_amount = coupon["discount_value"]
-            
-            await db.coupons.update_one({"id": coupon["id"]}, {"$inc": {"used_count": 1}})
+    discount_amount, applied_coupon, coupon_error = 0, None, None
+    if coupon_code:
+        try:
+            coupon = await validate_coupon(coupon_code, subtotal)
+            discount_amount, applied_coupon = coupon["discount"], coupon["code"]
+        except HTTPException as e:
+            coupon_error = e.detail
     
-    total = subtotal + shipping_cost - discount_amount
+    return {
+        "items": items_out,
+        "subtotal": subtotal,
+        "shipping_cost": shipping_cost,
+        "free_shipping_threshold": settings.get("free_shipping_threshold", 499),
+        "discount_amount": discount_amount,
+        "coupon_code": applied_coupon,
+        "coupon_error": coupon_error,
+        "total": subtotal + shipping_cost - discount_amount,
+        "issues": issues
+    }
+
+def sign_cart_quote(quote: dict) -> str:
+    """JWT carrying the priced lines and totals; item customizations come with the order"""
+    payload = {
+        "typ": "cart_quote",
+        "exp": datetime.utcnow() + timedelta(seconds=CART_QUOTE_TTL_SECONDS),
+        "products": {item["product_id"]: [item["price"], item["name"], item["image"]] for item in quote["items"]},
+        "quantities": {item["product_id"]: 0 for item in quote["items"]},
+        **{key: quote[key] for key in ("subtotal", "shipping_cost", "discount_amount", "total", "coupon_code")}
+    }
+    for item in quote["items"]:
+        payload["quantities"][item["product_id"]] += item["quantity"]
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+def read_cart_quote(token: str, items: List[CartItem], coupon_code: Optional[str]) -> Optional[dict]:
+    """The priced order from a quote token, or None if it expired or no longer matches the cart"""
+    try:
+        quote = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+    if quote.get("typ") != "cart_quote" or quote["quantities"] != cart_quantities(items):
+        return None
+    # A quote without the coupon (or with a different one) was priced for another checkout
+    if (quote["coupon_code"] or None) != ((coupon_code or "").upper() or None):
+        return None
+    return {
+        "items": [
+            {
+                "product_id": item.product_id,
+                "name": quote["products"][item.product_id][1],
+                "price": quote["products"][item.product_id][0],
+                "quantity": item.quantity,
+                "image": quote["products"][item.product_id][2],
+                "customization": item.customization
+            }
+            for item in items
+        ],
+        **{key: quote[key] for key in ("subtotal", "shipping_cost", "discount_amount", "total", "coupon_code")}
+    }
+
+@api_router.post("/cart/quote")
+async def quote_cart(data: CartQuoteRequest):
+    """Server-side cart pricing; the token lets checkout reuse these prices without repricing"""
+    quote = await price_cart(data.items, data.coupon_code)
+    quote["quote_token"] = None if quote["issues"] or not quote["items"] else sign_cart_quote(quote)
+    quote["expires_in"] = CART_QUOTE_TTL_SECONDS
+    return quote
+
+# ==================== ORDER ROUTES ====================
+
+@api_router.post("/orders")
+async def create_order(
+    order_data: OrderCreate,
+    background_tasks: BackgroundTasks,
+    user = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
+):
+    return await run_idempotent(
+        f"orders:{user['id'] if user else 'guest'}",
+        idempotency_key,
+        order_data.dict(),
+        lambda: place_order(order_data, background_tasks, user)
+    )
+
+async def place_order(order_data: OrderCreate, background_tasks: BackgroundTasks, user: Optional[dict]):
+    priced = None
+    if order_data.quote_token:
+        priced = read_cart_quote(order_data.quote_token, order_data.items, order_data.coupon_code)
+    # Quoted prices stand, but a product deactivated since the quote sends the cart back to pricing
+    if priced and await db.products.count_documents(
+        {"id": {"$in": [item["product_id"] for item in priced["items"]]}, "is_active": {"$ne": False}}
+    ) < len({item["product_id"] for item in priced["items"]}):
+        priced = None
+    if not priced:
+        priced = await price_cart(order_data.items, order_data.coupon_code)
+        if any(issue["issue"] == "unavailable" for issue in priced["issues"]):
+            raise HTTPException(status_code=400, detail="Some items in your cart are no longer available")
+    
+    order_items = priced["items"]
+    subtotal = priced["subtotal"]
+    shipping_cost = priced["shipping_cost"]
+    # An invalid coupon is dropped rather than failing the order
+    discount_amount = priced["discount_amount"]
+    total = priced["total"]
+    stock_quantities = cart_quantities(order_data.items)
+    settings = await cached_site_settings()
     
     # Get user email from shipping address
     user_email = order_data.shipping_address.email
@@ -973,6 +1357,7 @@ async def create_order(order_data: OrderCreate, background_tasks: BackgroundTask
             user_id = existing_user["id"]
     
     order = Order(
+        order_number=await next_order_number(),
         user_id=user_id,
         user_email=user_email,
         items=order_items,
@@ -982,14 +1367,39 @@ async def create_order(order_data: OrderCreate, background_tasks: BackgroundTask
         shipping_cost=shipping_cost,
         discount_amount=discount_amount,
         total=total,
-        coupon_code=order_data.coupon_code
+        coupon_code=priced["coupon_code"]
     )
     
+    # The coupon may have been used up or switched off since it was priced (or quoted)
+    if priced["coupon_code"] and not await claim_coupon_use(priced["coupon_code"]):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Coupon {priced['coupon_code']} is no longer available; remove it and try again"
+        )
+    
+    # Take stock before the order exists; unpaid online orders only hold it until payment
+    try:
+        await reserve_stock(
+            order.id,
+            stock_quantities,
+            hold=order_data.payment_method in STOCK_HOLD_PAYMENT_METHODS
+        )
+    except Exception:
+        await release_coupon_use(priced["coupon_code"])
+        raise
+    
     order_dict = order.dict()
-    await db.orders.insert_one(order_dict)
+    order_dict["search_keys"] = order_search_keys(order_dict)
+    try:
+        await db.orders.insert_one(order_dict)
+    except Exception:
+        await release_stock_reservation(order.id, "order_insert_failed")
+        await release_coupon_use(priced["coupon_code"])
+        raise
     
-    # Remove MongoDB _id from response
+    # Remove MongoDB _id and the internal search keys from response
     order_dict.pop('_id', None)
+    order_dict.pop('search_keys', None)
     
     # Update user stats if user found
     if user_id:
@@ -1000,36 +1410,47 @@ async def create_order(order_data: OrderCreate, background_tasks: BackgroundTask
     
     # Send order confirmation email in background
     if settings.get("send_order_confirmation", True):
-        email_html = generate_order_email(order_dict, settings)
+        message = await render_order_message("order_confirmation", order_dict, settings)
         background_tasks.add_task(
             send_email,
             order_data.shipping_address.email,
-            f"Order Confirmed! #{order.order_number}",
-            email_html
+            message["subject"],
+            message["html"]
         )
     
     # Send WhatsApp notification in background
     if settings.get("send_whatsapp_order_confirmation", True) and order_data.shipping_address.phone:
-        whatsapp_message = generate_order_whatsapp_message(order_dict, settings)
+        message = await render_order_message("whatsapp_order_confirmation", order_dict, settings)
         background_tasks.add_task(
             send_whatsapp_message,
             order_data.shipping_address.phone,
-            whatsapp_message
+            message["text"]
         )
     
     return order_dict
 
 @api_router.get("/orders")
-async def get_user_orders(user = Depends(get_current_user)):
+async def get_user_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user = Depends(get_current_user)
+):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    orders = await db.orders.find({"user_id": user["id"]}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return orders
+    return await order_history_page(user["id"], cursor, limit)
 
 @api_router.post("/orders/{order_id}/submit-payment")
-async def submit_payment(order_id: str, payment_data: dict):
+async def submit_payment(order_id: str, payment_data: dict, idempotency_key: Optional[str] = Header(None)):
     """Submit UTR number for manual payment verification"""
+    return await run_idempotent(
+        f"submit-payment:{order_id}",
+        idempotency_key,
+        payment_data,
+        lambda: record_payment_submission(order_id, payment_data)
+    )
+
+async def record_payment_submission(order_id: str, payment_data: dict):
     # Find order by order_number or id
     order = await db.orders.find_one({"$or": [{"order_number": order_id}, {"id": order_id}]})
     if not order:
@@ -1048,6 +1469,7 @@ async def submit_payment(order_id: str, payment_data: dict):
             "updated_at": datetime.utcnow()
         }}
     )
+    await hold_stock_for_verification(order["id"])
     
     return {"success": True, "message": "Payment submitted for verification"}
 
@@ -1068,6 +1490,7 @@ async def approve_payment(order_id: str, admin = Depends(get_admin_user)):
             "updated_at": datetime.utcnow()
         }}
     )
+    await commit_stock_reservation(order["id"])
     
     return {"success": True, "message": "Payment approved successfully"}
 
@@ -1086,12 +1509,13 @@ async def reject_payment(order_id: str, reason: str = "Payment verification fail
             "updated_at": datetime.utcnow()
         }}
     )
+    await release_stock_reservation(order["id"], "payment_rejected")
     
     return {"success": True, "message": "Payment rejected"}
 
 @api_router.get("/orders/{order_id}")
 async def get_order(order_id: str, user = Depends(get_current_user)):
-    order = await db.orders.find_one({"id": order_id}, {"_id": 0})
+    order = await db.orders.find_one({"id": order_id}, {"_id": 0, "search_keys": 0})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -1102,13 +1526,15 @@ async def get_order(order_id: str, user = Depends(get_current_user)):
 
 # ==================== RAZORPAY PAYMENT ROUTES ====================
 
-def get_razorpay_client():
-    """Get Razorpay client with keys from settings"""
-    # Get keys from database settings
-    import asyncio
-    loop = asyncio.new_event_loop()
-    settings = loop.run_until_complete(db.settings.find_one({"id": "site_settings"}, {"_id": 0}))
-    loop.close()
+# One gateway per process: cached clients, pooled HTTP session, calls off the event loop
+payment_gateway = RazorpayGateway()
+
+async def get_razorpay_client():
+    """Get the cached Razorpay client for the keys in settings"""
+    settings = await db.settings.find_one(
+        {"id": "site_settings"},
+        {"_id": 0, "razorpay_key_id": 1, "razorpay_key_secret": 1}
+    )
     
     key_id = settings.get("razorpay_key_id") if settings else None
     key_secret = settings.get("razorpay_key_secret") if settings else None
@@ -1116,11 +1542,27 @@ def get_razorpay_client():
     if not key_id or not key_secret:
         return None
     
-    return razorpay.Client(auth=(key_id, key_secret))
+    return payment_gateway.client(key_id, key_secret)
 
 @api_router.post("/payment/razorpay/create-order")
-async def create_razorpay_order(data: dict):
+async def create_razorpay_order(data: dict, idempotency_key: Optional[str] = Header(None)):
     """Create a Razorpay order for payment"""
+    return await run_idempotent(
+        "razorpay-create-order",
+        idempotency_key,
+        data,
+        lambda: open_razorpay_order(data)
+    )
+
+# Razorpay amounts are integers in paise; orders are only ever charged in rupees
+RAZORPAY_CURRENCY = "INR"
+# An expired order can still be paid: the stock is taken again when the payment lands
+RAZORPAY_PAYABLE_STATUSES = ["pending", "expired"]
+
+def amount_in_paise(total: float) -> int:
+    return int(round(total * 100))
+
+async def open_razorpay_order(data: dict):
     settings = await db.settings.find_one({"id": "site_settings"}, {"_id": 0})
     
     if not settings or not settings.get("razorpay_enabled"):
@@ -1132,33 +1574,55 @@ async def create_razorpay_order(data: dict):
     if not key_id or not key_secret:
         raise HTTPException(status_code=400, detail="Razorpay keys not configured")
     
+    # The amount always comes from the stored order, never from the request
+    order = await db.orders.find_one(
+        {"$or": [{"id": data.get("order_id")}, {"order_number": data.get("order_id")}]},
+        {"_id": 0, "id": 1, "total": 1, "payment_status": 1, "user_email": 1}
+    ) if data.get("order_id") else None
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order.get("payment_status") not in RAZORPAY_PAYABLE_STATUSES:
+        raise HTTPException(status_code=409, detail="This order is not awaiting payment")
+    
     try:
-        client = razorpay.Client(auth=(key_id, key_secret))
-        
-        amount = int(data.get("amount", 0) * 100)  # Convert to paise
-        
-        razorpay_order = client.order.create({
-            "amount": amount,
-            "currency": "INR",
+        razorpay_order = await payment_gateway.create_order(key_id, key_secret, {
+            "amount": amount_in_paise(order["total"]),
+            "currency": RAZORPAY_CURRENCY,
             "payment_capture": 1,
             "notes": {
-                "order_id": data.get("order_id", ""),
-                "customer_email": data.get("email", "")
+                "order_id": order["id"],
+                "customer_email": order.get("user_email") or ""
             }
         })
-        
-        return {
-            "id": razorpay_order["id"],
-            "amount": razorpay_order["amount"],
-            "currency": razorpay_order["currency"],
-            "key_id": key_id
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create Razorpay order: {str(e)}")
+    except RazorpayGatewayError as e:
+        raise HTTPException(status_code=502, detail=f"Failed to create Razorpay order: {str(e)}")
+    
+    # Lets webhooks and the reconciliation sweep find the order without the browser callback
+    attached = await db.orders.update_one(
+        {"id": order["id"], "payment_status": {"$in": RAZORPAY_PAYABLE_STATUSES}},
+        {"$set": {"razorpay_order_id": razorpay_order["id"], "updated_at": datetime.utcnow()}}
+    )
+    if not attached.matched_count:
+        raise HTTPException(status_code=409, detail="This order is not awaiting payment")
+    
+    return {
+        "id": razorpay_order["id"],
+        "amount": razorpay_order["amount"],
+        "currency": razorpay_order["currency"],
+        "key_id": key_id
+    }
 
 @api_router.post("/payment/razorpay/verify")
-async def verify_razorpay_payment(data: dict):
+async def verify_razorpay_payment(data: dict, idempotency_key: Optional[str] = Header(None)):
     """Verify Razorpay payment signature and update order"""
+    return await run_idempotent(
+        "razorpay-verify",
+        idempotency_key,
+        data,
+        lambda: confirm_razorpay_payment(data)
+    )
+
+async def confirm_razorpay_payment(data: dict):
     settings = await db.settings.find_one({"id": "site_settings"}, {"_id": 0})
     
     if not settings:
@@ -1174,31 +1638,268 @@ async def verify_razorpay_payment(data: dict):
     if not all([razorpay_order_id, razorpay_payment_id, razorpay_signature]):
         raise HTTPException(status_code=400, detail="Missing payment details")
     
+    if not key_secret:
+        raise HTTPException(status_code=400, detail="Razorpay keys not configured")
+    
     # Verify signature
-    message = f"{razorpay_order_id}|{razorpay_payment_id}"
-    generated_signature = hmac.new(
-        key_secret.encode(),
-        message.encode(),
-        hashlib.sha256
-    ).hexdigest()
-    
-    if generated_signature != razorpay_signature:
+    if not verify_payment_signature(key_secret, razorpay_order_id, razorpay_payment_id, razorpay_signature):
         raise HTTPException(status_code=400, detail="Invalid payment signature")
     
-    # Update order status
-    if order_id:
+    if not order_id:
+        return {"success": True, "message": "Payment verified successfully"}
+    
+    # The signature only proves Razorpay issued this payment id; its amount comes from Razorpay
+    try:
+        payment = await payment_gateway.fetch_payment(settings.get("razorpay_key_id"), key_secret, razorpay_payment_id)
+    except RazorpayGatewayError as e:
+        logger.warning(f"Could not fetch Razorpay payment {razorpay_payment_id}: {e}")
+        return {"success": True, "message": "Payment received; confirmation will follow shortly"}
+    if payment.get("order_id") != razorpay_order_id:
+        raise HTTPException(status_code=400, detail="Payment does not belong to this Razorpay order")
+    if payment.get("status") != "captured":
+        # Captured payments reach the order through the webhook or reconciliation
+        return {"success": True, "message": "Payment received; confirmation will follow shortly"}
+    
+    order_query = {"$or": [{"id": order_id}, {"order_number": order_id}]}
+    if not await mark_order_paid(order_query, razorpay_order_id, payment, source="checkout"):
+        order = await db.orders.find_one(order_query, {"_id": 0, "payment_status": 1})
+        if not order or order.get("payment_status") != "paid":
+            raise HTTPException(status_code=400, detail="Payment could not be matched to this order; our team will review it")
+    
+    return {"success": True, "message": "Payment verified successfully"}
+
+async def mark_order_paid(order_query: dict, razorpay_order_id: str, payment: dict, source: str) -> bool:
+    """Record a captured Razorpay payment on an order.
+    
+    Checkout callback, webhook and reconciliation all land here; whichever arrives
+    first wins and the rest are no-ops. A payment whose amount or currency doesn't match
+    the order total is never applied: it is logged and flagged on the order for review.
+    """
+    order = await db.orders.find_one(
+        {**order_query, "payment_status": {"$nin": ["paid", "refunded"]}},
+        {"_id": 0, "id": 1, "total": 1}
+    )
+    if not order:
+        return False
+    
+    now = datetime.utcnow()
+    expected = amount_in_paise(order.get("total", 0))
+    if payment.get("amount") != expected or payment.get("currency") != RAZORPAY_CURRENCY:
+        logger.warning(
+            f"Razorpay payment {payment.get('id')} ({payment.get('amount')} {payment.get('currency')}) "
+            f"does not match order {order['id']} ({expected} {RAZORPAY_CURRENCY}); flagged for review"
+        )
+        await db.orders.update_one({"id": order["id"]}, {"$set": {"payment_review": {
+            "payment_id": payment.get("id"),
+            "razorpay_order_id": razorpay_order_id,
+            "amount": payment.get("amount"),
+            "currency": payment.get("currency"),
+            "expected_amount": expected,
+            "source": source,
+            "flagged_at": now
+        }, "updated_at": now}})
+        return False
+    
+    # Matching on total too, so an edit between the read and the write is never paid by a stale check
+    paid = await db.orders.find_one_and_update(
+        {"id": order["id"], "total": order.get("total"), "payment_status": {"$nin": ["paid", "refunded"]}},
+        {"$set": {
+            "payment_status": "paid",
+            "order_status": "confirmed",
+            "payment_id": payment.get("id"),
+            "razorpay_order_id": razorpay_order_id,
+            "payment_confirmed_via": source,
+            "updated_at": now
+        }},
+        projection={"id": 1}
+    )
+    if not paid:
+        return False
+    await commit_stock_reservation(order["id"])
+    return True
+
+# ==================== RAZORPAY WEBHOOKS ====================
+
+PAYMENT_EVENT_POLL_SECONDS = 30
+PAYMENT_EVENT_MAX_ATTEMPTS = 5
+# A "processing" event older than this was abandoned by a crashed worker
+PAYMENT_EVENT_LOCK_SECONDS = 300
+RAZORPAY_RECONCILE_INTERVAL_SECONDS = int(os.environ.get('RAZORPAY_RECONCILE_INTERVAL_SECONDS', '600'))
+# Leave fresh orders to the browser callback and webhook; give up on very old ones
+RAZORPAY_RECONCILE_MIN_AGE = timedelta(minutes=10)
+RAZORPAY_RECONCILE_MAX_AGE = timedelta(hours=48)
+
+# Wakes the event worker as soon as a webhook is stored
+payment_event_signal = asyncio.Event()
+
+@api_router.post("/payment/razorpay/webhook")
+async def razorpay_webhook(request: Request):
+    """Receive Razorpay webhooks: verify, store and acknowledge; processing happens in the background"""
+    body = await request.body()
+    settings = await db.settings.find_one({"id": "site_settings"}, {"_id": 0, "razorpay_webhook_secret": 1})
+    secret = settings.get("razorpay_webhook_secret") if settings else None
+    if not secret:
+        raise HTTPException(status_code=400, detail="Razorpay webhook secret not configured")
+    
+    if not verify_webhook_signature(secret, body, request.headers.get("x-razorpay-signature")):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+    
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    
+    now = datetime.utcnow()
+    event_id = request.headers.get("x-razorpay-event-id") or hashlib.sha256(body).hexdigest()
+    try:
+        await db.payment_events.insert_one({
+            "event_id": event_id,
+            "event": payload.get("event"),
+            "payload": payload,
+            "raw_body": body.decode(),
+            "status": "pending",
+            "attempts": 0,
+            "received_at": now,
+            "available_at": now
+        })
+    except DuplicateKeyError:
+        # Razorpay redelivers until it sees a 2xx; the first copy is already queued
+        return {"status": "duplicate"}
+    
+    payment_event_signal.set()
+    return {"status": "accepted"}
+
+async def apply_razorpay_event(payload: dict):
+    """Fold one webhook event into order state"""
+    event = payload.get("event")
+    entities = payload.get("payload", {})
+    payment = entities.get("payment", {}).get("entity", {})
+    razorpay_order = entities.get("order", {}).get("entity", {})
+    razorpay_order_id = payment.get("order_id") or razorpay_order.get("id")
+    if not razorpay_order_id:
+        return
+    
+    # Orders created before razorpay_order_id was stored (or whose checkout was retried) are
+    # found through the notes; the server writes those, and mark_order_paid checks the amount
+    notes = razorpay_order.get("notes") or payment.get("notes") or {}
+    order_query = {"razorpay_order_id": razorpay_order_id}
+    if notes.get("order_id"):
+        order_query = {"$or": [
+            {"razorpay_order_id": razorpay_order_id},
+            {"id": notes["order_id"]},
+            {"order_number": notes["order_id"]}
+        ]}
+    
+    if event in ["payment.captured", "order.paid"]:
+        await mark_order_paid(order_query, razorpay_order_id, payment, source="webhook")
+    elif event == "payment.failed":
         await db.orders.update_one(
-            {"$or": [{"id": order_id}, {"order_number": order_id}]},
+            {**order_query, "payment_status": "pending"},
             {"$set": {
-                "payment_status": "paid",
-                "order_status": "confirmed",
-                "payment_id": razorpay_payment_id,
-                "razorpay_order_id": razorpay_order_id,
+                "payment_error": payment.get("error_description") or "Payment failed",
                 "updated_at": datetime.utcnow()
             }}
         )
+
+async def process_payment_events() -> int:
+    """Drain queued webhook events; safe to run in several workers at once"""
+    processed = 0
+    while True:
+        now = datetime.utcnow()
+        event = await db.payment_events.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "available_at": {"$lte": now}},
+                {"status": "processing", "locked_at": {"$lt": now - timedelta(seconds=PAYMENT_EVENT_LOCK_SECONDS)}}
+            ]},
+            {"$set": {"status": "processing", "locked_at": now}, "$inc": {"attempts": 1}},
+            sort=[("received_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if not event:
+            return processed
+        
+        try:
+            await apply_razorpay_event(event["payload"])
+            await db.payment_events.update_one(
+                {"_id": event["_id"]},
+                {"$set": {"status": "processed", "processed_at": datetime.utcnow()}}
+            )
+        except Exception as e:
+            failed = event["attempts"] >= PAYMENT_EVENT_MAX_ATTEMPTS
+            logger.warning(f"Payment event {event['event_id']} failed (attempt {event['attempts']}): {e}")
+            await db.payment_events.update_one(
+                {"_id": event["_id"]},
+                {"$set": {
+                    "status": "failed" if failed else "pending",
+                    "last_error": str(e),
+                    "available_at": datetime.utcnow() + timedelta(seconds=30 * 2 ** event["attempts"])
+                }}
+            )
+        processed += 1
+
+async def payment_event_worker():
+    while True:
+        payment_event_signal.clear()
+        try:
+            await process_payment_events()
+        except Exception as e:
+            logger.warning(f"Payment event processing failed: {e}")
+        try:
+            await asyncio.wait_for(payment_event_signal.wait(), timeout=PAYMENT_EVENT_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+async def reconcile_razorpay_payments() -> int:
+    """Ask Razorpay about unpaid orders whose callback and webhook both went missing.
     
-    return {"success": True, "message": "Payment verified successfully"}
+    Orders the stock sweeper already expired are included: a payment captured after the
+    hold lapsed still marks the order paid, and commit_stock_reservation takes the stock again.
+    """
+    settings = await db.settings.find_one(
+        {"id": "site_settings"},
+        {"_id": 0, "razorpay_enabled": 1, "razorpay_key_id": 1, "razorpay_key_secret": 1}
+    )
+    if not settings or not settings.get("razorpay_enabled"):
+        return 0
+    key_id = settings.get("razorpay_key_id")
+    key_secret = settings.get("razorpay_key_secret")
+    if not key_id or not key_secret:
+        return 0
+    
+    now = datetime.utcnow()
+    orders = await db.orders.find(
+        {
+            "razorpay_order_id": {"$exists": True},
+            "payment_status": {"$in": ["pending", "expired"]},
+            "created_at": {"$gte": now - RAZORPAY_RECONCILE_MAX_AGE, "$lte": now - RAZORPAY_RECONCILE_MIN_AGE}
+        },
+        {"_id": 0, "id": 1, "razorpay_order_id": 1}
+    # Least recently checked first, so abandoned checkouts can't starve the rest of the window
+    ).sort("reconcile_checked_at", 1).to_list(100)
+    
+    reconciled = 0
+    for order in orders:
+        try:
+            payments = await payment_gateway.fetch_order_payments(key_id, key_secret, order["razorpay_order_id"])
+        except RazorpayGatewayError as e:
+            logger.warning(f"Reconciliation lookup failed for {order['razorpay_order_id']}: {e}")
+            continue
+        captured = next((p for p in payments.get("items", []) if p.get("status") == "captured"), None)
+        if not captured:
+            await db.orders.update_one({"id": order["id"]}, {"$set": {"reconcile_checked_at": now}})
+        elif await mark_order_paid({"id": order["id"]}, order["razorpay_order_id"], captured, source="reconciliation"):
+            reconciled += 1
+    return reconciled
+
+async def razorpay_reconciliation_sweeper():
+    while True:
+        await asyncio.sleep(RAZORPAY_RECONCILE_INTERVAL_SECONDS)
+        try:
+            reconciled = await reconcile_razorpay_payments()
+            if reconciled:
+                logger.info(f"Reconciled {reconciled} Razorpay payments")
+        except Exception as e:
+            logger.warning(f"Razorpay reconciliation failed: {e}")
 
 @api_router.get("/payment/razorpay/config")
 async def get_razorpay_config():
@@ -1248,17 +1949,53 @@ async def validate_coupon(code: str, subtotal: float):
     
     return {"valid": True, "discount": discount, "code": coupon["code"]}
 
+async def claim_coupon_use(code: str) -> bool:
+    """Count one use of a coupon, only while it is active, unexpired and under its usage limit"""
+    result = await db.coupons.update_one(
+        {"code": code, "is_active": True, "$and": [
+            {"$or": [{"valid_until": None}, {"valid_until": {"$gte": datetime.utcnow()}}]},
+            {"$or": [
+                {"usage_limit": {"$in": [None, 0]}},
+                {"$expr": {"$lt": [{"$ifNull": ["$used_count", 0]}, "$usage_limit"]}}
+            ]}
+        ]},
+        {"$inc": {"used_count": 1}}
+    )
+    return result.modified_count == 1
+
+async def release_coupon_use(code: Optional[str]):
+    """Give back a use claimed by an order that was never placed"""
+    if code:
+        await db.coupons.update_one({"code": code, "used_count": {"$gt": 0}}, {"$inc": {"used_count": -1}})
+
 # ==================== SETTINGS ROUTES ====================
 
+# Checkout reads settings on every quote. Other workers drop their copy when the invalidation
+# bus sees an admin edit; the TTL bounds staleness when change streams are unavailable
+SETTINGS_CACHE_TTL_SECONDS = 30
+site_settings_cache: Dict[str, tuple] = {}
+invalidation_bus.register("site_settings", ["settings"], lambda event: site_settings_cache.clear())
+
+async def cached_site_settings() -> dict:
+    cached = site_settings_cache.get("site_settings")
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    settings = await db.settings.find_one({"id": "site_settings"}, {"_id": 0}) or SiteSettings().dict()
+    site_settings_cache["site_settings"] = (time.monotonic() + SETTINGS_CACHE_TTL_SECONDS, settings)
+    return settings
+
 @api_router.get("/settings")
 async def get_settings():
     settings = await db.settings.find_one({"id": "site_settings"}, {"_id": 0})
     if not settings:
         settings = SiteSettings().dict()
-        await db.settings.insert_one(settings)
-    # Remove sensitive data for public endpoint
-    public_settings = {k: v for k, v in settings.items() if not any(x in k for x in ['secret', 'password', 'smtp_'])}
-    return public_settings
+        # insert_one adds an ObjectId _id to the dict it is given
+        await db.settings.insert_one(dict(settings))
+    return public_site_settings(settings)
+
+def public_site_settings(settings: dict) -> dict:
+    """Settings without keys, passwords and SMTP details, for public endpoints"""
+    return {k: v for k, v in settings.items() if not any(x in k for x in ['secret', 'password', 'smtp_'])}
 
 # ==================== MEDIA ROUTES ====================
 
@@ -1303,6 +2040,7 @@ async def setup_admin(admin_data: AdminCreate):
     )
     user_dict = user.dict()
     user_dict["password_hash"] = get_password_hash(admin_data.password)
+    user_dict["search_keys"] = user_search_keys(user_dict)
     
     await db.users.insert_one(user_dict)
     token = create_access_token({"sub": user.id, "role": user.role})
@@ -1326,80 +2064,90 @@ async def reset_admin_password(admin_data: AdminCreate):
     
     return {"success": True, "message": "Admin password reset successfully"}
 
+DASHBOARD_QUERY_TIMEOUT_SECONDS = float(os.environ.get('DASHBOARD_QUERY_TIMEOUT_SECONDS', '2'))
+# Customer totals only move on registration; a minute-old figure is fine for the dashboard
+DASHBOARD_COUNT_TTL_SECONDS = 60
+dashboard_counts: Dict[str, tuple] = {}
+
+def drop_dashboard_counts(event):
+    # Counts only move when documents come or go; a role edit shows up within the TTL
+    if event.resync or event.operation in ("insert", "delete"):
+        for key in [key for key in dashboard_counts if event.resync or key.startswith(f"{event.collection}:")]:
+            dashboard_counts.pop(key, None)
+
+invalidation_bus.register("dashboard_counts", ["users"], drop_dashboard_counts)
+
+async def cached_count(collection, query: dict) -> int:
+    key = f"{collection.name}:{json.dumps(query, sort_keys=True)}"
+    cached = dashboard_counts.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    value = await collection.count_documents(query, maxTimeMS=int(DASHBOARD_QUERY_TIMEOUT_SECONDS * 1000))
+    dashboard_counts[key] = (time.monotonic() + DASHBOARD_COUNT_TTL_SECONDS, value)
+    return value
+
+async def gather_with_timeouts(section: str, queries: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """Run named awaitables concurrently; one that fails or overruns yields None.
+    Each is timed as `section.name`, so it shows in the Server-Timing header and /metrics"""
+    async def run(name, query):
+        with track(f"{section}.{name}"):
+            try:
+                return await asyncio.wait_for(query, timeout)
+            except Exception as e:
+                logger.warning(f"{section} query {name} failed: {e!r}")
+                return None
+    
+    values = await asyncio.gather(*(run(name, query) for name, query in queries.items()))
+    return dict(zip(queries, values))
+
 @api_router.get("/admin/dashboard")
 async def admin_dashboard(admin = Depends(get_admin_user)):
-    try:
-        total_orders = await db.orders.count_documents({})
-        total_users = await db.users.count_documents({"role": "user"})
-        total_products = await db.products.count_documents({})
-        
+    """Stats fan out concurrently; any query that fails or times out is reported in `partial`"""
+    max_time_ms = int(DASHBOARD_QUERY_TIMEOUT_SECONDS * 1000)
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow_start = today_start + timedelta(days=1)
+    
+    async def total_revenue():
         # Revenue - handle both paid statuses
-        pipeline = [
+        result = await db.orders.aggregate([
             {"$match": {"payment_status": {"$in": ["paid", "completed"]}}},
             {"$group": {"_id": None, "total": {"$sum": "$total"}}}
-        ]
-        revenue_result = await db.orders.aggregate(pipeline).to_list(1)
-        total_revenue = revenue_result[0]["total"] if revenue_result else 0
-        
-        # Pending orders
-        pending_orders = await db.orders.count_documents({"order_status": "pending"})
-        
-        # Today's orders - use string comparison for dates stored as strings
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_str = today_start.isoformat()
-        
-        # Count today's orders by checking if created_at string starts with today's date
-        today_date_str = today_start.strftime("%Y-%m-%d")
-        all_orders = await db.orders.find({}, {"created_at": 1}).to_list(1000)
-        today_orders = 0
-        for order in all_orders:
-            created = order.get("created_at", "")
-            if isinstance(created, str) and created.startswith(today_date_str):
-                today_orders += 1
-            elif isinstance(created, datetime) and created >= today_start:
-                today_orders += 1
-        
-        # Recent orders
-        recent_orders = await db.orders.find({}, {"_id": 0}).sort("created_at", -1).limit(10).to_list(10)
-        
-        # Order stats by status
-        status_pipeline = [
+        ], maxTimeMS=max_time_ms).to_list(1)
+        return result[0]["total"] if result else 0
+    
+    async def order_status_stats():
+        stats = await db.orders.aggregate([
             {"$group": {"_id": "$order_status", "count": {"$sum": 1}}}
-        ]
-        status_stats = await db.orders.aggregate(status_pipeline).to_list(10)
-        
+        ], maxTimeMS=max_time_ms).to_list(10)
+        return {s["_id"]: s["count"] for s in stats if s["_id"]}
+    
+    results = await gather_with_timeouts("dashboard", {
+        # Collection metadata, not a scan
+        "total_orders": db.orders.estimated_document_count(maxTimeMS=max_time_ms),
+        "total_products": db.products.estimated_document_count(maxTimeMS=max_time_ms),
+        "total_users": cached_count(db.users, {"role": "user"}),
+        "total_revenue": total_revenue(),
+        "pending_orders": db.orders.count_documents({"order_status": "pending"}, maxTimeMS=max_time_ms),
+        # Older orders stored created_at as an ISO string; range queries only match their own type
+        "today_orders": db.orders.count_documents({"$or": [
+            {"created_at": {"$gte": today_start, "$lt": tomorrow_start}},
+            {"created_at": {"$gte": today_start.isoformat(), "$lt": tomorrow_start.isoformat()}}
+        ]}, maxTimeMS=max_time_ms),
+        "recent_orders": db.orders.find({}, {"_id": 0, "search_keys": 0}).sort("created_at", -1).limit(10)
+            .max_time_ms(max_time_ms).to_list(10),
+        "order_status_stats": order_status_stats()
+    }, DASHBOARD_QUERY_TIMEOUT_SECONDS)
+    
+    return {
+        "stats": {name: results[name] for name in (
+            "total_orders", "total_users", "total_products", "total_revenue", "pending_orders", "today_orders"
+        )},
+        "recent_orders": results["recent_orders"] or [],
+        "order_status_stats": results["order_status_stats"] or {},
         # Monthly revenue - simplified for string dates
-        monthly_stats = []
-        
-        return {
-            "stats": {
-                "total_orders": total_orders,
-                "total_users": total_users,
-                "total_products": total_products,
-                "total_revenue": total_revenue,
-                "pending_orders": pending_orders,
-                "today_orders": today_orders
-            },
-            "recent_orders": recent_orders,
-            "order_status_stats": {s["_id"]: s["count"] for s in status_stats if s["_id"]},
-            "monthly_stats": monthly_stats
-        }
-    except Exception as e:
-        print(f"Dashboard error: {e}")
-        # Return basic stats on error
-        return {
-            "stats": {
-                "total_orders": await db.orders.count_documents({}),
-                "total_users": await db.users.count_documents({"role": "user"}),
-                "total_products": await db.products.count_documents({}),
-                "total_revenue": 0,
-                "pending_orders": await db.orders.count_documents({"order_status": "pending"}),
-                "today_orders": 0
-            },
-            "recent_orders": [],
-            "order_status_stats": {},
-            "monthly_stats": []
-        }
+        "monthly_stats": [],
+        "partial": [name for name, value in results.items() if value is None]
+    }
 
 # ========== ADVANCED ANALYTICS APIs ==========
 
@@ -1471,7 +2219,7 @@ async def admin_analytics(
         top_products = sorted(product_sales.values(), key=lambda x: x["revenue"], reverse=True)[:10]
         
         # Low stock products
-        low_stock = await db.products.find({"stock": {"$lt": 10}}, {"_id": 0, "name": 1, "stock": 1, "id": 1}).to_list(20)
+        low_stock = await db.products.find({"stock_quantity": {"$lt": 10}}, {"_id": 0, "name": 1, "stock_quantity": 1, "id": 1}).sort("stock_quantity", 1).to_list(20)
         
         return {
             "daily_revenue": sorted(daily_revenue.values(), key=lambda x: x["date"]),
@@ -1499,10 +2247,10 @@ async def export_report(
             orders = await db.orders.find({}, {"_id": 0}).to_list(10000)
             return {"data": orders, "type": "orders", "count": len(orders)}
         elif report_type == "customers":
-            customers = await db.users.find({"role": "user"}, {"_id": 0, "password_hash": 0}).to_list(10000)
+            customers = await db.users.find({"role": "user"}, {"_id": 0, "password_hash": 0, "search_keys": 0}).to_list(10000)
             return {"data": customers, "type": "customers", "count": len(customers)}
         elif report_type == "products":
-            products = await db.products.find({}, {"_id": 0}).to_list(10000)
+            products = await db.products.find({}, PRODUCT_PROJECTION).to_list(10000)
             return {"data": products, "type": "products", "count": len(products)}
         elif report_type == "revenue":
             orders = await db.orders.find({"payment_status": {"$in": ["paid", "completed"]}}, {"_id": 0}).to_list(10000)
@@ -1525,7 +2273,7 @@ class StaffCreate(BaseModel):
 @api_router.get("/admin/staff")
 async def get_staff(admin = Depends(get_admin_user)):
     """Get all staff members"""
-    staff = await db.users.find({"role": {"$in": ["admin", "staff"]}}, {"_id": 0, "password_hash": 0}).to_list(100)
+    staff = await db.users.find({"role": {"$in": ["admin", "staff"]}}, {"_id": 0, "password_hash": 0, "search_keys": 0}).to_list(100)
     return {"staff": staff}
 
 @api_router.post("/admin/staff")
@@ -1537,25 +2285,31 @@ async def create_staff(staff_data: StaffCreate, admin = Depends(get_admin_user))
         raise HTTPException(status_code=400, detail="Email already exists")
     
     staff = {
-        "id": str(uuid.uuid4()),
+        "id": new_id(),
         "name": staff_data.name,
         "email": staff_data.email,
-        "password_hash": pwd_context.hash(staff_data.password),
+        "password_hash": get_password_hash(staff_data.password),
         "role": staff_data.role,
         "permissions": staff_data.permissions,
         "is_active": True,
         "created_at": datetime.utcnow().isoformat()
     }
+    staff["search_keys"] = user_search_keys(staff)
     await db.users.insert_one(staff)
     del staff["password_hash"]
+    del staff["search_keys"]
     return staff
 
 @api_router.put("/admin/staff/{staff_id}")
 async def update_staff(staff_id: str, updates: dict, admin = Depends(get_admin_user)):
     """Update staff member"""
     if "password" in updates:
-        updates["password_hash"] = pwd_context.hash(updates.pop("password"))
+        updates["password_hash"] = get_password_hash(updates.pop("password"))
     updates.pop("password_hash", None)
+    updates.pop("search_keys", None)
+    if {"name", "email", "phone"} & updates.keys():
+        staff = await db.users.find_one({"id": staff_id}, {"_id": 0, "name": 1, "email": 1, "phone": 1}) or {}
+        updates["search_keys"] = user_search_keys({**staff, **updates})
     await db.users.update_one({"id": staff_id}, {"$set": updates})
     return {"message": "Staff updated"}
 
@@ -1612,12 +2366,12 @@ async def get_inventory_alerts(
 ):
     """Get low stock alerts"""
     low_stock = await db.products.find(
-        {"stock": {"$lt": threshold}},
+        {"stock_quantity": {"$lt": threshold}},
         {"_id": 0}
-    ).sort("stock", 1).to_list(100)
+    ).sort("stock_quantity", 1).to_list(100)
     
     out_of_stock = await db.products.find(
-        {"stock": {"$lte": 0}},
+        {"stock_quantity": {"$lte": 0}},
         {"_id": 0}
     ).to_list(100)
     
@@ -1632,27 +2386,17 @@ async def get_inventory_alerts(
 
 @api_router.get("/admin/email-templates")
 async def get_email_templates(admin = Depends(get_admin_user)):
-    """Get email templates"""
-    templates = await db.email_templates.find({}, {"_id": 0}).to_list(50)
-    if not templates:
-        # Return default templates
-        default_templates = [
-            {"id": "order_confirmation", "name": "Order Confirmation", "subject": "Your order {{order_number}} has been confirmed!", "body": "Dear {{customer_name}},\n\nThank you for your order!\n\nOrder Number: {{order_number}}\nTotal: ₹{{total}}\n\nWe'll notify you when your order ships.\n\nBest regards,\nName Craft Team"},
-            {"id": "order_shipped", "name": "Order Shipped", "subject": "Your order {{order_number}} has been shipped!", "body": "Dear {{customer_name}},\n\nGreat news! Your order has been shipped.\n\nOrder Number: {{order_number}}\nTracking ID: {{tracking_id}}\n\nBest regards,\nName Craft Team"},
-            {"id": "order_delivered", "name": "Order Delivered", "subject": "Your order {{order_number}} has been delivered!", "body": "Dear {{customer_name}},\n\nYour order has been delivered!\n\nWe hope you love your purchase. Please leave a review!\n\nBest regards,\nName Craft Team"}
-        ]
-        return {"templates": default_templates}
-    return {"templates": templates}
+    """Email and WhatsApp templates: stored edits over the built-in defaults"""
+    return {"templates": await message_templates.list()}
 
 @api_router.put("/admin/email-templates/{template_id}")
 async def update_email_template(template_id: str, data: dict, admin = Depends(get_admin_user)):
-    """Update email template"""
-    await db.email_templates.update_one(
-        {"id": template_id},
-        {"$set": data},
-        upsert=True
-    )
-    return {"message": "Template updated"}
+    """Update email template; the next send uses the new version"""
+    try:
+        template = await message_templates.save(template_id, data)
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid template: {e}")
+    return {"message": "Template updated", "version": template["version"]}
 
 @api_router.get("/admin/orders")
 async def admin_get_orders(
@@ -1668,14 +2412,10 @@ async def admin_get_orders(
         query["order_status"] = status
     if payment_status:
         query["payment_status"] = payment_status
-    if search:
-        query["$or"] = [
-            {"order_number": {"$regex": search, "$options": "i"}},
-            {"shipping_address.email": {"$regex": search, "$options": "i"}},
-            {"shipping_address.phone": {"$regex": search, "$options": "i"}}
-        ]
+    if search and order_search_clauses(search):
+        query["$or"] = order_search_clauses(search)
     
-    orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    orders = await db.orders.find(query, {"_id": 0, "search_keys": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
     total = await db.orders.count_documents(query)
     
     return {"orders": orders, "total": total}
@@ -1700,6 +2440,11 @@ async def admin_update_order(
     
     await db.orders.update_one({"id": order_id}, {"$set": update})
     
+    if update.get("order_status") == "cancelled":
+        await release_stock_reservation(order_id, "order_cancelled")
+    elif update.get("payment_status") == "paid":
+        await commit_stock_reservation(order_id)
+    
     # Send shipping notification
     settings = await db.settings.find_one({"id": "site_settings"}, {"_id": 0})
     if not settings:
@@ -1707,21 +2452,21 @@ async def admin_update_order(
     
     if update_data.get("order_status") == "shipped" and settings.get("send_shipping_notification", True):
         order["tracking_number"] = update_data.get("tracking_number", order.get("tracking_number"))
-        email_html = generate_shipping_email(order, settings)
+        message = await render_order_message("order_shipped", order, settings)
         background_tasks.add_task(
             send_email,
             order["shipping_address"]["email"],
-            f"Your Order #{order['order_number']} Has Shipped!",
-            email_html
+            message["subject"],
+            message["html"]
         )
         
         # Send WhatsApp shipping notification
         if settings.get("send_whatsapp_shipping_notification", True) and order.get("shipping_address", {}).get("phone"):
-            whatsapp_message = generate_shipping_whatsapp_message(order, settings)
+            message = await render_order_message("whatsapp_order_shipped", order, settings)
             background_tasks.add_task(
                 send_whatsapp_message,
                 order["shipping_address"]["phone"],
-                whatsapp_message
+                message["text"]
             )
     
     return {"success": True}
@@ -1809,7 +2554,7 @@ async def bulk_upload_products(file: UploadFile = File(...), admin = Depends(get
             stock_qty = (row.get('stock_quantity') or row.get('Stock') or '100').strip()
             
             doc = {
-                'id': str(uuid.uuid4()),
+                'id': new_id(),
                 'name': name,
                 'slug': slug,
                 'description': description or f'Beautiful {name}. Perfect gift for your loved ones.',
@@ -1856,7 +2601,7 @@ async def admin_get_products(
     if category:
         query["category"] = category
     
-    products = await db.products.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    products = await db.products.find(query, PRODUCT_PROJECTION).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
     total = await db.products.count_documents(query)
     return {"products": products, "total": total}
 
@@ -1868,12 +2613,47 @@ async def admin_create_product(product_data: ProductCreate, admin = Depends(get_
 
 @api_router.put("/admin/products/{product_id}")
 async def admin_update_product(product_id: str, product_data: Dict[str, Any], admin = Depends(get_admin_user)):
+    # Stock moves through /stock below; a form opened before a sale must not overwrite it
+    product_data = {key: value for key, value in product_data.items() if key not in PRODUCT_MANAGED_FIELDS}
     product_data["updated_at"] = datetime.utcnow()
     result = await db.products.update_one({"id": product_id}, {"$set": product_data})
-    if result.modified_count == 0:
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     return {"success": True}
 
+@api_router.post("/admin/products/{product_id}/stock")
+async def admin_adjust_stock(product_id: str, adjustment: StockAdjustment, admin = Depends(get_admin_user)):
+    """Change stock by ``delta``, or set it to ``quantity`` only if it still equals ``expected``"""
+    if (adjustment.delta is None) == (adjustment.quantity is None):
+        raise HTTPException(status_code=400, detail="Send either delta or quantity")
+    if adjustment.quantity is not None and adjustment.expected is None:
+        raise HTTPException(status_code=400, detail="Setting stock needs the expected current quantity")
+    if (adjustment.quantity or 0) < 0:
+        raise HTTPException(status_code=400, detail="Stock cannot be negative")
+    
+    now = datetime.utcnow()
+    if adjustment.delta is not None:
+        query = {"id": product_id}
+        if adjustment.delta < 0:
+            query["stock_quantity"] = {"$gte": -adjustment.delta}
+        update = {"$inc": {"stock_quantity": adjustment.delta}, "$set": {"updated_at": now}}
+    else:
+        query = {"id": product_id, "stock_quantity": adjustment.expected}
+        update = {"$set": {"stock_quantity": adjustment.quantity, "updated_at": now}}
+    
+    product = await db.products.find_one_and_update(
+        query, update, projection={"_id": 0, "stock_quantity": 1}, return_document=ReturnDocument.AFTER
+    )
+    if product:
+        return {"success": True, "stock_quantity": product["stock_quantity"]}
+    
+    current = await db.products.find_one({"id": product_id}, {"_id": 0, "stock_quantity": 1})
+    if not current:
+        raise HTTPException(status_code=404, detail="Product not found")
+    raise HTTPException(
+        status_code=409, detail=f"Stock is now {current.get('stock_quantity', 0)}; reload and try again"
+    )
+
 @api_router.delete("/admin/products/{product_id}")
 async def admin_delete_product(product_id: str, admin = Depends(get_admin_user)):
     result = await db.products.delete_one({"id": product_id})
@@ -1890,31 +2670,43 @@ async def admin_get_users(
     admin = Depends(get_admin_user)
 ):
     query = {}
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"email": {"$regex": search, "$options": "i"}},
-            {"phone": {"$regex": search, "$options": "i"}}
-        ]
+    if search and user_search_clauses(search):
+        query["$or"] = user_search_clauses(search)
     if role:
         query["role"] = role
     
-    users = await db.users.find(query, {"_id": 0, "password_hash": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    users = await db.users.find(query, {"_id": 0, "password_hash": 0, "search_keys": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
     total = await db.users.count_documents(query)
     return {"users": users, "total": total}
 
 @api_router.get("/admin/users/{user_id}")
 async def admin_get_user(user_id: str, admin = Depends(get_admin_user)):
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0, "search_keys": 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get user's orders
-    orders = await db.orders.find({"user_id": user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    user["orders"] = orders
+    # First page of the user's orders; the rest via /admin/users/{user_id}/orders
+    page = await order_history_page(user_id)
+    user["orders"] = page["orders"]
+    user["orders_next_cursor"] = page["next_cursor"]
     
     return user
 
+@api_router.get("/admin/users/{user_id}/orders")
+async def admin_get_user_orders(
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    admin = Depends(get_admin_user)
+):
+    return await order_history_page(user_id, cursor, limit)
+
+@api_router.post("/admin/orders/link-guest-orders")
+async def admin_link_guest_orders(admin = Depends(get_admin_user)):
+    """Attach guest orders to accounts registered with the same email"""
+    linked = await link_guest_orders()
+    return {"success": True, "orders_linked": linked}
+
 @api_router.put("/admin/users/{user_id}")
 async def admin_update_user(
     user_id: str,
@@ -1927,6 +2719,12 @@ async def admin_update_user(
     if not update:
         raise HTTPException(status_code=400, detail="No valid update data")
     
+    if "name" in update or "phone" in update:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "name": 1, "email": 1, "phone": 1})
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        update["search_keys"] = user_search_keys({**user, **update})
+    
     result = await db.users.update_one({"id": user_id}, {"$set": update})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -1976,6 +2774,8 @@ async def admin_update_settings(settings_data: Dict[str, Any], admin = Depends(g
         {"$set": settings_data},
         upsert=True
     )
+    site_settings_cache.clear()
+    drop_storefront_components("settings")
     return {"success": True}
 
 @api_router.get("/admin/categories")
@@ -2046,7 +2846,12 @@ async def admin_update_refund(
     update_data: Dict[str, Any],
     admin = Depends(get_admin_user)
 ):
-    """Update refund status (approve/reject/process)"""
+    """Update refund status (approve/reject/process)
+    
+    Processing a refund returns the order's stock only when the goods never left
+    (not shipped or delivered) and the whole order is refunded. Pass ``restock``
+    to decide explicitly, e.g. for a returned parcel.
+    """
     refund = await db.refunds.find_one({"id": refund_id}, {"_id": 0})
     if not refund:
         raise HTTPException(status_code=404, detail="Refund not found")
@@ -2063,10 +2868,21 @@ async def admin_update_refund(
         
         # Update order status if refund is processed
         if update_data.get("status") == "processed":
+            order = await db.orders.find_one(
+                {"id": refund["order_id"]}, {"_id": 0, "order_status": 1, "total": 1}
+            ) or {}
+            restock = update_data.get("restock")
+            if restock is None:
+                restock = (
+                    order.get("order_status") not in ["shipped", "delivered"]
+                    and refund["amount"] >= order.get("total", 0)
+                )
             await db.orders.update_one(
                 {"id": refund["order_id"]},
                 {"$set": {"payment_status": "refunded", "order_status": "refunded"}}
             )
+            await release_stock_reservation(refund["order_id"], "refunded", restock=bool(restock))
+            update["restocked"] = bool(restock)
     
     await db.refunds.update_one({"id": refund_id}, {"$set": update})
     return {"success": True}
@@ -2079,46 +2895,127 @@ async def admin_delete_refund(refund_id: str, admin = Depends(get_admin_user)):
         raise HTTPException(status_code=404, detail="Refund not found")
     return {"success": True}
 
+# ==================== RATING SUMMARIES ====================
+# Each product carries rating_count, rating_sum and a per-star histogram of its
+# approved reviews. Moderation adjusts them with $inc; the rebuild recomputes them.
+
+RATING_REBUILD_INTERVAL_SECONDS = 3600
+
+def empty_rating_summary() -> dict:
+    return {"rating_count": 0, "rating_sum": 0, "rating_histogram": {str(star): 0 for star in range(1, 6)}}
+
+def rating_average(product: dict) -> float:
+    count = product.get("rating_count") or 0
+    return round(product.get("rating_sum", 0) / count, 1) if count else 0
+
+async def apply_review_rating(review: dict, direction: int):
+    """Add (1) or remove (-1) an approved review from its product's summary"""
+    rating = review.get("rating")
+    if rating not in range(1, 6):
+        return
+    await db.products.update_one(
+        {"id": review["product_id"]},
+        {"$inc": {"rating_count": direction, "rating_sum": direction * rating, f"rating_histogram.{rating}": direction}}
+    )
+
+async def rebuild_rating_summaries(product_ids: Optional[List[str]] = None) -> int:
+    """Recompute summaries from the approved reviews; returns the number of products changed
+    
+    Each write only lands if the product's count and sum are still what they were before
+    the reviews were read, so a review approved or deleted meanwhile (whose $inc already
+    keeps the summary current) is never overwritten with the older total.
+    """
+    match = {"approved": True}
+    product_query = {}
+    if product_ids:
+        match["product_id"] = {"$in": product_ids}
+        product_query["id"] = {"$in": product_ids}
+    
+    previous = {
+        product["id"]: (product.get("rating_count"), product.get("rating_sum"))
+        async for product in db.products.find(product_query, {"_id": 0, "id": 1, "rating_count": 1, "rating_sum": 1})
+    }
+    summaries: Dict[str, dict] = {}
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": {"product_id": "$product_id", "rating": "$rating"}, "count": {"$sum": 1}}}
+    ]
+    async for row in db.reviews.aggregate(pipeline):
+        rating = row["_id"].get("rating")
+        if rating not in range(1, 6):
+            continue
+        summary = summaries.setdefault(row["_id"]["product_id"], empty_rating_summary())
+        summary["rating_count"] += row["count"]
+        summary["rating_sum"] += row["count"] * rating
+        summary["rating_histogram"][str(rating)] += row["count"]
+    
+    updated, skipped, batch = 0, 0, []
+    
+    async def flush():
+        nonlocal updated, skipped
+        result = await db.products.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+        skipped += len(batch) - result.matched_count
+        batch.clear()
+    
+    for product_id, (rating_count, rating_sum) in previous.items():
+        # None also matches products that have no summary yet
+        batch.append(UpdateOne(
+            {"id": product_id, "rating_count": rating_count, "rating_sum": rating_sum},
+            {"$set": summaries.get(product_id, empty_rating_summary())}
+        ))
+        if len(batch) >= 1000:
+            await flush()
+    if batch:
+        await flush()
+    logger.info(f"Rebuilt rating summaries for {updated} products")
+    if skipped:
+        logger.info(f"{skipped} products changed during the rating rebuild and were left as they are")
+    return updated
+
+async def rating_summary_backfill():
+    try:
+        if await claim_scheduled_run("rating_rebuild", RATING_REBUILD_INTERVAL_SECONDS):
+            await rebuild_rating_summaries()
+    except Exception as e:
+        logger.warning(f"Rating summary backfill failed: {e}")
+
 # ==================== PRODUCT REVIEWS ROUTES ====================
 
 @api_router.get("/products/{product_id}/reviews")
-async def get_product_reviews(product_id: str):
+async def get_product_reviews(product_id: str, limit: int = Query(100, le=100), skip: int = 0):
     """Get approved reviews for a product"""
     reviews = await db.reviews.find(
         {"product_id": product_id, "approved": True}, 
         {"_id": 0, "reviewer_email": 0}
-    ).sort("created_at", -1).to_list(100)
+    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
     
-    # Calculate average rating
-    total_reviews = len(reviews)
-    avg_rating = sum(r.get("rating", 0) for r in reviews) / total_reviews if total_reviews > 0 else 0
+    # Totals come from the product's rating summary, not from the page of reviews
+    product = await db.products.find_one(
+        {"id": product_id}, {"_id": 0, "rating_count": 1, "rating_sum": 1, "rating_histogram": 1}
+    ) or empty_rating_summary()
     
     return {
         "reviews": reviews,
-        "total": total_reviews,
-        "average_rating": round(avg_rating, 1)
+        "total": product.get("rating_count", 0),
+        "average_rating": rating_average(product),
+        "histogram": product.get("rating_histogram", empty_rating_summary()["rating_histogram"])
     }
 
 @api_router.post("/products/{product_id}/reviews")
 async def submit_review(product_id: str, review_data: ReviewCreate):
     """Submit a new product review"""
     # Check if product exists
-    product = await db.products.find_one({"id": product_id})
+    product = await db.products.find_one({"id": product_id}, {"_id": 1})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Check if user has purchased this product (verified purchase)
-    verified_purchase = False
-    orders = await db.orders.find({
-        "user_email": review_data.reviewer_email,
-        "order_status": "delivered"
-    }).to_list(100)
-    
-    for order in orders:
-        for item in order.get("items", []):
-            if item.get("product_id") == product_id or item.get("id") == product_id:
-                verified_purchase = True
-                break
+    # Check if user has purchased this product (verified purchase): one indexed
+    # existence check instead of scanning the customer's orders
+    verified_purchase = await db.orders.find_one(
+        {"user_email": review_data.reviewer_email, "order_status": "delivered", "items.product_id": product_id},
+        {"_id": 1}
+    ) is not None
     
     review = Review(
         product_id=product_id,
@@ -2144,41 +3041,205 @@ async def get_all_reviews(admin: dict = Depends(get_admin_user)):
 @api_router.put("/admin/reviews/{review_id}")
 async def update_review(review_id: str, approved: bool, admin: dict = Depends(get_admin_user)):
     """Approve or reject a review"""
-    result = await db.reviews.update_one(
-        {"id": review_id},
-        {"$set": {"approved": approved}}
+    # Only the request that actually flips the flag adjusts the product's rating summary
+    review = await db.reviews.find_one_and_update(
+        {"id": review_id, "approved": {"$ne": True} if approved else True},
+        {"$set": {"approved": approved}},
+        projection={"_id": 0, "product_id": 1, "rating": 1}
     )
-    if result.matched_count == 0:
+    if review:
+        await apply_review_rating(review, 1 if approved else -1)
+    elif not await db.reviews.find_one({"id": review_id}, {"_id": 1}):
         raise HTTPException(status_code=404, detail="Review not found")
     return {"success": True}
 
 @api_router.delete("/admin/reviews/{review_id}")
 async def delete_review(review_id: str, admin: dict = Depends(get_admin_user)):
     """Delete a review"""
-    result = await db.reviews.delete_one({"id": review_id})
-    if result.deleted_count == 0:
+    review = await db.reviews.find_one_and_delete(
+        {"id": review_id}, projection={"_id": 0, "product_id": 1, "rating": 1, "approved": 1}
+    )
+    if not review:
         raise HTTPException(status_code=404, detail="Review not found")
+    if review.get("approved"):
+        await apply_review_rating(review, -1)
     return {"success": True}
 
+@api_router.post("/admin/reviews/rebuild-ratings")
+async def rebuild_ratings(admin: dict = Depends(get_admin_user)):
+    """Recompute every product's rating summary from its approved reviews"""
+    updated = await rebuild_rating_summaries()
+    return {"success": True, "products_updated": updated}
+
+# ==================== RECOMMENDATIONS ====================
+
+RECOMMENDATIONS_TOP_K = int(os.environ.get('RECOMMENDATIONS_TOP_K', '8'))
+RECOMMENDATIONS_MIN_CO_PURCHASES = int(os.environ.get('RECOMMENDATIONS_MIN_CO_PURCHASES', '1'))
+RECOMMENDATIONS_INTERVAL_SECONDS = int(os.environ.get('RECOMMENDATIONS_INTERVAL_SECONDS', str(6 * 3600)))
+RECOMMENDATIONS_CHECK_SECONDS = 300
+# Orders that never became a purchase say nothing about what goes together
+RECOMMENDATIONS_EXCLUDED_STATUSES = ["cancelled", "refunded"]
+RELATED_CACHE_TTL_SECONDS = 300
+RELATED_CACHE_MAX_ENTRIES = 5000
+RELATED_PRODUCT_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "slug": 1, "price": 1, "original_price": 1, "discount": 1, "image": 1,
+    "hover_image": 1, "category": 1, "in_stock": 1, "rating_count": 1, "rating_sum": 1
+}
+# slug -> (expires, related products)
+related_cache: Dict[str, tuple] = {}
+
+def drop_related_products(event):
+    # Prices, names and in_stock are embedded in the cached lists; a rebuild replaces them wholesale.
+    # Stock and rating counters churn with every sale, so those updates wait for the TTL.
+    if event.collection == "products" and event.only_touches(VOLATILE_PRODUCT_FIELDS):
+        return
+    related_cache.clear()
+
+invalidation_bus.register("related_products", ["products", "recommendations"], drop_related_products)
+
+async def rebuild_recommendations() -> int:
+    """Recompute top-K co-purchased products for every product; returns how many have any"""
+    started = datetime.utcnow()
+    baskets = []
+    async for order in db.orders.find(
+        {"order_status": {"$nin": RECOMMENDATIONS_EXCLUDED_STATUSES}}, {"_id": 0, "items.product_id": 1}
+    ).batch_size(5000):
+        baskets.append([item["product_id"] for item in order.get("items", []) if item.get("product_id")])
+    
+    # NumPy is only needed here, so it loads on the first rebuild rather than at startup
+    from recommendations import co_purchase_recommendations
+    
+    # The counting is CPU-bound; keep it off the event loop
+    related = await asyncio.get_running_loop().run_in_executor(
+        None, co_purchase_recommendations, baskets, RECOMMENDATIONS_TOP_K, RECOMMENDATIONS_MIN_CO_PURCHASES
+    )
+    
+    stored, batch = 0, []
+    async for product in db.products.find({}, {"_id": 0, "id": 1, "slug": 1}):
+        if product["id"] not in related:
+            continue
+        batch.append(UpdateOne({"product_id": product["id"]}, {"$set": {
+            "slug": product.get("slug"), "related": related[product["id"]], "computed_at": started
+        }}, upsert=True))
+        if len(batch) >= 1000:
+            await db.recommendations.bulk_write(batch, ordered=False)
+            stored += len(batch)
+            batch = []
+    if batch:
+        await db.recommendations.bulk_write(batch, ordered=False)
+        stored += len(batch)
+    # Products no longer bought with anything, or deleted
+    await db.recommendations.delete_many({"computed_at": {"$lt": started}})
+    related_cache.clear()
+    logger.info(f"Rebuilt recommendations for {stored} products from {len(baskets)} orders")
+    return stored
+
+async def claim_scheduled_run(name: str, interval_seconds: int) -> bool:
+    """True for the one worker that gets to run `name` this interval"""
+    now = datetime.utcnow()
+    try:
+        # Not due: the filter misses and the upsert collides with the existing run document
+        await db.job_runs.update_one(
+            {"_id": name, "next_run_at": {"$lte": now}},
+            {"$set": {"next_run_at": now + timedelta(seconds=interval_seconds), "started_at": now}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def recommendations_refresher():
+    while True:
+        try:
+            if await claim_scheduled_run("recommendations", RECOMMENDATIONS_INTERVAL_SECONDS):
+                await rebuild_recommendations()
+        except Exception as e:
+            logger.warning(f"Recommendation rebuild failed: {e}")
+        await asyncio.sleep(RECOMMENDATIONS_CHECK_SECONDS)
+
+@api_router.get("/products/{slug}/related")
+async def get_related_products(slug: str, limit: int = Query(RECOMMENDATIONS_TOP_K, ge=1, le=20)):
+    """Customers also bought: precomputed, then cached per slug in memory"""
+    cached = related_cache.get(slug)
+    if not cached or cached[0] <= time.monotonic():
+        recommendation = await db.recommendations.find_one({"slug": slug}, {"_id": 0, "related.product_id": 1})
+        ids = [r["product_id"] for r in recommendation["related"]] if recommendation else []
+        products = []
+        if ids:
+            found = await db.products.find(
+                {"id": {"$in": ids}, "is_active": True}, RELATED_PRODUCT_PROJECTION
+            ).to_list(len(ids))
+            by_id = {product["id"]: product for product in found}
+            products = [by_id[product_id] for product_id in ids if product_id in by_id]
+            for product in products:
+                product["rating_average"] = rating_average(product)
+        if len(related_cache) >= RELATED_CACHE_MAX_ENTRIES:
+            related_cache.clear()
+        cached = related_cache[slug] = (time.monotonic() + RELATED_CACHE_TTL_SECONDS, products)
+    return {"products": cached[1][:limit]}
+
+@api_router.post("/admin/recommendations/rebuild")
+async def rebuild_recommendations_now(admin = Depends(get_admin_user)):
+    """Recompute co-purchase recommendations from all orders"""
+    stored = await rebuild_recommendations()
+    return {"success": True, "products": stored}
+
 # ==================== NAVIGATION ROUTES ====================
 
+# Shown until an admin adds items (or seeds these defaults)
+DEFAULT_NAVIGATION = [
+    {"id": "1", "name": "Women", "href": "/collections/for-her", "order": 1, "is_active": True},
+    {"id": "2", "name": "Men", "href": "/collections/for-him", "order": 2, "is_active": True},
+    {"id": "3", "name": "Couples", "href": "/collections/couples", "order": 3, "is_active": True},
+    {"id": "4", "name": "Earrings", "href": "/collections/earrings", "order": 4, "is_active": True},
+    {"id": "5", "name": "Personalized", "href": "/collections/personalized-gifts", "order": 5, "is_active": True, "highlight": True},
+    {"id": "6", "name": "All Products", "href": "/collections/all", "order": 6, "is_active": True}
+]
+
+# Every page view fetches the menu; it changes a few times a year
+NAVIGATION_CACHE_TTL_SECONDS = 300
+NAVIGATION_MAX_ITEMS = 500
+# "menu" -> (expires, tree, JSON bytes, ETag), "building" -> marker of a rebuild in progress.
+# Admin routes clear it here and the invalidation bus clears it in the other workers; the TTL
+# only applies while the bus is down
+navigation_cache: Dict[str, tuple] = {}
+invalidation_bus.register("navigation", ["navigation"], lambda event: navigation_cache.clear())
+
+async def navigation_menu() -> tuple:
+    """(tree, body, etag) for the public menu, built once per change"""
+    cached = navigation_cache.get("menu")
+    if cached and (invalidation_bus.live or cached[0] > time.monotonic()):
+        return cached[1:]
+    # A clear() while we read drops the marker, so a menu built from old items is never stored
+    building = navigation_cache["building"] = object()
+    items = await db.navigation.find({}, {"_id": 0}).to_list(NAVIGATION_MAX_ITEMS)
+    tree = build_navigation_tree(items) or [dict(item, children=[]) for item in DEFAULT_NAVIGATION]
+    body = json.dumps(jsonable_encoder(tree), separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if navigation_cache.get("building") is building:
+        navigation_cache["menu"] = (time.monotonic() + NAVIGATION_CACHE_TTL_SECONDS, tree, body, etag)
+    return tree, body, etag
+
+def not_modified(request: Request, etag: str) -> bool:
+    return etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+
 @api_router.get("/navigation")
-async def get_navigation():
-    """Get public navigation items"""
-    nav_items = await db.navigation.find({"is_active": True}, {"_id": 0}).sort("order", 1).to_list(100)
-    
-    # If no navigation items exist, return default
-    if not nav_items:
-        nav_items = [
-            {"id": "1", "name": "Women", "href": "/collections/for-her", "order": 1, "is_active": True},
-            {"id": "2", "name": "Men", "href": "/collections/for-him", "order": 2, "is_active": True},
-            {"id": "3", "name": "Couples", "href": "/collections/couples", "order": 3, "is_active": True},
-            {"id": "4", "name": "Earrings", "href": "/collections/earrings", "order": 4, "is_active": True},
-            {"id": "5", "name": "Personalized", "href": "/collections/personalized-gifts", "order": 5, "is_active": True, "highlight": True},
-            {"id": "6", "name": "All Products", "href": "/collections/all", "order": 6, "is_active": True}
-        ]
-    
-    return nav_items
+async def get_navigation(request: Request):
+    """Public menu as a tree: top-level items with nested `children`, served pre-rendered"""
+    _, body, etag = await navigation_menu()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def check_navigation_parent(nav_id: Optional[str], parent_id: Optional[str]):
+    if not parent_id:
+        return
+    items = await db.navigation.find({}, {"_id": 0, "id": 1, "parent_id": 1}).to_list(NAVIGATION_MAX_ITEMS)
+    if parent_id not in {item["id"] for item in items}:
+        raise HTTPException(status_code=400, detail="Parent navigation item not found")
+    if nav_id and creates_cycle(items, nav_id, parent_id):
+        raise HTTPException(status_code=400, detail="A navigation item cannot be nested under itself")
 
 @api_router.get("/admin/navigation")
 async def admin_get_navigation(admin = Depends(get_admin_user)):
@@ -2190,15 +3251,20 @@ async def admin_get_navigation(admin = Depends(get_admin_user)):
 async def admin_create_navigation(nav_data: Dict[str, Any], admin = Depends(get_admin_user)):
     """Create a navigation item"""
     nav_item = NavigationItem(**nav_data)
+    await check_navigation_parent(None, nav_item.parent_id)
     await db.navigation.insert_one(nav_item.dict())
+    navigation_cache.clear()
     return nav_item.dict()
 
 @api_router.put("/admin/navigation/{nav_id}")
 async def admin_update_navigation(nav_id: str, nav_data: Dict[str, Any], admin = Depends(get_admin_user)):
     """Update a navigation item"""
+    nav_data.pop("children", None)
+    await check_navigation_parent(nav_id, nav_data.get("parent_id"))
     result = await db.navigation.update_one({"id": nav_id}, {"$set": nav_data})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Navigation item not found")
+    navigation_cache.clear()
     return {"success": True}
 
 @api_router.delete("/admin/navigation/{nav_id}")
@@ -2207,6 +3273,7 @@ async def admin_delete_navigation(nav_id: str, admin = Depends(get_admin_user)):
     result = await db.navigation.delete_one({"id": nav_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Navigation item not found")
+    navigation_cache.clear()
     return {"success": True}
 
 @api_router.post("/admin/navigation/seed")
@@ -2229,8 +3296,103 @@ async def admin_seed_navigation(admin = Depends(get_admin_user)):
             await db.navigation.insert_one(nav_item.dict())
             added += 1
     
+    navigation_cache.clear()
     return {"success": True, "added": added}
 
+# ==================== STOREFRONT BOOTSTRAP ====================
+
+# Everything the storefront shell needs on first paint, in one round trip
+BOOTSTRAP_FEATURED_LIMIT = 20
+# What a product card shows. Stock and rating counters change with every sale and review, so
+# they stay out of the cached list (and its version); the product page reads them live
+FEATURED_PRODUCT_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "slug": 1, "price": 1, "original_price": 1, "discount": 1, "image": 1,
+    "hover_image": 1, "category": 1
+}
+# Components expire after this only while the invalidation bus is down
+STOREFRONT_CACHE_TTL_SECONDS = 60
+BOOTSTRAP_CACHE_MAX_ENTRIES = 8
+# name -> (expires, value, version); "name:building" marks a rebuild in progress
+storefront_cache: Dict[str, tuple] = {}
+# ETag -> rendered payload. The ETag is derived from the component versions, so an entry
+# never goes stale; it just stops being asked for
+bootstrap_cache: Dict[str, bytes] = {}
+
+def drop_storefront_components(*names: str):
+    for name in names:
+        storefront_cache.pop(name, None)
+        storefront_cache.pop(f"{name}:building", None)
+
+invalidation_bus.register("storefront_settings", ["settings"], lambda event: drop_storefront_components("settings"))
+invalidation_bus.register("storefront_categories", ["categories"], lambda event: drop_storefront_components("categories"))
+
+def drop_featured_products(event):
+    if not event.only_touches(VOLATILE_PRODUCT_FIELDS):
+        drop_storefront_components("featured_products")
+
+invalidation_bus.register("storefront_featured", ["products"], drop_featured_products)
+
+def content_version(value) -> str:
+    return hashlib.sha256(json.dumps(jsonable_encoder(value), sort_keys=True).encode()).hexdigest()[:16]
+
+async def storefront_component(name: str, load) -> tuple:
+    """(value, version) of one bootstrap component, loaded once per change"""
+    cached = storefront_cache.get(name)
+    if cached and (invalidation_bus.live or cached[0] > time.monotonic()):
+        return cached[1:]
+    building = storefront_cache[f"{name}:building"] = object()
+    value = await load()
+    version = content_version(value)
+    if storefront_cache.get(f"{name}:building") is building:
+        storefront_cache[name] = (time.monotonic() + STOREFRONT_CACHE_TTL_SECONDS, value, version)
+    return value, version
+
+async def load_public_settings() -> dict:
+    return public_site_settings(await cached_site_settings())
+
+async def load_categories() -> list:
+    return await db.categories.find({"is_active": True}, {"_id": 0}).sort("order", 1).to_list(100)
+
+async def load_featured_products() -> list:
+    return await db.products.find(
+        {"is_active": True, "is_featured": True}, FEATURED_PRODUCT_PROJECTION
+    ).limit(BOOTSTRAP_FEATURED_LIMIT).to_list(BOOTSTRAP_FEATURED_LIMIT)
+
+async def navigation_component() -> tuple:
+    tree, _, etag = await navigation_menu()
+    return tree, etag.strip('"')
+
+@api_router.get("/bootstrap")
+async def get_bootstrap(request: Request):
+    """Settings, navigation tree, categories and featured products in one cached response.
+    The ETag combines the component versions; a matching If-None-Match gets 304."""
+    with track("bootstrap"):
+        components = dict(zip(
+            ["settings", "navigation", "categories", "featured_products"],
+            await asyncio.gather(
+                storefront_component("settings", load_public_settings),
+                navigation_component(),
+                storefront_component("categories", load_categories),
+                storefront_component("featured_products", load_featured_products)
+            )
+        ))
+    versions = {name: version for name, (_, version) in components.items()}
+    version = hashlib.sha256(json.dumps(versions, sort_keys=True).encode()).hexdigest()[:32]
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    body = bootstrap_cache.get(etag)
+    if body is None:
+        payload = {"version": version, "versions": versions}
+        payload.update({name: value for name, (value, _) in components.items()})
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        if len(bootstrap_cache) >= BOOTSTRAP_CACHE_MAX_ENTRIES:
+            bootstrap_cache.clear()
+        bootstrap_cache[etag] = body
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # ==================== WHATSAPP TEST ====================
 
 @api_router.post("/admin/test-whatsapp")
@@ -2275,195 +3437,195 @@ async def test_email(to_email: str, admin = Depends(get_admin_user)):
     else:
         raise HTTPException(status_code=500, detail="Failed to send test email. Check SMTP configuration.")
 
-# ==================== SEED DATA ====================
-
-@api_router.post("/admin/seed")
-async def seed_data(admin = Depends(get_admin_user)):
-    """Seed initial data"""
-    # Seed categories
-    categories = [
-        {"name": "Her", "slug": "for-her", "order": 1, "image": "https://images.pexels.com/photos/4550854/pexels-photo-4550854.jpeg?w=800"},
-        {"name": "Him", "slug": "for-him", "order": 2, "image": "https://images.pexels.com/photos/3070012/pexels-photo-3070012.jpeg?w=800"},
-        {"name": "Kids", "slug": "kids", "order": 3, "image": "https://images.pexels.com/photos/5737277/pexels-photo-5737277.jpeg?w=800"},
-        {"name": "Couple", "slug": "couple", "order": 4, "image": "https://images.pexels.com/photos/121848/pexels-photo-121848.jpeg?w=800"},
-        {"name": "Cultural", "slug": "cultural", "order": 5},
-        {"name": "Express Ship", "slug": "express-ship", "order": 6},
-    ]
-    
-    for cat in categories:
-        existing = await db.categories.find_one({"slug": cat["slug"]})
-        if not existing:
-            category = Category(**cat)
-            await db.categories.insert_one(category.dict())
-    
-    # Seed products
-    products = [
-        {"name": "Men Circle Bracelet", "slug": "men-circle-bracelet", "price": 1499, "original_price": 2499, "discount": 40, "image": "https://images.pexels.com/photos/3634366/pexels-photo-3634366.jpeg?w=533", "hover_image": "https://images.pexels.com/photos/32039109/pexels-photo-32039109.jpeg?w=533", "category": "for-him", "is_featured": True, "description": "Stylish men's circle bracelet with personalized engraving"},
-        {"name": "Rainbow Kids Name Necklace", "slug": "rainbow-kids-necklace", "price": 1499, "original_price": 1899, "discount": 21, "image": "https://images.unsplash.com/photo-1601121141461-9d6647bca1ed?w=533&q=80", "hover_image": "https://images.unsplash.com/photo-1600862754152-80a263dd564f?w=533&q=80", "category": "kids", "is_featured": True},
-        {"name": "Chic Signature Name Necklace", "slug": "chic-signature-necklace", "price": 1499, "original_price": 1899, "discount": 21, "image": "https://images.unsplash.com/photo-1623321673989-830eff0fd59f?w=533&q=80", "hover_image": "https://images.pexels.com/photos/4550854/pexels-photo-4550854.jpeg?w=533", "category": "for-her", "is_featured": True},
-        {"name": "Heart Name Necklace", "slug": "heart-name-necklace", "price": 1499, "original_price": 1899, "discount": 21, "image": "https://images.unsplash.com/photo-1622398925373-3f91b1e275f5?w=533&q=80", "hover_image": "https://images.unsplash.com/photo-1598560917807-1bae44bd2be8?w=533&q=80", "category": "for-her", "is_featured": True},
-        {"name": "Zirconia Bar Necklace", "slug": "zirconia-bar-necklace", "price": 1799, "original_price": 2499, "discount": 28, "image": "https://images.unsplash.com/photo-1611955167811-4711904bb9f8?w=533&q=80", "hover_image": "https://images.pexels.com/photos/3674231/pexels-photo-3674231.jpeg?w=533", "category": "for-her", "is_featured": True},
-        {"name": "Dainty Name Necklace", "slug": "dainty-name-necklace", "price": 1499, "original_price": 1899, "discount": 21, "image": "https://images.pexels.com/photos/13924051/pexels-photo-13924051.jpeg?w=533", "hover_image": "https://images.unsplash.com/photo-1601121141461-9d6647bca1ed?w=533&q=80", "category": "for-her", "is_featured": True},
-        {"name": "Men Legacy Bracelet", "slug": "men-legacy-bracelet", "price": 1499, "original_price": 2499, "discount": 40, "image": "https://images.pexels.com/photos/3070012/pexels-photo-3070012.jpeg?w=533", "hover_image": "https://images.pexels.com/photos/3634366/pexels-photo-3634366.jpeg?w=533", "category": "for-him", "is_featured": True},
-        {"name": "Preserved Rose Box & Necklace", "slug": "rose-box-necklace", "price": 1999, "original_price": 3499, "discount": 43, "image": "https://images.pexels.com/photos/10582459/pexels-photo-10582459.jpeg?w=533", "hover_image": "https://images.pexels.com/photos/11952260/pexels-photo-11952260.jpeg?w=533", "category": "for-her", "is_featured": True},
-        {"name": "Circle of Love Bead Necklace", "slug": "circle-love-necklace", "price": 1499, "original_price": 2499, "discount": 40, "image": "https://images.unsplash.com/photo-1600862754152-80a263dd564f?w=533&q=80", "hover_image": "https://images.unsplash.com/photo-1623321673989-830eff0fd59f?w=533&q=80", "category": "for-her", "is_featured": False},
-        {"name": "Bond of Love Bracelets Set", "slug": "bond-love-bracelets", "price": 1499, "original_price": 2199, "discount": 32, "image": "https://images.pexels.com/photos/121848/pexels-photo-121848.jpeg?w=533", "hover_image": "https://images.pexels.com/photos/3634366/pexels-photo-3634366.jpeg?w=533", "category": "couple", "is_featured": False},
-        {"name": "Couple Name Ring", "slug": "couple-name-ring", "price": 1499, "original_price": 1899, "discount": 21, "image": "https://images.unsplash.com/photo-1611955167811-4711904bb9f8?w=533&q=80", "hover_image": "https://images.unsplash.com/photo-1622398925373-3f91b1e275f5?w=533&q=80", "category": "couple", "is_featured": False},
-    ]
-    
-    for prod in products:
-        existing = await db.products.find_one({"slug": prod["slug"]})
-        if not existing:
-            product = Product(**prod)
-            await db.products.insert_one(product.dict())
-    
-    # Seed default coupons
-    coupons = [
-        {"code": "SAVE10", "discount_type": "percentage", "discount_value": 10, "min_order_amount": 1000},
-        {"code": "FLAT100", "discount_type": "fixed", "discount_value": 100, "min_order_amount": 1499},
-        {"code": "VALENTINE", "discount_type": "percentage", "discount_value": 15, "min_order_amount": 1000, "max_discount": 500},
-    ]
-    
-    for coup in coupons:
-        existing = await db.coupons.find_one({"code": coup["code"]})
-        if not existing:
-            coupon = Coupon(**coup)
-            await db.coupons.insert_one(coupon.dict())
-    
-    # Seed settings
-    settings = await db.settings.find_one({"id": "site_settings"})
-    if not settings:
-        await db.settings.insert_one(SiteSettings().dict())
-    
-    return {"success": True, "message": "Data seeded successfully"}
+# ==================== MARKETING BROADCASTS ====================
+
+BROADCAST_RATE_PER_SECOND = float(os.environ.get('BROADCAST_RATE_PER_SECOND', '10'))
+BROADCAST_BATCH_SIZE = int(os.environ.get('BROADCAST_BATCH_SIZE', '200'))
+# The worker runs in its own process, so it finds new and resumed broadcasts by polling
+BROADCAST_POLL_SECONDS = 10
+BROADCAST_MAX_ATTEMPTS = 5
+# A "running" broadcast whose checkpoint is older than this lost its worker
+BROADCAST_LOCK_SECONDS = 300
+BROADCAST_TEMPLATES = {"email": "sale_announcement", "whatsapp": "whatsapp_sale_announcement"}
+# Stored on the broadcast by name; operator keys can't be saved in a document
+BROADCAST_AUDIENCES = {
+    "customers": {"role": "user", "is_active": {"$ne": False}, "marketing_opt_out": {"$ne": True}}
+}
+# Identifies this process's claims on the broadcasts collection
+BROADCAST_WORKER_ID = new_id()
+
+class BroadcastCreate(BaseModel):
+    name: Optional[str] = None
+    channels: List[str] = ["email"]
+    rate_per_second: Optional[float] = Field(None, gt=0)
+    batch_size: Optional[int] = Field(None, ge=1, le=1000)
 
-# ==================== DATA MIGRATION ====================
+async def broadcast_settings() -> dict:
+    # Settings saved field by field may lack the sale defaults
+    stored = await db.settings.find_one({"id": "site_settings"}, {"_id": 0}) or {}
+    return {**SiteSettings().dict(), **stored}
 
-@api_router.post("/admin/seed-products")
-async def seed_products(admin = Depends(get_admin_user)):
-    """One-time migration: Delete old products and add 35 new products"""
-    
-    # AI Generated Images
-    AI_IMAGES = {
-        'hero_necklace': 'https://static.prod-images.emergentagent.com/jobs/9d1dc081-f684-46a4-910e-adc6bbd703a7/images/f8c6efac80ae614536d1764b9a0a170f7f052c57b2b71df301cd29f7d7098064.png',
-        'rose_box': 'https://static.prod-images.emergentagent.com/jobs/9d1dc081-f684-46a4-910e-adc6bbd703a7/images/5050e972d9dc4fc45ea5f4231b20933ccc5c2499b6c382d95e467787578f8af7.png',
-        'kids_bracelet': 'https://static.prod-images.emergentagent.com/jobs/9d1dc081-f684-46a4-910e-adc6bbd703a7/images/3b0ea511d8cce0fb7b141203688ff7fa9c5f4e711ea338f881f4ef3ab19022ba.png',
-        'infinity_ring': 'https://static.prod-images.emergentagent.com/jobs/9d1dc081-f684-46a4-910e-adc6bbd703a7/images/7cadb3dfad6ec995430963bc1e1301db97653351bb2c2c47038f953bdf0512ee.png',
-        'couple_bracelet': 'https://static.prod-images.emergentagent.com/jobs/9d1dc081-f684-46a4-910e-adc6bbd703a7/images/6391f64240274bca52ba985f92b03ac223f615f672a948c3e8552e1a72193866.png',
+def broadcast_channel_errors(settings: dict, channels: List[str]) -> List[str]:
+    errors = []
+    if "email" in channels and not (settings.get("smtp_user") and settings.get("smtp_password")):
+        errors.append("SMTP is not configured")
+    if "whatsapp" in channels and not (settings.get("whatsapp_enabled") and settings.get("whatsapp_api_token")
+                                       and settings.get("whatsapp_business_phone_id")):
+        errors.append("WhatsApp is not configured")
+    return errors
+
+@api_router.post("/admin/broadcasts")
+async def create_broadcast(data: BroadcastCreate, admin = Depends(get_admin_user)):
+    """Queue a sale announcement to every active customer; sending happens in the background"""
+    channels = list(dict.fromkeys(data.channels))
+    if not channels or any(channel not in BROADCAST_TEMPLATES for channel in channels):
+        raise HTTPException(status_code=400, detail="Channels must be email and/or whatsapp")
+    settings = await broadcast_settings()
+    errors = broadcast_channel_errors(settings, channels)
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
+    if not settings.get("sale_active"):
+        raise HTTPException(status_code=400, detail="No active sale to announce")
+    
+    now = datetime.utcnow()
+    broadcast = {
+        "id": new_id(),
+        "name": data.name or settings.get("sale_title") or "Sale announcement",
+        "channels": channels,
+        "template_ids": {channel: BROADCAST_TEMPLATES[channel] for channel in channels},
+        "rate_per_second": data.rate_per_second or BROADCAST_RATE_PER_SECOND,
+        "batch_size": data.batch_size or BROADCAST_BATCH_SIZE,
+        "audience": "customers",
+        "status": "queued",
+        "checkpoint": None,
+        "counts": {"processed": 0},
+        "attempts": 0,
+        "lock_owner": None,
+        "created_by": admin.get("email"),
+        "created_at": now,
+        "updated_at": now
     }
-    
-    STOCK = [
-        'https://images.unsplash.com/photo-1758995115518-26f90aa61b97?w=600',
-        'https://images.unsplash.com/photo-1758995115643-1e8348bfde39?w=600',
-        'https://images.unsplash.com/photo-1601121141499-17ae80afc03a?w=600',
-        'https://images.pexels.com/photos/14509757/pexels-photo-14509757.jpeg?w=600',
-        'https://images.unsplash.com/photo-1668619322685-e634175f8182?w=600',
-        'https://images.unsplash.com/photo-1681091636907-85eb440dfe06?w=600',
-        'https://images.pexels.com/photos/14509642/pexels-photo-14509642.jpeg?w=600',
-        'https://images.unsplash.com/photo-1588909006332-2e30f95291bc?w=600',
-        'https://images.unsplash.com/photo-1720528347642-e70ea18b4140?w=600',
-        'https://images.pexels.com/photos/29612233/pexels-photo-29612233.jpeg?w=600',
-        'https://images.unsplash.com/photo-1761210875101-1273b9ae5600?w=600',
-        'https://images.unsplash.com/photo-1758995115543-983c55f98a33?w=600',
-        'https://images.unsplash.com/photo-1761211115639-54394f139142?w=600',
-        'https://images.unsplash.com/photo-1761211106346-939cb32005d7?w=600',
-        'https://images.pexels.com/photos/29193429/pexels-photo-29193429.jpeg?w=600',
-        'https://images.unsplash.com/photo-1766560362710-b1d951aab881?w=600',
-        'https://images.pexels.com/photos/16849040/pexels-photo-16849040.png?w=600',
-        'https://images.pexels.com/photos/7104205/pexels-photo-7104205.jpeg?w=600',
-        'https://images.pexels.com/photos/29218181/pexels-photo-29218181.jpeg?w=600',
-        'https://images.pexels.com/photos/16304556/pexels-photo-16304556.jpeg?w=600',
-    ]
-    
-    PRODUCTS = [
-        {'name': 'Personalized Name Necklace', 'category': 'for-her', 'price': 1299, 'original_price': 1999, 'discount': 35, 'image': AI_IMAGES['hero_necklace'], 'description': 'Elegant personalized name necklace crafted with premium quality. Perfect gift for her.', 'is_featured': True},
-        {'name': 'Rose Box Heart Necklace', 'category': 'for-her', 'price': 1999, 'original_price': 2999, 'discount': 33, 'image': AI_IMAGES['rose_box'], 'description': 'Beautiful preserved rose box with gold heart necklace. Romantic gift for special occasions.', 'is_featured': True},
-        {'name': 'Infinity Heart Pendant', 'category': 'for-her', 'price': 1499, 'original_price': 2299, 'discount': 35, 'image': STOCK[10], 'description': 'Stunning infinity heart pendant symbolizing eternal love. Customizable with names.', 'is_featured': False},
-        {'name': 'Initial Letter Necklace', 'category': 'for-her', 'price': 999, 'original_price': 1499, 'discount': 33, 'image': STOCK[11], 'description': 'Delicate initial letter pendant necklace. Personalize with your loved ones initial.', 'is_featured': False},
-        {'name': 'Heart Name Ring Necklace', 'category': 'for-her', 'price': 1599, 'original_price': 2499, 'discount': 36, 'image': STOCK[12], 'description': 'Beautiful heart pendant with name rings. Each ring represents someone special.', 'is_featured': False},
-        {'name': 'Layered Chain Necklace', 'category': 'for-her', 'price': 1199, 'original_price': 1799, 'discount': 33, 'image': STOCK[13], 'description': 'Trendy layered chain necklace with customizable pendants.', 'is_featured': False},
-        {'name': 'Classic Gold Name Chain', 'category': 'for-her', 'price': 1799, 'original_price': 2799, 'discount': 36, 'image': STOCK[0], 'description': 'Timeless gold name chain necklace. Premium quality craftsmanship.', 'is_featured': False},
-        {'name': 'Minimalist Bar Necklace', 'category': 'for-her', 'price': 899, 'original_price': 1399, 'discount': 36, 'image': STOCK[14], 'description': 'Sleek minimalist bar necklace with custom engraving option.', 'is_featured': False},
-        {'name': 'Leather Name Bracelet', 'category': 'for-him', 'price': 1299, 'original_price': 1999, 'discount': 35, 'image': AI_IMAGES['couple_bracelet'], 'description': 'Premium leather bracelet with personalized name plate. Perfect for men.', 'is_featured': True},
-        {'name': 'Steel ID Bracelet', 'category': 'for-him', 'price': 1499, 'original_price': 2299, 'discount': 35, 'image': STOCK[18], 'description': 'Stainless steel ID bracelet with custom engraving. Durable and stylish.', 'is_featured': False},
-        {'name': 'Braided Leather Band', 'category': 'for-him', 'price': 999, 'original_price': 1499, 'discount': 33, 'image': STOCK[19], 'description': 'Handcrafted braided leather band with silver clasp.', 'is_featured': False},
-        {'name': 'Mens Beaded Bracelet', 'category': 'for-him', 'price': 799, 'original_price': 1199, 'discount': 33, 'image': STOCK[5], 'description': 'Natural stone beaded bracelet with custom charm.', 'is_featured': False},
-        {'name': 'Anchor Chain Bracelet', 'category': 'for-him', 'price': 1199, 'original_price': 1799, 'discount': 33, 'image': STOCK[6], 'description': 'Bold anchor chain bracelet with name engraving.', 'is_featured': False},
-        {'name': 'Titanium Cuff Bracelet', 'category': 'for-him', 'price': 1599, 'original_price': 2499, 'discount': 36, 'image': STOCK[4], 'description': 'Premium titanium cuff with inner personalization.', 'is_featured': False},
-        {'name': 'Double Wrap Leather', 'category': 'for-him', 'price': 1099, 'original_price': 1699, 'discount': 35, 'image': STOCK[7], 'description': 'Stylish double wrap leather bracelet with magnetic clasp.', 'is_featured': False},
-        {'name': 'Rainbow Name Bracelet', 'category': 'kids', 'price': 699, 'original_price': 999, 'discount': 30, 'image': AI_IMAGES['kids_bracelet'], 'description': 'Colorful rainbow bracelet with personalized name beads. Safe for kids.', 'is_featured': True},
-        {'name': 'Butterfly Charm Bracelet', 'category': 'kids', 'price': 599, 'original_price': 899, 'discount': 33, 'image': STOCK[15], 'description': 'Adorable butterfly charm bracelet with name pendant.', 'is_featured': False},
-        {'name': 'Star Moon Necklace', 'category': 'kids', 'price': 799, 'original_price': 1199, 'discount': 33, 'image': STOCK[16], 'description': 'Magical star and moon necklace with initial charm.', 'is_featured': False},
-        {'name': 'Princess Crown Pendant', 'category': 'kids', 'price': 899, 'original_price': 1399, 'discount': 36, 'image': STOCK[17], 'description': 'Sparkly princess crown pendant with custom name.', 'is_featured': False},
-        {'name': 'Superhero ID Bracelet', 'category': 'kids', 'price': 649, 'original_price': 999, 'discount': 35, 'image': STOCK[2], 'description': 'Cool superhero-themed ID bracelet for kids.', 'is_featured': False},
-        {'name': 'Matching Name Bracelets Set', 'category': 'couples', 'price': 1999, 'original_price': 2999, 'discount': 33, 'image': AI_IMAGES['couple_bracelet'], 'description': 'His and hers matching bracelets with personalized names. Perfect couple gift.', 'is_featured': True},
-        {'name': 'Interlocking Heart Pendants', 'category': 'couples', 'price': 2499, 'original_price': 3499, 'discount': 29, 'image': STOCK[10], 'description': 'Two hearts that interlock perfectly. Each pendant customized with initials.', 'is_featured': False},
-        {'name': 'King Queen Bracelets', 'category': 'couples', 'price': 1799, 'original_price': 2699, 'discount': 33, 'image': STOCK[1], 'description': 'Royal themed couple bracelets with crown charms.', 'is_featured': False},
-        {'name': 'Coordinates Necklace Set', 'category': 'couples', 'price': 2199, 'original_price': 3299, 'discount': 33, 'image': STOCK[11], 'description': 'Custom coordinates of your special place on matching necklaces.', 'is_featured': False},
-        {'name': 'Puzzle Piece Pendants', 'category': 'couples', 'price': 1699, 'original_price': 2499, 'discount': 32, 'image': STOCK[12], 'description': 'Two puzzle pieces that fit together. Symbolizing perfect match.', 'is_featured': False},
-        {'name': 'Infinity Diamond Ring', 'category': 'rings', 'price': 2499, 'original_price': 3999, 'discount': 38, 'image': AI_IMAGES['infinity_ring'], 'description': 'Elegant infinity ring with diamond accents. Engrave a special message inside.', 'is_featured': True},
-        {'name': 'Name Band Ring', 'category': 'rings', 'price': 1299, 'original_price': 1999, 'discount': 35, 'image': STOCK[7], 'description': 'Classic band ring with custom name engraving.', 'is_featured': False},
-        {'name': 'Birthstone Promise Ring', 'category': 'rings', 'price': 1799, 'original_price': 2699, 'discount': 33, 'image': STOCK[8], 'description': 'Beautiful promise ring with birthstone and name.', 'is_featured': False},
-        {'name': 'Stacking Name Rings Set', 'category': 'rings', 'price': 1999, 'original_price': 2999, 'discount': 33, 'image': STOCK[9], 'description': 'Set of 3 stackable rings, each with a name.', 'is_featured': False},
-        {'name': 'Signet Initial Ring', 'category': 'rings', 'price': 1499, 'original_price': 2299, 'discount': 35, 'image': STOCK[3], 'description': 'Classic signet ring with initial engraving.', 'is_featured': False},
-        {'name': 'Quick Ship Name Pendant', 'category': 'express', 'price': 999, 'original_price': 1499, 'discount': 33, 'image': STOCK[0], 'description': 'Ready to ship personalized pendant. Delivered in 2-3 days.', 'is_featured': False},
-        {'name': 'Express Heart Necklace', 'category': 'express', 'price': 1199, 'original_price': 1799, 'discount': 33, 'image': STOCK[10], 'description': 'Fast delivery heart necklace with name engraving.', 'is_featured': False},
-        {'name': 'Rush Order Bracelet', 'category': 'express', 'price': 899, 'original_price': 1399, 'discount': 36, 'image': STOCK[4], 'description': 'Express personalized bracelet. Perfect for last-minute gifts.', 'is_featured': False},
-        {'name': 'Same Day Initial Pendant', 'category': 'express', 'price': 799, 'original_price': 1199, 'discount': 33, 'image': STOCK[11], 'description': 'Initial pendant with same-day dispatch option.', 'is_featured': False},
-        {'name': 'Quick Custom Ring', 'category': 'express', 'price': 1099, 'original_price': 1699, 'discount': 35, 'image': STOCK[8], 'description': 'Express delivery personalized ring. Ships within 24 hours.', 'is_featured': False},
-    ]
-    
-    def create_slug(name):
-        return name.lower().replace(' ', '-').replace('&', 'and')
-    
-    # Delete all existing products
-    delete_result = await db.products.delete_many({})
-    
-    # Add new products
-    added = 0
-    for product in PRODUCTS:
-        slug = create_slug(product['name'])
-        doc = {
-            'id': str(uuid.uuid4()),
-            'name': product['name'],
-            'slug': slug,
-            'description': product['description'],
-            'price': float(product['price']),
-            'original_price': float(product['original_price']),
-            'discount': product['discount'],
-            'image': product['image'],
-            'hover_image': product['image'],
-            'category': product['category'],
-            'metal_types': ['gold', 'rose-gold', 'silver'],
-            'is_featured': product.get('is_featured', False),
-            'allow_custom_image': product['category'] in ['for-her', 'couples'] or 'Necklace' in product['name'] or 'Ring' in product['name'] or 'Pendant' in product['name'],
-            'is_active': True,
-            'in_stock': True,
-            'stock_quantity': 100,
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow(),
-        }
-        await db.products.insert_one(doc)
-        added += 1
-    
-    # Update hero settings
-    await db.settings.update_one(
-        {'id': 'site_settings'},
-        {'$set': {
-            'hero_title': '100% Real Rose Box + Necklace',
-            'hero_cta': 'GET YOURS NOW',
-            'hero_image': AI_IMAGES['rose_box'],
-            'hero_link': '/products/rose-box-heart-necklace',
-        }},
-        upsert=True
+    await db.broadcasts.insert_one(dict(broadcast))
+    return broadcast
+
+@api_router.get("/admin/broadcasts")
+async def get_broadcasts(admin = Depends(get_admin_user)):
+    broadcasts = await db.broadcasts.find({}, {"_id": 0}).sort("created_at", -1).to_list(50)
+    return {"broadcasts": broadcasts}
+
+@api_router.get("/admin/broadcasts/{broadcast_id}")
+async def get_broadcast(broadcast_id: str, admin = Depends(get_admin_user)):
+    broadcast = await db.broadcasts.find_one({"id": broadcast_id}, {"_id": 0})
+    if not broadcast:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return broadcast
+
+async def transition_broadcast(broadcast_id: str, from_statuses: List[str], status: str) -> dict:
+    broadcast = await db.broadcasts.find_one_and_update(
+        {"id": broadcast_id, "status": {"$in": from_statuses}},
+        {"$set": {"status": status, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
+    if broadcast:
+        return broadcast
+    current = await db.broadcasts.find_one({"id": broadcast_id}, {"_id": 0, "status": 1})
+    if not current:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    raise HTTPException(status_code=400, detail=f"Broadcast is {current['status']}")
+
+@api_router.post("/admin/broadcasts/{broadcast_id}/pause")
+async def pause_broadcast(broadcast_id: str, admin = Depends(get_admin_user)):
+    """Stop after the batch in flight; resume picks up from the checkpoint"""
+    return await transition_broadcast(broadcast_id, ["queued", "running"], "paused")
+
+@api_router.post("/admin/broadcasts/{broadcast_id}/resume")
+async def resume_broadcast(broadcast_id: str, admin = Depends(get_admin_user)):
+    return await transition_broadcast(broadcast_id, ["paused", "failed"], "queued")
+
+@api_router.post("/admin/broadcasts/{broadcast_id}/cancel")
+async def cancel_broadcast(broadcast_id: str, admin = Depends(get_admin_user)):
+    return await transition_broadcast(broadcast_id, ["queued", "running", "paused", "failed"], "cancelled")
+
+async def claim_broadcast() -> Optional[dict]:
+    """Take the oldest queued broadcast, or one whose worker stopped checkpointing"""
+    now = datetime.utcnow()
+    return await db.broadcasts.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "locked_at": {"$lt": now - timedelta(seconds=BROADCAST_LOCK_SECONDS)}}
+        ]},
+        {"$set": {"status": "running", "lock_owner": BROADCAST_WORKER_ID, "locked_at": now, "updated_at": now},
+         "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def run_broadcast(broadcast: dict) -> bool:
+    """Send one claimed broadcast; False if it failed and was put back in the queue"""
+    settings = await broadcast_settings()
+    email = whatsapp = None
+    if "email" in broadcast["channels"] and not broadcast_channel_errors(settings, ["email"]):
+        email = SMTPPool(
+            settings.get('smtp_host', 'smtp.gmail.com'), settings.get('smtp_port', 587),
+            settings['smtp_user'], settings['smtp_password'],
+            f"{settings.get('email_from_name') or 'Name Craft'} <{settings.get('email_from_address') or settings['smtp_user']}>"
+        )
+    if "whatsapp" in broadcast["channels"] and not broadcast_channel_errors(settings, ["whatsapp"]):
+        whatsapp = WhatsAppSender(settings["whatsapp_api_token"], settings["whatsapp_business_phone_id"])
     
-    return {
-        "success": True,
-        "deleted": delete_result.deleted_count,
-        "added": added,
-        "message": f"Deleted {delete_result.deleted_count} old products, added {added} new products"
-    }
+    runner = BroadcastRunner(db.broadcasts, db.users, db.broadcast_deliveries, message_templates, settings,
+                             BROADCAST_WORKER_ID, email=email, whatsapp=whatsapp, lease_seconds=BROADCAST_LOCK_SECONDS)
+    try:
+        if not email and not whatsapp:
+            raise RuntimeError("; ".join(broadcast_channel_errors(settings, broadcast["channels"])))
+        await runner.run(broadcast, BROADCAST_AUDIENCES[broadcast["audience"]])
+        return True
+    except asyncio.CancelledError:
+        # Worker shutting down: hand the broadcast straight back instead of waiting out the lease
+        await db.broadcasts.update_one(
+            {"id": broadcast["id"], "lock_owner": BROADCAST_WORKER_ID, "status": "running"},
+            {"$set": {"status": "queued", "lock_owner": None}, "$inc": {"attempts": -1}}
+        )
+        raise
+    except Exception as e:
+        failed = broadcast["attempts"] >= BROADCAST_MAX_ATTEMPTS
+        logger.warning(f"Broadcast {broadcast['id']} failed (attempt {broadcast['attempts']}): {e}")
+        await db.broadcasts.update_one(
+            {"id": broadcast["id"], "lock_owner": BROADCAST_WORKER_ID, "status": "running"},
+            {"$set": {"status": "failed" if failed else "queued", "lock_owner": None, "last_error": str(e)}}
+        )
+        return False
+    finally:
+        if email:
+            await asyncio.get_running_loop().run_in_executor(None, email.close)
+        if whatsapp:
+            await whatsapp.close()
+
+async def broadcast_worker():
+    """Claim and send broadcasts forever; run by broadcast_worker.py, never by the API"""
+    while True:
+        try:
+            # A failed broadcast waits for the next poll instead of retrying straight away
+            while (broadcast := await claim_broadcast()) and await run_broadcast(broadcast):
+                pass
+        except Exception as e:
+            logger.warning(f"Broadcast processing failed: {e}")
+        await asyncio.sleep(BROADCAST_POLL_SECONDS)
+
+# ==================== SEED DATA ====================
+
+# Demo data and the one-off product migration. Off by default so production workers never
+# import their payloads; set SEED_ROUTES_ENABLED=true on a dev or staging server to use them.
+SEED_ROUTES_ENABLED = os.environ.get('SEED_ROUTES_ENABLED', 'false').lower() == 'true'
+
+if SEED_ROUTES_ENABLED:
+    from seed_routes import create_seed_router
+    api_router.include_router(create_seed_router(
+        db, get_admin_user,
+        category_model=Category, product_model=Product, coupon_model=Coupon, settings_model=SiteSettings
+    ))
 
 # ==================== ROOT ====================
 
@@ -2477,6 +3639,15 @@ app.include_router(api_router)
 # Serve uploaded files (StaticFiles already imported at line 825)
 app.mount("/api/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 
+# Throttles login, forgot-password, reviews and uploads; "mongo" shares buckets across workers
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'memory')
+app.add_middleware(
+    RateLimitMiddleware,
+    store=MongoBucketStore(db.rate_limits) if RATE_LIMIT_STORE == "mongo" else MemoryBucketStore()
+)
+
+app.add_middleware(RequestMetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -2487,4 +3658,16 @@ app.add_middleware(
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.stock_sweeper.cancel()
+    app.state.payment_event_worker.cancel()
+    app.state.razorpay_reconciler.cancel()
+    app.state.recommendations_refresher.cancel()
+    app.state.cache_bus.cancel()
+    if getattr(app.state, "rating_rebuild", None):
+        app.state.rating_rebuild.cancel()
+    if getattr(app.state, "guest_order_backfill", None):
+        app.state.guest_order_backfill.cancel()
+    if getattr(app.state, "search_key_backfill", None):
+        app.state.search_key_backfill.cancel()
+    payment_gateway.close()
     client.close()
@@ -0,0 +1,142 @@
+"""
+Local stand-in for the Razorpay Orders API
+Run the backend with RAZORPAY_BASE_URL=http://127.0.0.1:<port> to exercise payments offline.
+
+Run: python3 tests/fake_razorpay.py --port 9010
+"""
+import argparse
+import base64
+import json
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeRazorpayState:
+    def __init__(self):
+        self.orders = {}
+        self.payments = {}
+        self.requests = []
+        # Seconds to sleep before answering, to exercise client timeouts
+        self.delay = 0
+        self.lock = threading.Lock()
+
+    def capture(self, order_id):
+        """Simulate a customer paying an order"""
+        with self.lock:
+            order = self.orders[order_id]
+            payment = {
+                "id": f"pay_{secrets.token_hex(7)}",
+                "entity": "payment",
+                "order_id": order_id,
+                "amount": order["amount"],
+                "currency": order["currency"],
+                "status": "captured",
+                "created_at": int(time.time())
+            }
+            self.payments[payment["id"]] = payment
+            order["status"] = "paid"
+            order["amount_paid"] = order["amount"]
+            order["amount_due"] = 0
+        return payment
+
+
+class FakeRazorpayHandler(BaseHTTPRequestHandler):
+    state: FakeRazorpayState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, description):
+        self._reply(status, {"error": {"code": "BAD_REQUEST_ERROR", "description": description}})
+
+    def _authorized(self):
+        header = self.headers.get("Authorization", "")
+        if not header.startswith("Basic "):
+            return False
+        key_id, _, key_secret = base64.b64decode(header[6:]).decode().partition(":")
+        return bool(key_id and key_secret)
+
+    def _handle(self, method):
+        self.state.requests.append((method, self.path))
+        if self.state.delay:
+            time.sleep(self.state.delay)
+        if not self._authorized():
+            return self._error(401, "Authentication failed")
+
+        if method == "POST" and self.path == "/v1/orders":
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(data.get("amount"), int) or data["amount"] < 100:
+                return self._error(400, "Order amount less than minimum amount allowed")
+            order = {
+                "id": f"order_{secrets.token_hex(7)}",
+                "entity": "order",
+                "amount": data["amount"],
+                "amount_paid": 0,
+                "amount_due": data["amount"],
+                "currency": data.get("currency", "INR"),
+                "receipt": data.get("receipt"),
+                "notes": data.get("notes", {}),
+                "status": "created",
+                "created_at": int(time.time())
+            }
+            with self.state.lock:
+                self.state.orders[order["id"]] = order
+            return self._reply(200, order)
+
+        match = re.fullmatch(r"/v1/orders/([\w]+)(/payments)?", self.path.split("?")[0])
+        if method == "GET" and match:
+            order = self.state.orders.get(match.group(1))
+            if not order:
+                return self._error(400, "The id provided does not exist")
+            if match.group(2):
+                items = [p for p in self.state.payments.values() if p["order_id"] == order["id"]]
+                return self._reply(200, {"entity": "collection", "count": len(items), "items": items})
+            return self._reply(200, order)
+
+        match = re.fullmatch(r"/v1/payments/([\w]+)", self.path.split("?")[0])
+        if method == "GET" and match:
+            payment = self.state.payments.get(match.group(1))
+            if not payment:
+                return self._error(400, "The id provided does not exist")
+            return self._reply(200, payment)
+
+        self._error(404, "The requested URL was not found on the server.")
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def start_fake_razorpay(port=0):
+    """Start the fake in a background thread; returns (server, state, base_url)"""
+    state = FakeRazorpayState()
+    handler = type("Handler", (FakeRazorpayHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Razorpay Orders API")
+    parser.add_argument("--port", type=int, default=9010)
+    args = parser.parse_args()
+    server, _, base_url = start_fake_razorpay(args.port)
+    print(f"Fake Razorpay listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
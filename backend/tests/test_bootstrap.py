@@ -0,0 +1,45 @@
+"""
+Storefront Bootstrap Tests for Name Craft E-commerce
+Tests: /api/bootstrap payload, version matching its components, conditional requests
+"""
+import pytest
+import requests
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://checkout-amount-calc.preview.emergentagent.com')
+
+
+class TestBootstrap:
+    """One call for settings, navigation, categories and featured products"""
+
+    def test_payload_matches_component_routes(self):
+        response = requests.get(f"{BASE_URL}/api/bootstrap")
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data["versions"]) == {"settings", "navigation", "categories", "featured_products"}
+        assert response.headers["ETag"] == f'"{data["version"]}"'
+
+        assert data["navigation"] == requests.get(f"{BASE_URL}/api/navigation").json()
+        assert data["categories"] == requests.get(f"{BASE_URL}/api/categories").json()
+        assert data["settings"]["site_name"] == requests.get(f"{BASE_URL}/api/settings").json()["site_name"]
+        featured = requests.get(f"{BASE_URL}/api/products?featured=true&limit=100").json()["products"]
+        assert {product["id"] for product in data["featured_products"]} <= {product["id"] for product in featured}
+        # Display fields only, so sales and reviews don't change the version
+        assert not [key for product in data["featured_products"] for key in product
+                    if key.startswith("rating_") or key in ("stock_quantity", "in_stock", "stock_holds")]
+        assert not [key for key in data["settings"] if "secret" in key or "password" in key or "smtp_" in key]
+        print(f"✓ Bootstrap version {data['version']} with {len(data['featured_products'])} featured products")
+
+    def test_conditional_request(self):
+        first = requests.get(f"{BASE_URL}/api/bootstrap")
+        assert first.status_code == 200
+        cached = requests.get(f"{BASE_URL}/api/bootstrap", headers={"If-None-Match": first.headers["ETag"]})
+        assert cached.status_code == 304
+        assert cached.headers["ETag"] == first.headers["ETag"]
+        stale = requests.get(f"{BASE_URL}/api/bootstrap", headers={"If-None-Match": '"stale"'})
+        assert stale.status_code == 200
+        print("✓ Matching ETag revalidated with 304")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,250 @@
+"""
+Marketing Broadcast Tests
+Exercises broadcasts.py (rate limiter, batching, checkpoint / resume, delivery records,
+lease renewal, pause) against
+in-memory collections and senders, no server, database or mail account required
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from broadcasts import BroadcastRunner, RateLimiter, clean_whatsapp_number
+from message_templates import DEFAULT_TEMPLATES, CompiledTemplate
+
+
+class MemoryCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, field, direction):
+        self.documents.sort(key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def close(self):
+        pass
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class MemoryUsers:
+    """find() with the {"$and": [audience, {"id": {"$gt": checkpoint}}]} shape the runner sends"""
+
+    def __init__(self, users):
+        self.users = users
+
+    def find(self, query, projection):
+        after = query["$and"][1]["id"]["$gt"] if "$and" in query else ""
+        return MemoryCursor([dict(user) for user in self.users if user["id"] > after])
+
+
+class MemoryBroadcasts:
+    def __init__(self, job):
+        self.job = dict(job, counts={"processed": 0})
+
+    def matches(self, query):
+        return all(self.job.get(key) == value for key, value in query.items())
+
+    async def find_one_and_update(self, query, update, projection, return_document):
+        if not self.matches(query):
+            return None
+        await self.update_one(query, update)
+        return {"status": self.job["status"]}
+
+    async def update_one(self, query, update):
+        if not self.matches(query):
+            return
+        self.job.update(update.get("$set", {}))
+        for key, amount in update.get("$inc", {}).items():
+            field = key.split(".", 1)[1]
+            self.job["counts"][field] = self.job["counts"].get(field, 0) + amount
+
+
+class MemoryDeliveries:
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+
+    def find(self, query, projection):
+        found = [{"_id": key} for key in query["_id"]["$in"] if key in self.keys]
+
+        class Found:
+            async def to_list(self, length):
+                return found
+        return Found()
+
+    async def insert_one(self, document):
+        self.keys.add(document["_id"])
+
+
+class MemoryTemplates:
+    async def get(self, template_id):
+        return CompiledTemplate(DEFAULT_TEMPLATES[template_id], None)
+
+
+class RecordingSender:
+    def __init__(self, fail_for=(), on_send=None, delay=0):
+        self.sent = []
+        self.fail_for = set(fail_for)
+        self.on_send = on_send
+        self.delay = delay
+
+    async def send(self, recipient, rendered):
+        await asyncio.sleep(self.delay)
+        if recipient in self.fail_for:
+            raise RuntimeError("rejected")
+        self.sent.append((recipient, rendered))
+        if self.on_send:
+            self.on_send(len(self.sent))
+
+
+SETTINGS = {"site_name": "Name Craft", "sale_title": "DIWALI SALE", "sale_discount": "30% OFF", "sale_subtitle": "Storewide"}
+USERS = [
+    {"id": f"user-{n:03d}", "name": f"Customer {n}", "email": f"c{n}@example.com",
+     "phone": f"98765{n:05d}" if n % 2 else None}
+    for n in range(25)
+]
+
+
+def new_job(**overrides):
+    job = {
+        "id": "broadcast-1", "channels": ["email", "whatsapp"], "status": "running", "lock_owner": "worker-a",
+        "template_ids": {"email": "sale_announcement", "whatsapp": "whatsapp_sale_announcement"},
+        "rate_per_second": 1000, "batch_size": 10, "checkpoint": None
+    }
+    job.update(overrides)
+    return job
+
+
+def run_broadcast(broadcasts, worker_id="worker-a", email=None, whatsapp=None, deliveries=None, lease_seconds=300):
+    runner = BroadcastRunner(broadcasts, MemoryUsers(USERS), deliveries or MemoryDeliveries(), MemoryTemplates(),
+                             SETTINGS, worker_id, email=email, whatsapp=whatsapp, lease_seconds=lease_seconds)
+    return asyncio.run(runner.run(dict(broadcasts.job), {}))
+
+
+class TestRateLimiter:
+    def test_rate_is_enforced_after_the_burst(self):
+        async def run():
+            limiter = RateLimiter(rate=50, burst=5)
+            started = time.monotonic()
+            await asyncio.gather(*(limiter.acquire() for _ in range(30)))
+            return time.monotonic() - started
+
+        elapsed = asyncio.run(run())
+        # 5 go out at once, the other 25 need 0.5s at 50/s
+        assert 0.45 <= elapsed < 1.5
+        print(f"✓ 30 acquisitions at 50/s (burst 5) took {elapsed:.2f}s")
+
+    def test_rejects_non_positive_rate(self):
+        with pytest.raises(ValueError):
+            RateLimiter(0)
+
+
+class TestBroadcastRunner:
+    def test_sends_every_recipient_and_completes(self):
+        broadcasts = MemoryBroadcasts(new_job())
+        email, whatsapp = RecordingSender(fail_for={"c3@example.com"}), RecordingSender()
+        assert run_broadcast(broadcasts, email=email, whatsapp=whatsapp) is True
+
+        job = broadcasts.job
+        assert job["status"] == "completed" and job["lock_owner"] is None
+        assert job["checkpoint"] == "user-024"
+        assert job["counts"] == {"processed": 25, "email_sent": 24, "email_failed": 1, "whatsapp_sent": 12}
+        assert email.sent[0][1]["subject"] == "DIWALI SALE: 30% OFF Storewide"
+        assert "Hi Customer!" in whatsapp.sent[0][1]["text"]
+        print("✓ 25 recipients, failures counted, checkpoint at last id")
+
+    def test_resumes_from_checkpoint(self):
+        broadcasts = MemoryBroadcasts(new_job(channels=["email"], checkpoint="user-019"))
+        email = RecordingSender()
+        run_broadcast(broadcasts, email=email)
+        assert [recipient for recipient, _ in email.sent] == [f"c{n}@example.com" for n in range(20, 25)]
+        print("✓ Resumed after user-019")
+
+    def test_pause_stops_after_the_batch_in_flight(self):
+        broadcasts = MemoryBroadcasts(new_job(channels=["email"]))
+
+        def pause(sent):
+            if sent == 12:
+                broadcasts.job["status"] = "paused"
+
+        email = RecordingSender(on_send=pause)
+        assert run_broadcast(broadcasts, email=email) is False
+        job = broadcasts.job
+        # The second batch finished and was checkpointed, then the runner let go of the claim
+        assert len(email.sent) == 20 and job["checkpoint"] == "user-019"
+        assert job["status"] == "paused" and job["lock_owner"] is None
+
+        job.update(status="running", lock_owner="worker-b")
+        run_broadcast(broadcasts, worker_id="worker-b", email=email)
+        assert len(email.sent) == 25 and len({recipient for recipient, _ in email.sent}) == 25
+        print("✓ Paused at user-019, resumed by another worker without resending")
+
+    def test_lost_claim_stops_the_runner(self):
+        broadcasts = MemoryBroadcasts(new_job(channels=["email"], lock_owner="worker-b"))
+        email = RecordingSender()
+        assert run_broadcast(broadcasts, email=email) is False
+        # The first batch was in flight; nothing is recorded against someone else's claim
+        # Nothing is sent, or recorded, against someone else's claim
+        assert email.sent == [] and broadcasts.job["checkpoint"] is None
+
+    def test_crashed_batch_skips_recipients_already_delivered(self):
+        # The previous worker sent user-020..022 and died before checkpointing the batch
+        deliveries = MemoryDeliveries(f"broadcast-1:email:user-{n:03d}" for n in range(20, 23))
+        broadcasts = MemoryBroadcasts(new_job(channels=["email"], checkpoint="user-019"))
+        email = RecordingSender()
+        run_broadcast(broadcasts, email=email, deliveries=deliveries)
+        assert [recipient for recipient, _ in email.sent] == ["c23@example.com", "c24@example.com"]
+        assert broadcasts.job["counts"]["email_sent"] == 5
+        assert {f"broadcast-1:email:user-{n:03d}" for n in range(20, 25)} <= deliveries.keys
+        print("✓ Resumed batch sent only the 2 recipients without a delivery record")
+
+    def test_lease_renewed_during_slow_batch(self):
+        broadcasts = MemoryBroadcasts(new_job(channels=["email"], batch_size=5, rate_per_second=1000))
+        renewals = []
+        original = broadcasts.update_one
+
+        async def recording_update(query, update):
+            if "checkpoint" not in update.get("$set", {}) and "locked_at" in update.get("$set", {}):
+                renewals.append(update["$set"]["locked_at"])
+            await original(query, update)
+        broadcasts.update_one = recording_update
+
+        # Each batch takes ~0.1s; a 0.09s lease is renewed every 0.03s while sends are in flight
+        assert run_broadcast(broadcasts, email=RecordingSender(delay=0.1), lease_seconds=0.09) is True
+        assert len(renewals) >= 5 * 2
+
+    def test_taken_over_lease_stops_sending_mid_batch(self):
+        broadcasts = MemoryBroadcasts(new_job(channels=["email"], batch_size=25, rate_per_second=20))
+        email = RecordingSender()
+        original = broadcasts.find_one_and_update
+
+        async def take_over(query, update, projection, return_document):
+            if len(email.sent) >= 3:
+                broadcasts.job["lock_owner"] = "worker-b"
+            return await original(query, update, projection, return_document)
+        broadcasts.find_one_and_update = take_over
+
+        assert run_broadcast(broadcasts, email=email, lease_seconds=0.3) is False
+        assert len(email.sent) < 25 and broadcasts.job["checkpoint"] is None
+
+
+class TestHelpers:
+    def test_clean_whatsapp_number(self):
+        assert clean_whatsapp_number("+91 98765-43210") == "919876543210"
+        assert clean_whatsapp_number("98765 43210") == "919876543210"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
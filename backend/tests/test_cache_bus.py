@@ -0,0 +1,187 @@
+"""
+Cache Invalidation Bus Tests
+Exercises cache_bus.py (routing, resync, resume tokens, updated fields, TTL-only fallback) against a scripted
+change stream, no server or replica set required
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cache_bus
+from cache_bus import InvalidationBus, InvalidationEvent
+from metrics import registry
+
+
+def change(collection, operation="update", key="k", token=None, updated=None):
+    event = {"operationType": operation, "ns": {"db": "test", "coll": collection},
+             "documentKey": {"_id": key}, "_id": token or {"_data": f"{collection}-{key}"}}
+    if updated is not None:
+        event["updatedFields"] = updated
+    return event
+
+
+class ScriptedStream:
+    """Yields its changes, then fails with `error` (or blocks, like an idle stream)"""
+
+    def __init__(self, changes, error=None):
+        self.changes = changes
+        self.error = error
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for item in self.changes:
+            self.resume_token = item["_id"]
+            yield item
+        if self.error:
+            raise self.error
+        await asyncio.Event().wait()
+
+
+class ScriptedDatabase:
+    """watch() raises or returns the next scripted stream, recording start_after"""
+
+    def __init__(self, streams):
+        self.streams = list(streams)
+        self.start_after = []
+
+    def watch(self, pipeline, start_after=None):
+        self.start_after.append(start_after)
+        stream = self.streams.pop(0)
+        if isinstance(stream, Exception):
+            raise stream
+        return stream
+
+
+class MemoryState:
+    def __init__(self, token=None):
+        self.document = {"_id": "resume_token", "token": token} if token else None
+
+    async def find_one(self, query):
+        return self.document
+
+    async def update_one(self, query, update, upsert):
+        self.document = {"_id": "resume_token", **update["$set"]}
+
+
+async def run_until(bus, condition, timeout=2):
+    task = asyncio.create_task(bus.run())
+    try:
+        while not condition():
+            await asyncio.sleep(0.01)
+            assert not task.done(), task.exception()
+            timeout -= 0.01
+            assert timeout > 0, "condition not reached"
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(cache_bus, "RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(cache_bus, "TOKEN_SAVE_SECONDS", 0)
+
+
+class TestInvalidationBus:
+    def test_routes_events_to_registered_regions(self):
+        seen = {"settings": [], "products": []}
+        stream = ScriptedStream([change("settings", key="s1"), change("products", "insert", "p1"), change("users")])
+        bus = InvalidationBus(ScriptedDatabase([stream]), MemoryState(), enabled=True)
+        bus.register("settings", ["settings"], seen["settings"].append)
+        bus.register("products", ["products"], seen["products"].append)
+
+        asyncio.run(run_until(bus, lambda: len(seen["products"]) == 2))
+        # A fresh stream starts with a resync, then only the region's own collection
+        assert seen["settings"] == [cache_bus.RESYNC, InvalidationEvent("settings", "update", "s1")]
+        assert seen["products"] == [cache_bus.RESYNC, InvalidationEvent("products", "insert", "p1")]
+        assert bus.live
+        assert 'cache_invalidations_total{region="products",cause="products"}' in registry.render()
+        print("✓ Events reach only the regions watching their collection")
+
+    def test_resumes_from_saved_token_without_resync(self):
+        seen = []
+        state = MemoryState(token={"_data": "saved"})
+        database = ScriptedDatabase([ScriptedStream([change("settings", token={"_data": "next"})])])
+        bus = InvalidationBus(database, state, enabled=True)
+        bus.register("settings", ["settings"], seen.append)
+
+        asyncio.run(run_until(bus, lambda: state.document["token"] == {"_data": "next"}))
+        assert database.start_after == [{"_data": "saved"}]
+        assert seen == [InvalidationEvent("settings", "update", "k")]
+
+    def test_reconnects_with_token_after_failure(self):
+        seen = []
+        database = ScriptedDatabase([
+            ScriptedStream([change("settings", token={"_data": "t1"})], error=AutoReconnect("primary stepped down")),
+            ScriptedStream([change("settings", key="after")])
+        ])
+        bus = InvalidationBus(database, MemoryState(), enabled=True)
+        bus.register("settings", ["settings"], seen.append)
+
+        asyncio.run(run_until(bus, lambda: len(seen) == 3))
+        assert database.start_after == [None, {"_data": "t1"}]
+        assert seen[-1] == InvalidationEvent("settings", "update", "after")
+
+    def test_lost_token_resyncs(self):
+        seen = []
+        database = ScriptedDatabase([OperationFailure("history lost", code=286), ScriptedStream([])])
+        bus = InvalidationBus(database, MemoryState(token={"_data": "ancient"}), enabled=True)
+        bus.register("settings", ["settings"], seen.append)
+
+        asyncio.run(run_until(bus, lambda: seen == [cache_bus.RESYNC]))
+        assert database.start_after == [{"_data": "ancient"}, None]
+
+    def test_standalone_server_falls_back_to_ttl(self):
+        database = ScriptedDatabase([OperationFailure("only supported on replica sets", code=40573)])
+        bus = InvalidationBus(database, MemoryState(), enabled=True)
+        bus.register("settings", ["settings"], lambda event: None)
+
+        asyncio.run(run_until(bus, lambda: bus.mode == "ttl"))
+        assert not bus.live and database.streams == []
+
+    def test_drop_resyncs_and_failing_region_is_isolated(self):
+        seen = []
+        bus = InvalidationBus(ScriptedDatabase([]), MemoryState(), enabled=True)
+        bus.register("broken", ["products"], lambda event: 1 / 0)
+        bus.register("products", ["products"], seen.append)
+
+        bus.handle_change(change("products", "update"))
+        bus.handle_change(change("categories", "drop"))
+        assert seen == [InvalidationEvent("products", "update", "k"), cache_bus.RESYNC]
+
+    def test_update_events_carry_field_names(self):
+        seen = []
+        bus = InvalidationBus(ScriptedDatabase([]), MemoryState(), enabled=True)
+        bus.register("products", ["products"], seen.append)
+
+        bus.handle_change(change("products", updated=["stock_quantity", "rating_histogram.5"]))
+        bus.handle_change(change("products", updated=["stock_quantity", "price"]))
+        bus.handle_change(change("products", "replace", updated=[]))
+        volatile = {"stock_quantity", "rating_histogram"}
+        assert [event.only_touches(volatile) for event in seen] == [True, False, False]
+        assert seen[0].updated_fields == frozenset({"stock_quantity", "rating_histogram.5"})
+        assert seen[2].updated_fields is None and not cache_bus.RESYNC.only_touches(volatile)
+
+    def test_pipeline_ships_field_names_not_values(self):
+        project = InvalidationBus(ScriptedDatabase([]), MemoryState()).pipeline()[1]["$project"]
+        assert "updateDescription" not in project and "fullDocument" not in project
+        assert "updatedFields" in project
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,79 @@
+"""
+Cart Quote Tests for Name Craft E-commerce
+Tests: server-side cart pricing, quote tokens honoured at checkout, unknown products rejected
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://checkout-amount-calc.preview.emergentagent.com')
+
+SHIPPING_ADDRESS = {
+    "first_name": "TEST", "last_name": "Quote", "email": "test_quote@example.com", "phone": "9876543210",
+    "address": "1 Test Street", "city": "Mumbai", "state": "Maharashtra", "pincode": "400001"
+}
+
+
+@pytest.fixture
+def product():
+    response = requests.get(f"{BASE_URL}/api/products?limit=20")
+    assert response.status_code == 200
+    in_stock = [p for p in response.json()["products"] if p.get("in_stock", True) and p.get("stock_quantity", 0) >= 2]
+    if not in_stock:
+        pytest.skip("No products in stock")
+    return in_stock[0]
+
+
+class TestCartQuote:
+    """/cart/quote prices from the catalogue; checkout reuses the quote"""
+
+    def test_quote_uses_catalogue_prices(self, product):
+        response = requests.post(f"{BASE_URL}/api/cart/quote", json={
+            "items": [{"product_id": product["id"], "quantity": 2, "price": 1, "customization": {"name": "TEST"}}]
+        })
+        assert response.status_code == 200
+        quote = response.json()
+        assert quote["items"][0]["price"] == product["price"]
+        assert quote["subtotal"] == product["price"] * 2
+        assert quote["total"] == quote["subtotal"] + quote["shipping_cost"] - quote["discount_amount"]
+        assert quote["issues"] == [] and quote["quote_token"]
+        print(f"✓ Quoted {quote['total']} with token")
+
+    def test_quote_reports_unavailable_and_bad_coupon(self, product):
+        response = requests.post(f"{BASE_URL}/api/cart/quote", json={
+            "items": [{"product_id": product["id"], "quantity": 1}, {"product_id": f"missing-{uuid.uuid4()}", "quantity": 1}],
+            "coupon_code": f"NOPE{uuid.uuid4().hex[:6]}"
+        })
+        assert response.status_code == 200
+        quote = response.json()
+        assert [issue["issue"] for issue in quote["issues"]] == ["unavailable"]
+        assert quote["coupon_error"] and quote["discount_amount"] == 0
+        assert quote["quote_token"] is None
+        print("✓ Unavailable item and invalid coupon reported")
+
+    def test_order_with_quote_token(self, product):
+        items = [{"product_id": product["id"], "quantity": 1, "customization": {"name": "TEST"}}]
+        quote = requests.post(f"{BASE_URL}/api/cart/quote", json={"items": items}).json()
+
+        response = requests.post(f"{BASE_URL}/api/orders", json={
+            "items": items, "shipping_address": SHIPPING_ADDRESS, "payment_method": "cod",
+            "quote_token": quote["quote_token"]
+        })
+        assert response.status_code == 200
+        order = response.json()
+        assert order["total"] == quote["total"]
+        assert order["items"][0]["customization"] == {"name": "TEST"}
+        print(f"✓ Order {order['order_number']} placed from quote")
+
+    def test_order_rejects_unknown_product(self):
+        response = requests.post(f"{BASE_URL}/api/orders", json={
+            "items": [{"product_id": f"missing-{uuid.uuid4()}", "quantity": 1, "name": "Free", "price": 1}],
+            "shipping_address": SHIPPING_ADDRESS, "payment_method": "cod"
+        })
+        assert response.status_code == 400
+        print("✓ Client-priced unknown product rejected")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
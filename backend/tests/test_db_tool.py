@@ -0,0 +1,78 @@
+"""
+Database Dump Format Tests
+File encoding, compression and legacy export parsing; no database required
+"""
+import gzip
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import db_tool
+from db_tool import DumpError, encode_document, iter_documents, open_write
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+DOCS = [{"_id": ObjectId(), "id": str(i), "name": "Naam ✨ हार", "price": 1499.0, "quantity": i,
+         "created_at": datetime(2026, 1, 25, 10, 30)} for i in range(50)]
+
+
+class TestDumpFiles:
+    """Round trips through every format and compression"""
+
+    @pytest.mark.parametrize("fmt,compression", [("ndjson", "gzip"), ("bson", "gzip"), ("ndjson", "none"), ("bson", "none")])
+    def test_round_trip(self, tmp_path, fmt, compression):
+        path = tmp_path / f"orders{db_tool.FORMATS[fmt]}{db_tool.COMPRESSIONS[compression]}"
+        with open_write(path, compression) as fh:
+            for doc in DOCS:
+                fh.write(encode_document(doc, fmt))
+        assert list(iter_documents(path)) == DOCS
+        print(f"✓ {path.name}: {path.stat().st_size} bytes")
+
+    def test_zstd_round_trip(self, tmp_path):
+        pytest.importorskip("zstandard")
+        path = tmp_path / "orders.ndjson.zst"
+        with open_write(path, "zstd") as fh:
+            for doc in DOCS:
+                fh.write(encode_document(doc, "ndjson"))
+        assert list(iter_documents(path)) == DOCS
+
+
+class TestLegacyExports:
+    """db_export (NDJSON) and db_backup (JSON array) snapshots"""
+
+    def test_json_array_streamed_in_small_chunks(self, tmp_path, monkeypatch):
+        path = tmp_path / "orders.json"
+        path.write_text(json.dumps([{"_id": {"$oid": str(d["_id"])}, "name": d["name"]} for d in DOCS]))
+        # Force chunk boundaries inside documents and multi-byte characters
+        monkeypatch.setattr(db_tool, "_chunks", lambda fh: iter(lambda: fh.read(7), b""))
+        docs = list(iter_documents(path))
+        assert [d["_id"] for d in docs] == [d["_id"] for d in DOCS]
+        assert docs[0]["name"] == DOCS[0]["name"]
+
+    def test_truncated_array_rejected(self, tmp_path):
+        path = tmp_path / "orders.json"
+        path.write_text('[{"id": "1"}, {"id": ')
+        with pytest.raises(DumpError):
+            list(iter_documents(path))
+
+    def test_repo_snapshots_parse(self):
+        backup = list(iter_documents(REPO_ROOT / "db_backup" / "orders.json"))
+        export = list(iter_documents(REPO_ROOT / "db_export" / "orders.json"))
+        assert backup and isinstance(backup[0]["_id"], ObjectId)
+        assert export and "order_number" in export[0]
+        print(f"✓ db_backup: {len(backup)} orders, db_export: {len(export)} orders")
+
+    def test_gzipped_ndjson(self, tmp_path):
+        path = tmp_path / "users.ndjson.gz"
+        with gzip.open(path, "wb") as fh:
+            fh.write(b'{"id": "a"}\n\n{"id": "b"}')
+        assert [d["id"] for d in iter_documents(path)] == ["a", "b"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
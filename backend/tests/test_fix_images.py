@@ -0,0 +1,186 @@
+"""
+Image Auditor Tests
+Probes a local HTTP stand-in, no network or database required
+"""
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fix_images import STOCK_IMAGES, ImageCheck, ImageChecker, plan_repairs
+
+
+class ImageHostHandler(BaseHTTPRequestHandler):
+    hits = []
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self, method):
+        cls = type(self)
+        with cls.lock:
+            cls.hits.append((method, self.path))
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            if self.path.startswith("/slow"):
+                time.sleep(1.5)
+            elif self.path.startswith("/busy"):
+                time.sleep(0.1)
+            if self.path.startswith("/missing"):
+                status, content_type = 404, "text/html"
+            elif self.path.startswith("/unavailable"):
+                status, content_type = 503, "text/html"
+            elif self.path.startswith("/page"):
+                status, content_type = 200, "text/html"
+            elif self.path.startswith("/no-head") and method == "HEAD":
+                status, content_type = 405, "text/plain"
+            else:
+                status, content_type = 200, "image/jpeg"
+            body = b"\xff\xd8\xff" if content_type == "image/jpeg" else b"nope"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if method == "GET":
+                self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def do_HEAD(self):
+        self._handle("HEAD")
+
+    def do_GET(self):
+        self._handle("GET")
+
+
+@pytest.fixture
+def image_host():
+    handler = type("Handler", (ImageHostHandler,), {"hits": [], "active": 0, "max_active": 0,
+                                                    "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield handler, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def run_checks(urls, **kwargs):
+    async def run():
+        checker = ImageChecker(**kwargs)
+        try:
+            return await checker.check_all(urls), checker
+        finally:
+            await checker.close()
+    return asyncio.run(run())
+
+
+class TestImageChecker:
+    """URL probing against the stand-in"""
+
+    def test_classifies_urls(self, image_host):
+        _, base = image_host
+        results, _ = run_checks([f"{base}/ok.jpg", f"{base}/missing.jpg", f"{base}/page.html",
+                                 f"{base}/no-head.jpg", "https://via.placeholder.com/300", ""],
+                                timeout=1)
+        assert results[f"{base}/ok.jpg"].ok
+        assert results[f"{base}/missing.jpg"].reason == "http_404"
+        assert results[f"{base}/page.html"].reason == "not_an_image"
+        assert results[f"{base}/no-head.jpg"].ok
+        assert results["https://via.placeholder.com/300"].reason == "blocked"
+        print(f"✓ {', '.join(f'{r.reason}' for r in results.values())}")
+
+    def test_timeout(self, image_host):
+        _, base = image_host
+        results, _ = run_checks([f"{base}/slow.jpg"], timeout=0.3)
+        assert results[f"{base}/slow.jpg"].reason == "timeout"
+
+    def test_per_host_limit(self, image_host):
+        handler, base = image_host
+        run_checks([f"{base}/busy/{i}.jpg" for i in range(12)], per_host=3)
+        assert handler.max_active <= 3
+        print(f"✓ Peak concurrency on one host: {handler.max_active}")
+
+    def test_cache_skips_repeat_requests(self, image_host):
+        handler, base = image_host
+        url = f"{base}/ok.jpg"
+
+        async def run():
+            checker = ImageChecker()
+            await checker.check_all([url, url])
+            await checker.check(url)
+            await checker.close()
+            return checker.export_cache()
+
+        cache = asyncio.run(run())
+        assert len(handler.hits) == 1
+
+        # A persisted entry is reused until the TTL runs out
+        run_checks([url], cache=cache)
+        assert len(handler.hits) == 1
+        run_checks([url], cache=cache, cache_ttl=0)
+        assert len(handler.hits) == 2
+
+    def test_transient_failures_not_cached(self, image_host):
+        handler, base = image_host
+        urls = [f"{base}/unavailable.jpg", f"{base}/slow.jpg", f"{base}/missing.jpg"]
+
+        async def run():
+            checker = ImageChecker(timeout=0.3)
+            results = await checker.check_all(urls)
+            await checker.check_all(urls)
+            await checker.close()
+            return results, checker.export_cache()
+
+        results, cache = asyncio.run(run())
+        assert results[f"{base}/unavailable.jpg"].transient
+        assert results[f"{base}/slow.jpg"].transient
+        assert results[f"{base}/missing.jpg"].broken
+        assert list(cache) == [f"{base}/missing.jpg"]
+        assert [path for _, path in handler.hits].count("/unavailable.jpg") == 2
+
+
+class TestPlanRepairs:
+    """Repairs built from probe results"""
+
+    def test_only_broken_fields_replaced(self):
+        health = {url: ImageCheck(True, "ok") for urls in STOCK_IMAGES.values() for url in urls}
+        health.update({"http://good/a.jpg": ImageCheck(True, "ok"), "http://gone/b.jpg": ImageCheck(False, "http_404")})
+        products = [
+            {"id": "1", "name": "Heart Necklace", "image": "http://gone/b.jpg", "hover_image": "http://good/a.jpg",
+             "gallery": ["http://good/a.jpg", "http://gone/b.jpg"]},
+            {"id": "2", "name": "Name Ring", "image": "http://good/a.jpg", "hover_image": "http://good/a.jpg"}
+        ]
+        updates, fixes = plan_repairs(products, health)
+        assert len(updates) == 1
+        change = updates[0]._doc["$set"]
+        assert change["image"] in STOCK_IMAGES["necklaces"]
+        assert "hover_image" not in change
+        assert change["gallery"] == ["http://good/a.jpg"]
+        assert fixes[0]["changes"]["image"]["reason"] == "http_404"
+
+    def test_unreachable_images_left_untouched(self, image_host):
+        _, base = image_host
+        product = {"id": "1", "name": "Heart Necklace", "image": f"{base}/unavailable.jpg",
+                   "hover_image": f"{base}/slow.jpg", "gallery": [f"{base}/unavailable/2.jpg"]}
+        stock = [url for urls in STOCK_IMAGES.values() for url in urls]
+        health, _ = run_checks([product["image"], product["hover_image"], *product["gallery"]], timeout=0.3)
+        health.update({url: ImageCheck(True, "ok") for url in stock})
+        assert health[product["image"]].reason == "http_503"
+        assert health[product["hover_image"]].reason == "timeout"
+
+        updates, fixes = plan_repairs([product], health)
+        assert updates == [] and fixes == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
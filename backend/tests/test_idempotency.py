@@ -0,0 +1,81 @@
+"""
+Idempotency-Key Tests for Name Craft E-commerce
+Tests: retried order creation and payment submission are deduplicated
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://checkout-amount-calc.preview.emergentagent.com')
+
+
+def order_payload(quantity=1):
+    products = requests.get(f"{BASE_URL}/api/products?limit=1").json()["products"]
+    if not products:
+        pytest.skip("No products available")
+    return {
+        "items": [{"product_id": products[0]["id"], "quantity": quantity}],
+        "shipping_address": {
+            "first_name": "TEST",
+            "last_name": "Idempotency",
+            "email": "test_idempotency@example.com",
+            "phone": "9876543210",
+            "address": "1 Test Street",
+            "city": "Mumbai",
+            "state": "Maharashtra",
+            "pincode": "400001"
+        },
+        "payment_method": "upi"
+    }
+
+
+class TestOrderIdempotency:
+    """POST /api/orders with Idempotency-Key"""
+
+    def test_retry_returns_same_order(self):
+        """Replaying the same key returns the original order instead of creating a new one"""
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        payload = order_payload()
+        first = requests.post(f"{BASE_URL}/api/orders", json=payload, headers=headers)
+        assert first.status_code == 200
+        retry = requests.post(f"{BASE_URL}/api/orders", json=payload, headers=headers)
+        assert retry.status_code == 200
+        assert retry.json() == first.json()
+        print(f"Retry returned original order {first.json()['order_number']}")
+
+    def test_key_reuse_with_different_body_is_rejected(self):
+        """The same key cannot be reused for a different request"""
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        assert requests.post(f"{BASE_URL}/api/orders", json=order_payload(1), headers=headers).status_code == 200
+        response = requests.post(f"{BASE_URL}/api/orders", json=order_payload(2), headers=headers)
+        assert response.status_code == 422
+        print("Key reuse with different payload rejected")
+
+    def test_without_key_creates_new_orders(self):
+        """Requests without the header keep the old behaviour"""
+        payload = order_payload()
+        first = requests.post(f"{BASE_URL}/api/orders", json=payload)
+        second = requests.post(f"{BASE_URL}/api/orders", json=payload)
+        assert first.status_code == 200 and second.status_code == 200
+        assert first.json()["id"] != second.json()["id"]
+
+
+class TestPaymentIdempotency:
+    """Payment submission with Idempotency-Key"""
+
+    def test_submit_payment_replay(self):
+        """Replaying a UTR submission returns the stored response"""
+        order = requests.post(f"{BASE_URL}/api/orders", json=order_payload()).json()
+        utr = f"TEST{uuid.uuid4().hex[:12]}"
+        headers = {"Idempotency-Key": utr}
+        body = {"utr_number": utr, "payment_method": "upi"}
+        first = requests.post(f"{BASE_URL}/api/orders/{order['id']}/submit-payment", json=body, headers=headers)
+        retry = requests.post(f"{BASE_URL}/api/orders/{order['id']}/submit-payment", json=body, headers=headers)
+        assert first.status_code == 200
+        assert retry.json() == first.json()
+        print("UTR submission replay deduplicated")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
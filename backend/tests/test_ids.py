@@ -0,0 +1,43 @@
+"""
+Time-Ordered Id Tests
+Exercises ids.py directly, no server or database required
+"""
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ids
+from ids import datetime_ms, new_id, uuid7_from
+
+
+class TestNewId:
+    def test_uuid7_shape(self):
+        value = uuid.UUID(new_id())
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+        assert len(str(value)) == 36
+
+    def test_ids_strictly_increase(self):
+        generated = [new_id() for _ in range(20000)]
+        assert generated == sorted(generated)
+        assert len(set(generated)) == len(generated)
+        print(f"✓ {len(generated)} ids generated in order")
+
+    def test_clock_stepping_back_keeps_order(self, monkeypatch):
+        first = new_id()
+        monkeypatch.setattr(ids.time, "time_ns", lambda: 0)
+        assert new_id() > first
+
+    def test_timestamp_prefix(self):
+        moment = datetime(2025, 3, 1, 12, 30)
+        value = uuid.UUID(uuid7_from(datetime_ms(moment), 0, 0))
+        assert value.int >> 80 == datetime_ms(moment) == 1740832200000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
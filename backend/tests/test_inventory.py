@@ -0,0 +1,134 @@
+"""
+Inventory Tests for Name Craft E-commerce
+Tests: stock decrement on checkout, oversell protection, release on payment rejection
+"""
+import pytest
+import requests
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://checkout-amount-calc.preview.emergentagent.com')
+
+# Test credentials
+ADMIN_EMAIL = "admin@test.com"
+ADMIN_PASSWORD = "admin123"
+
+SHIPPING_ADDRESS = {
+    "first_name": "TEST",
+    "last_name": "Inventory",
+    "email": "test_inventory@example.com",
+    "phone": "9876543210",
+    "address": "1 Test Street",
+    "city": "Mumbai",
+    "state": "Maharashtra",
+    "pincode": "400001"
+}
+
+
+@pytest.fixture
+def admin_headers():
+    """Get admin auth headers"""
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={
+        "email": ADMIN_EMAIL,
+        "password": ADMIN_PASSWORD
+    })
+    if response.status_code != 200:
+        pytest.skip(f"Admin login failed: {response.text}")
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture
+def limited_product(admin_headers):
+    """Create a product with only 3 units in stock"""
+    slug = f"test-stock-{uuid.uuid4().hex[:6]}"
+    response = requests.post(f"{BASE_URL}/api/admin/products", json={
+        "name": f"TEST Stock {slug}",
+        "slug": slug,
+        "price": 499,
+        "original_price": 999,
+        "image": "https://images.pexels.com/photos/4550854/pexels-photo-4550854.jpeg?w=600",
+        "category": "for-her",
+        "stock_quantity": 3
+    }, headers=admin_headers)
+    assert response.status_code == 200
+    product = response.json()
+    yield product
+    requests.delete(f"{BASE_URL}/api/admin/products/{product['id']}", headers=admin_headers)
+
+
+def place_order(product_id, quantity, payment_method="cod"):
+    return requests.post(f"{BASE_URL}/api/orders", json={
+        "items": [{"product_id": product_id, "quantity": quantity}],
+        "shipping_address": SHIPPING_ADDRESS,
+        "payment_method": payment_method
+    })
+
+
+def get_stock(product, admin_headers):
+    response = requests.get(f"{BASE_URL}/api/admin/products?search={product['name']}", headers=admin_headers)
+    assert response.status_code == 200
+    return response.json()["products"][0]["stock_quantity"]
+
+
+class TestStockReservation:
+    """Checkout stock enforcement tests"""
+
+    def test_order_decrements_stock(self, limited_product, admin_headers):
+        """Placing an order reduces stock_quantity"""
+        response = place_order(limited_product["id"], 2)
+        assert response.status_code == 200
+        assert get_stock(limited_product, admin_headers) == 1
+        print("Stock decremented on checkout")
+
+    def test_order_exceeding_stock_is_rejected(self, limited_product, admin_headers):
+        """Ordering more than available returns 409 and leaves stock untouched"""
+        response = place_order(limited_product["id"], 4)
+        assert response.status_code == 409
+        assert "Insufficient stock" in response.json()["detail"]
+        assert get_stock(limited_product, admin_headers) == 3
+        print("Oversized order rejected")
+
+    def test_concurrent_checkouts_never_oversell(self, limited_product, admin_headers):
+        """Ten simultaneous single-unit orders for 3 units: exactly 3 succeed"""
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            responses = list(pool.map(lambda _: place_order(limited_product["id"], 1), range(10)))
+
+        succeeded = [r for r in responses if r.status_code == 200]
+        rejected = [r for r in responses if r.status_code == 409]
+        assert len(succeeded) == 3
+        assert len(rejected) == 7
+        assert get_stock(limited_product, admin_headers) == 0
+        print("Concurrent checkouts respected stock limit")
+
+    def test_rejected_payment_releases_stock(self, limited_product, admin_headers):
+        """Rejecting a UPI payment returns the held stock"""
+        response = place_order(limited_product["id"], 2, payment_method="upi")
+        assert response.status_code == 200
+        order_id = response.json()["id"]
+        assert get_stock(limited_product, admin_headers) == 1
+
+        reject = requests.post(f"{BASE_URL}/api/admin/orders/{order_id}/reject-payment", headers=admin_headers)
+        assert reject.status_code == 200
+        assert get_stock(limited_product, admin_headers) == 3
+
+        # Rejecting twice must not restock twice
+        requests.post(f"{BASE_URL}/api/admin/orders/{order_id}/reject-payment", headers=admin_headers)
+        assert get_stock(limited_product, admin_headers) == 3
+        print("Stock released on payment rejection")
+
+
+class TestInventoryAlerts:
+    """Inventory alert endpoint tests"""
+
+    def test_alerts_use_stock_quantity(self, limited_product, admin_headers):
+        """Low stock alerts pick up products by stock_quantity"""
+        response = requests.get(f"{BASE_URL}/api/admin/inventory/alerts?threshold=5", headers=admin_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert any(p["id"] == limited_product["id"] for p in data["low_stock"])
+        print(f"Low stock alerts: {data['low_stock_count']}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
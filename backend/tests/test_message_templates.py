@@ -0,0 +1,91 @@
+"""
+Message Template Tests
+Exercises message_templates.py directly, no server or database required
+"""
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from message_templates import (DEFAULT_TEMPLATES, CompiledTemplate, TemplateError, TemplateStore, compile_template,
+                               order_context)
+
+ORDER = {
+    "order_number": "NC202501020000042", "created_at": datetime(2025, 1, 2), "payment_method": "upi",
+    "items": [{"name": "Ring <b>", "image": "/r.jpg", "price": 999, "quantity": 2, "customization": {"name": "Asha"}}]
+    * 4,
+    "subtotal": 7992, "shipping_cost": 0, "discount_amount": 0, "total": 7992, "tracking_number": None,
+    "shipping_address": {"first_name": "Asha", "last_name": "K", "email": "a@example.com", "phone": "98"}
+}
+
+
+class MemoryTemplates:
+    """find_one / update_one / find for the email_templates collection"""
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        doc = self.docs.get(query["id"])
+        return dict(doc) if doc else None
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["id"], {"id": query["id"]})
+        doc.update(update["$set"])
+        doc["version"] = doc.get("version", 0) + update["$inc"]["version"]
+
+
+class TestCompiler:
+    def test_sections_escaping_and_dotted_names(self):
+        render = compile_template(
+            "{{#items}}<li>{{name}} x{{quantity}}</li>{{/items}}{{^tracking}}none{{/tracking}} {{{raw}}} {{a.b}}",
+            autoescape=True
+        )
+        out = render({"items": [{"name": "<i>", "quantity": 2}], "raw": "<hr>", "a": {"b": "ok"}})
+        assert out == "<li>&lt;i&gt; x2</li>none <hr> ok"
+
+    def test_unbalanced_sections_rejected(self):
+        with pytest.raises(TemplateError):
+            compile_template("{{#items}}open")
+        with pytest.raises(TemplateError):
+            compile_template("{{/items}}")
+
+    def test_default_order_templates(self):
+        context = order_context(ORDER, {"site_name": "Name Craft"})
+        email = CompiledTemplate(DEFAULT_TEMPLATES["order_confirmation"], None).render(context)
+        assert email["subject"] == "Order Confirmed! #NC202501020000042"
+        assert "Ring &lt;b&gt;" in email["html"] and "₹7,992" in email["html"]
+        whatsapp = CompiledTemplate(DEFAULT_TEMPLATES["whatsapp_order_confirmation"], None).render(context)
+        assert whatsapp["text"].count("• Ring <b> x2") == 3 and "...and 1 more items" in whatsapp["text"]
+
+
+class TestTemplateStore:
+    def test_cached_until_edited(self):
+        async def run():
+            collection = MemoryTemplates()
+            store = TemplateStore(collection, ttl_seconds=60)
+            first = await store.get("order_shipped")
+            assert await store.get("order_shipped") is first
+            assert collection.reads == 1
+
+            await store.save("order_shipped", {"body": "Shipped {{order_number}}", "subject": "#{{order_number}}"})
+            edited = await store.get("order_shipped")
+            assert edited is not first and edited.version == 1
+            # A stored text body replaces the default html as well
+            assert "Shipped NC1" in edited.render({"order_number": "NC1"})["html"]
+
+            with pytest.raises(TemplateError):
+                await store.save("order_shipped", {"body": "{{#broken}}"})
+            assert (await store.get("order_shipped")).version == 1
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
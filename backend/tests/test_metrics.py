@@ -0,0 +1,96 @@
+"""
+Request Instrumentation Tests
+Exercises metrics.py directly, no server or database required
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from metrics import (MongoCommandListener, RequestMetricsMiddleware, RequestStats, current_request,
+                     registry, track)
+
+
+def command_event(request_id, command_name="find", collection="products", duration_micros=1500):
+    return SimpleNamespace(
+        command={command_name: collection}, command_name=command_name, database_name="test",
+        connection_id=("localhost", 27017), request_id=request_id, duration_micros=duration_micros
+    )
+
+
+class TestMongoCommandListener:
+    """Commands are attributed to the active request"""
+
+    def test_commands_counted_on_current_request(self):
+        listener = MongoCommandListener()
+        stats = RequestStats()
+        token = current_request.set(stats)
+        try:
+            for request_id in (1, 2):
+                event = command_event(request_id)
+                listener.started(event)
+                listener.succeeded(event)
+        finally:
+            current_request.reset(token)
+
+        assert stats.mongo_commands == 2
+        assert stats.mongo_ops[("products", "find")][0] == 2
+        assert "products.find x2" in stats.breakdown()
+        print(f"✓ {stats.breakdown()}")
+
+    def test_failures_counted(self):
+        listener = MongoCommandListener()
+        event = command_event(3, command_name="insert", collection="orders")
+        listener.started(event)
+        listener.failed(event)
+        assert 'mongo_command_failures_total{collection="orders",command="insert"}' in registry.render()
+
+
+class TestRequestMetricsMiddleware:
+    """Per-route latency, Server-Timing header and slow request log"""
+
+    def run_request(self, middleware, path="/api/products"):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": path,
+                 "route": SimpleNamespace(path="/api/products/{product_id}")}
+        asyncio.run(middleware(scope, receive, send))
+        return sent
+
+    def test_route_template_label_and_server_timing(self):
+        async def app(scope, receive, send):
+            with track("bcrypt"):
+                pass
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        sent = self.run_request(RequestMetricsMiddleware(app), "/api/products/abc")
+        headers = dict(sent[0]["headers"])
+        assert b"mongo;" in headers[b"server-timing"] and b"bcrypt;" in headers[b"server-timing"]
+        rendered = registry.render()
+        assert 'http_requests_total{method="GET",route="/api/products/{product_id}",status="200"}' in rendered
+        print("✓ Route template used as label, Server-Timing header present")
+
+    def test_slow_request_logged(self, caplog):
+        async def app(scope, receive, send):
+            await asyncio.sleep(0.02)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        with caplog.at_level("WARNING", logger="metrics"):
+            self.run_request(RequestMetricsMiddleware(app, slow_request_ms=10))
+        assert any("Slow request" in record.message for record in caplog.records)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
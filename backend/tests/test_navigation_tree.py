@@ -0,0 +1,63 @@
+"""
+Navigation Tree Tests
+Exercises navigation.py (nesting, ordering, orphans, cycles) directly, no server or database required
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from navigation import build_navigation_tree, creates_cycle
+
+
+def item(item_id, parent_id=None, order=0, **extra):
+    return {"id": item_id, "name": item_id.title(), "href": f"/{item_id}", "order": order, "parent_id": parent_id, **extra}
+
+
+def shape(tree):
+    return [(node["id"], shape(node["children"])) for node in tree]
+
+
+class TestBuildNavigationTree:
+    def test_nests_and_orders(self):
+        items = [
+            item("rings", order=2), item("women", order=1),
+            item("necklaces", "women", order=2), item("earrings", "women", order=1),
+            item("gold", "necklaces")
+        ]
+        assert shape(build_navigation_tree(items)) == [
+            ("women", [("earrings", []), ("necklaces", [("gold", [])])]),
+            ("rings", [])
+        ]
+        print("✓ Children nested under parents, each level by order")
+
+    def test_inactive_parent_hides_children_and_orphans_move_up(self):
+        items = [
+            item("sale", is_active=False), item("sale-rings", "sale"),
+            item("lost", "deleted-parent", order=5), item("men", order=1)
+        ]
+        assert shape(build_navigation_tree(items)) == [("men", []), ("lost", [])]
+
+    def test_cycles_and_depth_limit_dropped(self):
+        items = [item("a", "b"), item("b", "a"), item("top"), item("l2", "top"), item("l3", "l2"), item("l4", "l3")]
+        assert shape(build_navigation_tree(items)) == [("top", [("l2", [("l3", [])])])]
+
+    def test_source_items_untouched(self):
+        items = [item("women"), item("earrings", "women")]
+        build_navigation_tree(items)
+        assert "children" not in items[0]
+
+
+class TestCreatesCycle:
+    def test_cycles(self):
+        items = [item("women"), item("necklaces", "women"), item("gold", "necklaces")]
+        assert creates_cycle(items, "women", "gold")
+        assert creates_cycle(items, "women", "women")
+        assert not creates_cycle(items, "gold", "women")
+        assert not creates_cycle(items, "women", None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
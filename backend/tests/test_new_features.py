@@ -50,6 +50,16 @@ class TestNavigation:
         data = response.json()
         highlighted = [item for item in data if item.get("highlight")]
         print(f"Highlighted items: {len(highlighted)}")
+    
+    def test_navigation_tree_and_etag(self):
+        """Menu comes back as a tree with an ETag; a matching If-None-Match gets 304"""
+        response = requests.get(f"{BASE_URL}/api/navigation")
+        assert response.status_code == 200
+        assert all(isinstance(item["children"], list) for item in response.json())
+        etag = response.headers["ETag"]
+        cached = requests.get(f"{BASE_URL}/api/navigation", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        print(f"Navigation ETag {etag} revalidated")
 
 
 class TestAdminAuth:
@@ -117,6 +127,28 @@ class TestAdminNavigation:
         # Cleanup
         requests.delete(f"{BASE_URL}/api/admin/navigation/{data['id']}", headers=headers)
     
+    def test_admin_nested_navigation(self, admin_token):
+        """A child item shows under its parent in the public menu at once"""
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        parent = requests.post(f"{BASE_URL}/api/admin/navigation", json={
+            "name": f"TEST_parent_{uuid.uuid4().hex[:6]}", "href": "/test-parent", "order": 98
+        }, headers=headers).json()
+        child = requests.post(f"{BASE_URL}/api/admin/navigation", json={
+            "name": "TEST_child", "href": "/test-child", "parent_id": parent["id"]
+        }, headers=headers).json()
+        try:
+            menu = requests.get(f"{BASE_URL}/api/navigation").json()
+            node = next(item for item in menu if item["id"] == parent["id"])
+            assert [c["id"] for c in node["children"]] == [child["id"]]
+            # Nesting the parent under its own child is refused
+            response = requests.put(f"{BASE_URL}/api/admin/navigation/{parent['id']}",
+                                    json={"parent_id": child["id"]}, headers=headers)
+            assert response.status_code == 400
+            print(f"Nested navigation item: {child['id']}")
+        finally:
+            requests.delete(f"{BASE_URL}/api/admin/navigation/{child['id']}", headers=headers)
+            requests.delete(f"{BASE_URL}/api/admin/navigation/{parent['id']}", headers=headers)
+    
     def test_admin_update_navigation(self, admin_token):
         """Admin can update a navigation item"""
         headers = {"Authorization": f"Bearer {admin_token}"}
@@ -316,5 +348,44 @@ class TestProductCustomImage:
         print(f"{len(products_with_custom)}/{len(products)} products allow custom image upload")
 
 
+class TestAdminProductStock:
+    """Product editor never overwrites stock or ratings; stock moves through /stock"""
+    
+    @pytest.fixture
+    def admin_token(self):
+        """Get admin auth token"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
+        })
+        if response.status_code != 200:
+            pytest.skip(f"Admin login failed: {response.text}")
+        return response.json()["token"]
+    
+    def test_edit_keeps_stock_and_adjust_is_guarded(self, admin_token):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        slug = f"test-stock-{uuid.uuid4().hex[:8]}"
+        product = requests.post(f"{BASE_URL}/api/admin/products", json={
+            "name": "TEST Stock", "slug": slug, "price": 100, "original_price": 100,
+            "image": "/test.jpg", "category": "for-her", "stock_quantity": 0
+        }, headers=headers).json()
+        try:
+            edited = {**product, "name": "TEST Stock Edited", "stock_quantity": 50, "rating_count": 9}
+            assert requests.put(f"{BASE_URL}/api/admin/products/{product['id']}", json=edited, headers=headers).status_code == 200
+            listed = requests.get(f"{BASE_URL}/api/admin/products?search=TEST Stock Edited", headers=headers).json()["products"]
+            saved = next(p for p in listed if p["id"] == product["id"])
+            assert saved["stock_quantity"] == 0 and saved["rating_count"] == 0
+            assert "stock_holds" not in saved
+            
+            stock_url = f"{BASE_URL}/api/admin/products/{product['id']}/stock"
+            assert requests.post(stock_url, json={"delta": 5}, headers=headers).json()["stock_quantity"] == 5
+            assert requests.post(stock_url, json={"quantity": 7, "expected": 0}, headers=headers).status_code == 409
+            assert requests.post(stock_url, json={"quantity": 7, "expected": 5}, headers=headers).json()["stock_quantity"] == 7
+            assert requests.post(stock_url, json={"delta": -8}, headers=headers).status_code == 409
+            print("✓ Product edits keep stock; stock adjusts by delta or compare-and-set")
+        finally:
+            requests.delete(f"{BASE_URL}/api/admin/products/{product['id']}", headers=headers)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,77 @@
+"""
+Order History Tests for Name Craft E-commerce
+Tests: guest orders linked at signup, cursor pagination, summary projection
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://checkout-amount-calc.preview.emergentagent.com')
+
+
+@pytest.fixture
+def product():
+    response = requests.get(f"{BASE_URL}/api/products?limit=1")
+    assert response.status_code == 200
+    if not response.json()["products"]:
+        pytest.skip("No products available")
+    return response.json()["products"][0]
+
+
+def place_guest_order(product_id, email):
+    response = requests.post(f"{BASE_URL}/api/orders", json={
+        "items": [{"product_id": product_id, "quantity": 1, "customization": {"name": "TEST"}}],
+        "shipping_address": {
+            "first_name": "TEST", "last_name": "History", "email": email, "phone": "9876543210", "address": "1 Test Street",
+            "city": "Mumbai", "state": "Maharashtra", "pincode": "400001"
+        },
+        "payment_method": "cod"
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestOrderHistory:
+    """My-orders reads the user_id index only"""
+
+    def test_guest_orders_linked_and_paginated(self, product):
+        email = f"test_history_{uuid.uuid4().hex[:8]}@example.com"
+        placed = [place_guest_order(product["id"], email)["id"] for _ in range(3)]
+
+        response = requests.post(f"{BASE_URL}/api/auth/register", json={
+            "email": email, "name": "TEST History", "password": "history123"
+        })
+        assert response.status_code == 200
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, "cursor": cursor} if cursor else {"limit": 2}
+            page = requests.get(f"{BASE_URL}/api/orders/my-orders", params=params, headers=headers).json()
+            seen.extend(page["orders"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert sorted(o["id"] for o in seen) == sorted(placed)
+        assert "shipping_address" not in seen[0]
+        assert seen[0]["items"][0]["customization"] == {"name": "TEST"}
+        print(f"✓ {len(seen)} guest orders linked and paged")
+
+        # Full detail on demand
+        detail = requests.get(f"{BASE_URL}/api/orders/{seen[0]['id']}", headers=headers).json()
+        assert detail["shipping_address"]["email"] == email
+
+    def test_invalid_cursor_rejected(self, product):
+        email = f"test_history_{uuid.uuid4().hex[:8]}@example.com"
+        token = requests.post(f"{BASE_URL}/api/auth/register", json={
+            "email": email, "name": "TEST History", "password": "history123"
+        }).json()["token"]
+        response = requests.get(f"{BASE_URL}/api/orders/my-orders", params={"cursor": "not-a-cursor"},
+                                headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
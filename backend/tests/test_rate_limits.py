@@ -0,0 +1,133 @@
+"""
+Rate Limiter Tests
+Exercises rate_limits.py directly (buckets, client IP, middleware), no server or database required
+"""
+import asyncio
+import json
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from metrics import registry
+from rate_limits import Limit, MemoryBucketStore, RateLimitMiddleware, RateRule, client_ip
+
+RULES = [RateRule("login", "POST", re.compile(r"^/api/auth/login$"), Limit(5, 60), Limit(2, 60), "email")]
+
+
+def http_scope(path="/api/auth/login", method="POST", client="10.0.0.1", forwarded=None):
+    headers = [(b"content-type", b"application/json")]
+    if forwarded:
+        headers.append((b"x-forwarded-for", forwarded.encode()))
+    return {"type": "http", "method": method, "path": path, "headers": headers, "client": (client, 50000)}
+
+
+async def echo_app(scope, receive, send):
+    message = await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": message["body"]})
+
+
+def limiter(store=None):
+    return RateLimitMiddleware(echo_app, store=store or MemoryBucketStore(), rules=RULES)
+
+
+def call(middleware, scope, body=b""):
+    """Run one request in two body chunks; returns (status, headers, body)"""
+    sent = []
+    chunks = [body[:3], body[3:]]
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"], dict(sent[0].get("headers", [])), sent[1]["body"]
+
+
+def login_body(email):
+    return json.dumps({"email": email, "password": "x"}).encode()
+
+
+class TestMemoryBucketStore:
+    def test_burst_then_refill(self):
+        store = MemoryBucketStore()
+        limit = Limit(3, 3)
+
+        async def run():
+            waits = [await store.take("k", limit) for _ in range(4)]
+            await asyncio.sleep(1.1)
+            return waits, await store.take("k", limit)
+
+        waits, after_refill = asyncio.run(run())
+        assert waits[:3] == [0, 0, 0]
+        assert 0.9 < waits[3] <= 1.0
+        assert after_refill == 0
+        print(f"✓ Burst of 3, then retry after {waits[3]:.2f}s")
+
+    def test_idle_buckets_evicted_when_full(self):
+        store = MemoryBucketStore(max_buckets=10)
+
+        async def run():
+            for n in range(25):
+                await store.take(f"ip-{n}", Limit(5, 60))
+
+        asyncio.run(run())
+        assert len(store._buckets) <= 10
+
+
+class TestClientIp:
+    def test_last_forwarded_hop(self):
+        # The client wrote "6.6.6.6"; the ingress appended the real peer
+        scope = http_scope(forwarded="6.6.6.6, 203.0.113.9")
+        assert client_ip(scope, proxy_hops=1) == "203.0.113.9"
+        assert client_ip(scope, proxy_hops=0) == "10.0.0.1"
+        assert client_ip(http_scope(), proxy_hops=1) == "10.0.0.1"
+
+
+class TestRateLimitMiddleware:
+    def test_account_limit_and_retry_after(self):
+        middleware = limiter()
+        statuses = [call(middleware, http_scope(), login_body("Victim@example.com"))[0] for _ in range(3)]
+        assert statuses == [200, 200, 429]
+
+        status, headers, _ = call(middleware, http_scope(), login_body("victim@example.com"))
+        assert status == 429 and int(headers[b"retry-after"]) >= 1
+        # Other accounts from the same IP still get in until the IP bucket runs dry
+        assert call(middleware, http_scope(), login_body("other@example.com"))[0] == 200
+        print(f"✓ Account limited, Retry-After {headers[b'retry-after'].decode()}s")
+
+    def test_ip_limit(self):
+        middleware = limiter()
+        statuses = [call(middleware, http_scope(), login_body(f"user{n}@example.com"))[0] for n in range(6)]
+        assert statuses == [200] * 5 + [429]
+        assert call(middleware, http_scope(client="10.0.0.2"), login_body("user9@example.com"))[0] == 200
+        assert 'rate_limit_decisions_total{rule="login",scope="ip",outcome="limited"}' in registry.render()
+
+    def test_body_replayed_to_app(self):
+        body = login_body("replay@example.com")
+        assert call(limiter(), http_scope(), body)[2] == body
+
+    def test_other_routes_untouched(self):
+        middleware = limiter()
+        for _ in range(10):
+            assert call(middleware, http_scope(path="/api/products", method="GET"), b"")[0] == 200
+
+    def test_store_failure_lets_requests_through(self):
+        class BrokenStore:
+            async def take(self, key, limit):
+                raise ConnectionError("store down")
+
+        middleware = limiter(BrokenStore())
+        assert call(middleware, http_scope(), login_body("a@example.com"))[0] == 200
+        assert 'rate_limit_store_errors_total{rule="login"}' in registry.render()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
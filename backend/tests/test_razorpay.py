@@ -5,6 +5,10 @@ Tests for Razorpay config, order creation, and verification endpoints
 import pytest
 import requests
 import os
+import json
+import hmac
+import hashlib
+import uuid
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -29,14 +33,42 @@ class TestRazorpayConfig:
         print(f"✓ Razorpay config: enabled={data['enabled']}, key_id={data['key_id'][:15]}...")
 
 
+def place_razorpay_order(quantity=1):
+    """Place a pending Razorpay order for the first product and return it"""
+    product = requests.get(f"{BASE_URL}/api/products").json()["products"][0]
+    response = requests.post(f"{BASE_URL}/api/orders", json={
+        "items": [{
+            "product_id": product["id"],
+            "name": product["name"],
+            "price": product["price"],
+            "quantity": quantity,
+            "image": product["image"],
+            "customization": {"name": "TEST_Razorpay"}
+        }],
+        "shipping_address": {
+            "first_name": "Test",
+            "last_name": "User",
+            "email": "test@razorpay.com",
+            "phone": "+919876543210",
+            "address": "123 Test Street",
+            "city": "Mumbai",
+            "state": "Maharashtra",
+            "pincode": "400001"
+        },
+        "payment_method": "razorpay"
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
 class TestRazorpayOrderCreation:
     """Test Razorpay order creation endpoint"""
     
     def test_create_razorpay_order_success(self):
         """POST /api/payment/razorpay/create-order should create a valid Razorpay order"""
+        order = place_razorpay_order()
         payload = {
-            "amount": 1499,
-            "order_id": "test_order_001",
+            "order_id": order["id"],
             "email": "test@example.com"
         }
         
@@ -52,20 +84,19 @@ class TestRazorpayOrderCreation:
         assert "id" in data
         assert data["id"].startswith("order_")  # Razorpay order IDs start with 'order_'
         assert "amount" in data
-        assert data["amount"] == 149900  # Amount in paise (1499 * 100)
+        assert data["amount"] == round(order["total"] * 100)  # Amount in paise, from the stored order
         assert "currency" in data
         assert data["currency"] == "INR"
         assert "key_id" in data
         print(f"✓ Razorpay order created: {data['id']}, amount={data['amount']} paise")
     
-    def test_create_razorpay_order_with_different_amounts(self):
-        """Test order creation with various amounts"""
-        test_amounts = [999, 1999, 2499]
-        
-        for amount in test_amounts:
+    def test_create_razorpay_order_ignores_client_amount(self):
+        """The amount charged comes from the stored order, never from the request"""
+        for quantity in [1, 2, 3]:
+            order = place_razorpay_order(quantity)
             payload = {
-                "amount": amount,
-                "order_id": f"test_order_{amount}",
+                "amount": 1,
+                "order_id": order["order_number"],
                 "email": "test@example.com"
             }
             
@@ -76,8 +107,17 @@ class TestRazorpayOrderCreation:
             
             assert response.status_code == 200
             data = response.json()
-            assert data["amount"] == amount * 100  # Verify paise conversion
-            print(f"✓ Order for ₹{amount} created: {data['id']}")
+            assert data["amount"] == round(order["total"] * 100)  # Verify paise conversion
+            print(f"✓ Order for ₹{order['total']} created: {data['id']}")
+    
+    def test_create_razorpay_order_unknown_order(self):
+        """Razorpay orders can only be opened for orders that exist"""
+        response = requests.post(
+            f"{BASE_URL}/api/payment/razorpay/create-order",
+            json={"order_id": "test_order_001", "amount": 1499}
+        )
+        assert response.status_code == 404
+        print("✓ Unknown order rejected")
 
 
 class TestRazorpayVerification:
@@ -177,6 +217,48 @@ class TestOrderCreationWithRazorpay:
         return data["order_number"]
 
 
+class TestRazorpayWebhook:
+    """Test Razorpay webhook ingestion endpoint"""
+    
+    def test_webhook_rejects_invalid_signature(self):
+        """POST /api/payment/razorpay/webhook should reject a bad signature"""
+        body = json.dumps({"event": "payment.captured", "payload": {}})
+        
+        response = requests.post(
+            f"{BASE_URL}/api/payment/razorpay/webhook",
+            data=body,
+            headers={"Content-Type": "application/json", "X-Razorpay-Signature": "invalid_signature_here"}
+        )
+        
+        assert response.status_code == 400
+        print(f"✓ Webhook rejects invalid signature: {response.json()['detail']}")
+    
+    def test_webhook_accepts_signed_event_once(self):
+        """A signed event is acknowledged, and a redelivery is reported as duplicate"""
+        secret = os.environ.get('RAZORPAY_WEBHOOK_SECRET')
+        if not secret:
+            pytest.skip("RAZORPAY_WEBHOOK_SECRET not set")
+        
+        body = json.dumps({
+            "event": "payment.failed",
+            "payload": {"payment": {"entity": {"id": "pay_test123", "order_id": "order_test123", "status": "failed"}}}
+        })
+        headers = {
+            "Content-Type": "application/json",
+            "X-Razorpay-Signature": hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest(),
+            "X-Razorpay-Event-Id": f"evt_test_{uuid.uuid4().hex[:12]}"
+        }
+        
+        first = requests.post(f"{BASE_URL}/api/payment/razorpay/webhook", data=body, headers=headers)
+        assert first.status_code == 200
+        assert first.json()["status"] == "accepted"
+        
+        retry = requests.post(f"{BASE_URL}/api/payment/razorpay/webhook", data=body, headers=headers)
+        assert retry.status_code == 200
+        assert retry.json()["status"] == "duplicate"
+        print("✓ Webhook stored once and deduplicated on redelivery")
+
+
 class TestSettingsRazorpayEnabled:
     """Test that Razorpay is enabled in site settings"""
     
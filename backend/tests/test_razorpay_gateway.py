@@ -0,0 +1,117 @@
+"""
+Razorpay Gateway Adapter Tests
+Runs against the local fake in fake_razorpay.py, no network or keys required
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fake_razorpay import start_fake_razorpay
+from razorpay_gateway import RazorpayGateway, RazorpayGatewayError, sign, verify_payment_signature
+
+KEY_ID = "rzp_test_fake"
+KEY_SECRET = "fake_secret"
+
+
+@pytest.fixture
+def fake():
+    server, state, base_url = start_fake_razorpay()
+    yield state, base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def gateway(fake):
+    _, base_url = fake
+    gateway = RazorpayGateway(base_url=base_url, timeout=2)
+    yield gateway
+    gateway.close()
+
+
+class TestRazorpayGateway:
+    """Adapter behaviour against the fake gateway"""
+
+    def test_create_and_fetch_order(self, gateway):
+        """Orders round-trip through the thread pool"""
+        async def run():
+            created = await gateway.create_order(KEY_ID, KEY_SECRET, {"amount": 149900, "currency": "INR"})
+            fetched = await gateway.fetch_order(KEY_ID, KEY_SECRET, created["id"])
+            return created, fetched
+
+        created, fetched = asyncio.run(run())
+        assert created["id"].startswith("order_")
+        assert fetched["amount"] == 149900
+        print(f"✓ Created and fetched {created['id']}")
+
+    def test_fetch_captured_payment(self, gateway, fake):
+        """A payment's amount and currency come back from Razorpay, not the browser"""
+        state, _ = fake
+
+        async def run():
+            created = await gateway.create_order(KEY_ID, KEY_SECRET, {"amount": 500000, "currency": "INR"})
+            captured = state.capture(created["id"])
+            return created, await gateway.fetch_payment(KEY_ID, KEY_SECRET, captured["id"])
+
+        created, payment = asyncio.run(run())
+        assert (payment["order_id"], payment["amount"], payment["currency"]) == (created["id"], 500000, "INR")
+
+    def test_client_cached_per_key_pair(self, gateway):
+        """The same key pair reuses one client; a new pair gets its own"""
+        first = gateway.client(KEY_ID, KEY_SECRET)
+        assert gateway.client(KEY_ID, KEY_SECRET) is first
+        assert gateway.client(KEY_ID, "rotated_secret") is not first
+        print("✓ Clients cached per key pair")
+
+    def test_concurrent_calls_do_not_block_loop(self, gateway, fake):
+        """Slow gateway calls overlap instead of running back to back"""
+        state, _ = fake
+        state.delay = 0.3
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*[
+                gateway.create_order(KEY_ID, KEY_SECRET, {"amount": 10000, "currency": "INR"})
+                for _ in range(5)
+            ])
+            return loop.time() - started
+
+        elapsed = asyncio.run(run())
+        assert elapsed < 1.0
+        print(f"✓ 5 slow calls finished in {elapsed:.2f}s")
+
+    def test_timeout_raises_gateway_error(self, fake):
+        """A hung gateway surfaces as RazorpayGatewayError, not a stuck request"""
+        state, base_url = fake
+        state.delay = 1.5
+        gateway = RazorpayGateway(base_url=base_url, timeout=0.5)
+        with pytest.raises(RazorpayGatewayError):
+            asyncio.run(gateway.create_order(KEY_ID, KEY_SECRET, {"amount": 10000, "currency": "INR"}))
+        gateway.close()
+        print("✓ Timeout surfaced as gateway error")
+
+    def test_rejected_request_raises_gateway_error(self, gateway):
+        """Razorpay validation errors are wrapped"""
+        with pytest.raises(RazorpayGatewayError):
+            asyncio.run(gateway.create_order(KEY_ID, KEY_SECRET, {"amount": 1, "currency": "INR"}))
+
+
+class TestPaymentSignature:
+    """Checkout signature verification"""
+
+    def test_valid_signature(self):
+        signature = sign(KEY_SECRET, "order_abc|pay_def")
+        assert verify_payment_signature(KEY_SECRET, "order_abc", "pay_def", signature)
+
+    def test_tampered_signature(self):
+        signature = sign(KEY_SECRET, "order_abc|pay_def")
+        assert not verify_payment_signature(KEY_SECRET, "order_abc", "pay_other", signature)
+        assert not verify_payment_signature(KEY_SECRET, "order_abc", "pay_def", None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,67 @@
+"""
+Co-purchase Recommendation Tests
+Exercises recommendations.py against a brute-force pair count, no server or database required
+"""
+import itertools
+import math
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from recommendations import MAX_BASKET_SIZE, co_purchase_recommendations
+
+
+def brute_force_scores(baskets):
+    frequency, pairs = Counter(), Counter()
+    for basket in baskets:
+        distinct = set(basket)
+        if 2 <= len(distinct) <= MAX_BASKET_SIZE:
+            frequency.update(distinct)
+            pairs.update(itertools.permutations(distinct, 2))
+    return frequency, pairs
+
+
+class TestCoPurchaseRecommendations:
+    def test_small_example(self):
+        baskets = [["a", "b", "c"], ["a", "b"], ["b", "c"], ["a"], ["a", "b", "b"]]
+        related = co_purchase_recommendations(baskets, k=2)
+        # a is in 3 multi-product baskets, b in 4; bought together 3 times
+        assert related["a"][0] == {"product_id": "b", "score": round(3 / math.sqrt(3 * 4), 4), "count": 3}
+        assert [r["product_id"] for r in related["b"]] == ["a", "c"]
+        # Duplicate lines in one order count once
+        assert related["b"][0]["count"] == 3
+        print("✓ Scores and counts on a hand-checked example")
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        products = [f"p{n}" for n in range(60)]
+        baskets = [rng.sample(products, rng.randint(1, 6)) for _ in range(5000)]
+        related = co_purchase_recommendations(baskets, k=5, min_count=3)
+        frequency, pairs = brute_force_scores(baskets)
+
+        for product in products:
+            expected = sorted(
+                (round(count / math.sqrt(frequency[a] * frequency[b]), 4)
+                 for (a, b), count in pairs.items() if a == product and count >= 3),
+                reverse=True
+            )[:5]
+            assert [r["score"] for r in related.get(product, [])] == expected
+            for r in related.get(product, []):
+                assert pairs[product, r["product_id"]] == r["count"]
+        print(f"✓ Top-5 matches brute force for {len(products)} products over {len(baskets)} orders")
+
+    def test_ignores_single_item_and_oversized_baskets(self):
+        baskets = [["a"], ["b"], [f"bulk{n}" for n in range(MAX_BASKET_SIZE + 1)]]
+        assert co_purchase_recommendations(baskets) == {}
+
+    def test_empty(self):
+        assert co_purchase_recommendations([]) == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,88 @@
+"""
+Review Rating Summary Tests for Name Craft E-commerce
+Tests: rating_count/rating_sum/histogram follow review moderation
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://checkout-amount-calc.preview.emergentagent.com')
+
+# Test credentials
+ADMIN_EMAIL = "admin@test.com"
+ADMIN_PASSWORD = "admin123"
+
+
+@pytest.fixture
+def admin_headers():
+    """Get admin auth headers"""
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={
+        "email": ADMIN_EMAIL,
+        "password": ADMIN_PASSWORD
+    })
+    if response.status_code != 200:
+        pytest.skip(f"Admin login failed: {response.text}")
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture
+def product(admin_headers):
+    """Throwaway product so other reviews cannot disturb the counts"""
+    slug = f"test-rating-{uuid.uuid4().hex[:8]}"
+    response = requests.post(f"{BASE_URL}/api/admin/products", headers=admin_headers, json={
+        "name": "TEST Rating Product", "slug": slug, "price": 999, "original_price": 1999,
+        "image": "https://images.unsplash.com/photo-1601121141461-9d6647bca1ed?w=600", "category": "rings"
+    })
+    assert response.status_code == 200
+    yield response.json()
+    requests.delete(f"{BASE_URL}/api/admin/products/{response.json()['id']}", headers=admin_headers)
+
+
+def submit_review(product_id, rating):
+    marker = uuid.uuid4().hex
+    requests.post(f"{BASE_URL}/api/products/{product_id}/reviews", json={
+        "product_id": product_id, "rating": rating, "comment": marker,
+        "reviewer_name": "TEST Reviewer", "reviewer_email": "test_reviews@example.com"
+    })
+    return marker
+
+
+def find_review(admin_headers, marker):
+    reviews = requests.get(f"{BASE_URL}/api/admin/reviews", headers=admin_headers).json()
+    return next(r for r in reviews if r["comment"] == marker)
+
+
+class TestRatingSummary:
+    """Summary maintained by approve / unapprove / delete"""
+
+    def test_moderation_updates_summary(self, admin_headers, product):
+        ids = [find_review(admin_headers, submit_review(product["id"], rating))["id"] for rating in (5, 3)]
+        for review_id in ids:
+            requests.put(f"{BASE_URL}/api/admin/reviews/{review_id}?approved=true", headers=admin_headers)
+        # Approving twice must not count twice
+        requests.put(f"{BASE_URL}/api/admin/reviews/{ids[0]}?approved=true", headers=admin_headers)
+
+        detail = requests.get(f"{BASE_URL}/api/products/{product['slug']}").json()
+        assert detail["rating_count"] == 2
+        assert detail["rating_sum"] == 8
+        assert detail["rating_average"] == 4.0
+        assert detail["rating_histogram"]["5"] == 1 and detail["rating_histogram"]["3"] == 1
+
+        requests.put(f"{BASE_URL}/api/admin/reviews/{ids[1]}?approved=false", headers=admin_headers)
+        requests.delete(f"{BASE_URL}/api/admin/reviews/{ids[0]}", headers=admin_headers)
+        summary = requests.get(f"{BASE_URL}/api/products/{product['id']}/reviews").json()
+        assert summary["total"] == 0
+        assert summary["average_rating"] == 0
+        print("Rating summary followed moderation")
+
+    def test_listing_includes_summary(self):
+        """Listings carry ratings without per-product review calls"""
+        products = requests.get(f"{BASE_URL}/api/products?limit=5").json()["products"]
+        for product in products:
+            assert "rating_average" in product
+        print(f"Checked {len(products)} listed products")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,64 @@
+"""
+Search Key Normalization Tests
+Exercises search_keys.py directly, no server or database required
+"""
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from search_keys import order_search_clauses, order_search_keys, user_search_clauses, user_search_keys
+
+
+def matches(clauses, doc):
+    """Evaluate anchored-prefix $or branches against a document's search_keys"""
+    for clause in clauses:
+        (field, condition), = clause.items()
+        values = doc["search_keys"][field.split(".", 1)[1]]
+        for value in values if isinstance(values, list) else [values]:
+            if re.match(condition["$regex"], value):
+                return True
+    return False
+
+
+class TestOrderSearch:
+    order = {"search_keys": order_search_keys({
+        "order_number": "NC20250101ABC123", "user_email": "Priya@Example.com",
+        "shipping_address": {"email": "Priya@Example.com", "phone": "+91 84336 91276"}
+    })}
+
+    @pytest.mark.parametrize("search", ["nc2025", "NC20250101abc", "priya@ex", "84336", "+91 84336", "918433691276"])
+    def test_prefixes_match(self, search):
+        assert matches(order_search_clauses(search), self.order)
+
+    @pytest.mark.parametrize("search", ["ABC123", "example.com", "91276"])
+    def test_only_prefixes_match(self, search):
+        assert not matches(order_search_clauses(search), self.order)
+
+    def test_regex_characters_escaped(self):
+        assert order_search_clauses("a.b*")[1]["search_keys.email"]["$regex"] == r"^a\.b\*"
+
+    def test_blank_search_has_no_clauses(self):
+        assert order_search_clauses("   ") == []
+
+
+class TestUserSearch:
+    def test_name_words_and_national_phone(self):
+        keys = user_search_keys({"email": " Raj@Example.com", "name": "Raj  Kumar", "phone": "098765-43210"})
+        assert keys == {"email": "raj@example.com", "phone": ["09876543210", "9876543210"],
+                        "name": ["raj kumar", "raj", "kumar"]}
+        user = {"search_keys": keys}
+        assert matches(user_search_clauses("kum"), user)
+        assert matches(user_search_clauses("Raj K"), user)
+        assert matches(user_search_clauses("98765 43"), user)
+
+    def test_missing_fields(self):
+        assert user_search_keys({"email": "a@example.com", "phone": None}) == \
+            {"email": "a@example.com", "phone": [], "name": []}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
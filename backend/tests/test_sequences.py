@@ -0,0 +1,69 @@
+"""
+Sequence Allocator Tests
+Exercises sequences.py against an in-memory counters collection, no database required
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sequences import SequenceAllocator
+
+
+class MemoryCounters:
+    """Just enough of a Motor collection for find_one_and_update with $inc and upsert"""
+
+    def __init__(self):
+        self.values = {}
+        self.round_trips = 0
+
+    async def find_one_and_update(self, query, update, upsert, return_document):
+        self.round_trips += 1
+        await asyncio.sleep(0)
+        key = query["_id"]
+        self.values[key] = self.values.get(key, 0) + update["$inc"]["value"]
+        return {"_id": key, "value": self.values[key]}
+
+
+def allocate(allocators, per_worker, scope="20250101"):
+    async def worker(allocator):
+        return [await allocator.next(scope) for _ in range(per_worker)]
+
+    async def run():
+        # Several concurrent requests per process, several processes sharing the counter
+        results = await asyncio.gather(*(worker(a) for a in allocators for _ in range(4)))
+        return [n for numbers in results for n in numbers]
+
+    return asyncio.run(run())
+
+
+class TestSequenceAllocator:
+    def test_unique_across_allocators(self):
+        counters = MemoryCounters()
+        allocators = [SequenceAllocator(counters, "order_number", block_size=10) for _ in range(5)]
+        numbers = allocate(allocators, per_worker=25)
+        assert len(numbers) == len(set(numbers)) == 500
+        # One round trip per block, not per number
+        assert counters.round_trips <= 500 // 10 + len(allocators)
+        print(f"✓ 500 numbers, {counters.round_trips} counter updates")
+
+    def test_scope_change_starts_new_sequence(self):
+        counters = MemoryCounters()
+        allocator = SequenceAllocator(counters, "order_number", block_size=10)
+
+        async def run():
+            return [await allocator.next(scope) for scope in ("20250101", "20250101", "20250102")]
+
+        assert asyncio.run(run()) == [1, 2, 1]
+        assert set(counters.values) == {"order_number:20250101", "order_number:20250102"}
+
+    def test_block_size_validated(self):
+        with pytest.raises(ValueError):
+            SequenceAllocator(MemoryCounters(), "order_number", block_size=0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,56 @@
+"""
+Startup Budget Tests
+Imports server.py in a fresh interpreter and checks the import time budget and that the
+payment, mail, NumPy and seed modules stay deferred. Needs the backend requirements
+installed but no server or database (the Mongo client connects lazily).
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Cold import is ~1 s on a dev laptop; the budget leaves room for slower CI machines
+IMPORT_BUDGET_SECONDS = float(os.environ.get('STARTUP_IMPORT_BUDGET_SECONDS', '3'))
+
+DEFERRED_MODULES = ["razorpay", "requests", "httpx", "passlib", "bcrypt", "smtplib", "email.mime.text",
+                    "numpy", "recommendations", "seed_routes"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import server
+print(json.dumps({"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_server(**env):
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], cwd=BACKEND_DIR, capture_output=True, text=True,
+        env={**os.environ, "SEED_ROUTES_ENABLED": "false", **env}
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestStartup:
+    def test_import_within_budget(self):
+        # Best of three, so one slow run on a busy machine doesn't fail the build
+        seconds = min(import_server()["seconds"] for _ in range(3))
+        assert seconds < IMPORT_BUDGET_SECONDS, f"import server took {seconds:.2f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+        print(f"✓ import server: {seconds:.2f}s (budget {IMPORT_BUDGET_SECONDS}s)")
+
+    def test_heavy_modules_deferred(self):
+        loaded = set(import_server()["modules"])
+        assert [module for module in DEFERRED_MODULES if module in loaded] == []
+
+    def test_seed_routes_only_when_enabled(self):
+        assert "seed_routes" in import_server(SEED_ROUTES_ENABLED="true")["modules"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
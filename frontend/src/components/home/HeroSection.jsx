@@ -2,9 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { ArrowRight } from 'lucide-react';
 import { heroData } from '../../data/mock';
-import axios from 'axios';
-
-const API = process.env.REACT_APP_BACKEND_URL || '';
+import { fetchBootstrap } from '../../lib/bootstrap';
 
 const HeroSection = () => {
   const [hero, setHero] = useState(heroData);
@@ -12,13 +10,13 @@ const HeroSection = () => {
   useEffect(() => {
     const fetchSettings = async () => {
       try {
-        const res = await axios.get(`${API}/api/settings`);
-        if (res.data) {
+        const { settings } = await fetchBootstrap();
+        if (settings) {
           setHero({
-            title: res.data.hero_title || heroData.title,
-            cta: res.data.hero_cta || heroData.cta,
-            link: res.data.hero_link || heroData.link,
-            image: res.data.hero_image || heroData.image
+            title: settings.hero_title || heroData.title,
+            cta: settings.hero_cta || heroData.cta,
+            link: settings.hero_link || heroData.link,
+            image: settings.hero_image || heroData.image
           });
         }
       } catch (err) {
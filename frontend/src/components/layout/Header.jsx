@@ -4,9 +4,7 @@ import { Search, User, ShoppingBag, ChevronDown, Menu, X, LogIn } from 'lucide-r
 import { siteConfig } from '../../data/mock';
 import { useCart } from '../../context/CartContext';
 import { useAuth } from '../../context/AuthContext';
-import axios from 'axios';
-
-const API = process.env.REACT_APP_BACKEND_URL || '';
+import { fetchBootstrap } from '../../lib/bootstrap';
 
 const Header = () => {
   const [mobileMenuOpen, setMobileMenuOpen] = useState(false);
@@ -17,12 +15,12 @@ const Header = () => {
   const { user, isAuthenticated } = useAuth();
   const navigate = useNavigate();
 
-  // Fetch navigation items from API
+  // Menu tree (top-level items with nested children) from the shared bootstrap call
   useEffect(() => {
     const fetchNavigation = async () => {
       try {
-        const res = await axios.get(`${API}/api/navigation`);
-        setNavItems(res.data || []);
+        const data = await fetchBootstrap();
+        setNavItems(data.navigation || []);
       } catch (err) {
         // Fallback to default navigation
         setNavItems([
@@ -81,18 +79,37 @@ const Header = () => {
             {/* Desktop Navigation */}
             <div className="hidden lg:flex items-center gap-8">
               {navItems.map((item) => (
-                <Link
-                  key={item.name}
-                  to={item.href}
-                  className={`flex items-center gap-1 text-sm transition-colors ${
-                    item.highlight
-                      ? 'text-sky-600 font-medium hover:text-sky-700'
-                      : 'text-gray-700 hover:text-sky-600'
-                  }`}
-                >
-                  {item.name}
-                  {item.hasDropdown && <ChevronDown className="w-4 h-4" />}
-                </Link>
+                <div key={item.id || item.name} className="relative group">
+                  <Link
+                    to={item.href}
+                    className={`flex items-center gap-1 text-sm transition-colors ${
+                      item.highlight
+                        ? 'text-sky-600 font-medium hover:text-sky-700'
+                        : 'text-gray-700 hover:text-sky-600'
+                    }`}
+                  >
+                    {item.name}
+                    {item.children?.length > 0 && <ChevronDown className="w-4 h-4" />}
+                  </Link>
+                  {item.children?.length > 0 && (
+                    <div className="absolute left-0 top-full pt-2 hidden group-hover:block z-50">
+                      <div className="bg-white border border-gray-100 rounded-lg shadow-lg py-2 min-w-[12rem]">
+                        {item.children.map((child) => (
+                          <div key={child.id}>
+                            <Link to={child.href} className="block px-4 py-2 text-sm text-gray-700 hover:text-sky-600 hover:bg-gray-50">
+                              {child.name}
+                            </Link>
+                            {child.children?.map((grandchild) => (
+                              <Link key={grandchild.id} to={grandchild.href} className="block pl-8 pr-4 py-1.5 text-sm text-gray-500 hover:text-sky-600 hover:bg-gray-50">
+                                {grandchild.name}
+                              </Link>
+                            ))}
+                          </div>
+                        ))}
+                      </div>
+                    </div>
+                  )}
+                </div>
               ))}
             </div>
 
@@ -178,18 +195,29 @@ const Header = () => {
           <div className="lg:hidden border-t border-gray-100 py-4">
             <div className="px-4 space-y-4">
               {navItems.map((item) => (
-                <Link
-                  key={item.name}
-                  to={item.href}
-                  className={`block py-2 text-base transition-colors ${
-                    item.highlight
-                      ? 'text-sky-600 font-medium'
-                      : 'text-gray-700 hover:text-sky-600'
-                  }`}
-                  onClick={() => setMobileMenuOpen(false)}
-                >
-                  {item.name}
-                </Link>
+                <div key={item.id || item.name}>
+                  <Link
+                    to={item.href}
+                    className={`block py-2 text-base transition-colors ${
+                      item.highlight
+                        ? 'text-sky-600 font-medium'
+                        : 'text-gray-700 hover:text-sky-600'
+                    }`}
+                    onClick={() => setMobileMenuOpen(false)}
+                  >
+                    {item.name}
+                  </Link>
+                  {item.children?.map((child) => (
+                    <Link
+                      key={child.id}
+                      to={child.href}
+                      className="block py-1.5 pl-4 text-sm text-gray-600 hover:text-sky-600"
+                      onClick={() => setMobileMenuOpen(false)}
+                    >
+                      {child.name}
+                    </Link>
+                  ))}
+                </div>
               ))}
             </div>
           </div>
@@ -0,0 +1,19 @@
+import axios from 'axios';
+
+const API = process.env.REACT_APP_BACKEND_URL || '';
+
+let request = null;
+
+// Settings, navigation, categories and featured products from one /api/bootstrap call,
+// shared by every component that needs them on this page load
+export const fetchBootstrap = () => {
+  if (!request) {
+    request = axios.get(`${API}/api/bootstrap`)
+      .then((res) => res.data)
+      .catch((err) => {
+        request = null;
+        throw err;
+      });
+  }
+  return request;
+};
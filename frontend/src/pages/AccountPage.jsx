@@ -18,6 +18,8 @@ const AccountPage = () => {
   const navigate = useNavigate();
   const [activeTab, setActiveTab] = useState('orders');
   const [orders, setOrders] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [editing, setEditing] = useState(false);
   const [profileData, setProfileData] = useState({
@@ -57,7 +59,8 @@ const AccountPage = () => {
         const res = await axios.get(`${API}/orders/my-orders`, {
           headers: { Authorization: `Bearer ${token}` }
         });
-        setOrders(res.data || []);
+        setOrders(res.data.orders || []);
+        setNextCursor(res.data.next_cursor);
       } catch (err) {
         console.error('Failed to fetch orders:', err);
       } finally {
@@ -69,6 +72,22 @@ const AccountPage = () => {
     }
   }, [token, isAuthenticated]);
 
+  const loadMoreOrders = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await axios.get(`${API}/orders/my-orders`, {
+        params: { cursor: nextCursor },
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setOrders((prev) => [...prev, ...(res.data.orders || [])]);
+      setNextCursor(res.data.next_cursor);
+    } catch (err) {
+      console.error('Failed to fetch orders:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleLogout = () => {
     logout();
     toast({ title: 'Logged out', description: 'You have been logged out successfully.' });
@@ -243,6 +262,13 @@ const AccountPage = () => {
                         </div>
                       </div>
                     ))}
+                    {nextCursor && (
+                      <div className="text-center">
+                        <Button variant="outline" onClick={loadMoreOrders} disabled={loadingMore}>
+                          {loadingMore ? 'Loading...' : 'Load more orders'}
+                        </Button>
+                      </div>
+                    )}
                   </div>
                 )}
               </div>
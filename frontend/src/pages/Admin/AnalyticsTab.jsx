@@ -256,8 +256,8 @@ const AnalyticsTab = ({ token, api }) => {
             {(analytics?.low_stock_alerts || []).slice(0, 5).map((product, i) => (
               <div key={i} className="flex items-center justify-between py-2 border-b last:border-0">
                 <span className="font-medium text-gray-900">{product.name}</span>
-                <span className={`px-3 py-1 rounded-full text-sm font-medium ${product.stock <= 0 ? 'bg-red-100 text-red-700' : 'bg-orange-100 text-orange-700'}`}>
-                  {product.stock <= 0 ? 'Out of Stock' : `${product.stock} left`}
+                <span className={`px-3 py-1 rounded-full text-sm font-medium ${product.stock_quantity <= 0 ? 'bg-red-100 text-red-700' : 'bg-orange-100 text-orange-700'}`}>
+                  {product.stock_quantity <= 0 ? 'Out of Stock' : `${product.stock_quantity} left`}
                 </span>
               </div>
             ))}
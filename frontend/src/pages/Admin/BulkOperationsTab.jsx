@@ -258,7 +258,7 @@ const BulkOperationsTab = ({ token, api }) => {
                 />
                 <h3 className="font-medium text-gray-900 truncate">{product.name}</h3>
                 <p className="text-sky-600 font-semibold">₹{product.price}</p>
-                <p className="text-sm text-gray-500">Stock: {product.stock}</p>
+                <p className="text-sm text-gray-500">Stock: {product.stock_quantity}</p>
               </div>
             ))}
           </div>
@@ -679,7 +679,7 @@ const ProductForm = ({ token, product, onClose, onSave }) => {
     name: product?.name || '', slug: product?.slug || '', description: product?.description || '',
     price: product?.price || '', original_price: product?.original_price || '', discount: product?.discount || 0,
     image: product?.image || '', hover_image: product?.hover_image || '', category: product?.category || 'for-her',
-    is_featured: product?.is_featured || false, is_active: product?.is_active !== false, stock_quantity: product?.stock_quantity || 100, tags: product?.tags?.join(', ') || '',
+    is_featured: product?.is_featured || false, is_active: product?.is_active !== false, stock_quantity: product?.stock_quantity ?? 100, tags: product?.tags?.join(', ') || '',
     allow_custom_image: product?.allow_custom_image || false
   });
   const [loading, setLoading] = useState(false);
@@ -689,11 +689,17 @@ const ProductForm = ({ token, product, onClose, onSave }) => {
     setLoading(true);
     try {
       const data = { ...form, price: parseFloat(form.price), original_price: parseFloat(form.original_price), discount: parseInt(form.discount), stock_quantity: parseInt(form.stock_quantity), tags: form.tags.split(',').map(t => t.trim()).filter(Boolean) };
-      if (product) await api.put(`/admin/products/${product.id}`, data, token);
-      else await api.post('/admin/products', data, token);
+      if (product) {
+        // Stock is compare-and-set against the value this form loaded, so sales since then aren't overwritten
+        const { stock_quantity, ...fields } = data;
+        await api.put(`/admin/products/${product.id}`, fields, token);
+        if (stock_quantity !== product.stock_quantity) {
+          await api.post(`/admin/products/${product.id}/stock`, { quantity: stock_quantity, expected: product.stock_quantity ?? 0 }, token);
+        }
+      } else await api.post('/admin/products', data, token);
       toast({ title: `Product ${product ? 'updated' : 'created'}` });
       onSave();
-    } catch (e) { toast({ title: 'Error', variant: 'destructive' }); }
+    } catch (e) { toast({ title: 'Error', description: e.response?.data?.detail, variant: 'destructive' }); }
     setLoading(false);
   };
 
@@ -1158,7 +1164,7 @@ const NavigationTab = ({ token }) => {
   const [navItems, setNavItems] = useState([]);
   const [loading, setLoading] = useState(true);
   const [showForm, setShowForm] = useState(false);
-  const [form, setForm] = useState({ name: '', href: '', order: 0, highlight: false });
+  const [form, setForm] = useState({ name: '', href: '', order: 0, highlight: false, parent_id: null });
   const [editingId, setEditingId] = useState(null);
 
   const fetchNavigation = useCallback(async () => {
@@ -1183,14 +1189,14 @@ const NavigationTab = ({ token }) => {
         toast({ title: 'Navigation item added' });
       }
       setShowForm(false);
-      setForm({ name: '', href: '', order: 0, highlight: false });
+      setForm({ name: '', href: '', order: 0, highlight: false, parent_id: null });
       setEditingId(null);
       fetchNavigation();
-    } catch (e) { toast({ title: 'Error', variant: 'destructive' }); }
+    } catch (e) { toast({ title: 'Error', description: e.response?.data?.detail, variant: 'destructive' }); }
   };
 
   const editItem = (item) => {
-    setForm({ name: item.name, href: item.href, order: item.order || 0, highlight: item.highlight || false });
+    setForm({ name: item.name, href: item.href, order: item.order || 0, highlight: item.highlight || false, parent_id: item.parent_id || null });
     setEditingId(item.id);
     setShowForm(true);
   };
@@ -1222,17 +1228,27 @@ const NavigationTab = ({ token }) => {
         <h2 className="text-2xl font-bold">Navigation</h2>
         <div className="flex gap-2">
           <Button variant="outline" onClick={seedDefaults}>Seed Defaults</Button>
-          <Button onClick={() => { setShowForm(!showForm); setEditingId(null); setForm({ name: '', href: '', order: 0, highlight: false }); }} className="bg-sky-500 hover:bg-sky-600">
+          <Button onClick={() => { setShowForm(!showForm); setEditingId(null); setForm({ name: '', href: '', order: 0, highlight: false, parent_id: null }); }} className="bg-sky-500 hover:bg-sky-600">
             <Plus className="w-4 h-4 mr-2" />{editingId ? 'Cancel' : 'Add Item'}
           </Button>
         </div>
       </div>
       {showForm && (
         <div className="bg-white rounded-xl p-6 shadow-sm border">
-          <form onSubmit={handleSubmit} className="grid md:grid-cols-4 gap-4">
+          <form onSubmit={handleSubmit} className="grid md:grid-cols-5 gap-4">
             <div><Label>Name</Label><Input value={form.name} onChange={(e) => setForm({...form, name: e.target.value})} placeholder="Women" required /></div>
             <div><Label>Link</Label><Input value={form.href} onChange={(e) => setForm({...form, href: e.target.value})} placeholder="/collections/for-her" required /></div>
             <div><Label>Order</Label><Input type="number" value={form.order} onChange={(e) => setForm({...form, order: parseInt(e.target.value) || 0})} /></div>
+            <div>
+              <Label>Parent</Label>
+              <Select value={form.parent_id || 'none'} onValueChange={(v) => setForm({...form, parent_id: v === 'none' ? null : v})}>
+                <SelectTrigger><SelectValue /></SelectTrigger>
+                <SelectContent>
+                  <SelectItem value="none">Top level</SelectItem>
+                  {navItems.filter((n) => n.id !== editingId).map((n) => <SelectItem key={n.id} value={n.id}>{n.name}</SelectItem>)}
+                </SelectContent>
+              </Select>
+            </div>
             <div className="flex items-end gap-4">
               <div className="flex items-center gap-2"><Switch checked={form.highlight} onCheckedChange={(v) => setForm({...form, highlight: v})} /><Label>Highlight</Label></div>
               <Button type="submit" className="bg-sky-500 hover:bg-sky-600">{editingId ? 'Update' : 'Add'}</Button>
@@ -1248,6 +1264,7 @@ const NavigationTab = ({ token }) => {
                 <th className="px-6 py-4">Order</th>
                 <th className="px-6 py-4">Name</th>
                 <th className="px-6 py-4">Link</th>
+                <th className="px-6 py-4">Parent</th>
                 <th className="px-6 py-4">Highlight</th>
                 <th className="px-6 py-4">Status</th>
                 <th className="px-6 py-4">Actions</th>
@@ -1259,6 +1276,7 @@ const NavigationTab = ({ token }) => {
                   <td className="px-6 py-4">{item.order || 0}</td>
                   <td className="px-6 py-4 font-medium">{item.name}</td>
                   <td className="px-6 py-4 text-sm text-gray-500">{item.href}</td>
+                  <td className="px-6 py-4 text-sm text-gray-500">{navItems.find((n) => n.id === item.parent_id)?.name || '—'}</td>
                   <td className="px-6 py-4">{item.highlight ? <span className="text-sky-500">Yes</span> : 'No'}</td>
                   <td className="px-6 py-4">
                     <Switch checked={item.is_active !== false} onCheckedChange={() => toggleActive(item)} />
@@ -1368,7 +1386,10 @@ const SettingsTab = ({ token }) => {
 
   const seedData = async () => {
     try { await api.post('/admin/seed', null, token); toast({ title: 'Demo data seeded!' }); }
-    catch (e) { toast({ title: 'Error', variant: 'destructive' }); }
+    catch (e) {
+      const description = e.response?.status === 404 ? 'Seed routes are disabled on this server (SEED_ROUTES_ENABLED)' : undefined;
+      toast({ title: 'Error', description, variant: 'destructive' });
+    }
   };
 
   if (loading) return <div className="p-8">Loading...</div>;
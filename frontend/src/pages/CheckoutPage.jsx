@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { ChevronLeft, Lock, CreditCard, Truck, Shield, Smartphone, QrCode, Globe, CheckCircle, Copy, ExternalLink, User } from 'lucide-react';
 import { useCart } from '../context/CartContext';
@@ -44,10 +44,14 @@ const CheckoutPage = () => {
   const navigate = useNavigate();
   const { error: razorpayError, isLoading: razorpayLoading, Razorpay } = useRazorpay();
   const [loading, setLoading] = useState(false);
+  // Lets the backend recognise retried order submissions instead of creating duplicates
+  const idempotencyKey = useRef(crypto.randomUUID());
   const [couponCode, setCouponCode] = useState('');
   const [discount, setDiscount] = useState(0);
   const [couponApplied, setCouponApplied] = useState(false);
   const [siteSettings, setSiteSettings] = useState(null);
+  // Server-side pricing of the current cart; its token lets checkout skip repricing
+  const [quote, setQuote] = useState(null);
   const [razorpayConfig, setRazorpayConfig] = useState(null);
   const [showAuthPrompt, setShowAuthPrompt] = useState(false);
   const [createAccount, setCreateAccount] = useState(false);
@@ -110,11 +114,30 @@ const CheckoutPage = () => {
     fetchSettings();
   }, []);
 
-  // Calculate shipping based on settings from database
+  // Re-quote whenever the cart or the applied coupon changes
+  const appliedCoupon = couponApplied ? couponCode : null;
+  useEffect(() => {
+    if (!cart.length) {
+      setQuote(null);
+      return;
+    }
+    let cancelled = false;
+    axios.post(`${API}/cart/quote`, {
+      items: cart.map(item => ({ product_id: item.id, quantity: item.quantity, customization: item.customization })),
+      coupon_code: appliedCoupon
+    })
+      .then(res => { if (!cancelled) setQuote(res.data); })
+      .catch(() => { if (!cancelled) setQuote(null); });
+    return () => { cancelled = true; };
+  }, [cart, appliedCoupon]);
+
+  // Calculate shipping based on settings from database until the quote arrives
   const freeShippingThreshold = siteSettings?.free_shipping_threshold || 499;
   const baseShippingCost = siteSettings?.shipping_cost || 29;
-  const shippingCost = cartTotal >= freeShippingThreshold ? 0 : baseShippingCost;
-  const total = cartTotal + shippingCost - discount;
+  const subtotal = quote ? quote.subtotal : cartTotal;
+  const shippingCost = quote ? quote.shipping_cost : (cartTotal >= freeShippingThreshold ? 0 : baseShippingCost);
+  const discountAmount = quote ? quote.discount_amount : discount;
+  const total = quote ? quote.total : cartTotal + shippingCost - discount;
 
   const handleInputChange = (e) => {
     const { name, value } = e.target;
@@ -126,10 +149,9 @@ const CheckoutPage = () => {
     try {
       // Create Razorpay order
       const razorpayOrderRes = await axios.post(`${API}/payment/razorpay/create-order`, {
-        amount: total,
         order_id: savedOrderId,
         email: formData.email
-      });
+      }, { headers: { 'Idempotency-Key': savedOrderId } });
 
       const options = {
         key: razorpayConfig?.key_id,
@@ -146,7 +168,7 @@ const CheckoutPage = () => {
               razorpay_payment_id: response.razorpay_payment_id,
               razorpay_signature: response.razorpay_signature,
               order_id: savedOrderId
-            });
+            }, { headers: { 'Idempotency-Key': response.razorpay_payment_id } });
             
             clearCart();
             setOrderId(savedOrderId);
@@ -183,7 +205,7 @@ const CheckoutPage = () => {
       toast({ title: "Error", description: "Failed to initialize payment.", variant: "destructive" });
       setLoading(false);
     }
-  }, [Razorpay, razorpayConfig, total, formData, clearCart]);
+  }, [Razorpay, razorpayConfig, formData, clearCart]);
 
   const applyCoupon = async () => {
     if (!couponCode.trim()) return;
@@ -250,16 +272,19 @@ const CheckoutPage = () => {
           pincode: formData.pincode
         },
         payment_method: formData.paymentMethod,
-        subtotal: cartTotal,
+        subtotal: subtotal,
         shipping_cost: shippingCost,
-        discount_amount: discount,
+        discount_amount: discountAmount,
         total: total,
-        coupon_code: couponApplied ? couponCode : null,
+        coupon_code: appliedCoupon,
+        quote_token: quote?.quote_token || null,
         user_email: formData.email
       };
       
       // Add auth header if logged in
-      const config = token ? { headers: { Authorization: `Bearer ${token}` } } : {};
+      const headers = { 'Idempotency-Key': idempotencyKey.current };
+      if (token) headers.Authorization = `Bearer ${token}`;
+      const config = { headers };
 
       const res = await axios.post(`${API}/orders`, orderData, config);
       const savedOrderId = res.data.order_number || res.data.id;
@@ -297,7 +322,7 @@ const CheckoutPage = () => {
       await axios.post(`${API}/orders/${orderId}/submit-payment`, {
         utr_number: utrNumber,
         payment_method: formData.paymentMethod
-      });
+      }, { headers: { 'Idempotency-Key': utrNumber.trim() } });
       
       clearCart();
       setCheckoutStep('confirmation');
@@ -652,9 +677,9 @@ const CheckoutPage = () => {
 
               {/* Totals */}
               <div className="space-y-2 border-t border-gray-200 pt-4">
-                <div className="flex justify-between text-gray-600"><span>Subtotal ({cartCount} items)</span><span>{siteConfig.currencySymbol}{cartTotal.toLocaleString()}</span></div>
+                <div className="flex justify-between text-gray-600"><span>Subtotal ({cartCount} items)</span><span>{siteConfig.currencySymbol}{subtotal.toLocaleString()}</span></div>
                 <div className="flex justify-between text-gray-600"><span>Shipping</span><span>{shippingCost === 0 ? 'Free' : `${siteConfig.currencySymbol}${shippingCost}`}</span></div>
-                {discount > 0 && <div className="flex justify-between text-green-600"><span>Discount</span><span>-{siteConfig.currencySymbol}{discount.toFixed(0)}</span></div>}
+                {discountAmount > 0 && <div className="flex justify-between text-green-600"><span>Discount</span><span>-{siteConfig.currencySymbol}{discountAmount.toFixed(0)}</span></div>}
                 <div className="flex justify-between text-lg font-medium text-gray-900 pt-2 border-t"><span>Total</span><span>{siteConfig.currencySymbol}{total.toLocaleString()}</span></div>
               </div>
 